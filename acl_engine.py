@@ -0,0 +1,379 @@
+# acl_engine.py
+
+from bisect import bisect_right
+from collections import Counter
+from routing_engine import ip_to_int, int_to_ip, load_numpy, FULL_MASK
+
+PROTOCOLS = {
+    "icmp": 1,
+    "igmp": 2,
+    "tcp": 6,
+    "udp": 17,
+    "gre": 47,
+    "esp": 50,
+    "ahp": 51,
+    "eigrp": 88,
+    "ospf": 89,
+    "pim": 103,
+}
+PROTOCOL_NAMES = {number: name for name, number in PROTOCOLS.items()}
+
+PORTS = {
+    "ftp-data": 20,
+    "ftp": 21,
+    "ssh": 22,
+    "telnet": 23,
+    "smtp": 25,
+    "domain": 53,
+    "bootps": 67,
+    "bootpc": 68,
+    "tftp": 69,
+    "www": 80,
+    "http": 80,
+    "pop3": 110,
+    "ntp": 123,
+    "snmp": 161,
+    "snmptrap": 162,
+    "bgp": 179,
+    "https": 443,
+    "syslog": 514,
+}
+
+# שדות החבילה, לפי הסדר: (protocol, src, dst, src_port, dst_port) - כולם מספרים שלמים
+FIELDS = ("protocol", "src", "dst", "src_port", "dst_port")
+FIELD_RANGES = ((0, 255), (0, FULL_MASK), (0, FULL_MASK), (0, 65535), (0, 65535))
+
+# מאגרים קטנים מזה מוערכים בלולאה גם כש-NumPy מותקן; ההמרה למערכים לא משתלמת
+VECTOR_THRESHOLD = 256
+VECTOR_CHUNK = 4096
+
+
+class ACE:
+    # שורה אחת ב-ACL. כתובת = (value, care): החבילה מתאימה אם address & care == value.
+    # פורטים = רשימת טווחים סגורים [(lo, hi)], או None לכל פורט
+    __slots__ = ("action", "protocol", "src", "dst", "src_ports", "dst_ports", "text")
+
+    def __init__(self, action, text, protocol=None, src=(0, 0), dst=(0, 0), src_ports=None, dst_ports=None):
+        self.action = action
+        self.text = text
+        self.protocol = protocol
+        self.src = src
+        self.dst = dst
+        self.src_ports = src_ports
+        self.dst_ports = dst_ports
+
+    def matches(self, packet):
+        if self.action == "remark":
+            return False
+        protocol, src, dst, src_port, dst_port = packet
+        if self.protocol is not None and protocol != self.protocol:
+            return False
+        if src & self.src[1] != self.src[0] or dst & self.dst[1] != self.dst[0]:
+            return False
+        return in_ranges(src_port, self.src_ports) and in_ranges(dst_port, self.dst_ports)
+
+    def intervals(self, field):
+        # הערכים של שדה אחד שמתאימים לשורה, כטווחים סגורים. כתובת עם wildcard לא רציף
+        # מוחזרת כטווח המלא, והבדיקה המדויקת נעשית ב-matches (ראו CompiledACL.verify)
+        if self.action == "remark":
+            return []
+        low, high = FIELD_RANGES[field]
+        if field == 0:
+            return [(low, high)] if self.protocol is None else [(self.protocol, self.protocol)]
+        if field in (1, 2):
+            value, care = self.src if field == 1 else self.dst
+            wildcard = ~care & FULL_MASK
+            if wildcard & (wildcard + 1):
+                return [(low, high)]
+            return [(value, value | wildcard)]
+        ports = self.src_ports if field == 3 else self.dst_ports
+        return [(low, high)] if ports is None else ports
+
+    def exact(self):
+        # True אם intervals מתאר את השורה בדיוק (wildcard רציף בשתי הכתובות)
+        for _, care in (self.src, self.dst):
+            wildcard = ~care & FULL_MASK
+            if wildcard & (wildcard + 1):
+                return False
+        return True
+
+
+def in_ranges(value, ranges):
+    if ranges is None:
+        return True
+    for low, high in ranges:
+        if low <= value <= high:
+            return True
+    return False
+
+
+def is_standard(acl_id):
+    # 1-99 ו-1300-1999 הם ACL סטנדרטי (כתובת מקור בלבד), 100-199 ו-2000-2699 מורחב
+    if not str(acl_id).isdigit():
+        return None
+    number = int(acl_id)
+    if 1 <= number <= 99 or 1300 <= number <= 1999:
+        return True
+    if 100 <= number <= 199 or 2000 <= number <= 2699:
+        return False
+    raise ValueError(f"Invalid access list number: {acl_id}")
+
+
+def parse_address(tokens, position):
+    # any | host A.B.C.D | A.B.C.D W.W.W.W  ->  ((value, care), המיקום הבא)
+    if position >= len(tokens):
+        raise ValueError("Address required")
+    token = tokens[position]
+    if token == "any":
+        return (0, 0), position + 1
+    if token == "host":
+        if position + 1 >= len(tokens):
+            raise ValueError("Host address required")
+        return (ip_to_int(tokens[position + 1]), FULL_MASK), position + 2
+    address = ip_to_int(token)
+    wildcard = 0
+    if position + 1 < len(tokens) and tokens[position + 1].count(".") == 3:
+        wildcard = ip_to_int(tokens[position + 1])
+        position += 1
+    care = ~wildcard & FULL_MASK
+    return (address & care, care), position + 1
+
+
+def parse_port(token):
+    if token.isdigit() and int(token) <= 65535:
+        return int(token)
+    if token in PORTS:
+        return PORTS[token]
+    raise ValueError(f"Invalid port: {token}")
+
+
+def parse_ports(tokens, position):
+    # eq / neq / lt / gt / range  ->  (רשימת טווחים או None, המיקום הבא)
+    if position >= len(tokens) or tokens[position] not in ("eq", "neq", "lt", "gt", "range"):
+        return None, position
+    operator = tokens[position]
+    if operator == "range":
+        if position + 2 >= len(tokens):
+            raise ValueError("Port range requires two ports")
+        low, high = parse_port(tokens[position + 1]), parse_port(tokens[position + 2])
+        if low > high:
+            raise ValueError("Invalid port range")
+        return [(low, high)], position + 3
+    if position + 1 >= len(tokens):
+        raise ValueError(f"Port required after {operator}")
+    port = parse_port(tokens[position + 1])
+    if operator == "eq":
+        ranges = [(port, port)]
+    elif operator == "lt":
+        ranges = [(0, port - 1)] if port > 0 else []
+    elif operator == "gt":
+        ranges = [(port + 1, 65535)] if port < 65535 else []
+    else:
+        ranges = [(low, high) for low, high in ((0, port - 1), (port + 1, 65535)) if low <= high]
+    return ranges, position + 2
+
+
+def parse_rule(text, standard=None):
+    # "permit tcp any host 10.0.0.5 eq 80" -> ACE. standard=None מזהה לפי התוכן (ACL בשם)
+    tokens = text.lower().split()
+    if not tokens or tokens[0] not in ("permit", "deny", "remark"):
+        raise ValueError("Rule must start with permit, deny or remark")
+    action = tokens[0]
+    if action == "remark":
+        return ACE(action, text)
+    if standard is None:
+        standard = len(tokens) > 1 and (tokens[1] in ("any", "host") or tokens[1].count(".") == 3)
+    if standard:
+        src, position = parse_address(tokens, 1)
+        ace = ACE(action, text, src=src)
+    else:
+        if len(tokens) < 2:
+            raise ValueError("Protocol required")
+        name = tokens[1]
+        if name == "ip":
+            protocol = None
+        elif name in PROTOCOLS:
+            protocol = PROTOCOLS[name]
+        elif name.isdigit() and int(name) <= 255:
+            protocol = int(name)
+        else:
+            raise ValueError(f"Invalid protocol: {name}")
+        src, position = parse_address(tokens, 2)
+        src_ports, position = parse_ports(tokens, position) if protocol in (6, 17) else (None, position)
+        dst, position = parse_address(tokens, position)
+        dst_ports, position = parse_ports(tokens, position) if protocol in (6, 17) else (None, position)
+        ace = ACE(action, text, protocol, src, dst, src_ports, dst_ports)
+    for token in tokens[position:]:
+        if token not in ("log", "log-input"):
+            raise ValueError(f"Unexpected token: {token}")
+    return ace
+
+
+def make_packet(protocol, src, dst, src_port=0, dst_port=0):
+    # ("tcp", "10.0.0.1", "10.0.0.2", 1234, 80) -> החבילה בייצוג המספרי
+    if isinstance(protocol, str):
+        protocol = PROTOCOLS[protocol] if protocol in PROTOCOLS else int(protocol)
+    return (protocol, ip_to_int(src), ip_to_int(dst), int(src_port), int(dst_port))
+
+
+def format_packet(packet):
+    protocol, src, dst, src_port, dst_port = packet
+    name = PROTOCOL_NAMES.get(protocol, str(protocol))
+    if protocol in (6, 17):
+        return f"{name} {int_to_ip(src)}:{src_port} -> {int_to_ip(dst)}:{dst_port}"
+    return f"{name} {int_to_ip(src)} -> {int_to_ip(dst)}"
+
+
+class CompiledACL:
+    # ACL מהודר לחיפוש מהיר עם first-match: לכל שדה, ציר הערכים מחולק לטווחים אלמנטריים
+    # ולכל טווח bitmask של השורות שמתאימות בו (ביט i = שורה i). חבילה = חיפוש בינארי לכל שדה,
+    # AND של חמש המסכות, והביט הנמוך ביותר הוא השורה הראשונה שמתאימה
+    def __init__(self, rules, standard=None, hits=None):
+        self.rules = []
+        for rule in rules:
+            try:
+                self.rules.append(parse_rule(rule, standard))
+            except ValueError:
+                # שורה שנשמרה לפני שהיה אימות ולא ניתנת לפענוח - נשארת בתצוגה אבל לא מתאימה לכלום
+                self.rules.append(ACE("remark", rule))
+        # מוני ההתאמות לכל שורה; רשימה של מי שיצר (DataManager), כדי שישרדו הידור מחדש
+        self.hits = [] if hits is None else hits
+        del self.hits[len(self.rules):]
+        self.hits.extend([0] * (len(self.rules) - len(self.hits)))
+        self.bounds = []
+        self.masks = []
+        for field in range(len(FIELDS)):
+            bounds, masks = self._build_field(field)
+            self.bounds.append(bounds)
+            self.masks.append(masks)
+        # שורות שה-bitmask לא מתאר בדיוק (wildcard לא רציף) ונבדקות שוב ב-ACE.matches
+        self.verify = 0
+        for i, rule in enumerate(self.rules):
+            if not rule.exact():
+                self.verify |= 1 << i
+        self.permits = [rule.action == "permit" for rule in self.rules]
+        self._words = None
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _build_field(self, field):
+        # סריקה על נקודות הקצה: בכל נקודה המסכה משתנה רק בשורות שטווח שלהן מתחיל או נגמר בה
+        events = {}
+        for i, rule in enumerate(self.rules):
+            bit = 1 << i
+            for low, high in rule.intervals(field):
+                events[low] = events.get(low, 0) ^ bit
+                events[high + 1] = events.get(high + 1, 0) ^ bit
+        low, high = FIELD_RANGES[field]
+        events.setdefault(low, 0)
+        bounds = []
+        masks = []
+        mask = 0
+        for position in sorted(events):
+            if position > high:
+                break
+            mask ^= events[position]
+            bounds.append(position)
+            masks.append(mask)
+        return bounds, masks
+
+    def match(self, packet):
+        # אינדקס השורה הראשונה שמתאימה, או None (deny מובלע בסוף כל ACL)
+        bounds, masks = self.bounds, self.masks
+        candidates = (masks[0][bisect_right(bounds[0], packet[0]) - 1]
+                      & masks[1][bisect_right(bounds[1], packet[1]) - 1]
+                      & masks[2][bisect_right(bounds[2], packet[2]) - 1]
+                      & masks[3][bisect_right(bounds[3], packet[3]) - 1]
+                      & masks[4][bisect_right(bounds[4], packet[4]) - 1])
+        while candidates:
+            lowest = candidates & -candidates
+            index = lowest.bit_length() - 1
+            if not lowest & self.verify or self.rules[index].matches(packet):
+                return index
+            candidates ^= lowest
+        return None
+
+    def permitted(self, packet, count=True):
+        index = self.match(packet)
+        if index is None:
+            return False
+        if count:
+            self.hits[index] += 1
+        return self.permits[index]
+
+    def evaluate_many(self, packets, count=True, vectorized=None):
+        # אינדקס השורה לכל חבילה (-1 = deny מובלע). vectorized=None: NumPy אם מותקן והאצווה גדולה.
+        # בלי NumPy הכול עובד, רק הערכת אצוות גדולות רצה בלולאה רגילה
+        if vectorized is None:
+            vectorized = len(packets) >= VECTOR_THRESHOLD and load_numpy() is not None
+        if vectorized:
+            if load_numpy() is None:
+                raise RuntimeError("NumPy is not installed")
+            indexes = self._evaluate_vectorized(packets)
+        else:
+            match = self.match
+            indexes = [-1 if index is None else index for index in map(match, packets)]
+        if count:
+            for index, hits in Counter(indexes).items():
+                if index >= 0:
+                    self.hits[index] += hits
+        return indexes
+
+    def permitted_many(self, packets, count=True, vectorized=None):
+        permits = self.permits
+        return [index >= 0 and permits[index] for index in self.evaluate_many(packets, count, vectorized)]
+
+    def _word_tables(self):
+        # המסכות של כל שדה כמטריצה (טווח x מילים של 64 ביט), נבנות רק לשימוש הראשון ב-NumPy
+        if self._words is None:
+            np = load_numpy()
+            words = max(1, (len(self.rules) + 63) // 64)
+            self._words = [
+                (np.array(bounds, dtype=np.int64),
+                 np.frombuffer(b"".join(mask.to_bytes(words * 8, "little") for mask in masks),
+                               dtype="<u8").reshape(len(masks), words))
+                for bounds, masks in zip(self.bounds, self.masks)]
+        return self._words
+
+    def _evaluate_vectorized(self, packets):
+        np = load_numpy()
+        tables = self._word_tables()
+        packets = np.asarray(packets, dtype=np.int64).reshape(-1, len(FIELDS))
+        result = np.empty(len(packets), dtype=np.int64)
+        for start in range(0, len(packets), VECTOR_CHUNK):
+            chunk = packets[start:start + VECTOR_CHUNK]
+            candidates = None
+            for field, (bounds, words) in enumerate(tables):
+                rows = words[np.searchsorted(bounds, chunk[:, field], side="right") - 1]
+                candidates = rows if candidates is None else candidates & rows
+            nonzero = candidates != 0
+            found = nonzero.any(axis=1)
+            word = nonzero.argmax(axis=1)
+            value = candidates[np.arange(len(chunk)), word]
+            lowest = value & (~value + np.uint64(1))
+            bit = np.log2(np.where(found, lowest, 1).astype(np.float64)).astype(np.int64)
+            result[start:start + VECTOR_CHUNK] = np.where(found, word * 64 + bit, -1)
+        indexes = result.tolist()
+        if self.verify:
+            # שורה עם wildcard לא רציף שנבחרה במטריצה נבדקת שוב, בלולאה, רק עבור החבילות האלה
+            for position, index in enumerate(indexes):
+                if index >= 0 and (self.verify >> index) & 1:
+                    match = self.match(tuple(int(value) for value in packets[position]))
+                    indexes[position] = -1 if match is None else match
+        return indexes
+
+    def clear_counters(self):
+        self.hits[:] = [0] * len(self.rules)
+
+    def show(self, acl_id, standard=None):
+        # פלט show access-lists לרשימה אחת, עם מונה ההתאמות של כל שורה
+        if standard is None:
+            standard = all(rule.protocol is None and rule.dst == (0, 0) and rule.dst_ports is None
+                           for rule in self.rules)
+        kind = "Standard" if standard else "Extended"
+        yield f"{kind} IP access list {acl_id}"
+        for i, rule in enumerate(self.rules):
+            hits = self.hits[i]
+            suffix = f" ({hits} match{'es' if hits != 1 else ''})" if hits else ""
+            yield f"    {(i + 1) * 10} {rule.text}{suffix}"
@@ -0,0 +1,62 @@
+# benchmarks/__main__.py
+#
+# הרצת כל המדידות ושמירת התוצאות כ-JSON, עם השוואה אופציונלית להרצה קודמת.
+# הרצה מתיקיית הפרויקט:
+#   python -m benchmarks --output before.json
+#   python -m benchmarks --output after.json --compare before.json
+
+import argparse
+import json
+import sys
+
+from benchmarks import bench_acl, bench_eigrp, bench_forwarding, bench_interfaces, bench_mac, bench_ospf, bench_parser, bench_render, bench_rip, bench_routing, bench_startup, bench_state, bench_suggestions
+from benchmarks.harness import compare, environment, quiet_logging, write_report
+
+SUITES = {
+    "parser": bench_parser.run,
+    "suggestions": lambda quick, seed: bench_suggestions.run(500 if quick else 2000, seed),
+    "state": bench_state.run,
+    "startup": bench_startup.run,
+    "render": bench_render.run,
+    "routing": bench_routing.run,
+    "acl": bench_acl.run,
+    "mac": bench_mac.run,
+    "ospf": bench_ospf.run,
+    "eigrp": bench_eigrp.run,
+    "rip": bench_rip.run,
+    "forwarding": bench_forwarding.run,
+    "interfaces": bench_interfaces.run,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cisco CLI Simulator benchmark suite")
+    parser.add_argument("--suite", choices=sorted(SUITES), nargs="+", default=list(SUITES))
+    parser.add_argument("--quick", action="store_true", help="קלטים קטנים יותר, לבדיקה מהירה")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="-", help="קובץ JSON לתוצאות ('-' לפלט הסטנדרטי)")
+    parser.add_argument("--compare", help="קובץ JSON של הרצה קודמת להשוואה")
+    parser.add_argument("--threshold", type=float, default=0.10, help="שינוי יחסי שמדווח (ברירת מחדל 10%%)")
+    args = parser.parse_args(argv)
+
+    quiet_logging()
+    report = {"meta": dict(environment(), quick=args.quick, seed=args.seed), "results": {}}
+    for name in args.suite:
+        sys.stderr.write(f"running {name}...\n")
+        report["results"][name] = SUITES[name](args.quick, args.seed)
+    write_report(report, args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = 0
+        for name, before, after, ratio in compare(baseline, report, args.threshold):
+            label = "slower" if ratio > 1 else "faster"
+            regressions += ratio > 1
+            sys.stderr.write(f"{name}: {before:.3f}us -> {after:.3f}us ({ratio:.2f}x, {label})\n")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
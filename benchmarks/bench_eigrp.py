@@ -0,0 +1,74 @@
+# benchmarks/bench_eigrp.py
+#
+# AS של EIGRP עם 300 נתבים (רשת משבצות 15x20) ב-DeviceRegistry אחד: התכנסות ראשונה (הפצת כל
+# הרשתות בין השכנים), ואחריה התכנסות אחרי שינוי בודד - delay של קישור, קישור שיורד ועולה (queries
+# ו-replies של DUAL), ו-loopback שיורד ועולה. כל שינוי נמדד עד שכל הנתבים מתכנסים, עם עדכון טבלת
+# הניתוב של כל נתב שהושפע.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_eigrp [--quick] [--seed S]
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, quiet_logging
+from benchmarks.bench_ospf import build
+
+
+def run(quick=False, seed=0):
+    rows, columns = (6, 6) if quick else (15, 20)
+    repeat = 3 if quick else 5
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    registry = build(generators.eigrp_grid_config(rows, columns, seed=seed))
+    build_seconds = time.perf_counter() - start
+    domain = registry.eigrp
+    managers = [registry.device(device_id).data_manager for device_id in sorted(registry)]
+    observer = managers[len(managers) // 2]
+    start = time.perf_counter()
+    domain.converge()
+    converge_seconds = time.perf_counter() - start
+    routes = sum(len(router.installed) for router in domain.routers.values())
+    messages = sum(domain.sent.values())
+
+    def change(manager, interface, key, values):
+        def apply(value):
+            manager.update_interface(interface, key, value)
+            observer.routing_engine()
+        return [lambda _, value=value: apply(value) for value in values]
+
+    delay_changes, link_flaps, stub_flaps = [], [], []
+    for manager in rng.sample(managers, 10):
+        delay_changes += change(manager, "GigabitEthernet0/0", "delay", (rng.randint(21, 40), rng.randint(1, 20)))
+        link_flaps += change(manager, "GigabitEthernet0/0", "status", ("administratively down", "up"))
+        stub_flaps += change(manager, "Loopback0", "status", ("administratively down", "up"))
+
+    results = {
+        "seed": seed,
+        "routers": len(managers),
+        "build_seconds": round(build_seconds, 3),
+        "initial_converge_seconds": round(converge_seconds, 3),
+        "initial_messages": messages,
+        "installed_routes": routes,
+        "delay_change": measure(lambda fn: fn(None), delay_changes, repeat),
+        "link_flap": measure(lambda fn: fn(None), link_flaps, repeat),
+        "stub_flap": measure(lambda fn: fn(None), stub_flaps, repeat),
+        "show_ip_route_after_change": measure(
+            lambda fn: (fn(None), list(observer.routing_engine().show_ip_route())), delay_changes, repeat),
+    }
+    registry.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-router EIGRP convergence benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
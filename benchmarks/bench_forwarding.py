@@ -0,0 +1,69 @@
+# benchmarks/bench_forwarding.py
+#
+# ה-data plane על אזור OSPF של 500 נתבים (רשת משבצות 20x25) ב-DeviceRegistry אחד: ping ו-traceroute בין
+# שני נתבים רחוקים, ומטריצת reachability של כל ה-loopbacks (250,000 זוגות) - בתהליך אחד עם ה-memo של
+# קטעי הדרך, ומחולקת בין תהליכים. ACL על כמה קישורים מבטל את ה-memo בקטעים שעוברים בהם.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_forwarding [--quick] [--seed S]
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, quiet_logging
+from benchmarks.bench_ospf import build
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, round(time.perf_counter() - start, 3)
+
+
+def run(quick=False, seed=0):
+    rows, columns = (6, 8) if quick else (20, 25)
+    repeat = 3 if quick else 5
+    rng = random.Random(seed)
+    registry = build(generators.ospf_grid_config(rows, columns, seed=seed))
+    managers = [registry.device(device_id).data_manager for device_id in sorted(registry)]
+    for manager in managers:
+        manager.routing_engine()
+    for manager in rng.sample(managers, max(1, len(managers) // 50)):
+        manager.update_device_state("access_lists", {"150": ["deny udp any any eq 53", "permit ip any any"]})
+        manager.update_interface("GigabitEthernet0/0", "access_group_in", "150")
+    loopbacks = [manager.state["interfaces"]["Loopback0"]["ip_address"] for manager in managers]
+    plane = registry.forwarding
+    first, last = registry.device(sorted(registry)[0]), loopbacks[-1]
+
+    serial, serial_seconds = timed(lambda: plane.reachability(loopbacks, workers=1))
+    pooled, pooled_seconds = timed(lambda: plane.reachability(loopbacks))
+    udp, udp_seconds = timed(lambda: plane.reachability(loopbacks, protocol="udp", port=53, workers=1))
+    results = {
+        "seed": seed,
+        "routers": len(managers),
+        "pairs": len(serial),
+        "reachable": sum(cell.reachable for cell in serial.values()),
+        "matrix_serial_seconds": serial_seconds,
+        "matrix_pool_seconds": pooled_seconds,
+        "pool_matches_serial": pooled == serial,
+        "udp_matrix_serial_seconds": udp_seconds,
+        "udp_reachable": sum(cell.reachable for cell in udp.values()),
+        "ping": measure(lambda line: first.execute(line), [f"ping {last}"] * 10, repeat),
+        "traceroute": measure(lambda line: first.execute(line), [f"traceroute {last}"] * 10, repeat),
+    }
+    registry.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-device forwarding and reachability benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
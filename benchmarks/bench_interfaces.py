@@ -0,0 +1,100 @@
+# benchmarks/bench_interfaces.py
+#
+# טבלת הממשקים על מחסניות גישה של 9 יחידות x 48 פורטים (432 ממשקים), 200 מכשירים ב-DeviceRegistry אחד:
+# הזיכרון של רשומות הממשקים לכל המכשירים, פקודות show על מכשיר אחד (מלאות ומסוננות דרך האינדקסים),
+# clear counters, ושינוי בממשק בודד (status / VLAN) שמעדכן את הרשומה והאינדקסים.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_interfaces [--quick] [--seed S]
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from benchmarks import generators
+from benchmarks.harness import measure, quiet_logging
+from cli_simulator import STATUS_OK
+from command_catalog import CommandCatalog
+from data_manager import DURABILITY_CHECKPOINT
+from device_registry import DeviceRegistry
+
+SHOW_COMMANDS = [
+    "show interfaces status",
+    "show ip interface brief",
+    "show interfaces trunk",
+    "show interfaces counters",
+    "show etherchannel summary",
+    "show interfaces",
+]
+
+
+def run(quick=False, seed=0):
+    devices = 10 if quick else 200
+    repeat = 3 if quick else 5
+    rng = random.Random(seed)
+    lines = generators.access_stack_config(seed=seed)
+    registry = DeviceRegistry(':memory:', catalog=CommandCatalog.load(), durability=DURABILITY_CHECKPOINT)
+    start = time.perf_counter()
+    simulators = []
+    for number in range(devices):
+        simulator = registry.add_device(f"SW{number}", "switch")
+        for _ in simulator.run_script(lines):
+            pass
+        simulators.append(simulator)
+    build_seconds = time.perf_counter() - start
+    managers = [simulator.data_manager for simulator in simulators]
+
+    # channel-group כבר בנה את הטבלאות בזמן ההגדרה; נבנות מחדש כדי למדוד את הזיכרון שלהן
+    for manager in managers:
+        manager.interface_records = None
+    tracemalloc.start()
+    start = time.perf_counter()
+    tables = [manager.interface_table() for manager in managers]
+    index_seconds = time.perf_counter() - start
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    interfaces = sum(len(table) for table in tables)
+
+    observer = simulators[0]
+    table = tables[0]
+    vlan = rng.choice(sorted(table.by_vlan))
+    results = {
+        "seed": seed,
+        "devices": devices,
+        "interfaces": interfaces,
+        "build_seconds": round(build_seconds, 3),
+        "index_build_seconds": round(index_seconds, 3),
+        "table_bytes_per_interface": round(table_bytes / interfaces, 1),
+        "show": {},
+    }
+    for line in SHOW_COMMANDS + [f"show interfaces status vlan {vlan}", "show interfaces status disabled"]:
+        result = observer.execute(line)
+        if result.status != STATUS_OK:
+            results["show"][line] = {"error": result.output}
+            continue
+        results["show"][line] = measure(lambda _: observer.execute(line), range(3), repeat)
+        results["show"][line]["output_lines"] = result.output.count("\n") + 1
+
+    names = [record.name for record in table]
+    manager = managers[0]
+    results["clear_counters"] = measure(lambda _: observer.execute("clear counters"), range(100), repeat)
+    results["interface_status_change"] = measure(
+        lambda name: manager.update_interface(name, "status", rng.choice(("up", "administratively down"))),
+        rng.sample(names, 100), repeat)
+    results["access_vlan_change"] = measure(
+        lambda name: manager.update_interface(name, "switchport_access_vlan", vlan), rng.sample(names, 100), repeat)
+    registry.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="interface table memory and show benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_mac.py
+#
+# טבלת MAC של מתג עם 100,000 תחנות (ובמתגים רבים): למידה, למידה מחדש, aging בגלגל הטיימרים
+# בזמן מדומה, ותצוגה מסוננת לפי VLAN ולפי פורט.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_mac [--quick] [--seed S]
+
+import argparse
+import json
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, measure_once, quiet_logging
+from mac_table import MacTable
+from sim_clock import SimulatedClock
+
+
+def filled(stations, clock):
+    table = MacTable(clock, aging_time=300)
+    for vlan, mac, port in stations:
+        table.learn(vlan, mac, port)
+    return table
+
+
+def run(quick=False, seed=0):
+    count = 10000 if quick else 100000
+    switches = 4 if quick else 20
+    repeat = 3 if quick else 5
+    stations = generators.mac_addresses(count, seed=seed)
+    results = {"entries": count, "switches": switches, "seed": seed}
+
+    def learn():
+        clock = SimulatedClock()
+        start = time.perf_counter()
+        filled(stations, clock)
+        return (time.perf_counter() - start) / count
+
+    results["learn"] = measure_once(learn, repeat)
+
+    clock = SimulatedClock()
+    table = filled(stations, clock)
+    results["relearn"] = measure(lambda station: table.learn(*station), stations, repeat)
+    results["lookup"] = measure(lambda station: table.lookup(station[0], station[1]), stations, repeat)
+
+    vlan, _, port = stations[0]
+    results["show_vlan"] = measure(lambda _: list(table.show(vlan=vlan)), range(20), repeat)
+    results["show_interface"] = measure(lambda _: list(table.show(port=port)), range(20), repeat)
+
+    # כל שנייה מדומה בלי שכניסה פגה: ההתקדמות לא סורקת את הטבלה
+    table.set_aging_time(1000000)
+    results["expire_idle_tick"] = measure(lambda _: (clock.advance(1), table.expire()), range(200), repeat)
+
+    def age_out():
+        # חצי מהתחנות ממשיכות לשדר, החצי השני מתיישן; מודדים את ה-expire שמוציא אותו
+        aging_clock = SimulatedClock()
+        aged = filled(stations, aging_clock)
+        aging_clock.advance(200)
+        for station in stations[::2]:
+            aged.learn(*station)
+        aging_clock.advance(150)
+        start = time.perf_counter()
+        removed = aged.expire()
+        elapsed = time.perf_counter() - start
+        assert len(removed) == count - len(stations[::2])
+        return elapsed / len(removed)
+
+    results["expire_per_entry"] = measure_once(age_out, repeat)
+
+    def many_switches():
+        # מתגים רבים עם שעון משותף: שעה מדומה של תנועה ו-aging בכולם
+        shared = SimulatedClock()
+        tables = [MacTable(shared, aging_time=300) for _ in range(switches)]
+        per_switch = stations[:count // switches]
+        start = time.perf_counter()
+        for minute in range(60):
+            for index, switch in enumerate(tables):
+                for station in per_switch[(minute + index) % 3::3]:
+                    switch.learn(*station)
+                switch.expire()
+            shared.advance(60)
+        return time.perf_counter() - start
+
+    results["many_switches_hour"] = measure_once(many_switches, 1, warmup=0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MAC address table benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
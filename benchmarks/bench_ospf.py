@@ -0,0 +1,89 @@
+# benchmarks/bench_ospf.py
+#
+# אזור OSPF של 1,000 נתבים (רשת משבצות 25x40) ב-DeviceRegistry אחד: התכנסות ראשונה (SPF מלא בכל
+# נתב), ואחריה התכנסות אחרי שינוי בודד - עלות קישור, קישור שיורד ועולה, ו-loopback שיורד ועולה
+# (רק רשת קצה, בלי Dijkstra). כל שינוי נמדד כפי שנתב אחד רואה אותו (הפצת ה-LSA, ה-SPF שלו ועדכון
+# טבלת הניתוב שלו), ועלות קישור גם כהתכנסות של כל הנתבים באזור.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_ospf [--quick] [--seed S]
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, quiet_logging
+from command_catalog import CommandCatalog
+from data_manager import DURABILITY_CHECKPOINT
+from device_registry import DeviceRegistry
+
+
+def build(configs):
+    registry = DeviceRegistry(':memory:', catalog=CommandCatalog.load(), durability=DURABILITY_CHECKPOINT)
+    for device_id, lines in configs.items():
+        for _ in registry.add_device(device_id, "router").run_script(lines):
+            pass
+    return registry
+
+
+def run(quick=False, seed=0):
+    rows, columns = (10, 10) if quick else (25, 40)
+    repeat = 3 if quick else 5
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    registry = build(generators.ospf_grid_config(rows, columns, seed=seed))
+    build_seconds = time.perf_counter() - start
+    domain = registry.ospf
+    managers = [registry.device(device_id).data_manager for device_id in sorted(registry)]
+    observer = managers[len(managers) // 2]
+    start = time.perf_counter()
+    observer.routing_engine()
+    first_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    domain.converge()
+    converge_seconds = time.perf_counter() - start
+    routes = sum(len(tree.routes) for tree in domain.trees.values())
+
+    def change(manager, interface, key, values, everywhere=False):
+        def apply(value):
+            manager.update_interface(interface, key, value)
+            domain.converge() if everywhere else observer.routing_engine()
+        return [lambda _, value=value: apply(value) for value in values]
+
+    cost_changes, all_routers, link_flaps, stub_flaps = [], [], [], []
+    for manager in rng.sample(managers, 10):
+        costs = (rng.randint(21, 40), rng.randint(1, 20))
+        cost_changes += change(manager, "GigabitEthernet0/0", "ospf_cost", costs)
+        all_routers += change(manager, "GigabitEthernet0/0", "ospf_cost", costs, everywhere=True)
+        link_flaps += change(manager, "GigabitEthernet0/0", "status", ("administratively down", "up"))
+        stub_flaps += change(manager, "Loopback0", "status", ("administratively down", "up"))
+
+    results = {
+        "seed": seed,
+        "routers": len(managers),
+        "build_seconds": round(build_seconds, 3),
+        "first_router_spf_seconds": round(first_seconds, 4),
+        "all_routers_converge_seconds": round(converge_seconds, 3),
+        "installed_routes": routes,
+        "cost_change": measure(lambda fn: fn(None), cost_changes, repeat),
+        "link_flap": measure(lambda fn: fn(None), link_flaps, repeat),
+        "stub_flap": measure(lambda fn: fn(None), stub_flaps, repeat),
+        "cost_change_all_routers": measure(lambda fn: fn(None), all_routers[:4], 1),
+        "show_ip_route_after_change": measure(
+            lambda fn: (fn(None), list(observer.routing_engine().show_ip_route())), cost_changes, repeat),
+    }
+    registry.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-router OSPF convergence benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_parser.py
+#
+# הנתיב החם של כל שורה: זיהוי הפקודה בעץ, parse_command לפי מצב, הרצת סקריפט מלא,
+# השלמה (Tab) והצעות תיקון לשורה לא מוכרת.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_parser [--quick] [--seed S]
+
+import argparse
+import json
+import logging
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, measure_once, quiet_logging
+from command_catalog import CommandCatalog
+from command_index import MODES
+from command_parser import CommandError
+from logger import set_level
+from script_runner import create_simulator
+
+
+def parse_in_mode(parser, mode):
+    def parse(line):
+        try:
+            parser.dispatch(line, "router", mode)
+        except CommandError:
+            # גם פקודה שנדחתה עוברת את כל הנתיב: זיהוי, אימות והודעת שגיאה
+            pass
+    return parse
+
+
+def run_script(catalog, lines):
+    def run():
+        simulator = create_simulator("router", catalog)
+        start = time.perf_counter()
+        for _ in simulator.run_script(lines):
+            pass
+        elapsed = time.perf_counter() - start
+        simulator.data_manager.close()
+        return elapsed / len(lines)
+    return run
+
+
+def run(quick=False, seed=0):
+    catalog = CommandCatalog.load()
+    commands = catalog.commands
+    samples = 500 if quick else 5000
+    repeat = 3 if quick else 5
+    lines = generators.catalog_lines(commands, samples, seed)
+
+    results = {"samples": samples, "seed": seed}
+    results["resolve"] = measure(lambda item: catalog.index.resolve(item[0].split(), item[1]), lines, repeat)
+
+    simulator = create_simulator("router", catalog)
+    parser = simulator.command_parser
+    parser.trace = False
+    by_mode = {}
+    for mode in MODES:
+        mode_lines = [line for line, line_mode in lines if line_mode == mode]
+        if mode_lines:
+            by_mode[mode] = measure(parse_in_mode(parser, mode), mode_lines, repeat)
+    results["parse_command"] = by_mode
+
+    # אותו נתיב עם תיעוד כל פקודה (DEBUG לקובץ), כדי לראות כמה התיעוד מוסיף לכל שורה
+    parser.trace = True
+    set_level(logging.DEBUG, "parser")
+    privileged = [line for line, line_mode in lines if line_mode == "privileged"]
+    results["parse_command_traced"] = measure(parse_in_mode(parser, "privileged"), privileged, repeat)
+    set_level(logging.NOTSET, "parser")
+    parser.trace = False
+
+    script = generators.router_config(interfaces=32, ospf_networks=64, seed=seed)
+    results["run_script_router"] = measure_once(run_script(catalog, script), repeat)
+    stack = generators.switch_stack_config(switches=4 if quick else 20, ports=48, vlans=100, seed=seed)
+    results["run_script_switch_stack"] = measure_once(run_script(catalog, stack), repeat)
+
+    prefixes = generators.completion_prefixes(commands, samples, seed)
+    results["complete_command"] = measure(lambda item: parser.complete_command(*item), prefixes, repeat)
+
+    typos = generators.typo_lines(commands, samples // 5, seed)
+    suggestions = catalog.suggestions
+
+    def suggest_uncached(item):
+        suggestions.cache.clear()
+        simulator.mode = item[1]
+        simulator.suggest_correction(item[0])
+
+    def suggest_cached(item):
+        simulator.mode = item[1]
+        simulator.suggest_correction(item[0])
+
+    results["suggest_correction"] = measure(suggest_uncached, typos, repeat)
+    results["suggest_correction_cached"] = measure(suggest_cached, typos, repeat)
+    simulator.data_manager.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="command parsing, completion and suggestion benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/bench_render.py
+#
+# הפקת פלט של פקודות show על מכשירים גדולים: מחסנית מתגים (100 יחידות x 48 פורטים)
+# ונתב עם 50,000 נתיבים סטטיים. פקודה שעדיין אין לה handler מדווחת עם השגיאה במקום זמן.
+# ה-running-config נמדד גם מאפס (בלי מטמון החלקים) וגם אחרי שינוי בפריט אחד, וכך גם snapshot
+# לארכיון והחזרה ממנו (configure replace).
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_render [--quick] [--seed S]
+
+import argparse
+import json
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, measure_once, quiet_logging
+from cli_simulator import STATUS_OK
+from command_catalog import CommandCatalog
+from script_runner import create_simulator
+
+SHOW_COMMANDS = {
+    "switch": [
+        "show running-config",
+        "show interfaces",
+        "show ip interface brief",
+        "show interfaces status",
+        "show vlan",
+        "show mac address-table",
+    ],
+    "router": [
+        "show running-config",
+        "show running-config | include ^ip route 1",
+        "show ip route",
+        "show ip route | include via 10.255.0.1$",
+        "show ip route | begin 200.",
+        "show ip interface brief",
+        "show access-lists",
+        "show ip ospf",
+    ],
+}
+
+
+def build_device(catalog, device_type, lines):
+    simulator = create_simulator(device_type, catalog)
+    start = time.perf_counter()
+    for _ in simulator.run_script(lines):
+        pass
+    return simulator, time.perf_counter() - start
+
+
+def render(simulator, commands, repeat):
+    results = {}
+    for line in commands:
+        simulator.mode = "privileged"
+        result = simulator.execute(line)
+        if result.status != STATUS_OK:
+            results[line] = {"error": result.output}
+            continue
+        results[line] = measure(lambda _: simulator.execute(line), range(3), repeat)
+        results[line]["output_lines"] = result.output.count("\n") + 1
+    return results
+
+
+def running_config(simulator, changes, repeat):
+    manager = simulator.data_manager
+
+    def cold():
+        manager.renderer = None
+        start = time.perf_counter()
+        "\n".join(manager.running_config())
+        return time.perf_counter() - start
+
+    def after_change(change):
+        # שינוי אחד (ממשק שעולה או יורד, נתיב חדש) ואז הפקה מלאה של הטקסט
+        change(manager)
+        "\n".join(manager.running_config())
+
+    return {"cold": measure_once(cold, repeat), "after_one_change": measure(after_change, changes, repeat)}
+
+
+def archive(simulator, changes, repeat):
+    manager = simulator.data_manager
+    base = manager.archive_config()
+
+    def snapshot(change):
+        change(manager)
+        manager.archive_config()
+
+    def replace(change):
+        # שינוי אחד ואז חזרה ל-snapshot הבסיס
+        change(manager)
+        manager.replace_config(base)
+
+    return {"snapshot_after_one_change": measure(snapshot, changes, repeat),
+            "replace_after_one_change": measure(replace, changes, repeat)}
+
+
+def run(quick=False, seed=0):
+    catalog = CommandCatalog.load()
+    repeat = 3 if quick else 5
+    switches = 10 if quick else 100
+    routes = 5000 if quick else 50000
+
+    stack, stack_seconds = build_device(catalog, "switch", generators.switch_stack_config(switches, 48, seed=seed))
+    # נתב עם ממשקים ו-OSPF, ואחריו טבלת הנתיבים הסטטיים (בלי השורות שחוזרות על enable / configure terminal)
+    router_lines = (generators.router_config(seed=seed)[:-1] + ["exit"]
+                    + generators.route_table_config(routes, seed=seed)[2:])
+    router, router_seconds = build_device(catalog, "router", router_lines)
+
+    ports = [f"GigabitEthernet{unit}/0/{port}" for unit in range(1, switches + 1) for port in (1, 48)]
+    port_changes = [lambda manager, name=name, status=status: manager.update_interface(name, "status", status)
+                    for name in ports[:20] for status in ("administratively down", "up")]
+    route_changes = [change for i in range(20) for change in (
+        lambda manager, i=i: manager.add_route(f"172.16.{i}.0/255.255.255.0", "10.255.0.1"),
+        lambda manager, i=i: manager.remove_route(f"172.16.{i}.0/255.255.255.0"))]
+
+    results = {
+        "seed": seed,
+        "switch_stack": {"switches": switches, "ports": 48, "build_seconds": round(stack_seconds, 3),
+                         "commands": render(stack, SHOW_COMMANDS["switch"], repeat),
+                         "running_config": running_config(stack, port_changes, repeat),
+                         "archive": archive(stack, port_changes[:6], repeat)},
+        "router": {"routes": routes, "build_seconds": round(router_seconds, 3),
+                   "commands": render(router, SHOW_COMMANDS["router"], repeat),
+                   "running_config": running_config(router, route_changes, repeat),
+                   "archive": archive(router, route_changes[:6], repeat)},
+    }
+    stack.data_manager.close()
+    router.data_manager.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="show command rendering benchmark on large devices")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_rip.py
+#
+# RIP על רשת משבצות של 2,000 נתבים (40x50) עם כ-10,000 prefixes ב-DeviceRegistry אחד: התכנסות ראשונה
+# בסבבים המסונכרנים של RipDomain, ואחריה התכנסות אחרי קישור שיורד ועולה ואחרי loopback שיורד ועולה, עד
+# שכל הנתבים מתכנסים. לצורך השוואה, התכנסות ראשונה על רשת קטנה עם NumPy ובלי.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_rip [--quick] [--seed S]
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, quiet_logging
+from benchmarks.bench_ospf import build
+from rip_engine import RipDomain
+
+
+def converge_seconds(registry, vectorized):
+    domain = RipDomain(vectorized)
+    for device_id in sorted(registry):
+        domain.attach(device_id, registry.device(device_id).data_manager)
+    start = time.perf_counter()
+    domain.converge()
+    return round(time.perf_counter() - start, 3)
+
+
+def run(quick=False, seed=0):
+    rows, columns = (8, 10) if quick else (40, 50)
+    repeat = 3 if quick else 5
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    registry = build(generators.rip_grid_config(rows, columns, seed=seed))
+    build_seconds = time.perf_counter() - start
+    domain = registry.rip
+    managers = [registry.device(device_id).data_manager for device_id in sorted(registry)]
+    observer = managers[len(managers) // 2]
+    start = time.perf_counter()
+    domain.converge()
+    converge = time.perf_counter() - start
+
+    def change(manager, interface, values):
+        def apply(value):
+            manager.update_interface(interface, "status", value)
+            observer.routing_engine()
+        return [lambda _, value=value: apply(value) for value in values]
+
+    link_flaps, stub_flaps = [], []
+    for manager in rng.sample(managers, 10):
+        link_flaps += change(manager, "GigabitEthernet0/0", ("administratively down", "up"))
+        stub_flaps += change(manager, "Loopback0", ("administratively down", "up"))
+
+    results = {
+        "seed": seed,
+        "routers": len(managers),
+        "prefixes": len(domain.prefixes),
+        "vectorized": domain.vectorized,
+        "build_seconds": round(build_seconds, 3),
+        "initial_converge_seconds": round(converge, 3),
+        "initial_rounds": domain.rounds,
+        "initial_metric_changes": domain.changes,
+        "installed_routes": sum(len(routes) for routes in domain.installed.values()),
+        "link_flap": measure(lambda fn: fn(None), link_flaps, repeat),
+        "stub_flap": measure(lambda fn: fn(None), stub_flaps, repeat),
+        "show_ip_route_after_change": measure(
+            lambda fn: (fn(None), list(observer.routing_engine().show_ip_route())), link_flaps, repeat),
+    }
+    registry.close()
+    small = build(generators.rip_grid_config(6, 8, seed=seed))
+    results["small_grid_converge_seconds"] = {"numpy": converge_seconds(small, True),
+                                             "python": converge_seconds(small, False)}
+    small.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="multi-router RIP convergence benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
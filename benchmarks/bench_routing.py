@@ -0,0 +1,72 @@
+# benchmarks/bench_routing.py
+#
+# מנוע הניתוב בטבלה מלאה: בניית RIB/FIB מ-500,000 נתיבים, חיפוש longest-prefix-match לכתובת
+# ולאצווה של כתובות, ועדכון נתיב בודד בטבלה מלאה.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_routing [--quick] [--seed S]
+
+import argparse
+import json
+import random
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, measure_once, quiet_logging
+from routing_engine import RoutingEngine
+
+
+def build(prefixes, next_hops):
+    engine = RoutingEngine()
+    start = time.perf_counter()
+    for i, (network, length) in enumerate(prefixes):
+        engine.add_route(network, length, "static", next_hop=next_hops[i % len(next_hops)])
+    return engine, time.perf_counter() - start
+
+
+def run(quick=False, seed=0):
+    routes = 50000 if quick else 500000
+    repeat = 3 if quick else 5
+    rng = random.Random(seed)
+    prefixes = generators.int_prefixes(routes, seed)
+    next_hops = [(10 << 24) | (255 << 16) | i for i in range(1, 33)]
+
+    engine, elapsed = build(prefixes, next_hops)
+    results = {"routes": routes, "seed": seed, "build": {"us_per_op": round(elapsed / routes * 1e6, 3)}}
+
+    # חצי מהכתובות בתוך prefix קיים, חצי אקראיות (רובן יפלו על נתיב קצר יותר או על כלום)
+    addresses = [network | rng.getrandbits(32 - length) if length < 32 else network
+                 for network, length in rng.sample(prefixes, 5000)]
+    addresses += [rng.getrandbits(32) for _ in range(5000)]
+    results["fib_lookup"] = measure(engine.fib.lookup, addresses, repeat)
+    results["rib_lookup"] = measure(engine.rib.lookup, addresses, repeat)
+    results["fib_lookup_many"] = measure_once(lambda: timed_many(engine, addresses), repeat)
+    results["resolve"] = measure(engine.resolve, addresses, repeat)
+
+    # עדכון בטבלה מלאה: הוספה והסרה של נתיב שמשנה את הנבחר ל-prefix
+    updates = rng.sample(prefixes, 2000)
+
+    def update(item):
+        network, length = item
+        engine.add_route(network, length, "ospf", next_hop=next_hops[0], distance=0)
+        engine.remove_route(network, length, "ospf", next_hop=next_hops[0])
+
+    results["incremental_update"] = measure(update, updates, repeat)
+    return results
+
+
+def timed_many(engine, addresses):
+    start = time.perf_counter()
+    engine.fib.lookup_many(addresses)
+    return (time.perf_counter() - start) / len(addresses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="routing engine (RIB/FIB) benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_startup.py
+#
+# זמן עלייה: בניית הקטלוג, יצירת CLISimulator בתוך תהליך קיים (עם קטלוג משותף ובלעדיו),
+# ועלייה קרה בתהליך Python חדש - כמו סשן או משימת בדיקה חדשה.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_startup [--quick]
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import ROOT, measure, measure_once, quiet_logging
+import command_catalog
+from command_catalog import CommandCatalog
+from cli_simulator import CLISimulator
+from data_manager import DataManager, DURABILITY_CHECKPOINT
+
+# כל תוכנית רצה בתיקייה זמנית עם עותק של commands.json, כך שהמסד שנוצר לא נוגע בזה של הפרויקט.
+# הקטלוג המהודר (.cache/commands.catalog) נשאר בין ההרצות, כמו בשימוש רגיל
+COLD_PROGRAMS = {
+    "python": "pass",
+    "import_cli_simulator": "import cli_simulator",
+    "cli_simulator": "import cli_simulator; cli_simulator.CLISimulator().set_device_type('router')",
+    "main_module": "import main",
+}
+
+
+def cold_start(program, directory):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+    def run():
+        for name in os.listdir(directory):
+            if name not in ("commands.json", command_catalog.CACHE_DIRECTORY):
+                path = os.path.join(directory, name)
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-c", program], cwd=directory, env=env,
+                                 capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr.strip().splitlines()[-1])
+        return elapsed
+    return run
+
+
+def run(quick=False, seed=0):
+    repeat = 3 if quick else 7
+    results = {}
+    results["catalog_load"] = measure_once(lambda: timed(CommandCatalog.load), repeat)
+    catalog = CommandCatalog.shared()
+    results["catalog_shared"] = measure(lambda _: CommandCatalog.shared(), range(100), repeat)
+
+    def from_compiled():
+        # תהליך חדש: אין קטלוג בזיכרון, הוא נטען מהקובץ המהודר
+        command_catalog._shared.clear()
+        return timed(CommandCatalog.shared)
+
+    results["catalog_compiled"] = measure_once(from_compiled, repeat)
+
+    def shared_catalog(_):
+        manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT, commands=catalog.commands)
+        CLISimulator(manager, catalog).set_device_type("router")
+        manager.close()
+
+    def own_catalog(_):
+        manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT)
+        CLISimulator(manager).set_device_type("router")
+        manager.close()
+
+    count = 20 if quick else 200
+    results["simulator_shared_catalog"] = measure(shared_catalog, range(count), repeat)
+    results["simulator_own_catalog"] = measure(own_catalog, range(count // 4), repeat)
+
+    cold = {}
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copy(os.path.join(ROOT, "commands.json"), directory)
+        for name, program in COLD_PROGRAMS.items():
+            try:
+                cold[name] = measure_once(cold_start(program, directory), repeat, warmup=1)
+            except RuntimeError as e:
+                # למשל main.py בלי PyQt5 מותקן
+                cold[name] = {"error": str(e)}
+    results["cold_process"] = cold
+    return results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="catalog and simulator startup benchmark")
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_state.py
+#
+# מחיר השינויים ב-DataManager כשהמכשיר כבר מחזיק 10 / 1,000 / 100,000 ישויות מכל סוג:
+# ממשקים, VLANs, נתיבים ו-ACLs. נמדדים גם flush אחרי שינויים, batch() וטעינה קרה מ-SQLite.
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_state [--quick] [--seed S]
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks import generators
+from benchmarks.harness import measure, measure_once, quiet_logging
+from data_manager import DataManager, DURABILITY_CHECKPOINT
+
+SIZES = (10, 1000, 100000)
+QUICK_SIZES = (10, 1000)
+
+
+def populate(manager, size, seed):
+    with manager.batch():
+        for i in range(size):
+            manager.add_interface(f"GigabitEthernet{i // 48 + 1}/0/{i % 48 + 1}", {"status": "up"})
+            manager.add_vlan(str(i + 1), f"VLAN{i}")
+            manager.add_access_list(str(i), f"permit ip host 10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255} any")
+        for destination, mask, next_hop in generators.route_table(size, seed=seed):
+            manager.add_route(f"{destination}/{mask}", next_hop)
+
+
+def run_size(size, db_name, seed, operations, repeat):
+    manager = DataManager(db_name, durability=DURABILITY_CHECKPOINT, commands=[])
+    start = time.perf_counter()
+    populate(manager, size, seed)
+    manager.flush()
+    results = {"populate_ms": round((time.perf_counter() - start) * 1e3, 3)}
+
+    names = list(manager.get_device_state("interfaces"))[:operations]
+    vlans = list(manager.get_device_state("vlans"))[:operations]
+    # remove_route עובר על כל הטבלה; בטבלאות גדולות מודדים פחות פעולות כדי שההרצה לא תימשך דקות
+    route_operations = max(10, min(operations, 10 ** 7 // size))
+    new_routes = [(f"{destination}/{mask}", next_hop)
+                  for destination, mask, next_hop in generators.route_table(route_operations, seed=seed + 1)]
+    counter = iter(range(10 ** 9))
+
+    results["update_interface"] = measure(lambda name: manager.update_interface(name, "description", "bench"),
+                                          names, repeat)
+    results["add_interface"] = measure(lambda name: manager.add_interface(f"Loopback{next(counter)}", {}),
+                                       names, repeat)
+    results["rename_vlan"] = measure(lambda vlan_id: manager.rename_vlan(vlan_id, "BENCH"), vlans, repeat)
+    results["add_access_list"] = measure(lambda name: manager.add_access_list("bench", "permit ip any any"),
+                                         names, repeat)
+
+    def add_remove_route(route):
+        manager.add_route(*route)
+        manager.remove_route(route[0])
+
+    results["add_remove_route"] = measure(add_remove_route, new_routes, repeat)
+
+    def update_in_batch(name):
+        with manager.batch():
+            manager.update_interface(name, "description", "batch")
+            manager.rename_vlan(vlans[0], "BATCH")
+
+    results["batch_two_updates"] = measure(update_in_batch, names, repeat)
+
+    def flush_after_updates():
+        manager.flush()
+        for name in names[:100]:
+            manager.update_interface(name, "status", "administratively down")
+        start = time.perf_counter()
+        manager.flush()
+        return time.perf_counter() - start
+
+    results["flush_100_updates"] = measure_once(flush_after_updates, repeat)
+    manager.flush()
+
+    def cold_load():
+        start = time.perf_counter()
+        manager.read_device_state()
+        return time.perf_counter() - start
+
+    results["load_state"] = measure_once(cold_load, repeat)
+    manager.close()
+    return results
+
+
+def run(quick=False, seed=0, sizes=None):
+    sizes = sizes or (QUICK_SIZES if quick else SIZES)
+    operations = 200 if quick else 1000
+    repeat = 3 if quick else 5
+    results = {"seed": seed, "operations": operations}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            # קובץ אמיתי ולא :memory:, כדי שה-flush והטעינה ימדדו גם את ה-WAL
+            db_name = os.path.join(directory, f"bench_{size}.db")
+            results[str(size)] = run_size(size, db_name, seed, min(operations, size), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataManager mutation, flush and load benchmark")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+    quiet_logging()
+    print(json.dumps(run(args.quick, args.seed, args.sizes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
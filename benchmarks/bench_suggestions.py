@@ -0,0 +1,86 @@
+# benchmarks/bench_suggestions.py
+#
+# השוואת SuggestionIndex מול ההתנהגות הקודמת של suggest_correction (difflib).
+# הרצה מתיקיית הפרויקט:  python -m benchmarks.bench_suggestions [--samples N] [--seed S]
+
+import argparse
+import difflib
+import json
+import random
+import time
+
+from benchmarks.generators import make_typo
+from command_suggestions import SuggestionIndex
+
+MODES = ("privileged", "config", "interface", "router")
+
+
+def load_catalog(path="commands.json"):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['commands']
+
+
+def make_inputs(commands, samples, seed):
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(samples):
+        command = rng.choice(commands)
+        mode = rng.choice(command['modes'])
+        phrase = rng.choice([command['full_command']] + command.get('shortcuts', []))
+        inputs.append((make_typo(rng, phrase), mode, command['full_command']))
+    return inputs
+
+
+def difflib_suggest(commands, line, mode):
+    all_commands = [cmd['full_command'] for cmd in commands if mode in cmd['modes']]
+    return difflib.get_close_matches(line, all_commands, n=3, cutoff=0.6)
+
+
+def measure(fn, inputs):
+    start = time.perf_counter()
+    hits = 0
+    for line, mode, expected in inputs:
+        if expected in fn(line, mode):
+            hits += 1
+    elapsed = time.perf_counter() - start
+    return {"us_per_call": elapsed / len(inputs) * 1e6, "recall": hits / len(inputs)}
+
+
+def run(samples=2000, seed=1234):
+    commands = load_catalog()
+    inputs = make_inputs(commands, samples, seed)
+
+    start = time.perf_counter()
+    index = SuggestionIndex(commands)
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    def indexed(line, mode):
+        # בלי שום מטמון: גם המועמדים לכל מילה נבנים מחדש
+        index.cache.clear()
+        index.word_cache.clear()
+        return index.suggest(line, mode)
+
+    results = {
+        "samples": samples,
+        "seed": seed,
+        "index_build_ms": build_ms,
+        "difflib": measure(lambda line, mode: difflib_suggest(commands, line, mode), inputs),
+        "suggestion_index": measure(indexed, inputs),
+    }
+    # אותן שגיאות חוזרות (תלמידים חוזרים על אותה טעות) - מהמטמון
+    for line, mode, _ in inputs:
+        index.suggest(line, mode)
+    results["suggestion_index_cached"] = measure(index.suggest, inputs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="suggest_correction benchmark: difflib vs SuggestionIndex")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    print(json.dumps(run(args.samples, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
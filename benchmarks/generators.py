@@ -0,0 +1,255 @@
+# benchmarks/generators.py
+#
+# קונפיגורציות סינתטיות לבדיקות ביצועים. כל מחולל מקבל seed ומחזיר תמיד את אותו פלט עבורו,
+# כך שתוצאות של commits שונים מודדות את אותה עבודה.
+
+import ipaddress
+import random
+
+
+def switch_stack_config(switches=100, ports=48, vlans=200, seed=0):
+    # מחסנית מתגים: switches יחידות עם ports פורטים כל אחת (GigabitEthernet<unit>/0/<port>), VLANs
+    # עם שמות, ופורטים שחלקם כבויים. מחזיר שורות קונפיגורציה כמו בקובץ שתלמיד מגיש
+    rng = random.Random(seed)
+    lines = ["enable", "configure terminal", f"hostname STACK-{seed}"]
+    for vlan_id in sorted(rng.sample(range(2, 4095), vlans)):
+        lines += [f"vlan {vlan_id}", f" name VLAN-{vlan_id}-{rng.choice(('DATA', 'VOICE', 'MGMT', 'LAB'))}", "exit"]
+    for unit in range(1, switches + 1):
+        for port in range(1, ports + 1):
+            lines.append(f"interface GigabitEthernet{unit}/0/{port}")
+            lines.append(" shutdown" if rng.random() < 0.1 else " no shutdown")
+            lines.append("exit")
+    lines.append("end")
+    return lines
+
+
+def access_stack_config(switches=9, ports=48, vlans=20, seed=0):
+    # מחסנית גישה: פורטי access ב-VLANs אקראיים, ושני הפורטים האחרונים בכל יחידה הם trunk ב-channel-group
+    # של היחידה. מחזיר שורות קונפיגורציה
+    rng = random.Random(seed)
+    vlan_ids = sorted(rng.sample(range(2, 1000), vlans))
+    lines = ["enable", "configure terminal", f"hostname ACCESS-{seed}"]
+    for vlan_id in vlan_ids:
+        lines += [f"vlan {vlan_id}", "exit"]
+    for unit in range(1, switches + 1):
+        for port in range(1, ports + 1):
+            lines.append(f"interface GigabitEthernet{unit}/0/{port}")
+            if port > ports - 2:
+                lines += [" switchport mode trunk", f" switchport trunk allowed vlan {','.join(map(str, vlan_ids))}",
+                          f" channel-group {unit} mode active"]
+            else:
+                lines += [" switchport mode access", f" switchport access vlan {rng.choice(vlan_ids)}"]
+                if rng.random() < 0.1:
+                    lines.append(" shutdown")
+            lines.append("exit")
+    lines.append("end")
+    return lines
+
+
+def random_prefixes(count, seed=0):
+    # count רשתות שונות באורכי prefix מגוונים (רוב /24, כמו בטבלת ניתוב אמיתית)
+    rng = random.Random(seed)
+    lengths = [24] * 6 + [16, 20, 22, 23, 25, 26, 27, 28, 30, 32]
+    prefixes = set()
+    result = []
+    while len(result) < count:
+        length = rng.choice(lengths)
+        address = rng.randrange(1 << 24, 224 << 24)
+        network = ipaddress.IPv4Network((address >> (32 - length) << (32 - length), length))
+        if network not in prefixes:
+            prefixes.add(network)
+            result.append(network)
+    return result
+
+
+def route_table(routes=50000, next_hops=32, seed=0):
+    # טבלת ניתוב סטטית: [(destination, mask, next_hop)]
+    rng = random.Random(seed)
+    hops = [f"10.255.{i // 250}.{i % 250 + 1}" for i in range(next_hops)]
+    return [(str(network.network_address), str(network.netmask), rng.choice(hops))
+            for network in random_prefixes(routes, seed)]
+
+
+def int_prefixes(count, seed=0):
+    # כמו random_prefixes, אבל כ-(network, length) של מספרים שלמים - מהיר מספיק ל-500,000 נתיבים
+    rng = random.Random(seed)
+    lengths = [24] * 6 + [16, 20, 22, 23, 25, 26, 27, 28, 30, 32]
+    seen = set()
+    result = []
+    while len(result) < count:
+        length = rng.choice(lengths)
+        network = rng.randrange(1 << 24, 224 << 24) >> (32 - length) << (32 - length)
+        if (network, length) not in seen:
+            seen.add((network, length))
+            result.append((network, length))
+    return result
+
+
+def route_table_config(routes=50000, next_hops=32, seed=0):
+    lines = ["enable", "configure terminal"]
+    lines += [f"ip route {destination} {mask} {next_hop}"
+              for destination, mask, next_hop in route_table(routes, next_hops, seed)]
+    lines.append("end")
+    return lines
+
+
+def router_config(interfaces=8, ospf_networks=16, seed=0):
+    # נתב בודד: ממשקים עם כתובות ותהליך OSPF
+    rng = random.Random(seed)
+    lines = ["enable", "configure terminal", f"hostname R{seed}"]
+    for i in range(interfaces):
+        lines += [f"interface GigabitEthernet0/{i}",
+                  f" ip address 10.{rng.randrange(256)}.{i}.1 255.255.255.0",
+                  " no shutdown", "exit"]
+    lines.append("router ospf 1")
+    for _ in range(ospf_networks):
+        lines.append(f" network 10.{rng.randrange(256)}.{rng.randrange(256)}.0 0.0.0.255 area 0")
+    lines.append("end")
+    return lines
+
+
+def grid_interfaces(rows, columns, rng):
+    # רשת משבצות של rows x columns נתבים: כל שכנים בשורה ובעמודה חולקים subnet /24 עם מדד אקראי
+    # 1-20 לקישור. מחזיר {(row, column): [(כתובת ומסכה, מדד)]}
+    interfaces = {}
+    link = 0
+    for row in range(rows):
+        for column in range(columns):
+            for neighbor in ((row, column + 1), (row + 1, column)):
+                if neighbor[0] >= rows or neighbor[1] >= columns:
+                    continue
+                metric = rng.randint(1, 20)
+                for device, host in (((row, column), 1), (neighbor, 2)):
+                    interfaces.setdefault(device, []).append(
+                        (f"10.{link // 256}.{link % 256}.{host} 255.255.255.0", metric))
+                link += 1
+    return interfaces
+
+
+def grid_config(interfaces, metric_command, router_lines, loopbacks=1):
+    configs = {}
+    for number, device in enumerate(sorted(interfaces)):
+        lines = ["enable", "configure terminal", f"hostname R{number}"]
+        for port, (address, metric) in enumerate(interfaces[device]):
+            lines += [f"interface GigabitEthernet0/{port}", f" ip address {address}"]
+            if metric_command:
+                lines.append(f" {metric_command} {metric}")
+            lines += [" no shutdown", "exit"]
+        for loopback in range(loopbacks):
+            lines += [f"interface Loopback{loopback}",
+                      f" ip address 10.{128 + number // 256}.{number % 256}.{loopback + 1} 255.255.255.255",
+                      " no shutdown", "exit"]
+        lines += router_lines + ["end"]
+        configs[f"R{number}"] = lines
+    return configs
+
+
+def ospf_grid_config(rows=25, columns=40, seed=0):
+    # אזור OSPF של rows x columns נתבים ברשת משבצות, לכל נתב loopback, ולקישורים עלויות אקראיות.
+    # מחזיר {device_id: שורות הגדרה}
+    interfaces = grid_interfaces(rows, columns, random.Random(seed))
+    return grid_config(interfaces, "ip ospf cost", ["router ospf 1", " network 10.0.0.0 0.255.255.255 area 0"])
+
+
+def eigrp_grid_config(rows=15, columns=20, seed=0):
+    # אותה רשת משבצות ב-EIGRP AS 1, עם delay אקראי (ביחידות של 10 מיקרו-שניות) לכל קישור
+    interfaces = grid_interfaces(rows, columns, random.Random(seed))
+    return grid_config(interfaces, "delay", ["router eigrp 1", " network 10.0.0.0"])
+
+
+def rip_grid_config(rows=40, columns=50, loopbacks=3, seed=0):
+    # רשת משבצות ב-RIP. ברירת המחדל: 2,000 נתבים ו-9,910 prefixes (3,910 קישורים ו-3 loopbacks לכל נתב)
+    interfaces = grid_interfaces(rows, columns, random.Random(seed))
+    return grid_config(interfaces, None, ["router rip", " network 10.0.0.0"], loopbacks)
+
+
+def access_list_rules(count=5000, seed=0):
+    # ACL מורחב בסגנון חומת אש: מארחים, רשתות ופורטים של שירותים, עם deny בין ה-permit
+    rng = random.Random(seed)
+    services = [" eq 22", " eq www", " eq 443", " range 20 21", " gt 1023", " neq 23", ""]
+
+    def address():
+        choice = rng.random()
+        if choice < 0.15:
+            return "any"
+        if choice < 0.5:
+            return f"host 10.{rng.randrange(4)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        return f"10.{rng.randrange(4)}.{rng.randrange(256)}.0 0.0.{rng.choice(('0', '3', '255'))}.255"
+
+    rules = []
+    for _ in range(count):
+        action = "deny" if rng.random() < 0.3 else "permit"
+        protocol = rng.choice(("tcp", "tcp", "udp", "icmp", "ip"))
+        ports = rng.choice(services) if protocol in ("tcp", "udp") else ""
+        rules.append(f"{action} {protocol} {address()} {address()}{ports}")
+    return rules
+
+
+def flows(count=100000, seed=0):
+    # זרימות סינתטיות בייצוג של acl_engine: (protocol, src, dst, src_port, dst_port)
+    rng = random.Random(seed)
+    ports = (22, 23, 53, 80, 443, 8080)
+    result = []
+    for _ in range(count):
+        protocol = rng.choice((6, 6, 17, 1))
+        src = (10 << 24) | rng.getrandbits(18)
+        dst = (10 << 24) | rng.getrandbits(18)
+        if protocol == 1:
+            result.append((protocol, src, dst, 0, 0))
+        else:
+            result.append((protocol, src, dst, rng.randrange(1024, 65536), rng.choice(ports)))
+    return result
+
+
+def mac_addresses(count=100000, vlans=50, ports=48, seed=0):
+    # תחנות בטבלת MAC של מתג: [(vlan, mac, port)], mac כמספר של 48 ביט
+    rng = random.Random(seed)
+    vlan_ids = rng.sample(range(2, 4095), vlans)
+    macs = rng.sample(range(1 << 40), count)
+    return [(rng.choice(vlan_ids), (0x0050 << 32) | mac, f"GigabitEthernet1/0/{rng.randrange(1, ports + 1)}")
+            for mac in macs]
+
+
+def make_typo(rng, phrase):
+    # שגיאת הקלדה אחת או שתיים: החלפת שכנים, השמטה, הכפלה או החלפת תו
+    chars = list(phrase)
+    for _ in range(rng.randint(1, 2)):
+        i = rng.randrange(len(chars))
+        edit = rng.choice(("swap", "drop", "repeat", "replace"))
+        if edit == "swap" and i + 1 < len(chars):
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+        elif edit == "drop" and len(chars) > 2:
+            del chars[i]
+        elif edit == "repeat":
+            chars.insert(i, chars[i])
+        else:
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(chars)
+
+
+def catalog_lines(commands, samples, seed=0):
+    # שורות שהמשתמש מקליד בפועל: הפקודה המלאה או קיצור, במצב שבו היא זמינה -> [(line, mode)]
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(samples):
+        command = rng.choice(commands)
+        phrase = rng.choice([command['full_command']] + command.get('shortcuts', []))
+        lines.append((phrase, rng.choice(command['modes'])))
+    return lines
+
+
+def typo_lines(commands, samples, seed=0):
+    rng = random.Random(seed)
+    return [(make_typo(rng, line), mode) for line, mode in catalog_lines(commands, samples, seed)]
+
+
+def completion_prefixes(commands, samples, seed=0):
+    # (text, line, mode) כמו ש-readline מעביר ל-complete_command: המילה החלקית והשורה שלפניה
+    rng = random.Random(seed)
+    result = []
+    for line, mode in catalog_lines(commands, samples, seed):
+        words = line.split()
+        i = rng.randrange(len(words))
+        word = words[i][:rng.randint(0, len(words[i]))]
+        result.append((word, " ".join(words[:i]), mode))
+    return result
@@ -0,0 +1,110 @@
+# benchmarks/harness.py
+#
+# תשתית משותפת לכל המדידות: חימום, חזרות, סטטיסטיקה, פרטי סביבה והשוואה בין שתי הרצות.
+# כל מדידה מחזירה מילון JSON, כך שאפשר לשמור תוצאות לכל commit ולהשוות ביניהן.
+
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(fn, inputs, repeat=5, warmup=1):
+    # מריץ את fn על כל הקלטים repeat פעמים (אחרי warmup סבבי חימום) ומחזיר זמן לקריאה במיקרו-שניות
+    inputs = list(inputs)
+    for _ in range(warmup):
+        for item in inputs:
+            fn(item)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        timings.append((time.perf_counter() - start) / len(inputs) * 1e6)
+    return summarize(timings, len(inputs))
+
+
+def measure_once(fn, repeat=5, warmup=1):
+    # לפעולות שמשנות את הקלט שלהן: fn מכינה בעצמה מצב נקי, מודדת רק את הפעולה ומחזירה שניות לפעולה
+    for _ in range(warmup):
+        fn()
+    timings = [fn() * 1e6 for _ in range(repeat)]
+    return summarize(timings, 1)
+
+
+def summarize(timings, calls):
+    median = statistics.median(timings)
+    return {
+        "us_per_op": round(median, 3),
+        "min_us": round(min(timings), 3),
+        "max_us": round(max(timings), 3),
+        "ops_per_sec": round(1e6 / median) if median else None,
+        "calls": calls,
+        "repeat": len(timings),
+    }
+
+
+def quiet_logging():
+    # תיעוד הפקודות ל-stderr היה מציף את הפלט: המדידות כותבות רק לקובץ וברמת WARNING.
+    # מדידה שבודקת את עלות התיעוד מעלה את הרמה של תת-המערכת שלה בעצמה
+    from logger import configure
+    configure(console=False, level=logging.WARNING)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def flatten(results, prefix=""):
+    # {"parser": {"resolve": {"us_per_op": ...}}} -> {"parser.resolve": us_per_op}
+    flat = {}
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        name = f"{prefix}{key}"
+        if "us_per_op" in value:
+            flat[name] = value["us_per_op"]
+        elif "us_per_call" in value:
+            flat[name] = value["us_per_call"]
+        else:
+            flat.update(flatten(value, name + "."))
+    return flat
+
+
+def compare(old, new, threshold=0.10):
+    # משווה שתי הרצות (מילוני JSON מלאים) ומחזיר [(מדידה, ישן, חדש, יחס)] רק לשינויים מעל הסף
+    old_flat = flatten(old.get("results", old))
+    new_flat = flatten(new.get("results", new))
+    changes = []
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[name], new_flat[name]
+        if before and abs(after / before - 1) > threshold:
+            changes.append((name, before, after, after / before))
+    return changes
+
+
+def write_report(report, path=None):
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path is None or path == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
@@ -1,26 +1,40 @@
 # cli_simulator.py
 
 import cmd
+import time
+from collections import namedtuple
 import command_parser
 import data_manager
-import difflib
+import output_pipeline
+from command_index import MODES
+from command_suggestions import SuggestionIndex
 from logger import Logger
 
+# תוצאה של שורה אחת בהרצה ללא ממשק (execute / run_script)
+CommandResult = namedtuple("CommandResult", ["line", "status", "output", "mode", "elapsed"])
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_UNKNOWN = "unknown"
+
 class CLISimulator(cmd.Cmd):
-    def __init__(self):
+    def __init__(self, manager=None, catalog=None):
         super().__init__()
         self.device_type = None
         self.language = None
         self.prompt = ""
         self.intro = "ברוכים הבאים לסימולטור CLI של סיסקו!\n"
-        self.data_manager = data_manager.DataManager()
-        self.command_parser = command_parser.CommandParser(self.data_manager)
-        self.commands = self.data_manager.load_commands()
+        # DeviceRegistry מעביר מנהל מצב לכל מכשיר וקטלוג אחד משותף; לבד - מכשיר יחיד עם קטלוג משלו
+        self.data_manager = manager or data_manager.DataManager()
+        self.catalog = catalog or self.data_manager.load_catalog()
+        self.command_parser = command_parser.CommandParser(self.data_manager, self.catalog)
+        self.commands = self.catalog.commands
+        self.suggestion_index = None
         self.history = []
         self.running = True
         self.mode = "user"
         self.hostname = "Router"
-        self.logger = Logger()
+        self.logger = Logger(subsystem="cli")
         self.logger.info("CLI Simulator initialized")
 
     def set_device_type(self, device_type):
@@ -30,13 +44,13 @@ class CLISimulator(cmd.Cmd):
         self.data_manager.load_device_state()
         self.hostname = self.data_manager.get_device_state("hostname") or "Router"
         self.update_prompt()
-        self.logger.info(f"Device type set to {device_type}")
+        self.logger.info("Device type set to %s", device_type)
 
     def set_language(self, language):
         if language not in ["he", "en"]:
             raise ValueError("Invalid language. Choose 'he' for Hebrew or 'en' for English.")
         self.language = language
-        self.logger.info(f"Language set to {language}")
+        self.logger.info("Language set to %s", language)
 
     def start(self):
         self.logger.info("Starting CLI Simulator")
@@ -46,7 +60,7 @@ class CLISimulator(cmd.Cmd):
         except KeyboardInterrupt:
             print("\nExiting CLI Simulator...")
         except Exception as e:
-            self.logger.error(f"Unexpected error: {str(e)}")
+            self.logger.error("Unexpected error: %s", e)
             print(f"An unexpected error occurred: {str(e)}")
         finally:
             self.do_exit("")
@@ -72,9 +86,13 @@ class CLISimulator(cmd.Cmd):
     def print_help(self):
         self.logger.debug("Displaying help")
         print("פקודות זמינות:")
+        for line in self.help_lines():
+            print(line)
+
+    def help_lines(self):
         for command in self.commands:
             if self.mode in command['modes']:
-                print(f"{command['full_command']}: {command['description_' + self.language]}")
+                yield f"{command['full_command']}: {command['description_' + self.language]}"
 
     def do_exit(self, args):
         self.logger.info("Exiting CLI Simulator")
@@ -83,48 +101,98 @@ class CLISimulator(cmd.Cmd):
             self.data_manager.save_device_state()
             print("מצב המכשיר נשמר בהצלחה.")
         except Exception as e:
-            self.logger.error(f"Error saving device state: {str(e)}")
+            self.logger.error("Error saving device state: %s", e)
             print(f"שגיאה בשמירת מצב המכשיר: {str(e)}")
         print("ביי!")
         return True
 
     def default(self, line):
-        self.logger.debug(f"Executing command: {line}")
+        self.logger.debug("Executing command: %s", line)
         try:
             result = self.command_parser.parse_command(line, self.device_type, self.mode)
-            if result:
-                print(result)
-                if "Entering" in result or "Exiting" in result:
-                    self.update_mode(result)
-            else:
-                self.logger.warning(f"Unknown command: {line}")
-                print(f"פקודה לא מוכרת: {line}")
-                suggestions = self.suggest_correction(line)
-                if suggestions:
-                    print("האם התכוונת לאחת מהפקודות הבאות?")
-                    for suggestion in suggestions:
-                        print(f"- {suggestion}")
-                else:
-                    print("לא נמצאו הצעות לתיקון. הקלד '?' לעזרה.")
+            self.page(result)
+            mode = self.command_parser.last_mode
+            if mode in MODES:
+                self.mode = mode
+            self.hostname = self.data_manager.get_device_state("hostname") or self.hostname
+            self.update_prompt()
+        except command_parser.UnknownCommandError:
+            self.report_unknown_command(line)
         except Exception as e:
-            self.logger.error(f"Error executing command: {str(e)}")
+            self.logger.error("Error executing command: %s", e)
             print(f"שגיאה בביצוע הפקודה: {str(e)}")
 
-    def update_mode(self, result):
-        if "Entering privileged mode" in result:
-            self.mode = "privileged"
-        elif "Entering configuration mode" in result:
-            self.mode = "config"
-        elif "Entering interface configuration mode" in result:
-            self.mode = "interface"
-        elif "Exiting current mode" in result:
-            if self.mode == "interface":
-                self.mode = "config"
-            elif self.mode == "config":
-                self.mode = "privileged"
-            elif self.mode == "privileged":
-                self.mode = "user"
-        self.update_prompt()
+    def page(self, output):
+        # מדפיס את הפלט תוך כדי הפקתו, עם עצירה ב---More-- כל terminal length שורות
+        pager = output_pipeline.Pager(output_pipeline.as_lines(output), self.command_parser.terminal_length)
+        while True:
+            chunk = pager.next_chunk()
+            if not chunk:
+                return
+            print("\n".join(chunk))
+            if pager.more:
+                print(output_pipeline.MORE_PROMPT, end="", flush=True)
+                if not pager.answer(self.stdin.readline()):
+                    return
+
+    def execute(self, line, lazy=False):
+        # הרצת שורה בלי הדפסה ובלי prompt: מחזיר CommandResult ומעדכן את המצב הנוכחי.
+        # lazy=True משאיר פלט של show כזרם שורות (לשרת ה-telnet), במקום מחרוזת אחת
+        start = time.perf_counter()
+        dispatch = self.command_parser.dispatch_stream if lazy else self.command_parser.dispatch
+        try:
+            command, output, mode = dispatch(line, self.device_type, self.mode)
+        except command_parser.UnknownCommandError as e:
+            return CommandResult(line, STATUS_UNKNOWN, str(e), self.mode, time.perf_counter() - start)
+        except Exception as e:
+            return CommandResult(line, STATUS_ERROR, str(e), self.mode, time.perf_counter() - start)
+        self.mode = mode
+        return CommandResult(line, STATUS_OK, output, mode, time.perf_counter() - start)
+
+    def run_script(self, lines, stop_on_error=False):
+        # מריץ קובץ קונפיגורציה או stdin שורה אחר שורה ומחזיר את התוצאות כ-generator.
+        # שורות ריקות והערות ("!") מדולגות; התיעוד לכל פקודה מכובה לאורך ההרצה
+        trace = self.command_parser.trace
+        self.command_parser.trace = False
+        try:
+            for line in lines:
+                line = line.strip()
+                if not line or line.startswith("!"):
+                    continue
+                result = self.execute(line)
+                yield result
+                if stop_on_error and result.status != STATUS_OK:
+                    return
+        finally:
+            self.command_parser.trace = trace
+            self.hostname = self.data_manager.get_device_state("hostname") or self.hostname
+
+    def run_block(self, lines):
+        # הדבקת בלוק קונפיגורציה: כל שורה היא פקודה רגילה, אבל הכל נכתב ל-SQLite ב-commit אחד
+        with self.data_manager.batch():
+            for line in lines:
+                line = self.precmd(line)
+                stop = self.onecmd(line)
+                self.postcmd(stop, line)
+                if stop:
+                    return True
+        return False
+
+    def report_unknown_command(self, line):
+        self.logger.warning("Unknown command: %s", line)
+        for text in self.unknown_command_lines(line):
+            print(text)
+
+    def unknown_command_lines(self, line):
+        # ההודעה והצעות התיקון לשורה לא מוכרת, גם לממשק הגרפי שלא מדפיס ל-stdout
+        yield f"פקודה לא מוכרת: {line}"
+        suggestions = self.suggest_correction(line)
+        if suggestions:
+            yield "האם התכוונת לאחת מהפקודות הבאות?"
+            for suggestion in suggestions:
+                yield f"- {suggestion}"
+        else:
+            yield "לא נמצאו הצעות לתיקון. הקלד '?' לעזרה."
 
     def emptyline(self):
         pass
@@ -132,13 +200,19 @@ class CLISimulator(cmd.Cmd):
     def completedefault(self, text, line, begidx, endidx):
         return self.complete_command(text, line, begidx, endidx)
 
+    def completenames(self, text, *ignored):
+        return self.command_parser.complete_command(text, "", self.mode)
+
     def complete_command(self, text, line, begidx, endidx):
         return self.command_parser.complete_command(text, line[:begidx].strip(), self.mode)
 
     def suggest_correction(self, command):
-        all_commands = [cmd['full_command'] for cmd in self.commands if self.mode in cmd['modes']]
-        suggestions = difflib.get_close_matches(command, all_commands, n=3, cutoff=0.6)
-        return suggestions
+        # האינדקס של הקטלוג המשותף; נבנה אינדקס נפרד רק אם רשימת הפקודות הוחלפה
+        if self.commands is self.catalog.commands:
+            return self.catalog.suggestions.suggest(command, self.mode, limit=3)
+        if self.suggestion_index is None or self.suggestion_index.commands is not self.commands:
+            self.suggestion_index = SuggestionIndex(self.commands)
+        return self.suggestion_index.suggest(command, self.mode, limit=3)
 
     def update_prompt(self):
         if self.mode == "user":
@@ -162,10 +236,10 @@ class CLISimulator(cmd.Cmd):
                 self.hostname = arg
                 self.data_manager.update_hostname(arg)
                 self.update_prompt()
-                self.logger.info(f"Hostname set to {arg}")
+                self.logger.info("Hostname set to %s", arg)
                 print(f"Hostname set to {arg}")
             except Exception as e:
-                self.logger.error(f"Error setting hostname: {str(e)}")
+                self.logger.error("Error setting hostname: %s", e)
                 print(f"שגיאה בהגדרת שם המארח: {str(e)}")
         else:
             print("Command available only in configuration mode")
@@ -173,9 +247,9 @@ class CLISimulator(cmd.Cmd):
     def do_show(self, arg):
         try:
             result = self.command_parser.parse_command(f"show {arg}", self.device_type, self.mode)
-            print(result)
+            self.page(result)
         except Exception as e:
-            self.logger.error(f"Error executing show command: {str(e)}")
+            self.logger.error("Error executing show command: %s", e)
             print(f"שגיאה בביצוע פקודת show: {str(e)}")
 
 if __name__ == "__main__":
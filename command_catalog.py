@@ -0,0 +1,86 @@
+# command_catalog.py
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+from command_index import CommandIndex
+from command_suggestions import SuggestionIndex
+
+# גרסת מבנה הקובץ המהודר; מעלים אותה כששינוי ב-CommandIndex / SuggestionIndex משנה את המבנה שנשמר
+CACHE_FORMAT = 1
+# התיקייה (ליד commands.json) שבה נשמר הקטלוג המהודר, מחוץ לקבצי המקור
+CACHE_DIRECTORY = '.cache'
+
+# קטלוגים שכבר נטענו בתהליך: נתיב -> CommandCatalog, לפי ה-hash של commands.json
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class CommandCatalog:
+    # קטלוג הפקודות המהודר: הרשימה, העץ לכל מצב ואינדקס ההצעות.
+    # לא משתנה אחרי הבנייה, ולכן כל המכשירים בתהליך חולקים מופע אחד
+    __slots__ = ("commands", "index", "command_regex", "_suggestions", "digest")
+
+    def __init__(self, commands, digest=None):
+        self.commands = commands
+        self.index = CommandIndex(commands)
+        self.command_regex = re.compile("|".join(re.escape(command['full_command']) for command in commands))
+        self._suggestions = None
+        self.digest = digest
+
+    @classmethod
+    def load(cls, path='commands.json'):
+        with open(path, 'rb') as f:
+            data = f.read()
+        return cls(json.loads(data)['commands'], hashlib.sha256(data).hexdigest())
+
+    @classmethod
+    def shared(cls, path='commands.json'):
+        # הקטלוג של הקובץ, פעם אחת לתהליך: כל הקריאות מקבלות את אותו מופע כל עוד תוכן הקובץ לא השתנה
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        key = os.path.abspath(path)
+        with _shared_lock:
+            catalog = _shared.get(key)
+            if catalog is None or catalog.digest != digest:
+                catalog = cls.compiled(path, data, digest)
+                _shared[key] = catalog
+            return catalog
+
+    @classmethod
+    def compiled(cls, path, data, digest):
+        # הקטלוג המהודר נשמר ב-.cache/commands.catalog ליד commands.json וטעינתו מהירה פי כמה מבנייה
+        # מחדש. הוא תקף רק לאותו תוכן בדיוק; שינוי בקובץ בונה ושומר אותו מחדש
+        directory, name = os.path.split(path)
+        cache_directory = os.path.join(directory, CACHE_DIRECTORY)
+        cache_path = os.path.join(cache_directory, os.path.splitext(name)[0] + '.catalog')
+        try:
+            with open(cache_path, 'rb') as f:
+                cache_format, cache_digest, catalog = pickle.load(f)
+            if cache_format == CACHE_FORMAT and cache_digest == digest:
+                return catalog
+        except (OSError, EOFError, ValueError, TypeError, AttributeError, pickle.UnpicklingError):
+            pass
+        catalog = cls(json.loads(data)['commands'], digest)
+        catalog.suggestions
+        try:
+            os.makedirs(cache_directory, exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump((CACHE_FORMAT, digest, catalog), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            # תיקייה לקריאה בלבד - עובדים בלי הקובץ המהודר
+            pass
+        return catalog
+
+    @property
+    def suggestions(self):
+        # אינדקס ההצעות נבנה רק כשמגיעה הפקודה הלא מוכרת הראשונה
+        if self._suggestions is None:
+            self._suggestions = SuggestionIndex(self.commands, self.index)
+        return self._suggestions
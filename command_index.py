@@ -0,0 +1,214 @@
+# command_index.py
+
+from bisect import bisect_left, insort
+
+MODES = ("user", "privileged", "config", "interface", "router", "vlan")
+
+
+class AmbiguousCommandError(Exception):
+    def __init__(self, candidates):
+        super().__init__(", ".join(cmd['full_command'] for cmd in candidates))
+        self.candidates = candidates
+
+
+class TrieNode:
+    __slots__ = ("keyword", "children", "aliases", "command", "lookup", "completions", "literal")
+
+    def __init__(self, keyword="", literal=False):
+        self.keyword = keyword
+        self.children = {}
+        # קיצורים של מילת מפתח אחת (למשל "int" -> "interfaces") מתוך שדה shortcuts
+        self.aliases = {}
+        self.command = None
+        # כל תחילית אפשרית של מילת מפתח -> הצמתים שהיא מתאימה להם, נבנה פעם אחת ב-freeze
+        self.lookup = {}
+        # תחילית -> מילות המפתח הקנוניות להשלמה (Tab), ממוינות
+        self.completions = {}
+        # צומת שנוצר מקיצור שמספר המילים בו שונה מהפקודה המלאה ("sh mac")
+        self.literal = literal
+
+    def child(self, keyword, literal=False):
+        node = self.children.get(keyword)
+        if node is None:
+            node = TrieNode(keyword, literal)
+            self.children[keyword] = node
+        elif not literal:
+            node.literal = False
+        return node
+
+    def freeze(self):
+        lookup = {}
+        for keyword, node in self.children.items():
+            for i in range(1, len(keyword) + 1):
+                lookup.setdefault(keyword[:i], []).append(node)
+        for alias, keywords in self.aliases.items():
+            targets = lookup.setdefault(alias, [])
+            for keyword in keywords:
+                targets.append(self.children[keyword])
+        # התאמה מדויקת למילת מפתח קנונית גוברת על כל תחילית אחרת, כמו ב-IOS
+        for keyword, node in self.children.items():
+            if not node.literal:
+                lookup[keyword] = [node]
+        self.lookup = {prefix: tuple(dict.fromkeys(nodes)) for prefix, nodes in lookup.items()}
+
+        completions = {}
+        for keyword in sorted(k for k, node in self.children.items() if not node.literal):
+            for i in range(len(keyword) + 1):
+                completions.setdefault(keyword[:i], []).append(keyword)
+        self.completions = {prefix: tuple(keywords) for prefix, keywords in completions.items()}
+        for node in self.children.values():
+            node.freeze()
+
+    def iter_commands(self):
+        if self.command is not None:
+            yield self.command
+        for node in self.children.values():
+            yield from node.iter_commands()
+
+
+class ModeView:
+    def __init__(self, mode):
+        self.mode = mode
+        self.root = TrieNode()
+
+    def insert(self, command):
+        keywords = command['full_command'].lower().split()
+        node = self.root
+        for keyword in keywords:
+            node = node.child(keyword)
+        node.command = command
+
+        for shortcut in command.get('shortcuts', []):
+            tokens = shortcut.lower().split()
+            if len(tokens) == len(keywords):
+                node = self.root
+                for token, keyword in zip(tokens, keywords):
+                    if token != keyword:
+                        node.aliases.setdefault(token, set()).add(keyword)
+                    node = node.children[keyword]
+            else:
+                node = self.root
+                for token in tokens:
+                    node = node.child(token, literal=True)
+                if node.command is None:
+                    node.command = command
+
+    def freeze(self):
+        self.root.freeze()
+
+    def resolve(self, tokens):
+        keys = [token.lower() for token in tokens]
+        matches = []
+        incomplete = []
+        self._walk(self.root, keys, 0, matches, incomplete)
+        if not matches:
+            # הקלט נגמר באמצע כמה פקודות שונות ("c" -> copy / clock / configure)
+            if len(incomplete) > 1:
+                candidates = {id(cmd): cmd for node in incomplete for cmd in node.iter_commands()}
+                raise AmbiguousCommandError(list(candidates.values()))
+            return None, tokens
+
+        depth = max(match_depth for match_depth, _ in matches)
+        candidates = list({id(cmd): cmd for match_depth, cmd in matches if match_depth == depth}.values())
+        if len(candidates) > 1:
+            raise AmbiguousCommandError(candidates)
+        return candidates[0], tokens[depth:]
+
+    def _walk(self, node, keys, depth, matches, incomplete):
+        if node.command is not None:
+            matches.append((depth, node.command))
+        if depth == len(keys):
+            if node.command is None:
+                incomplete.append(node)
+            return
+        for child in node.lookup.get(keys[depth], ()):
+            self._walk(child, keys, depth + 1, matches, incomplete)
+
+    def commands_below(self, tokens):
+        nodes = [self.root]
+        for token in tokens:
+            nodes = [child for node in nodes for child in node.lookup.get(token.lower(), ())]
+            if not nodes:
+                return []
+        return list({id(cmd): cmd for node in nodes for cmd in node.iter_commands()}.values())
+
+    def complete(self, tokens, text):
+        keys = [token.lower() for token in tokens]
+        keywords = []
+        arguments = []
+        self._complete(self.root, keys, 0, text.lower(), keywords, arguments)
+        if arguments:
+            # רק הפקודה העמוקה ביותר שהושלמה מקבלת את הארגומנטים
+            depth = max(arg[0] for arg in arguments)
+            arguments = [(command, position) for arg_depth, command, position in arguments if arg_depth == depth]
+        return list(dict.fromkeys(keywords)), arguments
+
+    def _complete(self, node, keys, depth, text, keywords, arguments):
+        if depth == len(keys):
+            keywords.extend(node.completions.get(text, ()))
+            if node.command is not None:
+                arguments.append((depth, node.command, 0))
+            return
+        if node.command is not None:
+            arguments.append((depth, node.command, len(keys) - depth))
+        for child in node.lookup.get(keys[depth], ()):
+            self._complete(child, keys, depth + 1, text, keywords, arguments)
+
+
+class CommandIndex:
+    def __init__(self, commands):
+        self.views = {mode: ModeView(mode) for mode in MODES}
+        for command in commands:
+            for mode in command['modes']:
+                if mode not in self.views:
+                    self.views[mode] = ModeView(mode)
+                self.views[mode].insert(command)
+        for view in self.views.values():
+            view.freeze()
+
+    def view(self, mode):
+        return self.views.get(mode)
+
+    def resolve(self, tokens, mode):
+        view = self.views.get(mode)
+        if view is None:
+            return None, tokens
+        return view.resolve(tokens)
+
+    def complete(self, tokens, text, mode):
+        view = self.views.get(mode)
+        if view is None:
+            return [], []
+        return view.complete(tokens, text)
+
+
+class PrefixIndex:
+    # רשימה ממוינת של שמות (ממשקים, VLANs, ACLs, מאגרי DHCP) להשלמה לפי תחילית ב-bisect
+    def __init__(self, names=()):
+        self.entries = sorted({(str(name).lower(), str(name)) for name in names})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, name):
+        entry = (str(name).lower(), str(name))
+        i = bisect_left(self.entries, entry)
+        if i == len(self.entries) or self.entries[i] != entry:
+            insort(self.entries, entry, lo=i)
+
+    def discard(self, name):
+        entry = (str(name).lower(), str(name))
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def complete(self, prefix):
+        prefix = prefix.lower()
+        entries = self.entries
+        result = []
+        for i in range(bisect_left(entries, (prefix,)), len(entries)):
+            key, name = entries[i]
+            if not key.startswith(prefix):
+                break
+            result.append(name)
+        return result
@@ -1,90 +1,532 @@
 # command_parser.py
 
-import re
 from data_manager import DataManager
 from logger import Logger
+from command_index import AmbiguousCommandError
+from routing_engine import int_to_ip, ip_to_int, parse_prefix
+import acl_engine
+import config_archive
+import eigrp_engine
+import forwarding
+import interface_table
+import mac_table
+import ospf_engine
+import output_pipeline
+import rip_engine
 import ipaddress
+import itertools
+
+# פורט היעד ומספר הצעדים המרבי של traceroute ב-IOS
+TRACEROUTE_PORT = 33434
+TRACEROUTE_MAX_TTL = 30
+# כמה שורות של פלט show מופקות בכל נעילה של המכשיר
+OUTPUT_CHUNK = 256
+# הסימון של ping/traceroute כשנתב בדרך מחזיר unreachable
+UNREACHABLE_CODES = {
+    forwarding.NO_ROUTE: "!H",
+    forwarding.DENIED: "!A",
+    forwarding.INTERFACE_DOWN: "!H",
+}
 
 class CommandError(Exception):
     pass
 
+class UnknownCommandError(CommandError):
+    pass
+
 class CommandParser:
-    def __init__(self, data_manager):
-        self.data_manager = data_manager
-        self.commands = self.data_manager.load_commands()
-        self.command_regex = self.create_command_regex()
-        self.logger = Logger()
+    # פעולה בקטלוג -> שם המתודה המטפלת; נבנה פעם אחת ולא בכל שורה
+    ACTIONS = {
+        'enter_privileged': 'enter_privileged_mode',
+        'exit_mode': 'exit_mode',
+        'enter_config': 'enter_config_mode',
+        'show_running_config': 'show_running_config',
+        'show_startup_config': 'show_startup_config',
+        'copy_running_to_startup': 'copy_running_to_startup',
+        'archive_config': 'archive_config',
+        'show_archive': 'show_archive',
+        'show_archive_differences': 'show_archive_differences',
+        'configure_replace': 'configure_replace',
+        'show_interfaces': 'show_interfaces',
+        'configure_interface': 'configure_interface',
+        'set_ip_address': 'set_ip_address',
+        'show_ip_interface_brief': 'show_ip_interface_brief',
+        'show_interface_status': 'show_interface_status',
+        'show_trunk_interface_info': 'show_interfaces_trunk',
+        'show_interface_counters': 'show_interface_counters',
+        'clear_interface_counters': 'clear_interface_counters',
+        'show_etherchannel_summary': 'show_etherchannel_summary',
+        'set_switchport_access_mode': 'set_switchport_access_mode',
+        'set_switchport_trunk_mode': 'set_switchport_trunk_mode',
+        'assign_vlan_to_access_port': 'assign_vlan_to_access_port',
+        'set_native_vlan_for_trunk': 'set_native_vlan_for_trunk',
+        'set_allowed_vlans_on_trunk': 'set_allowed_vlans_on_trunk',
+        'configure_etherchannel_group': 'configure_etherchannel_group',
+        'show_version': 'show_version',
+        'set_hostname': 'set_hostname',
+        'show_vlan': 'show_vlan',
+        'create_vlan': 'create_vlan',
+        'configure_access_list': 'configure_access_list',
+        'show_access_lists': 'show_access_lists',
+        'apply_access_list_to_interface': 'apply_access_list_to_interface',
+        'clear_access_list_counters': 'clear_access_list_counters',
+        'packet_tracer': 'packet_tracer',
+        'show_mac_address_table': 'show_mac_address_table',
+        'show_mac_aging_time': 'show_mac_aging_time',
+        'set_mac_aging_time': 'set_mac_aging_time',
+        'add_static_mac': 'add_static_mac',
+        'configure_dhcp_pool': 'configure_dhcp_pool',
+        'show_dhcp_bindings': 'show_dhcp_bindings',
+        'configure_static_route': 'configure_static_route',
+        'show_ip_route': 'show_ip_route',
+        'show_cef_table': 'show_cef_table',
+        'send_ping': 'send_ping',
+        'perform_traceroute': 'perform_traceroute',
+        'set_interface_as_nat_inside': 'set_interface_as_nat_inside',
+        'set_interface_as_nat_outside': 'set_interface_as_nat_outside',
+        'configure_nat_rule': 'configure_nat_rule',
+        'show_nat_translations': 'show_nat_translations',
+        'set_terminal_length': 'set_terminal_length',
+        'configure_ospf': 'configure_ospf',
+        'show_ip_ospf': 'show_ip_ospf',
+        'show_ospf_info': 'show_ip_ospf',
+        'show_ospf_neighbors': 'show_ip_ospf_neighbor',
+        'show_ospf_database': 'show_ip_ospf_database',
+        'set_ospf_cost': 'set_ospf_cost',
+        'configure_eigrp': 'configure_eigrp',
+        'show_ip_eigrp': 'show_ip_eigrp',
+        'show_eigrp_neighbors': 'show_ip_eigrp_neighbors',
+        'show_eigrp_topology': 'show_ip_eigrp_topology',
+        'make_interface_passive_eigrp': 'passive_interface',
+        'configure_variance_eigrp': 'set_variance',
+        'redistribute_routes_eigrp': 'redistribute',
+        'set_interface_bandwidth': 'set_interface_bandwidth',
+        'set_interface_delay': 'set_interface_delay',
+        'return_to_privileged': 'return_to_privileged',
+        'enter_interface_config': 'enter_interface_config',
+        'enable_interface': 'enable_interface',
+        'disable_interface': 'disable_interface',
+        'create_or_configure_vlan': 'create_or_configure_vlan',
+        'set_vlan_name': 'set_vlan_name',
+        'enter_routing_protocol_config': 'enter_routing_protocol_config',
+        'enter_ospf_config': 'enter_ospf_config',
+        'enter_eigrp_config': 'enter_eigrp_config',
+        'configure_rip': 'configure_rip',
+        'show_rip_database': 'show_ip_rip_database',
+        'step_rip': 'step_rip',
+        'enable_debugging': 'enable_debugging',
+        'disable_debugging': 'disable_debugging',
+        'advertise_network_ospf': 'advertise_network',
+    }
 
-    def create_command_regex(self):
-        patterns = []
-        for command in self.commands:
-            patterns.append(re.escape(command['full_command']))
-        pattern = "|".join(patterns)
-        return re.compile(pattern)
+    # פעולה -> המצב שאליו היא מעבירה; exit_mode חוזר למצב שמעל המצב הנוכחי
+    MODE_CHANGES = {
+        'enter_privileged': 'privileged',
+        'enter_config': 'config',
+        'return_to_privileged': 'privileged',
+        'enter_interface_config': 'interface',
+        'create_or_configure_vlan': 'vlan',
+        'enter_routing_protocol_config': 'router',
+        'enter_ospf_config': 'router',
+        'enter_eigrp_config': 'router',
+        'configure_rip': 'router',
+    }
+
+    PARENT_MODES = {
+        'privileged': 'user',
+        'config': 'privileged',
+        'interface': 'config',
+        'vlan': 'config',
+        'router': 'config',
+    }
+
+    # פעולה בקטלוג -> מפתח במצב המכשיר שממנו משלימים את הארגומנט הראשון
+    ARGUMENT_COMPLETIONS = {
+        'enter_interface_config': 'interfaces',
+        'configure_interface': 'interfaces',
+        'show_interfaces': 'interfaces',
+        'create_or_configure_vlan': 'vlans',
+        'create_vlan': 'vlans',
+        'assign_vlan_to_access_port': 'vlans',
+        'set_native_vlan_for_trunk': 'vlans',
+        'set_allowed_vlans_on_trunk': 'vlans',
+        'set_spanning_tree_vlan_priority': 'vlans',
+        'configure_access_list': 'access_lists',
+        'apply_access_list_to_interface': 'access_lists',
+        'show_access_lists': 'access_lists',
+        'configure_dhcp_pool': 'dhcp_pools',
+    }
+
+    def __init__(self, data_manager, catalog=None):
+        self.data_manager = data_manager
+        # הקטלוג המהודר משותף לכל המכשירים; כשהמנתח נוצר לבד - הקטלוג המשותף של commands.json
+        if catalog is None:
+            catalog = self.data_manager.load_catalog()
+        self.catalog = catalog
+        self.commands = catalog.commands
+        self.command_regex = catalog.command_regex
+        self.command_index = catalog.index
+        self.logger = Logger(subsystem="parser")
+        # תיעוד כל פקודה ללוג; מכובה בהרצה אצווה (CLISimulator.run_script)
+        self.trace = True
+        # ההקשר של מצבי המשנה: הממשק, ה-VLAN ותהליך הניתוב שנבחרו אחרונים
+        self.current_interface = None
+        self.current_vlan = None
+        self.current_router = None
+        # המצב אחרי הפקודה האחרונה שעברה ב-parse_command
+        self.last_mode = None
+        # terminal length של הסשן (לא חלק מהקונפיגורציה): כמה שורות עד --More--, 0 בלי עצירות
+        self.terminal_length = output_pipeline.DEFAULT_TERMINAL_LENGTH
 
     def parse_command(self, line, device_type, current_mode):
-        self.logger.debug(f"Parsing command: {line}")
+        # הפלט כפי שה-handler הפיק אותו: מחרוזת, או זרם שורות (פקודות show ומסנני "|") שמודפס תוך כדי
+        command, output, self.last_mode = self.dispatch_stream(line, device_type, current_mode)
+        return output
+
+    def dispatch(self, line, device_type, current_mode):
+        # מחזיר (פקודה, פלט, המצב אחרי הפקודה) בלי להדפיס דבר; הפלט תמיד מחרוזת אחת
+        command, output, mode = self.dispatch_stream(line, device_type, current_mode)
+        if not isinstance(output, str):
+            output = "\n".join(output)
+        return command, output, mode
+
+    def dispatch_stream(self, line, device_type, current_mode):
+        # כמו dispatch, אבל פלט של פקודת show יכול להיות generator של שורות שמופק רק כשקוראים אותו
+        if self.trace:
+            self.logger.debug("Parsing command: %s", line)
+        try:
+            line, filters = output_pipeline.split_filters(line)
+        except ValueError as e:
+            raise CommandError(f"מסנן פלט לא תקין: {e}")
         parts = line.split()
         if not parts:
             raise CommandError("פקודה ריקה. הקלד '?' לעזרה.")
 
-        base_command = parts[0].lower()
-        args = parts[1:]
-
-        matching_commands = [cmd for cmd in self.commands if cmd['full_command'].lower().startswith(base_command) and current_mode in cmd['modes']]
+        try:
+            command, args = self.command_index.resolve(parts, current_mode)
+        except AmbiguousCommandError as e:
+            raise CommandError(f"פקודה לא חד משמעית. אפשרויות: {', '.join([cmd['full_command'] for cmd in e.candidates])}")
 
-        if not matching_commands:
-            raise CommandError(f"פקודה לא מוכרת: {base_command}")
+        if command is None:
+            raise UnknownCommandError(f"פקודה לא מוכרת: {parts[0].lower()}")
+        if filters and not command['full_command'].startswith("show"):
+            raise CommandError("מסנני פלט (|) זמינים רק בפקודות show.")
 
-        if len(matching_commands) > 1:
-            raise CommandError(f"פקודה לא חד משמעית. אפשרויות: {', '.join([cmd['full_command'] for cmd in matching_commands])}")
+        # פקודה אחת = טרנזקציה אחת: אם ה-handler נכשל באמצע, השינויים שכבר עשה מתבטלים
+        with self.data_manager.batch():
+            output = self.execute_command(command, device_type, args)
+        if not isinstance(output, str):
+            output = self.locked_lines(output)
+        if filters:
+            output = output_pipeline.apply_filters(output, filters)
 
-        command = matching_commands[0]
+        action = command['action']
+        if action == 'exit_mode':
+            return command, output, self.PARENT_MODES.get(current_mode, current_mode)
+        return command, output, self.MODE_CHANGES.get(action, current_mode)
 
-        return self.execute_command(command, device_type, args)
+    def locked_lines(self, lines):
+        # ה-handler של show ממשיך לרוץ אחרי שה-batch של הפקודה נסגר, כשקוראים את הפלט; כל חלק של
+        # OUTPUT_CHUNK שורות מופק בתוך batch משלו, כך שהוא לא קורא את המצב באמצע פקודה של סשן אחר
+        lines = iter(lines)
+        while True:
+            with self.data_manager.batch():
+                chunk = list(itertools.islice(lines, OUTPUT_CHUNK))
+            if not chunk:
+                return
+            yield from chunk
 
     def execute_command(self, command, device_type, args):
-        self.logger.info(f"Executing command: {command['action']} with args: {args}")
         action = command['action']
+        if self.trace:
+            self.logger.info("Executing command: %s with args: %s", action, args)
 
-        actions = {
-            'enter_privileged': self.enter_privileged_mode,
-            'exit_mode': self.exit_mode,
-            'enter_config': self.enter_config_mode,
-            'show_running_config': self.show_running_config,
-            'show_startup_config': self.show_startup_config,
-            'copy_running_to_startup': self.copy_running_to_startup,
-            'show_interfaces': self.show_interfaces,
-            'configure_interface': self.configure_interface,
-            'set_ip_address': self.set_ip_address,
-            'show_ip_interface_brief': self.show_ip_interface_brief,
-            'show_version': self.show_version,
-            'set_hostname': self.set_hostname,
-            'show_vlan': self.show_vlan,
-            'create_vlan': self.create_vlan,
-            'configure_access_list': self.configure_access_list,
-            'show_access_lists': self.show_access_lists,
-            'configure_dhcp_pool': self.configure_dhcp_pool,
-            'show_dhcp_bindings': self.show_dhcp_bindings,
-            'configure_static_route': self.configure_static_route,
-            'show_ip_route': self.show_ip_route,
-            'configure_ospf': self.configure_ospf,
-            'show_ip_ospf': self.show_ip_ospf,
-            'configure_eigrp': self.configure_eigrp,
-            'show_ip_eigrp': self.show_ip_eigrp,
-        }
-
-        if action in actions:
-            return actions[action](device_type, args)
+        handler = getattr(self, self.ACTIONS.get(action, ''), None)
+        if handler is not None:
+            return handler(device_type, args)
         else:
             raise CommandError(f"פעולה {action} לא מיושמת עדיין.")
 
+    def enter_privileged_mode(self, device_type, args):
+        return ""
+
+    def exit_mode(self, device_type, args):
+        return ""
+
+    def return_to_privileged(self, device_type, args):
+        return ""
+
+    def enter_config_mode(self, device_type, args):
+        return "Enter configuration commands, one per line.  End with CNTL/Z."
+
+    def set_hostname(self, device_type, args):
+        if len(args) != 1:
+            raise CommandError("Error: Hostname required.")
+        self.data_manager.update_hostname(args[0])
+        return ""
+
+    def enter_interface_config(self, device_type, args):
+        if not args:
+            raise CommandError("Error: Interface name required.")
+        name = interface_table.canonical_interface("".join(args))
+        if name not in self.data_manager.get_device_state("interfaces"):
+            # ממשקי נתב כבויים כברירת מחדל, ממשקי מתג פעילים
+            status = "administratively down" if device_type == "router" else "up"
+            self.data_manager.add_interface(name, {"status": status})
+        self.current_interface = name
+        return ""
+
+    def enable_interface(self, device_type, args):
+        self.data_manager.update_interface(self.current_interface, "status", "up")
+        return ""
+
+    def disable_interface(self, device_type, args):
+        self.data_manager.update_interface(self.current_interface, "status", "administratively down")
+        return ""
+
+    def create_or_configure_vlan(self, device_type, args):
+        if len(args) != 1 or not args[0].isdigit() or not 1 <= int(args[0]) <= 4094:
+            raise CommandError("Error: VLAN ID must be between 1 and 4094.")
+        vlan_id = str(int(args[0]))
+        if vlan_id not in self.data_manager.get_device_state("vlans"):
+            self.data_manager.add_vlan(vlan_id, f"VLAN{int(vlan_id):04d}")
+        self.current_vlan = vlan_id
+        return ""
+
+    def set_vlan_name(self, device_type, args):
+        if len(args) != 1:
+            raise CommandError("Error: VLAN name required.")
+        self.data_manager.rename_vlan(self.current_vlan, args[0])
+        return ""
+
+    def enter_routing_protocol_config(self, device_type, args):
+        if not args:
+            raise CommandError("Error: Routing protocol required.")
+        return self.enter_router(args[0].lower(), args[1:])
+
+    def enter_ospf_config(self, device_type, args):
+        return self.enter_router("ospf", args)
+
+    def enter_eigrp_config(self, device_type, args):
+        return self.enter_router("eigrp", args)
+
+    def configure_rip(self, device_type, args):
+        return self.enter_router("rip", args)
+
+    def enter_router(self, protocol, args):
+        if protocol in ("ospf", "eigrp") and (len(args) != 1 or not args[0].isdigit()):
+            raise CommandError(f"Error: {protocol.upper()} process ID required.")
+        name = " ".join([protocol] + args[:1])
+        protocols = self.data_manager.get_device_state("routing_protocols") or {}
+        if name not in protocols:
+            protocols = dict(protocols)
+            protocols[name] = {"protocol": protocol, "networks": []}
+            self.data_manager.update_device_state("routing_protocols", protocols)
+        self.current_router = name
+        return ""
+
+    def advertise_network(self, device_type, args):
+        if not args:
+            raise CommandError("Error: Network address required.")
+        try:
+            ipaddress.ip_address(args[0])
+        except ValueError:
+            raise CommandError("Error: Invalid network address.")
+        network = " ".join(args)
+        self.update_router("networks", lambda current: current if network in current else current + [network])
+        return ""
+
+    def update_router(self, key, update):
+        # שינוי בתהליך הניתוב הנוכחי (router ...): update מקבל את הערך הקיים ומחזיר את החדש
+        protocols = dict(self.data_manager.get_device_state("routing_protocols") or {})
+        process = dict(protocols[self.current_router])
+        value = update(process.get(key))
+        if value != process.get(key):
+            process[key] = value
+            protocols[self.current_router] = process
+            self.data_manager.update_device_state("routing_protocols", protocols)
+
+    def passive_interface(self, device_type, args):
+        if len(args) != 1:
+            raise CommandError("Error: Interface name required.")
+        name = interface_table.canonical_interface(args[0])
+        if name not in (self.data_manager.get_device_state("interfaces") or {}):
+            raise CommandError(f"Error: Interface {name} does not exist.")
+        self.update_router("passive", lambda current: sorted(set(current or []) | {name}))
+        return ""
+
+    def set_variance(self, device_type, args):
+        if len(args) != 1 or not args[0].isdigit() or not 1 <= int(args[0]) <= eigrp_engine.MAX_VARIANCE:
+            raise CommandError(f"Error: Variance must be between 1 and {eigrp_engine.MAX_VARIANCE}.")
+        self.update_router("variance", lambda current: int(args[0]))
+        return ""
+
+    def redistribute(self, device_type, args):
+        # redistribute {connected | static} [metric <bandwidth> <delay> <reliability> <load> <mtu>]
+        if not args or args[0].lower() not in ("connected", "static"):
+            raise CommandError("Error: Only connected and static routes can be redistributed.")
+        source = args[0].lower()
+        metric = args[1:]
+        if metric and (len(metric) != 6 or metric[0].lower() != "metric" or not all(v.isdigit() for v in metric[1:])
+                       or not 1 <= int(metric[1]) <= eigrp_engine.MAX_BANDWIDTH):
+            raise CommandError("Error: Usage: redistribute <source> metric <bandwidth> <delay> <reliability> "
+                               "<load> <mtu>.")
+        statement = " ".join([source] + [value.lower() for value in metric])
+        self.update_router("redistribute", lambda current: [entry for entry in current or []
+                                                             if entry.split()[0] != source] + [statement])
+        return ""
+
+    def set_interface_bandwidth(self, device_type, args):
+        if len(args) != 1 or not args[0].isdigit() or not 1 <= int(args[0]) <= eigrp_engine.MAX_BANDWIDTH:
+            raise CommandError(f"Error: Bandwidth must be between 1 and {eigrp_engine.MAX_BANDWIDTH} kbps.")
+        self.data_manager.update_interface(self.current_interface, "bandwidth", int(args[0]))
+        return ""
+
+    def set_interface_delay(self, device_type, args):
+        if len(args) != 1 or not args[0].isdigit() or not 1 <= int(args[0]) <= eigrp_engine.MAX_DELAY:
+            raise CommandError(f"Error: Delay must be between 1 and {eigrp_engine.MAX_DELAY}.")
+        self.data_manager.update_interface(self.current_interface, "delay", int(args[0]))
+        return ""
+
+    def set_switchport(self, device_type, key, value):
+        if device_type == "router":
+            raise CommandError("Error: Switchport commands are only available on switches.")
+        self.data_manager.update_interface(self.current_interface, key, value)
+        return ""
+
+    def set_switchport_access_mode(self, device_type, args):
+        return self.set_switchport(device_type, "switchport_mode", "access")
+
+    def set_switchport_trunk_mode(self, device_type, args):
+        return self.set_switchport(device_type, "switchport_mode", "trunk")
+
+    def switchport_vlan(self, args):
+        if len(args) != 1 or not args[0].isdigit() or not 1 <= int(args[0]) <= interface_table.MAX_VLAN:
+            raise CommandError("Error: VLAN ID must be between 1 and 4094.")
+        return str(int(args[0]))
+
+    def assign_vlan_to_access_port(self, device_type, args):
+        vlan_id = self.switchport_vlan(args)
+        self.set_switchport(device_type, "switchport_access_vlan", vlan_id)
+        # כמו ב-IOS: VLAN שעוד לא קיים נוצר
+        if vlan_id not in self.data_manager.get_device_state("vlans"):
+            self.data_manager.add_vlan(vlan_id, f"VLAN{int(vlan_id):04d}")
+            return f"% Access VLAN does not exist. Creating vlan {vlan_id}"
+        return ""
+
+    def set_native_vlan_for_trunk(self, device_type, args):
+        return self.set_switchport(device_type, "switchport_trunk_native_vlan", self.switchport_vlan(args))
+
+    def set_allowed_vlans_on_trunk(self, device_type, args):
+        # switchport trunk allowed vlan {<list> | all | none | add <list> | remove <list> | except <list>}
+        if not 1 <= len(args) <= 2 or (len(args) == 2 and args[0].lower() not in ("add", "remove", "except")):
+            raise CommandError("Error: Usage: switchport trunk allowed vlan [add | remove | except] <list>.")
+        try:
+            vlans = interface_table.parse_vlan_list(args[-1].lower())
+        except ValueError as e:
+            raise CommandError(f"Error: {e}.")
+        config = self.data_manager.get_device_state("interfaces").get(self.current_interface) or {}
+        current = interface_table.parse_vlan_list(config.get("switchport_trunk_allowed_vlan") or "all")
+        operation = args[0].lower() if len(args) == 2 else None
+        if operation == "add":
+            vlans = current | vlans
+        elif operation == "remove":
+            vlans = current - vlans
+        elif operation == "except":
+            vlans = interface_table.parse_vlan_list("all") - vlans
+        # כל ה-VLANs הם ברירת המחדל, ואז השורה לא מופיעה בקונפיגורציה
+        value = None if len(vlans) == interface_table.MAX_VLAN else interface_table.format_vlan_list(vlans)
+        return self.set_switchport(device_type, "switchport_trunk_allowed_vlan", value)
+
+    def configure_etherchannel_group(self, device_type, args):
+        # channel-group <n> mode {active | passive | desirable | auto | on}
+        if (len(args) != 3 or not args[0].isdigit() or not 1 <= int(args[0]) <= 48 or args[1].lower() != "mode"
+                or args[2].lower() not in interface_table.CHANNEL_PROTOCOLS):
+            raise CommandError("Error: Usage: channel-group <1-48> mode {active | passive | desirable | auto | on}.")
+        group, mode = int(args[0]), args[2].lower()
+        protocol = interface_table.CHANNEL_PROTOCOLS[mode]
+        members = self.data_manager.interface_table().by_channel.get(group, {})
+        for record in members.values():
+            if record.name != self.current_interface and interface_table.CHANNEL_PROTOCOLS[record.channel_mode] != protocol:
+                raise CommandError(f"Error: Command rejected (Port-channel{group}, {self.current_interface}): "
+                                   "Invalid etherchannel mode.")
+        created = not members
+        self.data_manager.update_interface(self.current_interface, "channel_group", f"{group} mode {mode}")
+        return f"Creating a port-channel interface Port-channel {group}" if created else ""
+
+    def show_running_config(self, device_type, args):
+        # הכותרת צריכה את הגודל, ולכן השורות נאספות קודם - הפניות לשורות שכבר במטמון, לא עותק שלהן
+        lines = list(self.data_manager.running_config())
+        size = sum(map(len, lines)) + len(lines) - 1
+        return itertools.chain(["Building configuration...", "", f"Current configuration : {size} bytes"], lines)
+
+    def show_startup_config(self, device_type, args):
+        lines = self.data_manager.startup_config_lines()
+        if not lines:
+            return "startup-config is not present"
+        size = sum(map(len, lines)) + len(lines) - 1
+        return itertools.chain([f"Using {size} out of 262144 bytes"], lines)
+
+    def copy_running_to_startup(self, device_type, args):
+        self.data_manager.save_running_config()
+        return "Destination filename [startup-config]?\nBuilding configuration...\n[OK]"
+
+    def snapshot_ref(self, ref):
+        # מספר snapshot בארכיון של המכשיר (כמו ב-show archive), או startup-config
+        if ref.lower() == "startup-config":
+            snapshot_id = self.data_manager.get_device_state("startup_snapshot")
+        elif ref.isdigit():
+            snapshot_id = self.data_manager.find_snapshot(int(ref))
+        else:
+            snapshot_id = None
+        if snapshot_id is None:
+            raise CommandError(f"Error: Archive {ref} not found.")
+        return snapshot_id
+
+    def archive_config(self, device_type, args):
+        self.data_manager.archive_config()
+        return ""
+
+    def show_archive(self, device_type, args):
+        snapshots = self.data_manager.config_snapshots()
+        lines = ["The maximum archive configurations allowed is unlimited.",
+                 f"There are currently {len(snapshots)} archive configurations saved.",
+                 " Archive #  Created              Name"]
+        for index, (snapshot_id, number, created, label) in enumerate(snapshots, 1):
+            line = f" {number:<10} {created:<20} {label or ''}".rstrip()
+            lines.append(line + " <- Most Recent" if index == len(snapshots) else line)
+        return "\n".join(lines)
+
+    def show_archive_differences(self, device_type, args):
+        # בלי ארגומנטים: ה-snapshot האחרון מול ה-running-config; אחד: snapshot מול ה-running-config;
+        # שניים: snapshot מול snapshot
+        if len(args) > 2:
+            raise CommandError("Error: Usage: show archive config differences [archive] [archive]")
+        if args:
+            old = self.snapshot_ref(args[0])
+        else:
+            old = self.data_manager.find_snapshot()
+            if old is None:
+                raise CommandError("Error: No archived configurations.")
+        new = self.snapshot_ref(args[1]) if len(args) == 2 else None
+        return config_archive.format_diff(self.data_manager.config_diff(old, new))
+
+    def configure_replace(self, device_type, args):
+        if len(args) != 1:
+            raise CommandError("Error: Usage: configure replace <archive>")
+        self.data_manager.replace_config(self.snapshot_ref(args[0]))
+        return "Total number of passes: 1\nRollback Done"
+
     # ... (rest of the methods remain the same, but we'll update a few as examples)
 
     def set_ip_address(self, device_type, args):
+        # בתוך מצב interface הממשק הוא זה שנבחר ב-"interface <name>"
+        if len(args) == 2 and self.current_interface is not None:
+            args = [self.current_interface] + list(args)
         if len(args) < 3:
             raise CommandError("Error: Interface name, IP address, and subnet mask required.")
         interface_name, ip_address, subnet_mask = args[:3]
+        interface_name = interface_table.canonical_interface(interface_name)
         try:
             ipaddress.ip_address(ip_address)
             ipaddress.ip_address(subnet_mask)
@@ -106,10 +548,410 @@ class CommandParser:
         self.data_manager.add_route(f"{destination}/{mask}", next_hop)
         return f"Static route added: {destination}/{mask} via {next_hop}"
 
+    def configure_access_list(self, device_type, args):
+        # access-list <number> {permit|deny|remark} ... ; השורה נבדקת כאן ונשמרת כטקסט
+        if len(args) < 2:
+            raise CommandError("Error: Access list number and rule required.")
+        acl_id, rule = args[0], " ".join(args[1:])
+        try:
+            acl_engine.parse_rule(rule, acl_engine.is_standard(acl_id))
+        except ValueError as e:
+            raise CommandError(f"Error: Invalid access list entry: {e}.")
+        self.data_manager.add_access_list(acl_id, rule)
+        return ""
+
+    def apply_access_list_to_interface(self, device_type, args):
+        if len(args) != 2 or args[1].lower() not in ("in", "out"):
+            raise CommandError("Error: Access list and direction (in/out) required.")
+        self.data_manager.update_interface(self.current_interface, f"access_group_{args[1].lower()}", args[0])
+        return ""
+
+    def show_access_lists(self, device_type, args):
+        access_lists = self.data_manager.get_device_state("access_lists") or {}
+        names = [args[0]] if args else list(access_lists)
+        for acl_id in names:
+            compiled = self.data_manager.compiled_access_list(acl_id)
+            if compiled is not None:
+                try:
+                    standard = acl_engine.is_standard(acl_id)
+                except ValueError:
+                    standard = None
+                yield from compiled.show(acl_id, standard)
+
+    def clear_access_list_counters(self, device_type, args):
+        access_lists = self.data_manager.get_device_state("access_lists") or {}
+        for acl_id in args[:1] or list(access_lists):
+            compiled = self.data_manager.compiled_access_list(acl_id)
+            if compiled is not None:
+                compiled.clear_counters()
+        return ""
+
+    def packet_tracer(self, device_type, args):
+        # packet-tracer input <interface> <protocol> <source> [<source port>] <destination> [<destination port>]
+        # החבילה עוברת את ה-ACL הנכנס, חיפוש הניתוב וה-ACL היוצא, כמו ב-packet-tracer של ASA
+        if len(args) < 5 or args[0].lower() != "input":
+            raise CommandError("Error: Usage: packet-tracer input <interface> <protocol> <source> [port] "
+                               "<destination> [port].")
+        interface, protocol = interface_table.canonical_interface(args[1]), args[2].lower()
+        try:
+            if protocol in ("tcp", "udp"):
+                if len(args) != 7:
+                    raise ValueError(f"{protocol} requires source and destination ports")
+                packet = acl_engine.make_packet(protocol, args[3], args[5], args[4], args[6])
+            else:
+                packet = acl_engine.make_packet(protocol, args[3], args[4])
+        except (ValueError, KeyError) as e:
+            raise CommandError(f"Error: Invalid packet: {e}.")
+        if interface not in (self.data_manager.get_device_state("interfaces") or {}):
+            raise CommandError(f"Error: Interface {interface} does not exist.")
+
+        # כל שלב: (סוג, ALLOW/DROP, ההגדרה שקבעה)
+        phases = []
+        output_interface = None
+        allowed = self.trace_access_list(phases, interface, "in", packet)
+        if allowed:
+            engine = self.data_manager.routing_engine()
+            if engine.is_local(packet[2]):
+                output_interface = "identity"
+                phases.append(("ROUTE-LOOKUP", "ALLOW", "destination is an address of this device"))
+            else:
+                resolved = engine.resolve(packet[2])
+                if resolved is None:
+                    allowed = False
+                    phases.append(("ROUTE-LOOKUP", "DROP", "no route to destination"))
+                else:
+                    output_interface = resolved[0]
+                    phases.append(("ROUTE-LOOKUP", "ALLOW", f"found next-hop via egress interface {output_interface}"))
+                    allowed = self.trace_access_list(phases, output_interface, "out", packet)
+        lines = []
+        for number, (kind, result, config) in enumerate(phases, 1):
+            lines += [f"Phase: {number}", f"Type: {kind}", f"Result: {result}", f"Config: {config}", ""]
+        lines += [
+            "Result:",
+            f"packet: {acl_engine.format_packet(packet)}",
+            f"input-interface: {interface}",
+            f"output-interface: {output_interface or '-'}",
+            f"Action: {'allow' if allowed else 'drop'}",
+        ]
+        return "\n".join(lines)
+
+    def trace_access_list(self, phases, interface, direction, packet):
+        config = (self.data_manager.get_device_state("interfaces") or {}).get(interface) or {}
+        acl_id = config.get(f"access_group_{direction}")
+        compiled = self.data_manager.compiled_access_list(acl_id) if acl_id is not None else None
+        if compiled is None:
+            return True
+        index = compiled.match(packet)
+        if index is None:
+            phases.append((f"ACCESS-LIST ({direction} {interface})", "DROP", f"access-list {acl_id} implicit deny"))
+            return False
+        compiled.hits[index] += 1
+        allowed = compiled.permits[index]
+        phases.append((f"ACCESS-LIST ({direction} {interface})", "ALLOW" if allowed else "DROP",
+                       f"access-list {acl_id} {compiled.rules[index].text}"))
+        return allowed
+
+    def find_interface(self, table, args):
+        # שם מלא או מקוצר (Gi1/0/1, gig1/0/1)
+        name = interface_table.canonical_interface("".join(args))
+        record = table.get(name)
+        if record is None:
+            raise CommandError(f"Error: Interface {name} does not exist.")
+        return record
+
+    def show_interfaces(self, device_type, args):
+        table = self.data_manager.interface_table()
+        return table.show_interfaces([self.find_interface(table, args)] if args else None)
+
+    def show_ip_interface_brief(self, device_type, args):
+        return self.data_manager.interface_table().show_ip_brief()
+
+    def show_interface_status(self, device_type, args):
+        # show interfaces status [connected | disabled | notconnect | trunk | vlan <id>] - דרך האינדקסים
+        table = self.data_manager.interface_table()
+        statuses = {name: status for status, name in interface_table.STATUS_NAMES.items()}
+        if not args:
+            records = None
+        elif len(args) == 1 and args[0].lower() in statuses:
+            records = table.select(table.by_status, statuses[args[0].lower()])
+        elif len(args) == 1 and args[0].lower() == "trunk":
+            records = table.select(table.by_mode, "trunk")
+        elif len(args) == 2 and args[0].lower() == "vlan":
+            records = table.select(table.by_vlan, self.switchport_vlan(args[1:]))
+        else:
+            raise CommandError("Error: Usage: show interfaces status [connected | disabled | notconnect | trunk | "
+                               "vlan <id>].")
+        return table.show_status(records)
+
+    def show_interfaces_trunk(self, device_type, args):
+        vlans = {int(vlan_id) for vlan_id in self.data_manager.get_device_state("vlans") or {}} | {1}
+        return self.data_manager.interface_table().show_trunk(vlans)
+
+    def show_interface_counters(self, device_type, args):
+        return self.data_manager.interface_table().show_counters()
+
+    def clear_interface_counters(self, device_type, args):
+        # clear counters [interface]: בלי ממשק - כל המונים בבת אחת
+        table = self.data_manager.interface_table()
+        table.clear(self.find_interface(table, args).name if args else None)
+        return ""
+
+    def show_etherchannel_summary(self, device_type, args):
+        return self.data_manager.interface_table().show_etherchannel()
+
+    def show_mac_address_table(self, device_type, args):
+        # show mac address-table [dynamic | static] [vlan <id>] [interface <name>] [address <mac>]
+        filters = {"vlan": None, "interface": None, "address": None}
+        entry_type = None
+        position = 0
+        while position < len(args):
+            keyword = args[position].lower()
+            if keyword in ("dynamic", "static"):
+                entry_type = keyword.upper()
+                position += 1
+            elif keyword in filters and position + 1 < len(args):
+                filters[keyword] = args[position + 1]
+                position += 2
+            else:
+                raise CommandError(f"Error: Invalid filter: {args[position]}.")
+        try:
+            vlan = int(filters["vlan"]) if filters["vlan"] is not None else None
+            address = mac_table.parse_mac(filters["address"]) if filters["address"] is not None else None
+        except ValueError:
+            raise CommandError("Error: Invalid VLAN ID or MAC address.")
+        port = interface_table.canonical_interface(filters["interface"]) if filters["interface"] is not None else None
+        return self.data_manager.mac_address_table().show(vlan, port, entry_type, address)
+
+    def show_mac_aging_time(self, device_type, args):
+        return f"Global Aging Time: {self.data_manager.mac_address_table().aging_time:>6}"
+
+    def set_mac_aging_time(self, device_type, args):
+        if len(args) != 1 or not args[0].isdigit():
+            raise CommandError("Error: Aging time in seconds required.")
+        try:
+            self.data_manager.set_mac_aging_time(int(args[0]))
+        except ValueError as e:
+            raise CommandError(f"Error: {e}.")
+        return ""
+
+    def add_static_mac(self, device_type, args):
+        # mac address-table static <mac> vlan <id> interface <name>; כניסה לאותה כתובת באותו VLAN מחליפה את הקודמת
+        try:
+            vlan, mac, interface = mac_table.parse_static_entry(" ".join(args))
+        except ValueError as e:
+            raise CommandError(f"Error: Invalid static MAC entry: {e}.")
+        interface = interface_table.canonical_interface(interface)
+        if not 1 <= vlan <= interface_table.MAX_VLAN:
+            raise CommandError("Error: VLAN ID must be between 1 and 4094.")
+        if interface not in (self.data_manager.get_device_state("interfaces") or {}):
+            raise CommandError(f"Error: Interface {interface} does not exist.")
+        entries = [text for text in self.data_manager.get_device_state("mac_static") or []
+                   if mac_table.parse_static_entry(text)[:2] != (vlan, mac)]
+        entries.append(mac_table.format_static_entry(vlan, mac, interface))
+        self.data_manager.update_device_state("mac_static", entries)
+        return ""
+
+    def show_ip_route(self, device_type, args):
+        # show ip route | show ip route <address> | show ip route <network> <mask>
+        engine = self.data_manager.routing_engine()
+        try:
+            if not args:
+                lines = engine.show_ip_route()
+            elif len(args) == 1:
+                lines = engine.show_route_entry(ip_to_int(args[0]))
+            else:
+                lines = engine.show_ip_route(*parse_prefix(args[0], args[1]))
+        except ValueError:
+            raise CommandError("Error: Invalid IP address or subnet mask.")
+        return lines
+
+    def show_cef_table(self, device_type, args):
+        return self.data_manager.routing_engine().show_ip_cef()
+
+    def set_ospf_cost(self, device_type, args):
+        if len(args) != 1 or not args[0].isdigit() or not 1 <= int(args[0]) <= ospf_engine.MAX_COST:
+            raise CommandError(f"Error: OSPF cost must be between 1 and {ospf_engine.MAX_COST}.")
+        self.data_manager.update_interface(self.current_interface, "ospf_cost", int(args[0]))
+        return ""
+
+    def ospf_processes(self):
+        protocols = self.data_manager.get_device_state("routing_protocols") or {}
+        return [name for name, process in protocols.items() if process.get("protocol") == "ospf"]
+
+    def show_ip_ospf(self, device_type, args):
+        domain = self.data_manager.ospf_domain()
+        return domain.process_lines(self.data_manager.device_id, self.ospf_processes())
+
+    def show_ip_ospf_neighbor(self, device_type, args):
+        if not self.ospf_processes():
+            return ""
+        return self.data_manager.ospf_domain().neighbor_lines(self.data_manager.device_id)
+
+    def show_ip_ospf_database(self, device_type, args):
+        processes = self.ospf_processes()
+        if not processes:
+            return ""
+        return self.data_manager.ospf_domain().database_lines(self.data_manager.device_id, processes[0].split()[-1])
+
+    def show_ip_eigrp_neighbors(self, device_type, args):
+        return self.data_manager.eigrp_domain().neighbor_lines(self.data_manager.device_id)
+
+    def show_ip_eigrp_topology(self, device_type, args):
+        return self.data_manager.eigrp_domain().topology_lines(self.data_manager.device_id)
+
+    def show_ip_rip_database(self, device_type, args):
+        return self.data_manager.rip_domain().database_lines(self.data_manager.device_id)
+
+    def enable_debugging(self, device_type, args):
+        # debug ip rip: מצב הוראה - שינויים לא מתכנסים לבד, וכל rip step מריץ סבב עדכונים אחד
+        if [arg.lower() for arg in args] != ["ip", "rip"]:
+            raise CommandError("Error: Only 'debug ip rip' is supported.")
+        self.data_manager.rip_domain().stepping = True
+        return "RIP protocol debugging is on"
+
+    def disable_debugging(self, device_type, args):
+        if [arg.lower() for arg in args] not in (["ip", "rip"], ["all"]):
+            raise CommandError("Error: Only 'no debug ip rip' and 'no debug all' are supported.")
+        domain = self.data_manager.rip_domain()
+        domain.stepping = False
+        domain.converge()
+        return "RIP protocol debugging is off"
+
+    def step_rip(self, device_type, args):
+        # rip step [rounds]
+        if len(args) > 1 or (args and (not args[0].isdigit() or not 1 <= int(args[0]) <= rip_engine.INFINITY)):
+            raise CommandError(f"Error: Rounds must be between 1 and {rip_engine.INFINITY}.")
+        domain = self.data_manager.rip_domain()
+        if not domain.stepping:
+            raise CommandError("Error: RIP step mode is off (use 'debug ip rip').")
+        return domain.step_lines(self.data_manager.device_id, int(args[0]) if args else 1)
+
+    def set_terminal_length(self, device_type, args):
+        if len(args) != 1 or not args[0].isdigit() or int(args[0]) > output_pipeline.MAX_TERMINAL_LENGTH:
+            raise CommandError(f"Error: Terminal length must be between 0 and {output_pipeline.MAX_TERMINAL_LENGTH}.")
+        self.terminal_length = int(args[0])
+        return ""
+
+    def send_ping(self, device_type, args):
+        # ping <address> [repeat <count>]. החבילה עוברת ממכשיר למכשיר (forwarding.py) והתשובה חוזרת בדרך
+        # שלה: ! - תשובה, U - נתב בדרך החזיר unreachable (אין נתיב או ACL), . - אין תשובה
+        if not args:
+            raise CommandError("Error: Destination address required.")
+        count = 5
+        if len(args) >= 3 and args[1].lower() == "repeat":
+            if not args[2].isdigit() or not 1 <= int(args[2]) <= 2147483647:
+                raise CommandError("Error: Invalid repeat count.")
+            count = int(args[2])
+        try:
+            ip_to_int(args[0])
+        except ValueError:
+            raise CommandError("Error: Invalid IP address.")
+        plane = self.data_manager.forwarding_plane()
+        walker, forward, reply = plane.trace(self.data_manager.device_id, args[0])
+        if plane.open_edges and forward.status == forwarding.NO_NEIGHBOR:
+            marks, rtt = "!" * count, len(forward.hops)
+        elif reply is not None and reply.status == forwarding.DELIVERED:
+            marks, rtt = "!" * count, max(1, len(forward.hops) + len(reply.hops) - 2)
+        elif forward.status in UNREACHABLE_CODES and len(forward.hops) > 1 and plane.answered(walker, forward.hops[-1]):
+            marks = "".join("U" if number % 2 == 0 else "." for number in range(count))
+        else:
+            marks = "." * count
+        plane.count(forward, count, 100 * count)
+        if reply is not None:
+            plane.count(reply, count, 100 * count)
+        lines = [
+            "Type escape sequence to abort.",
+            f"Sending {count}, 100-byte ICMP Echos to {args[0]}, timeout is 2 seconds:",
+            marks,
+        ]
+        if marks[0] == "!":
+            lines.append(f"Success rate is 100 percent ({count}/{count}), round-trip min/avg/max = {rtt}/{rtt}/{rtt} ms")
+        else:
+            lines.append(f"Success rate is 0 percent (0/{count})")
+        return "\n".join(lines)
+
+    def perform_traceroute(self, device_type, args):
+        # traceroute <address>: שורה לכל נתב בדרך, עם הכתובת של ממשק הכניסה שלו (ממנה חוזר ה-time exceeded).
+        # !H - אין נתיב, !A - ACL, * - אין תשובה
+        if len(args) != 1:
+            raise CommandError("Error: Destination address required.")
+        try:
+            ip_to_int(args[0])
+        except ValueError:
+            raise CommandError("Error: Invalid IP address.")
+        # הבדיקות והמעקב רצים עכשיו, בתוך ה-batch של הפקודה; רק הדפסת השורות נדחית
+        plane = self.data_manager.forwarding_plane()
+        walker, forward, reply = plane.trace(self.data_manager.device_id, args[0], "udp", TRACEROUTE_PORT)
+        return self.traceroute_lines(plane, walker, forward, reply, args[0])
+
+    def traceroute_lines(self, plane, walker, forward, reply, destination):
+        yield "Type escape sequence to abort."
+        yield f"Tracing the route to {destination}"
+        yield "VRF info: (vrf in name/id, vrf out name/id)"
+        # צעד 0 הוא המכשיר הזה; הוא מופיע רק כשהיעד הוא כתובת שלו
+        hops = forward.hops[1:] if len(forward.hops) > 1 or forward.status != forwarding.DELIVERED else forward.hops
+        for number, hop in enumerate(hops[:TRACEROUTE_MAX_TTL], 1):
+            if hop.status == forwarding.DELIVERED:
+                if reply.status == forwarding.DELIVERED:
+                    yield f"{number:>3} {destination} {number} msec {number} msec {number} msec"
+                else:
+                    yield f"{number:>3}  *  *  *"
+            elif hop.address is None or not plane.answered(walker, hop):
+                yield f"{number:>3}  *  *  *"
+            elif hop.status in UNREACHABLE_CODES:
+                code = UNREACHABLE_CODES[hop.status]
+                yield f"{number:>3} {int_to_ip(hop.address)} {code}  {code}  {code}"
+            else:
+                yield f"{number:>3} {int_to_ip(hop.address)} {number} msec {number} msec {number} msec"
+        if len(hops) < TRACEROUTE_MAX_TTL and (forward.status == forwarding.NO_NEIGHBOR or not hops):
+            number = len(hops) + 1
+            if plane.open_edges and forward.status == forwarding.NO_NEIGHBOR:
+                yield f"{number:>3} {destination} {number} msec {number} msec {number} msec"
+            else:
+                yield f"{number:>3}  *  *  *"
+
+    def set_interface_as_nat_inside(self, device_type, args):
+        self.data_manager.update_interface(self.current_interface, "ip_nat", "inside")
+        return ""
+
+    def set_interface_as_nat_outside(self, device_type, args):
+        self.data_manager.update_interface(self.current_interface, "ip_nat", "outside")
+        return ""
+
+    def configure_nat_rule(self, device_type, args):
+        # ip nat inside source static <local> <global> | list <acl> interface <name> overload.
+        # כלל static לאותה כתובת פנימית, או list לאותו ACL, מחליף את הקודם
+        text = " ".join(args)
+        try:
+            rule = forwarding.parse_nat_rule(text)
+        except ValueError as e:
+            raise CommandError(f"Error: Invalid NAT rule: {e}.")
+        if rule[0] == "list" and rule[2] not in (self.data_manager.get_device_state("interfaces") or {}):
+            raise CommandError(f"Error: Interface {rule[2]} does not exist.")
+        rules = [existing for existing in self.data_manager.get_device_state("nat") or []
+                 if forwarding.parse_nat_rule(existing)[:2] != rule[:2]]
+        self.data_manager.update_device_state("nat", rules + [text])
+        return ""
+
+    def show_nat_translations(self, device_type, args):
+        yield f"{'Pro':<5}{'Inside global':<22}{'Inside local':<22}{'Outside local':<22}Outside global"
+        for text in self.data_manager.get_device_state("nat") or []:
+            rule = forwarding.parse_nat_rule(text)
+            if rule[0] == "static":
+                yield f"{'---':<5}{int_to_ip(rule[2]):<22}{int_to_ip(rule[1]):<22}{'---':<22}---"
+        plane = self.data_manager.forwarding_plane()
+        for (device_id, outside, peer, protocol), inside in sorted(plane.translations.items()):
+            if device_id == self.data_manager.device_id:
+                name = acl_engine.PROTOCOL_NAMES.get(protocol, str(protocol))
+                yield f"{name:<5}{int_to_ip(outside):<22}{int_to_ip(inside):<22}{int_to_ip(peer):<22}{int_to_ip(peer)}"
+
     # ... (other methods remain the same)
 
     def complete_command(self, text, command_prefix, current_mode):
-        return [cmd['full_command'] for cmd in self.commands 
-                if cmd['full_command'].startswith(command_prefix) and 
-                cmd['full_command'].startswith(text) and
-                current_mode in cmd['modes']]
+        keywords, arguments = self.command_index.complete(command_prefix.split(), text, current_mode)
+        completions = list(keywords)
+        for command, position in arguments:
+            state_key = self.ARGUMENT_COMPLETIONS.get(command['action'])
+            if state_key and position == 0:
+                completions.extend(self.data_manager.complete_keys(state_key, text))
+        return completions
@@ -0,0 +1,259 @@
+# command_suggestions.py
+
+from command_index import CommandIndex
+
+
+def pattern_masks(pattern):
+    masks = {}
+    bit = 1
+    for ch in pattern:
+        masks[ch] = masks.get(ch, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def levenshtein(pattern, text, masks=None):
+    # מרחק עריכה בשיטת bit-parallel (Myers/Hyyrö): מעבר אחד על text, ללא טבלת DP
+    m = len(pattern)
+    if m == 0:
+        return len(text)
+    if masks is None:
+        masks = pattern_masks(pattern)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    score = m
+    for ch in text:
+        eq = masks.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+def transposition_distance(pattern, text, masks=None):
+    # כמו levenshtein, אבל החלפת שתי אותיות סמוכות ("rnu" -> "run") עולה 1 (Hyyrö)
+    m = len(pattern)
+    if m == 0:
+        return len(text)
+    if masks is None:
+        masks = pattern_masks(pattern)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    score = m
+    d0 = 0
+    prev_eq = 0
+    for ch in text:
+        eq = masks.get(ch, 0)
+        tr = (((~d0 & eq) << 1) & prev_eq) & full
+        d0 = ((((eq & pv) + pv) ^ pv) | eq | mv | tr) & full
+        ph = mv | (~(d0 | pv) & full)
+        mh = d0 & pv
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(d0 | ph) & full)
+        mv = ph & d0
+        prev_eq = eq
+    return score
+
+
+class BKTree:
+    def __init__(self, words=()):
+        self.root = None
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+        node = self.root
+        masks = pattern_masks(word)
+        while True:
+            distance = levenshtein(word, node[0], masks)
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, query, radius):
+        if self.root is None:
+            return []
+        masks = pattern_masks(query)
+        result = []
+        stack = [self.root]
+        while stack:
+            word, children = stack.pop()
+            distance = levenshtein(query, word, masks)
+            if distance <= radius:
+                result.append((distance, word))
+            low = distance - radius
+            high = distance + radius
+            for child_distance, child in children.items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return result
+
+
+class DeletionIndex:
+    # אינדקס מחיקות סימטרי (SymSpell): כל מחרוזת במרחק עד max_distance חולקת גרסת-מחיקה עם המילה
+    def __init__(self, words, max_distance=2):
+        self.max_distance = max_distance
+        self.deletes = {}
+        for word in words:
+            for variant in self._variants(word, max_distance):
+                self.deletes.setdefault(variant, set()).add(word)
+
+    @staticmethod
+    def _variants(word, depth):
+        variants = {word}
+        frontier = {word}
+        for _ in range(depth):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+
+    def search(self, word, max_distance=None):
+        if max_distance is None:
+            max_distance = self.max_distance
+        masks = pattern_masks(word)
+        candidates = set()
+        for variant in self._variants(word, max_distance):
+            candidates |= self.deletes.get(variant, set())
+        result = []
+        for candidate in candidates:
+            distance = transposition_distance(word, candidate, masks)
+            if distance <= max_distance:
+                result.append((distance, candidate))
+        return result
+
+
+class SuggestionIndex:
+    CACHE_SIZE = 1024
+    MIN_FUZZY_LENGTH = 2
+
+    def __init__(self, commands, command_index=None, max_distance=3):
+        self.commands = commands
+        self.command_index = command_index or CommandIndex(commands)
+        self.max_distance = max_distance
+        # נבנים לכל מצב בפעם הראשונה שמגיעה בו פקודה לא מוכרת
+        self.word_indexes = {}
+        self.trees = {}
+        self.word_cache = {}
+        self.cache = {}
+        # מצב -> ביטוי (פקודה מלאה או קיצור) -> הפקודה
+        self.phrases = {}
+        for command in commands:
+            for mode in command['modes']:
+                phrases = self.phrases.setdefault(mode, {})
+                for phrase in [command['full_command']] + list(command.get('shortcuts', [])):
+                    phrases.setdefault(" ".join(phrase.lower().split()), command)
+
+    def _word_index(self, mode, view):
+        index = self.word_indexes.get(mode)
+        if index is None:
+            # אוצר המילים: כל תחילית וכל קיצור שהעץ מכיר בכל רמה
+            words = set()
+            stack = [view.root]
+            while stack:
+                node = stack.pop()
+                words.update(key for key in node.lookup if len(key) >= self.MIN_FUZZY_LENGTH)
+                stack.extend(node.children.values())
+            index = DeletionIndex(words, max_distance=2)
+            self.word_indexes[mode] = index
+        return index
+
+    def _fuzzy_words(self, mode, view, token):
+        key = (mode, token)
+        words = self.word_cache.get(key)
+        if words is None:
+            words = [(0, token)]
+            if len(token) >= self.MIN_FUZZY_LENGTH:
+                max_distance = 1 if len(token) <= 4 else 2
+                words.extend(match for match in self._word_index(mode, view).search(token, max_distance)
+                             if match[1] != token)
+            if len(self.word_cache) >= self.CACHE_SIZE * 8:
+                self.word_cache.clear()
+            self.word_cache[key] = words
+        return words
+
+    def suggest(self, line, mode, limit=3, max_distance=None):
+        key = (line, mode, limit, max_distance)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        tokens = line.lower().split()
+        budget = self.max_distance if max_distance is None else max_distance
+        ranked = {}
+        view = self.command_index.view(mode)
+        if view is not None and tokens:
+            candidates = [self._fuzzy_words(mode, view, token) for token in tokens]
+            self._walk(view.root, candidates, 0, 0, budget, ranked)
+
+        # שגיאה שחוצה מילים ("showip route") - חיפוש ב-BK-tree על פקודות מלאות וקיצורים
+        if not ranked and mode in self.phrases and tokens:
+            self._suggest_phrases(" ".join(tokens), mode, budget, ranked)
+
+        suggestions = [name for name, _ in sorted(ranked.items(), key=lambda item: item[1])][:limit]
+        if len(self.cache) >= self.CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = suggestions
+        return list(suggestions)
+
+    def _walk(self, node, candidates, depth, cost, budget, ranked):
+        if depth == len(candidates):
+            # הקלט נגמר: הפקודה עצמה, או כל הפקודות שמתחתיה אם זה קיצור שלא הושלם
+            for command in node.iter_commands():
+                extra = len(command['full_command'].split()) - depth
+                self._rank(ranked, command, (cost, 0, max(extra, 0), command['full_command']))
+            return
+        if node.command is not None:
+            # המילים שנותרו יכולות להיות ארגומנטים
+            self._rank(ranked, node.command, (cost, len(candidates) - depth, 0, node.command['full_command']))
+        for distance, word in candidates[depth]:
+            if cost + distance > budget:
+                continue
+            for child in node.lookup.get(word, ()):
+                self._walk(child, candidates, depth + 1, cost + distance, budget, ranked)
+
+    @staticmethod
+    def _rank(ranked, command, rank):
+        name = command['full_command']
+        if name not in ranked or rank < ranked[name]:
+            ranked[name] = rank
+
+    def _suggest_phrases(self, query, mode, budget, ranked):
+        tree = self.trees.get(mode)
+        if tree is None:
+            tree = BKTree(self.phrases[mode])
+            self.trees[mode] = tree
+        phrases = self.phrases[mode]
+        masks = pattern_masks(query)
+        for _, phrase in tree.search(query, budget):
+            command = phrases[phrase]
+            distance = transposition_distance(query, phrase, masks)
+            if distance <= budget:
+                self._rank(ranked, command, (distance, 0, 0, command['full_command']))
@@ -0,0 +1,207 @@
+# config_archive.py
+
+import difflib
+import json
+from datetime import datetime
+
+# כמה עצים (רשימות [name, hash] של חלק) נשמרים בזיכרון; עץ לא משתנה אחרי שנכתב
+TREE_CACHE_SIZE = 64
+
+# כמה hashes בשאילתת IN אחת כשקוראים blobs רבים
+BLOB_BATCH = 500
+
+
+class RunningManifest:
+    # ה-running-config החי בצורה של snapshot: ה-hashes מגיעים מה-renderer, שמחשב מחדש רק פריטים שהשתנו
+    def __init__(self, renderer, state, collections=None):
+        self.renderer = renderer
+        self.state = state
+        self.collections = collections
+
+    def sections(self):
+        return self.renderer.manifest(self.state, self.collections)
+
+    def items(self, key):
+        return self.renderer.items(key, self.state, self.collections)
+
+    def value(self, key, name, item_hash):
+        return self.renderer.item_value(key, name, self.state, self.collections)
+
+    def values(self, key, items):
+        return [self.value(key, name, item_hash) for name, item_hash in items]
+
+
+class StoredManifest:
+    # snapshot מהארכיון: חלק -> עץ -> blob לכל פריט. העצים וה-blobs נקראים רק כשמבקשים אותם
+    def __init__(self, archive, snapshot_id, sections):
+        self.archive = archive
+        self.snapshot_id = snapshot_id
+        self.section_list = sections
+        self.section_hashes = dict(sections)
+
+    def sections(self):
+        return self.section_list
+
+    def items(self, key):
+        tree_hash = self.section_hashes.get(key)
+        return self.archive.tree(tree_hash) if tree_hash is not None else []
+
+    def value(self, key, name, item_hash):
+        return self.archive.blob(item_hash)
+
+    def values(self, key, items):
+        blobs = self.archive.blobs([item_hash for name, item_hash in items])
+        return [blobs[item_hash] for name, item_hash in items]
+
+
+class ConfigArchive:
+    # snapshots של ה-running-config לפי כתובת תוכן: כל פריט (ממשק, VLAN, יעד ניתוב) נשמר פעם אחת כ-blob
+    # לפי ה-hash שלו, כל חלק כעץ של [name, hash], ו-snapshot הוא רק רשימת [חלק, hash של עץ].
+    # snapshot של מכשיר שלא השתנה מוסיף שורה אחת; חלק שלא השתנה לא נקרא ולא נכתב
+    def __init__(self, conn):
+        self.conn = conn
+        self.trees = {}
+        # עצים שכבר ידוע שנמצאים במסד
+        self.known_trees = set()
+
+    def save(self, device_id, manifest, label=None):
+        sections = manifest.sections()
+        latest = self.latest(device_id)
+        previous = dict(self.manifest(latest).sections()) if latest is not None else {}
+        with self.conn:
+            for key, tree_hash in sections:
+                if tree_hash in self.known_trees:
+                    continue
+                if self.conn.execute("SELECT 1 FROM config_trees WHERE hash = ?", (tree_hash,)).fetchone() is None:
+                    items = manifest.items(key)
+                    # רק פריטים שלא היו בעץ הקודם של החלק הם blobs שאולי חדשים
+                    known = {item_hash for name, item_hash in self.tree(previous[key])} if key in previous else set()
+                    new_items = [item for item in items if item[1] not in known]
+                    self.conn.executemany("INSERT OR IGNORE INTO config_blobs (hash, content) VALUES (?, ?)",
+                                          [(item_hash, json.dumps(value)) for (name, item_hash), value
+                                           in zip(new_items, manifest.values(key, new_items))])
+                    self.conn.execute("INSERT INTO config_trees (hash, items) VALUES (?, ?)",
+                                      (tree_hash, json.dumps(items)))
+                self.known_trees.add(tree_hash)
+            number = self.conn.execute("SELECT COALESCE(MAX(number), 0) + 1 FROM config_snapshots WHERE device_id = ?",
+                                       (device_id,)).fetchone()[0]
+            cursor = self.conn.execute(
+                "INSERT INTO config_snapshots (device_id, number, created, label, sections) VALUES (?, ?, ?, ?, ?)",
+                (device_id, number, datetime.now().isoformat(timespec="seconds"), label, json.dumps(sections)))
+        return cursor.lastrowid
+
+    def snapshots(self, device_id):
+        # [(snapshot_id, number, created, label)] מהישן לחדש
+        return self.conn.execute("SELECT snapshot_id, number, created, label FROM config_snapshots "
+                                 "WHERE device_id = ? ORDER BY number", (device_id,)).fetchall()
+
+    def find(self, device_id, number):
+        row = self.conn.execute("SELECT snapshot_id FROM config_snapshots WHERE device_id = ? AND number = ?",
+                                (device_id, number)).fetchone()
+        return row[0] if row else None
+
+    def latest(self, device_id):
+        row = self.conn.execute("SELECT MAX(snapshot_id) FROM config_snapshots WHERE device_id = ?",
+                                (device_id,)).fetchone()
+        return row[0]
+
+    def manifest(self, snapshot_id):
+        row = self.conn.execute("SELECT sections FROM config_snapshots WHERE snapshot_id = ?", (snapshot_id,)).fetchone()
+        if row is None:
+            raise KeyError(snapshot_id)
+        return StoredManifest(self, snapshot_id, [tuple(section) for section in json.loads(row[0])])
+
+    def tree(self, tree_hash):
+        items = self.trees.get(tree_hash)
+        if items is None:
+            row = self.conn.execute("SELECT items FROM config_trees WHERE hash = ?", (tree_hash,)).fetchone()
+            if row is None:
+                raise KeyError(tree_hash)
+            items = [tuple(item) for item in json.loads(row[0])]
+            if len(self.trees) >= TREE_CACHE_SIZE:
+                del self.trees[next(iter(self.trees))]
+            self.trees[tree_hash] = items
+        return items
+
+    def blob(self, item_hash):
+        row = self.conn.execute("SELECT content FROM config_blobs WHERE hash = ?", (item_hash,)).fetchone()
+        if row is None:
+            raise KeyError(item_hash)
+        return json.loads(row[0])
+
+    def blobs(self, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), BLOB_BATCH):
+            chunk = unique[start:start + BLOB_BATCH]
+            placeholders = ", ".join("?" * len(chunk))
+            for item_hash, content in self.conn.execute(
+                    f"SELECT hash, content FROM config_blobs WHERE hash IN ({placeholders})", chunk):
+                found[item_hash] = json.loads(content)
+        return found
+
+
+def render(manifest, renderer):
+    # הטקסט המלא של snapshot, באותו סדר ובאותו פורמט של ה-running-config
+    sections = dict(manifest.sections())
+    yield "!"
+    for key, section in renderer.sections:
+        if key not in sections:
+            continue
+        items = manifest.items(key)
+        for (name, item_hash), value in zip(items, manifest.values(key, items)):
+            yield from renderer.render_item(key, name, value)
+        if getattr(section, "separated", False) and items:
+            yield "!"
+    yield "end"
+
+
+def diff(old, new, renderer):
+    # ההבדלים המבניים בין שני manifests: חלק עם אותו hash מדולג בלי לקרוא אותו, ובחלק שהשתנה רק
+    # פריטים עם hash שונה מופקים. מחזיר (key, name, before, after) לכל פריט ששורותיו שונות
+    old_sections = dict(old.sections())
+    new_sections = dict(new.sections())
+    for key, section in renderer.sections:
+        if old_sections.get(key) == new_sections.get(key):
+            continue
+        old_items = dict(old.items(key))
+        for name, item_hash in new.items(key):
+            previous = old_items.pop(name, None)
+            if previous == item_hash:
+                continue
+            before = renderer.render_item(key, name, old.value(key, name, previous)) if previous else []
+            after = renderer.render_item(key, name, new.value(key, name, item_hash))
+            if before != after:
+                yield key, name, before, after
+        for name, item_hash in old_items.items():
+            yield key, name, renderer.render_item(key, name, old.value(key, name, item_hash)), []
+
+
+def mark(sign, line):
+    # הסימן בא אחרי ההזחה, כמו ב-IOS: " -shutdown" מתחת ל-"interface ..."
+    indent = len(line) - len(line.lstrip(" "))
+    return f"{line[:indent]}{sign}{line[indent:]}"
+
+
+def format_diff(changes):
+    # הפלט של "show archive config differences": לפריט עם שורות מוזחות מוצגת שורת האב כהקשר,
+    # ומתחתיה השורות שנמחקו (-) ונוספו (+)
+    yield "!Contextual Config Diffs:"
+    found = False
+    for key, name, before, after in changes:
+        before = [line for line in before if line != "!"]
+        after = [line for line in after if line != "!"]
+        matcher = difflib.SequenceMatcher(None, before, after, autojunk=False)
+        if name is not None and before and after and before[0] == after[0] and \
+                any(line.startswith(" ") for line in before + after):
+            yield before[0]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            found = True
+            for line in before[i1:i2]:
+                yield mark("-", line)
+            for line in after[j1:j2]:
+                yield mark("+", line)
+    if not found:
+        yield "!No changes were found"
@@ -0,0 +1,329 @@
+# config_renderer.py
+
+import bisect
+import hashlib
+import json
+import re
+from mac_table import DEFAULT_AGING_TIME
+from routing_engine import MASKS, int_to_ip, parse_prefix
+
+VERSION = "15.2"
+
+# מפתחות בהגדרת ממשק שכבר מוצגים בשורות ייעודיות
+INTERFACE_KEYS = ("description", "bandwidth", "delay", "ip_address", "subnet_mask", "access_group_in",
+                  "access_group_out", "ospf_cost", "status", "channel_group")
+
+
+def content_hash(value):
+    # כתובת התוכן של ערך: sha1 של JSON קנוני, כך שערכים שווים מקבלים אותו hash בכל מכשיר ובכל snapshot
+    return hashlib.sha1(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def natural_key(name):
+    # "GigabitEthernet1/0/10" אחרי "GigabitEthernet1/0/9", כמו בסדר של IOS
+    return tuple(int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name))
+
+
+def route_key(destination):
+    try:
+        network, length = parse_prefix(destination)
+    except ValueError:
+        return (1, 0, 0, destination)
+    return (0, network, length, destination)
+
+
+def acl_key(acl_id):
+    return (0, int(acl_id), "") if acl_id.isdigit() else (1, 0, acl_id)
+
+
+def render_interface(name, config):
+    yield f"interface {name}"
+    if config.get("description"):
+        yield f" description {config['description']}"
+    for key in ("bandwidth", "delay"):
+        if config.get(key):
+            yield f" {key} {config[key]}"
+    if config.get("ip_address") and config.get("subnet_mask"):
+        yield f" ip address {config['ip_address']} {config['subnet_mask']}"
+    for direction in ("in", "out"):
+        if config.get(f"access_group_{direction}"):
+            yield f" ip access-group {config[f'access_group_{direction}']} {direction}"
+    if config.get("ospf_cost"):
+        yield f" ip ospf cost {config['ospf_cost']}"
+    for key, value in config.items():
+        # הגדרות נוספות (speed, duplex...) בצורה הכללית "<key> <value>"
+        if key not in INTERFACE_KEYS and isinstance(value, str) and value:
+            yield f" {key.replace('_', ' ')} {value}"
+    if config.get("channel_group"):
+        yield f" channel-group {config['channel_group']}"
+    if config.get("status") == "administratively down":
+        yield " shutdown"
+    yield "!"
+
+
+def render_vlan(vlan_id, config):
+    yield f"vlan {vlan_id}"
+    name = config.get("name")
+    if name and name != f"VLAN{int(vlan_id):04d}":
+        yield f" name {name}"
+    yield "!"
+
+
+def render_routes(destination, routes):
+    try:
+        network, length = parse_prefix(destination)
+        prefix = f"{int_to_ip(network)} {int_to_ip(MASKS[length])}"
+    except ValueError:
+        prefix = destination.replace("/", " ")
+    for route in routes:
+        distance = route.get("distance", 1)
+        yield f"ip route {prefix} {route['next_hop']}" + (f" {distance}" if distance != 1 else "")
+
+
+def route_config(routes):
+    # זמן ההוספה של נתיב הוא מצב ריצה ולא הגדרה, ולא נכנס ל-hash
+    return [{key: value for key, value in route.items() if key != "time"} for route in routes]
+
+
+def render_access_list(acl_id, rules):
+    for rule in rules:
+        yield f"access-list {acl_id} {rule}"
+
+
+def render_dhcp_pool(name, config):
+    yield f"ip dhcp pool {name}"
+    for key, value in (config or {}).items():
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(item) for item in value)
+        yield f" {key.replace('_', '-')} {value}"
+    yield "!"
+
+
+class Section:
+    # חלק ב-running-config שתלוי במפתח אחד במצב (hostname, routing_protocols...). השורות נשמרות
+    # עד ששינוי במפתח מסמן את החלק כמלוכלך
+    def __init__(self, render):
+        self.render = render
+        self.cached = None
+        self.hash = None
+
+    def invalidate(self, name=None):
+        self.cached = None
+        self.hash = None
+
+    def stream(self, state, collection):
+        if self.cached is None:
+            self.cached = list(self.render(state))
+        return iter(self.cached)
+
+    def digests(self, value):
+        # חלק של מפתח יחיד הוא פריט אחד בלי שם
+        if self.hash is None:
+            self.hash = content_hash(value)
+        return [(None, self.hash)]
+
+    def digest(self, value):
+        return content_hash(self.digests(value))
+
+    def canonical(self, value):
+        return value
+
+
+class CollectionSection:
+    # חלק שמורכב מפריטים של אוסף (ממשקים, VLANs, נתיבים): השורות נשמרות לכל פריט, והסדר נשמר
+    # כרשימה ממוינת שמתעדכנת ב-bisect. שינוי בפריט אחד מפיק מחדש רק את השורות שלו
+    def __init__(self, render, sort_key, separated=False, canonical=None):
+        self.render = render
+        self.sort_key = sort_key
+        # פריטים בלי "!" משלהם (נתיבים, שורות ACL) מקבלים אחד בסוף החלק
+        self.separated = separated
+        # הערך של פריט כפי שנכנס ל-hash ולארכיון (בלי שדות של מצב ריצה)
+        self.canonical = canonical or (lambda value: value)
+        self.cached = {}
+        self.flat = None
+        self.order = None
+        self.members = set()
+        self.pending = set()
+        # hash לכל פריט ולחלק כולו, נשמרים כמו השורות עד שהפריט משתנה
+        self.hashes = {}
+        self.hash = None
+
+    def invalidate(self, name=None):
+        if name is None:
+            self.order = None
+        else:
+            self.pending.add(name)
+
+    def sync(self, collection):
+        if self.order is None or self.pending:
+            self.flat = None
+            self.hash = None
+        if self.order is None:
+            self.cached.clear()
+            self.hashes.clear()
+            self.pending.clear()
+            self.order = sorted((self.sort_key(name), name) for name in collection)
+            self.members = set(collection)
+            return
+        for name in self.pending:
+            self.cached.pop(name, None)
+            self.hashes.pop(name, None)
+            present = name in collection
+            if present and name not in self.members:
+                bisect.insort(self.order, (self.sort_key(name), name))
+                self.members.add(name)
+            elif not present and name in self.members:
+                del self.order[bisect.bisect_left(self.order, (self.sort_key(name), name))]
+                self.members.discard(name)
+        self.pending.clear()
+
+    def stream(self, state, collection):
+        # השורות של פריט מופקות רק כשהזרם מגיע אליו, כך שצרכן שעוצר באמצע לא משלם על השאר.
+        # כשדבר לא השתנה מאז ההצגה הקודמת, החלק כולו נשמר כרשימה שטוחה אחת
+        if self.flat is not None and not self.pending and self.order is not None:
+            yield from self.flat
+            return
+        self.sync(collection)
+        flat = []
+        for sort_key, name in self.order:
+            lines = self.cached.get(name)
+            if lines is None:
+                lines = self.cached[name] = list(self.render(name, collection[name]))
+            flat.extend(lines)
+            yield from lines
+        if self.separated and self.order:
+            flat.append("!")
+            yield "!"
+        self.flat = flat
+
+    def digests(self, collection):
+        # [(name, hash)] בסדר התצוגה; רק פריטים שהשתנו מאז הפעם הקודמת עוברים hash מחדש
+        self.sync(collection)
+        hashes = self.hashes
+        items = []
+        for sort_key, name in self.order:
+            item_hash = hashes.get(name)
+            if item_hash is None:
+                item_hash = hashes[name] = content_hash(self.canonical(collection[name]))
+            items.append((name, item_hash))
+        return items
+
+    def digest(self, collection):
+        if self.hash is None or self.pending or self.order is None:
+            self.hash = content_hash(self.digests(collection))
+        return self.hash
+
+
+class ConfigRenderer:
+    # running-config בסדר של IOS מתוך המצב המובנה. DataManager מעביר לכאן כל פריט שהשתנה
+    # (אותם פריטים שמסומנים ב-dirty לכתיבה ל-SQLite), ורק החלקים שלהם מופקים מחדש
+    def __init__(self):
+        self.sections = [
+            ("hostname", Section(self.render_header)),
+            ("enable_password", Section(self.render_enable)),
+            ("users", Section(self.render_users)),
+            ("dhcp_pools", CollectionSection(render_dhcp_pool, natural_key)),
+            ("vlans", CollectionSection(render_vlan, natural_key)),
+            ("interfaces", CollectionSection(render_interface, natural_key)),
+            ("routing_protocols", Section(self.render_routing_protocols)),
+            ("nat", Section(self.render_nat)),
+            ("routing_table", CollectionSection(render_routes, route_key, separated=True,
+                                                canonical=route_config)),
+            ("access_lists", CollectionSection(render_access_list, acl_key, separated=True)),
+            ("mac_aging_time", Section(self.render_mac_aging_time)),
+            ("mac_static", Section(self.render_mac_static)),
+        ]
+        self.by_key = dict(self.sections)
+
+    def invalidate(self, item=None):
+        # item הוא (key,) או (collection, name[, attribute]); None מסמן הכול
+        if item is None:
+            for key, section in self.sections:
+                section.invalidate()
+            return
+        section = self.by_key.get(item[0])
+        if section is not None:
+            section.invalidate(item[1] if len(item) > 1 else None)
+
+    def lines(self, state, collections=None):
+        # generator של שורות ה-running-config. collections מחליף אוסף במצב בתצוגה אחרת שלו
+        # (DataManager מעביר את הנתיבים לפי יעד במקום הרשימה השטוחה)
+        yield "!"
+        for key, section in self.sections:
+            yield from section.stream(state, self.value(key, state, collections))
+        yield "end"
+
+    def value(self, key, state, collections=None):
+        value = (collections or {}).get(key)
+        if value is None:
+            value = state.get(key)
+        if value is None and isinstance(self.by_key[key], CollectionSection):
+            value = {}
+        return value
+
+    def manifest(self, state, collections=None):
+        # [(key, hash)] לכל חלק, כאשר ה-hash של חלק הוא hash של רשימת [(name, hash)] של הפריטים שלו.
+        # זה הבסיס של הארכיון (config_archive): חלקים עם אותו hash זהים בלי להשוות אותם
+        return [(key, section.digest(self.value(key, state, collections))) for key, section in self.sections]
+
+    def items(self, key, state, collections=None):
+        return self.by_key[key].digests(self.value(key, state, collections))
+
+    def item_value(self, key, name, state, collections=None):
+        value = self.value(key, state, collections)
+        return value if name is None else self.by_key[key].canonical(value[name])
+
+    def render_item(self, key, name, value):
+        # השורות של פריט אחד מתוך ערך שמור; פריט בלי שם הוא הערך של מפתח יחיד במצב
+        section = self.by_key[key]
+        if name is None:
+            return list(section.render({key: value}))
+        return list(section.render(name, value))
+
+    @staticmethod
+    def render_header(state):
+        return [f"version {VERSION}", "!", f"hostname {state.get('hostname') or 'Router'}", "!"]
+
+    @staticmethod
+    def render_enable(state):
+        password = state.get("enable_password")
+        return [f"enable password {password}", "!"] if password else []
+
+    @staticmethod
+    def render_users(state):
+        lines = [f"username {user['username']} privilege {user.get('privilege', 1)} password {user['password']}"
+                 for user in state.get("users") or []]
+        return lines + ["!"] if lines else []
+
+    @staticmethod
+    def render_routing_protocols(state):
+        lines = []
+        protocols = state.get("routing_protocols") or {}
+        for name in sorted(protocols, key=natural_key):
+            process = protocols[name]
+            lines.append(f"router {name}")
+            if process.get("variance", 1) != 1:
+                lines.append(f" variance {process['variance']}")
+            lines.extend(f" network {network}" for network in process.get("networks", []))
+            lines.extend(f" passive-interface {interface}" for interface in process.get("passive", []))
+            lines.extend(f" redistribute {statement}" for statement in process.get("redistribute", []))
+            lines.append("!")
+        return lines
+
+    @staticmethod
+    def render_nat(state):
+        lines = [f"ip nat inside source {rule}" for rule in state.get("nat") or []]
+        return lines + ["!"] if lines else []
+
+    @staticmethod
+    def render_mac_aging_time(state):
+        # ערך ברירת המחדל לא מופיע ב-running-config, כמו ב-IOS
+        seconds = state.get("mac_aging_time")
+        if seconds is None:
+            seconds = DEFAULT_AGING_TIME
+        return [f"mac address-table aging-time {seconds}", "!"] if seconds != DEFAULT_AGING_TIME else []
+
+    @staticmethod
+    def render_mac_static(state):
+        lines = [f"mac address-table static {text}" for text in state.get("mac_static") or []]
+        return lines + ["!"] if lines else []
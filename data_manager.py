@@ -2,28 +2,152 @@
 
 import sqlite3
 import json
+import copy
+import functools
+import threading
 from datetime import datetime
+from command_catalog import CommandCatalog
+from command_index import PrefixIndex
+from config_archive import ConfigArchive, RunningManifest
+from config_renderer import ConfigRenderer
+from mac_table import MacTable, DEFAULT_AGING_TIME, TYPE_STATIC, parse_static_entry
+from routing_engine import RoutingEngine, ip_to_int, parse_prefix
+import config_archive
+import state_schema
+
+# מדיניות עמידות של מטמון המצב:
+# immediate - כל שינוי נכתב מיד ל-SQLite (ההתנהגות הישנה)
+# interval  - שינויים נכתבים ברקע לכל היותר flush_interval שניות אחרי השינוי, ובנקודות השמירה
+# checkpoint - שינויים נכתבים רק בנקודות השמירה: copy running-config startup-config, exit, close
+DURABILITY_IMMEDIATE = "immediate"
+DURABILITY_INTERVAL = "interval"
+DURABILITY_CHECKPOINT = "checkpoint"
+DURABILITY_POLICIES = (DURABILITY_IMMEDIATE, DURABILITY_INTERVAL, DURABILITY_CHECKPOINT)
+
+JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+SYNCHRONOUS_LEVELS = ("off", "normal", "full", "extra")
+
+# סימון לערך שלא היה קיים לפני השינוי, ביומן הביטול של batch()
+MISSING = object()
+
+def locked(method):
+    # פעולות קריאה-שינוי-כתיבה על המטמון רצות תחת הנעילה, כדי שהכתיבה ברקע לא תראה מצב חלקי
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def open_database(db_name, journal_mode="wal", synchronous="normal"):
+    if journal_mode.lower() not in JOURNAL_MODES:
+        raise ValueError(f"Invalid journal mode: {journal_mode}")
+    if synchronous.lower() not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Invalid synchronous level: {synchronous}")
+    conn = sqlite3.connect(db_name, check_same_thread=False)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode.lower()}")
+    conn.execute(f"PRAGMA synchronous = {synchronous.lower()}")
+    state_schema.migrate(conn)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS commands (
+        id INTEGER PRIMARY KEY,
+        command_data TEXT
+    )''')
+    conn.commit()
+    return conn
+
+class Batch:
+    # מנהל הקשר של DataManager.batch(); מחלקה ולא contextlib כי הוא עוטף כל פקודה שרצה
+    __slots__ = ("manager",)
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def __enter__(self):
+        manager = self.manager
+        manager.lock.acquire()
+        manager.undo_levels.append((len(manager.undo_log), set()))
+        manager.batch_depth += 1
+        return manager
+
+    def __exit__(self, exc_type, exc, tb):
+        manager = self.manager
+        try:
+            start = manager.undo_levels.pop()[0]
+            manager.batch_depth -= 1
+            if exc_type is not None:
+                manager._rollback_to(start)
+            if manager.batch_depth == 0:
+                manager.undo_log.clear()
+                if exc_type is None and manager.flush_pending:
+                    manager.flush_pending = False
+                    manager.flush()
+        finally:
+            manager.lock.release()
+        return False
 
 class DataManager:
-    def __init__(self, db_name='cisco_simulator.db'):
-        self.conn = sqlite3.connect(db_name)
+    def __init__(self, db_name='cisco_simulator.db', durability=DURABILITY_INTERVAL, flush_interval=1.0,
+                 journal_mode="wal", synchronous="normal", device_id=state_schema.DEFAULT_DEVICE,
+                 conn=None, lock=None, commands=None, scheduler=None, clock=None):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Invalid durability policy: {durability}")
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.device_id = device_id
+        # חיבור משותף (DeviceRegistry) שייך למי שיצר אותו ולא נסגר כאן
+        self.owns_connection = conn is None
+        self.conn = open_database(db_name, journal_mode, synchronous) if conn is None else conn
         self.cursor = self.conn.cursor()
-        self.create_tables()
-        self.commands = self.load_commands()
-        self.init_device_state()
-
-    def create_tables(self):
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS device_state (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        )''')
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS commands (
-            id INTEGER PRIMARY KEY,
-            command_data TEXT
-        )''')
-        self.conn.commit()
+        # המצב בזיכרון הוא המקור הסמכותי; dirty מחזיק את מה שעוד לא נכתב ל-SQLite:
+        # (key,) לערך שלם, או (collection, item[, attribute]) לשורה בודדת בטבלאות המנורמלות.
+        # self.state עצמו נטען רק בגישה הראשונה (ראו __getattr__)
+        self.dirty = set()
+        self.lock = lock or threading.RLock()
+        self.flush_timer = None
+        # מתזמן משותף לכתיבה ברקע (DeviceRegistry) במקום טיימר לכל מכשיר
+        self.scheduler = scheduler
+        # מצב batch(): עומק הקינון, יומן ביטול (פריט, ערך קודם) ולכל רמה - מאיפה היא מתחילה ביומן
+        self.batch_depth = 0
+        self.undo_log = []
+        self.undo_levels = []
+        self.flush_pending = False
+        # אינדקסים של שמות המפתחות (ממשקים, VLANs וכו') להשלמת ארגומנטים, נבנים לפי דרישה
+        self.key_indexes = {}
+        # רשומות הניתוב לפי יעד (נבנה לפי דרישה), ומנוע הניתוב (RIB/FIB) שנבנה מהמצב בשאילתה הראשונה
+        self.routes_by_destination = None
+        self.routing = None
+        # אזור ה-OSPF וה-AS של EIGRP שהמכשיר שייך אליהם (משותפים במרשם), והנתיבים שמנועי הניתוב
+        # הדינמי התקינו: {protocol: {(network, length): [(next_hop, interface, metric)]}} - מצב ריצה בלבד
+        self.ospf = None
+        self.eigrp = None
+        self.rip = None
+        self.forwarding = None
+        self.dynamic_routes = {}
+        # ACLs מהודרים לפי דרישה, ומוני ההתאמות שלהם - שנשמרים גם כשה-ACL מהודר מחדש
+        self.compiled_acls = {}
+        self.acl_hits = {}
+        # טבלת ה-MAC (מצב ריצה, לא הגדרה) נוצרת בגישה הראשונה; clock משותף (SimulatedClock) מאפשר
+        # לבדיקות ולמרשם לקדם את הזמן של כל המכשירים יחד
+        self.clock = clock
+        self.mac_table = None
+        # רשומות הממשקים עם אינדקסים ומוני תנועה (show interfaces...), נבנות בגישה הראשונה ומתעדכנות
+        # בכל שינוי בממשק; המונים הם מצב ריצה ולא נשמרים
+        self.interface_records = None
+        # ה-running-config מופק מהמצב עם מטמון לכל חלק; נוצר בהצגה הראשונה ומקבל מ-_mark_dirty כל פריט שהשתנה
+        self.renderer = None
+        # ארכיון ה-snapshots של הקונפיגורציה (archive config, configure replace), נוצר בשימוש הראשון
+        self.archive = None
+        self.commands = self.load_commands() if commands is None else commands
+
+    def __getattr__(self, name):
+        # נקרא רק כשהתכונה חסרה: טעינת המצב של המכשיר מ-SQLite בגישה הראשונה
+        if name != "state" or "lock" not in self.__dict__:
+            raise AttributeError(name)
+        with self.lock:
+            if "state" not in self.__dict__:
+                self.__dict__["state"] = self.read_device_state()
+                self.init_device_state()
+        return self.__dict__["state"]
 
     def init_device_state(self):
         default_state = {
@@ -35,6 +159,7 @@ class DataManager:
             "dhcp_pools": {},
             "ntp_config": {},
             "snmp_config": {},
+            "routing_protocols": {},
             "users": [],
             "enable_password": "",
             "startup_config": "",
@@ -43,14 +168,23 @@ class DataManager:
         for key, value in default_state.items():
             if self.get_device_state(key) is None:
                 self.update_device_state(key, value)
+        self.flush()
 
-    def load_commands(self):
+    def load_catalog(self):
+        # commands.json הוא המקור, דרך הקטלוג המהודר המשותף לכל התהליך; העותק במסד משמש רק כשאין קובץ
+        try:
+            return CommandCatalog.shared()
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
         self.cursor.execute("SELECT command_data FROM commands")
         result = self.cursor.fetchone()
         if result:
-            return json.loads(result[0])
+            return CommandCatalog(json.loads(result[0]))
         else:
-            return self.load_commands_from_json()
+            return CommandCatalog(self.load_commands_from_json())
+
+    def load_commands(self):
+        return self.load_catalog().commands
 
     def load_commands_from_json(self):
         try:
@@ -71,124 +205,666 @@ class DataManager:
         self.cursor.execute("INSERT INTO commands (command_data) VALUES (?)", (command_json,))
         self.conn.commit()
 
+    def read_device_state(self):
+        return state_schema.read_state(self.conn, self.device_id)
+
     def load_device_state(self):
-        self.cursor.execute("SELECT key, value FROM device_state")
-        rows = self.cursor.fetchall()
-        return {key: json.loads(value) for key, value in rows}
-
-    def save_device_state(self, state):
-        for key, value in state.items():
-            json_value = json.dumps(value)
-            self.cursor.execute("INSERT OR REPLACE INTO device_state (key, value) VALUES (?, ?)",
-                                (key, json_value))
-        self.conn.commit()
+        return self.state
+
+    def save_device_state(self, state=None):
+        with self.lock:
+            for key, value in (state or {}).items():
+                self.update_device_state(key, value)
+            self.flush()
         print("Device state saved successfully.")
 
     def update_device_state(self, key, value):
-        json_value = json.dumps(value)
-        self.cursor.execute("INSERT OR REPLACE INTO device_state (key, value) VALUES (?, ?)",
-                            (key, json_value))
-        self.conn.commit()
+        with self.lock:
+            self._before_change((key,))
+            self.key_indexes.pop(key, None)
+            if key == "routing_table":
+                self.routes_by_destination = None
+            if key in ("interfaces", "routing_table"):
+                self.routing = None
+            if key == "access_lists":
+                self.compiled_acls.clear()
+            self.state[key] = value
+            if key == "interfaces" and self.interface_records is not None:
+                self.interface_records.sync(value or {})
+            self._mark_dirty((key,))
 
     def get_device_state(self, key):
-        self.cursor.execute("SELECT value FROM device_state WHERE key = ?", (key,))
-        result = self.cursor.fetchone()
-        if result:
-            return json.loads(result[0])
-        return None
+        # מחזיר את האובייקט החי מהמטמון; שינויים בו צריכים לעבור דרך update_device_state
+        return self.state.get(key)
+
+    def batch(self):
+        # כל השינויים בתוך הבלוק נכתבים ב-commit אחד; חריגה מבטלת אותם גם בזיכרון.
+        # בלוקים מקוננים מתנהגים כמו savepoint: חריגה פנימית מבטלת רק את השינויים שלה
+        return Batch(self)
+
+    def _before_change(self, item):
+        if not self.undo_levels:
+            return
+        key = item[:2]
+        seen = self.undo_levels[-1][1]
+        if key in seen:
+            return
+        seen.add(key)
+        if key[0] == "routing_table" and len(key) == 2:
+            # רק הרשומות של היעד שמשתנה, דרך האינדקס - בלי להעתיק את כל הטבלה בכל "ip route"
+            self.undo_log.append((key, list(self.get_routes_by_destination().get(key[1], ()))))
+            return
+        if len(key) == 1:
+            value = self.state.get(key[0], MISSING)
+        else:
+            value = self.state.get(key[0], {}).get(key[1], MISSING)
+        if value is MISSING:
+            pass
+        elif key == ("routing_table",) or (key[0] == "access_lists" and type(value) is list):
+            # רשומות הניתוב ושורות ה-ACL לא משתנות במקום, מספיק להעתיק את הרשימה
+            value = list(value or [])
+        elif len(key) == 2 and type(value) is dict:
+            # פריט באוסף (ממשק, VLAN, מאגר) הוא מילון שטוח, לכל היותר עם רשימה בתוכו - עותק בשתי רמות
+            value = {name: list(item) if type(item) is list else item for name, item in value.items()}
+        else:
+            value = copy.deepcopy(value)
+        self.undo_log.append((key, value))
+
+    def _rollback_to(self, position):
+        for key, value in reversed(self.undo_log[position:]):
+            if self.renderer is not None:
+                self.renderer.invalidate(key)
+            if key[0] == "routing_table" and len(key) == 2:
+                routing_table = self.state["routing_table"]
+                routing_table[:] = [route for route in routing_table if route["destination"] != key[1]] + value
+            elif len(key) == 1:
+                if value is MISSING:
+                    self.state.pop(key[0], None)
+                else:
+                    self.state[key[0]] = value
+            else:
+                collection = self.state.setdefault(key[0], {})
+                if value is MISSING:
+                    collection.pop(key[1], None)
+                else:
+                    collection[key[1]] = value
+        del self.undo_log[position:]
+        # הפריטים שהשתנו כבר מסומנים ב-dirty, כך שה-flush הבא יכתוב את הערכים המשוחזרים
+        self.key_indexes.clear()
+        self.routes_by_destination = None
+        self.routing = None
+        self.compiled_acls.clear()
+        if self.mac_table is not None:
+            self.mac_table.set_aging_time(self.state.get("mac_aging_time", DEFAULT_AGING_TIME))
+            self._load_static_macs()
+        if self.interface_records is not None:
+            self.interface_records.sync(self.state.get("interfaces") or {})
+        if self.ospf is not None:
+            self.ospf.invalidate(self.device_id)
+        if self.eigrp is not None:
+            self.eigrp.invalidate(self.device_id)
+        if self.rip is not None:
+            self.rip.invalidate(self.device_id)
+        if self.forwarding is not None:
+            self.forwarding.invalidate(self.device_id)
+
+    def _mark_dirty(self, item):
+        self.dirty.add(item)
+        if self.renderer is not None:
+            self.renderer.invalidate(item)
+        if self.ospf is not None and item[0] in ("interfaces", "routing_protocols"):
+            self.ospf.invalidate(self.device_id)
+        # EIGRP מכריז גם נתיבים סטטיים (redistribute static)
+        if self.eigrp is not None and item[0] in ("interfaces", "routing_protocols", "routing_table"):
+            self.eigrp.invalidate(self.device_id)
+        if self.rip is not None and item[0] in ("interfaces", "routing_protocols"):
+            self.rip.invalidate(self.device_id)
+        # static NAT מוסיף כתובות שהמכשיר עונה עליהן
+        if self.forwarding is not None and item[0] in ("interfaces", "nat"):
+            self.forwarding.invalidate(self.device_id)
+        if self.mac_table is not None and item[0] == "mac_static":
+            self._load_static_macs()
+        if self.durability == DURABILITY_IMMEDIATE:
+            self.flush()
+        elif self.durability == DURABILITY_INTERVAL:
+            if self.scheduler is not None:
+                self.scheduler.schedule(self)
+            elif self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    def _flush_from_timer(self):
+        with self.lock:
+            self.flush_timer = None
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.batch_depth:
+                self.flush_pending = True
+                return
+            if not self.dirty:
+                return
+            with self.conn:
+                self.write_dirty()
+
+    def write_dirty(self):
+        # כותב את כל מה שב-dirty בתוך הטרנזקציה של הקורא (flush, או flush משותף של DeviceRegistry)
+        # ערכים שלמים קודם, ואחריהם שינויים בשורות בודדות שנעשו אחריהם
+        items = sorted(self.dirty, key=len)
+        routes = set()
+        for item in items:
+            if len(item) == 1:
+                key = item[0]
+                if key in state_schema.COLLECTIONS:
+                    state_schema.replace_collection(self.conn, self.device_id, key, self.state.get(key))
+                elif key in self.state:
+                    state_schema.write_scalar(self.conn, self.device_id, key, self.state[key])
+            elif item[0] == "routing_table":
+                routes.add(item[1])
+            else:
+                self._flush_item(item)
+        if routes:
+            by_destination = self.get_routes_by_destination()
+            for destination in routes:
+                state_schema.write_routes(self.conn, self.device_id, destination, by_destination.get(destination, []))
+        self.dirty.clear()
+
+    def _flush_item(self, item):
+        collection = self.state.get(item[0]) or {}
+        device_id = self.device_id
+        if item[0] == "interfaces":
+            if len(item) == 3:
+                state_schema.write_interface_attribute(self.conn, device_id, item[1], item[2], collection.get(item[1]))
+            else:
+                state_schema.write_interface(self.conn, device_id, item[1], collection.get(item[1]))
+        elif item[0] == "vlans":
+            state_schema.write_vlan(self.conn, device_id, item[1], collection.get(item[1]))
+        elif item[0] == "access_lists":
+            state_schema.write_access_list(self.conn, device_id, item[1], collection.get(item[1]))
+        elif item[0] == "dhcp_pools":
+            state_schema.write_dhcp_pool(self.conn, device_id, item[1], collection.get(item[1]))
+
+    def find_routes_via(self, next_hop):
+        # חיפוש לפי האינדקס routes_by_next_hop במקום מעבר על כל הטבלה
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT destination, next_hop, distance, time, extra FROM routes "
+            "WHERE device_id = ? AND next_hop = ? ORDER BY id", (self.device_id, next_hop))
+        return [state_schema.route_from_row(row) for row in rows]
+
+    def close(self):
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            self.flush()
+            if self.owns_connection:
+                self.conn.close()
+
+    def complete_keys(self, key, prefix):
+        index = self.key_indexes.get(key)
+        if index is None:
+            index = PrefixIndex(self.get_device_state(key) or {})
+            self.key_indexes[key] = index
+        return index.complete(prefix)
+
+    def get_routes_by_destination(self):
+        if self.routes_by_destination is None:
+            by_destination = {}
+            for route in self.state.get("routing_table") or []:
+                by_destination.setdefault(route["destination"], []).append(route)
+            self.routes_by_destination = by_destination
+        return self.routes_by_destination
+
+    @locked
+    def routing_engine(self):
+        # ה-RIB/FIB של המכשיר. נבנה מהממשקים, מהנתיבים הסטטיים ומהנתיבים הדינמיים בפעם הראשונה, ומשם
+        # מתעדכן בכל שינוי (add_route, update_interface...) רק ב-prefix שהשתנה. שינויים שמחכים באזור
+        # ה-OSPF, ב-EIGRP וב-RIP מחושבים לפני התשובה
+        if self.ospf is not None:
+            self.ospf.converge(self.device_id)
+        if self.eigrp is not None:
+            self.eigrp.converge()
+        if self.rip is not None:
+            self.rip.converge(self.device_id)
+        if self.routing is None:
+            engine = RoutingEngine()
+            for name, config in (self.state.get("interfaces") or {}).items():
+                engine.set_interface(name, config)
+            for route in self.state.get("routing_table") or []:
+                self._install_static_route(engine, route)
+            for protocol, routes in self.dynamic_routes.items():
+                for (network, length), paths in routes.items():
+                    engine.set_protocol_routes(protocol, network, length, paths)
+            self.routing = engine
+        return self.routing
+
+    @locked
+    def set_dynamic_routes(self, protocol, changes, replace=False):
+        # מנוע ניתוב דינמי מעדכן את הנתיבים שלו: {(network, length): paths}, ורשימה ריקה מוחקת.
+        # replace=True מחליף את כל הנתיבים של הפרוטוקול. הם לא נכתבים ל-SQLite ולא ל-running-config
+        routes = self.dynamic_routes.setdefault(protocol, {})
+        if replace:
+            changes = {**{prefix: [] for prefix in routes}, **changes}
+        for (network, length), paths in changes.items():
+            if paths:
+                routes[(network, length)] = paths
+            else:
+                routes.pop((network, length), None)
+            if self.routing is not None:
+                self.routing.set_protocol_routes(protocol, network, length, paths)
+
+    @locked
+    def ospf_domain(self):
+        # מכשיר שאינו חלק ממרשם הוא אזור OSPF של נתב אחד
+        if self.ospf is None:
+            from ospf_engine import OspfDomain
+            self.ospf = OspfDomain()
+            self.ospf.attach(self.device_id, self)
+        self.ospf.converge(self.device_id)
+        return self.ospf
+
+    @locked
+    def eigrp_domain(self):
+        if self.eigrp is None:
+            from eigrp_engine import EigrpDomain
+            self.eigrp = EigrpDomain()
+            self.eigrp.attach(self.device_id, self)
+        self.eigrp.converge()
+        return self.eigrp
+
+    @locked
+    def rip_domain(self):
+        if self.rip is None:
+            from rip_engine import RipDomain
+            self.rip = RipDomain()
+            self.rip.attach(self.device_id, self)
+        self.rip.converge(self.device_id)
+        return self.rip
+
+    @locked
+    def forwarding_plane(self):
+        # מכשיר שאינו חלק ממרשם מעביר חבילות לבד, ומה שיוצא ממנו לשכן שלא מוכר נחשב כמו שהגיע
+        if self.forwarding is None:
+            from forwarding import ForwardingPlane
+            self.forwarding = ForwardingPlane(open_edges=True)
+            self.forwarding.attach(self.device_id, self)
+        return self.forwarding
+
+    @staticmethod
+    def _install_static_route(engine, route):
+        try:
+            network, length = parse_prefix(route["destination"])
+        except ValueError:
+            return
+        next_hop = route["next_hop"]
+        try:
+            # next hop יכול להיות גם ממשק יציאה ("ip route 0.0.0.0 0.0.0.0 Serial0/0")
+            engine.add_route(network, length, "static", next_hop=ip_to_int(next_hop), distance=route.get("distance"))
+        except ValueError:
+            engine.add_route(network, length, "static", interface=next_hop, distance=route.get("distance"))
+
+    @locked
+    def compiled_access_list(self, acl_id):
+        # ה-ACL המהודר (acl_engine.CompiledACL), או None אם אין ACL כזה
+        acl_id = str(acl_id)
+        compiled = self.compiled_acls.get(acl_id)
+        if compiled is None:
+            rules = (self.state.get("access_lists") or {}).get(acl_id)
+            if rules is None:
+                return None
+            from acl_engine import CompiledACL, is_standard
+            try:
+                standard = is_standard(acl_id)
+            except ValueError:
+                standard = None
+            compiled = CompiledACL(rules, standard, self.acl_hits.setdefault(acl_id, []))
+            self.compiled_acls[acl_id] = compiled
+        return compiled
+
+    @locked
+    def mac_address_table(self):
+        if self.mac_table is None:
+            self.mac_table = MacTable(self.clock, self.state.get("mac_aging_time", DEFAULT_AGING_TIME))
+            self._load_static_macs()
+        return self.mac_table
+
+    def _load_static_macs(self):
+        # הכניסות הסטטיות הן הגדרה (mac address-table static), ולכן נבנות מחדש מהמצב
+        for entry in list(self.mac_table.select(entry_type=TYPE_STATIC)):
+            self.mac_table.remove(entry.vlan, entry.mac)
+        for text in self.state.get("mac_static") or []:
+            try:
+                vlan, mac, interface = parse_static_entry(text)
+            except ValueError:
+                continue
+            self.mac_table.add_static(vlan, mac, interface)
+
+    @locked
+    def learn_mac(self, vlan, mac, interface):
+        self.mac_address_table().learn(vlan, mac, interface)
+
+    @locked
+    def interface_table(self):
+        if self.interface_records is None:
+            from interface_table import InterfaceTable
+            self.interface_records = InterfaceTable(self.state.get("interfaces"))
+        return self.interface_records
+
+    @locked
+    def count_traffic(self, interface, direction, packets, octets):
+        self.interface_table().count(interface, direction, packets, octets)
+
+    @locked
+    def set_mac_aging_time(self, seconds):
+        self.mac_address_table().set_aging_time(seconds)
+        self.update_device_state("mac_aging_time", seconds)
+
+    @locked
+    def filter_packets(self, interface, direction, packets, count=True):
+        # האם כל חבילה עוברת את ה-ACL שמוחל על הממשק בכיוון direction ("in" / "out").
+        # ממשק בלי ACL (או עם ACL שלא הוגדר) מעביר הכול, כמו ב-IOS
+        config = (self.state.get("interfaces") or {}).get(interface) or {}
+        acl_id = config.get(f"access_group_{direction}")
+        compiled = self.compiled_access_list(acl_id) if acl_id is not None else None
+        if compiled is None:
+            return [True] * len(packets)
+        return compiled.permitted_many(packets, count)
+
+    def _index_add(self, key, name):
+        index = self.key_indexes.get(key)
+        if index is not None:
+            index.add(name)
+
+    def _index_discard(self, key, name):
+        index = self.key_indexes.get(key)
+        if index is not None:
+            index.discard(name)
 
     # Existing methods
 
+    @locked
     def update_hostname(self, hostname):
         self.update_device_state("hostname", hostname)
 
+    @locked
     def add_interface(self, name, config):
-        interfaces = self.get_device_state("interfaces") or {}
-        interfaces[name] = config
-        self.update_device_state("interfaces", interfaces)
-
+        self._before_change(("interfaces", name))
+        self.state["interfaces"][name] = config
+        self._mark_dirty(("interfaces", name))
+        self._index_add("interfaces", name)
+        if self.routing is not None:
+            self.routing.set_interface(name, config)
+        if self.interface_records is not None:
+            self.interface_records.set(name, config)
+
+    @locked
     def update_interface(self, name, key, value):
-        interfaces = self.get_device_state("interfaces") or {}
+        interfaces = self.state["interfaces"]
         if name in interfaces:
+            self._before_change(("interfaces", name))
             interfaces[name][key] = value
-            self.update_device_state("interfaces", interfaces)
-
+            self._mark_dirty(("interfaces", name, key))
+            if self.routing is not None and key in ("ip_address", "subnet_mask", "status"):
+                self.routing.set_interface(name, interfaces[name])
+            if self.mac_table is not None and key == "status" and value != "up":
+                # פורט שירד מאבד את הכתובות שנלמדו עליו
+                self.mac_table.clear(port=name)
+            if self.interface_records is not None:
+                self.interface_records.set(name, interfaces[name])
+
+    @locked
     def remove_interface(self, name):
-        interfaces = self.get_device_state("interfaces") or {}
-        interfaces.pop(name, None)
-        self.update_device_state("interfaces", interfaces)
+        self._before_change(("interfaces", name))
+        self.state["interfaces"].pop(name, None)
+        self._mark_dirty(("interfaces", name))
+        self._index_discard("interfaces", name)
+        if self.routing is not None:
+            self.routing.remove_interface(name)
+        if self.mac_table is not None:
+            self.mac_table.clear(port=name)
+        if self.interface_records is not None:
+            self.interface_records.remove(name)
 
     # New methods to support additional commands
 
+    @locked
     def add_vlan(self, vlan_id, name):
-        vlans = self.get_device_state("vlans") or {}
-        vlans[vlan_id] = {"name": name, "interfaces": []}
-        self.update_device_state("vlans", vlans)
-
+        vlan_id = str(vlan_id)
+        self._before_change(("vlans", vlan_id))
+        self.state["vlans"][vlan_id] = {"name": name, "interfaces": []}
+        self._mark_dirty(("vlans", vlan_id))
+        self._index_add("vlans", vlan_id)
+
+    @locked
+    def rename_vlan(self, vlan_id, name):
+        vlan_id = str(vlan_id)
+        vlans = self.state["vlans"]
+        if vlan_id in vlans:
+            self._before_change(("vlans", vlan_id))
+            vlans[vlan_id]["name"] = name
+            self._mark_dirty(("vlans", vlan_id))
+
+    @locked
     def remove_vlan(self, vlan_id):
-        vlans = self.get_device_state("vlans") or {}
-        vlans.pop(str(vlan_id), None)
-        self.update_device_state("vlans", vlans)
-
+        vlan_id = str(vlan_id)
+        self._before_change(("vlans", vlan_id))
+        self.state["vlans"].pop(vlan_id, None)
+        self._mark_dirty(("vlans", vlan_id))
+        self._index_discard("vlans", vlan_id)
+        if self.mac_table is not None:
+            self.mac_table.clear(vlan=int(vlan_id))
+
+    @locked
     def add_route(self, destination, next_hop, distance=1):
-        routing_table = self.get_device_state("routing_table") or []
-        routing_table.append({
+        by_destination = self.get_routes_by_destination()
+        self._before_change(("routing_table", destination))
+        route = {
             "destination": destination,
             "next_hop": next_hop,
             "distance": distance,
             "time": datetime.now().isoformat()
-        })
-        self.update_device_state("routing_table", routing_table)
+        }
+        self.state["routing_table"].append(route)
+        by_destination.setdefault(destination, []).append(route)
+        self._mark_dirty(("routing_table", destination))
+        if self.routing is not None:
+            self._install_static_route(self.routing, route)
 
+    @locked
     def remove_route(self, destination):
-        routing_table = self.get_device_state("routing_table") or []
-        routing_table = [route for route in routing_table if route["destination"] != destination]
-        self.update_device_state("routing_table", routing_table)
-
+        removed = self.get_routes_by_destination().get(destination)
+        if not removed:
+            return
+        self._before_change(("routing_table", destination))
+        del self.routes_by_destination[destination]
+        routing_table = self.state["routing_table"]
+        routing_table[:] = [route for route in routing_table if route["destination"] != destination]
+        self._mark_dirty(("routing_table", destination))
+        if self.routing is not None:
+            try:
+                network, length = parse_prefix(destination)
+            except ValueError:
+                return
+            self.routing.remove_route(network, length, "static", any_next_hop=True)
+
+    @locked
     def add_access_list(self, acl_id, rule):
-        access_lists = self.get_device_state("access_lists") or {}
+        acl_id = str(acl_id)
+        self._before_change(("access_lists", acl_id))
+        access_lists = self.state["access_lists"]
         if acl_id not in access_lists:
             access_lists[acl_id] = []
         access_lists[acl_id].append(rule)
-        self.update_device_state("access_lists", access_lists)
+        self._mark_dirty(("access_lists", acl_id))
+        self._index_add("access_lists", acl_id)
+        self.compiled_acls.pop(acl_id, None)
 
+    @locked
     def remove_access_list(self, acl_id):
-        access_lists = self.get_device_state("access_lists") or {}
-        access_lists.pop(acl_id, None)
-        self.update_device_state("access_lists", access_lists)
-
+        acl_id = str(acl_id)
+        self._before_change(("access_lists", acl_id))
+        self.state["access_lists"].pop(acl_id, None)
+        self._mark_dirty(("access_lists", acl_id))
+        self._index_discard("access_lists", acl_id)
+        self.compiled_acls.pop(acl_id, None)
+        self.acl_hits.pop(acl_id, None)
+
+    @locked
     def add_dhcp_pool(self, pool_name, config):
-        dhcp_pools = self.get_device_state("dhcp_pools") or {}
-        dhcp_pools[pool_name] = config
-        self.update_device_state("dhcp_pools", dhcp_pools)
+        self._before_change(("dhcp_pools", pool_name))
+        self.state["dhcp_pools"][pool_name] = config
+        self._mark_dirty(("dhcp_pools", pool_name))
+        self._index_add("dhcp_pools", pool_name)
 
+    @locked
     def remove_dhcp_pool(self, pool_name):
-        dhcp_pools = self.get_device_state("dhcp_pools") or {}
-        dhcp_pools.pop(pool_name, None)
-        self.update_device_state("dhcp_pools", dhcp_pools)
+        self._before_change(("dhcp_pools", pool_name))
+        self.state["dhcp_pools"].pop(pool_name, None)
+        self._mark_dirty(("dhcp_pools", pool_name))
+        self._index_discard("dhcp_pools", pool_name)
 
+    @locked
     def update_ntp_config(self, config):
         self.update_device_state("ntp_config", config)
 
+    @locked
     def update_snmp_config(self, config):
         self.update_device_state("snmp_config", config)
 
+    @locked
     def add_user(self, username, password, privilege):
-        users = self.get_device_state("users") or []
+        users = list(self.get_device_state("users") or [])
         users.append({"username": username, "password": password, "privilege": privilege})
         self.update_device_state("users", users)
 
+    @locked
     def remove_user(self, username):
         users = self.get_device_state("users") or []
         users = [user for user in users if user["username"] != username]
         self.update_device_state("users", users)
 
+    @locked
     def set_enable_password(self, password):
         self.update_device_state("enable_password", password)
 
+    def config_renderer(self):
+        if self.renderer is None:
+            self.renderer = ConfigRenderer()
+        return self.renderer
+
+    def running_config(self):
+        # generator של שורות ה-running-config; רק החלקים שהשתנו מאז ההצגה הקודמת מופקים מחדש.
+        # קורא מ-thread אחר שרוצה תמונה עקבית צריך להחזיק את self.lock עד סוף הזרם
+        return self.config_renderer().lines(self.state, {"routing_table": self.get_routes_by_destination()})
+
+    def config_archive(self):
+        if self.archive is None:
+            self.archive = ConfigArchive(self.conn)
+        return self.archive
+
+    def running_manifest(self):
+        return RunningManifest(self.config_renderer(), self.state, {"routing_table": self.get_routes_by_destination()})
+
+    def config_manifest(self, snapshot_id=None):
+        # snapshot לפי המזהה שלו בארכיון, או ה-running-config כש-snapshot_id הוא None
+        if snapshot_id is None:
+            return self.running_manifest()
+        return self.config_archive().manifest(snapshot_id)
+
+    @locked
+    def archive_config(self, label=None):
+        # שומר snapshot של ה-running-config ומחזיר את המזהה שלו (ייחודי בכל המסד)
+        return self.config_archive().save(self.device_id, self.running_manifest(), label)
+
+    @locked
+    def config_snapshots(self):
+        return self.config_archive().snapshots(self.device_id)
+
+    @locked
+    def find_snapshot(self, number=None):
+        # snapshot לפי המספר שלו אצל המכשיר; בלי מספר - האחרון
+        archive = self.config_archive()
+        return archive.latest(self.device_id) if number is None else archive.find(self.device_id, number)
+
+    @locked
+    def config_diff(self, old=None, new=None):
+        # ההבדלים בין שני snapshots (גם של מכשירים אחרים במסד); None הוא ה-running-config של המכשיר
+        return list(config_archive.diff(self.config_manifest(old), self.config_manifest(new), self.config_renderer()))
+
+    @locked
+    def replace_config(self, snapshot_id):
+        # configure replace: המצב חוזר ל-snapshot. רק חלקים עם hash שונה נפתחים, ובתוכם מוחלפים רק
+        # הפריטים ששונו - כך שחזרה אחרי שינוי קטן במכשיר גדול נוגעת בכמה שורות בלבד.
+        # מחזיר את מספר הפריטים שהוחלפו
+        target = self.config_archive().manifest(snapshot_id)
+        current = self.running_manifest()
+        current_sections = dict(current.sections())
+        changed = 0
+        with self.batch():
+            for key, tree_hash in target.sections():
+                if current_sections.get(key) == tree_hash:
+                    continue
+                if key not in state_schema.COLLECTIONS:
+                    value = target.value(key, None, target.items(key)[0][1])
+                    if key == "mac_aging_time":
+                        self.set_mac_aging_time(DEFAULT_AGING_TIME if value is None else value)
+                    else:
+                        self.update_device_state(key, value)
+                    changed += 1
+                    continue
+                current_items = dict(current.items(key))
+                for name, item_hash in target.items(key):
+                    if current_items.pop(name, None) != item_hash:
+                        self.restore_item(key, name, target.value(key, name, item_hash))
+                        changed += 1
+                for name in current_items:
+                    self.restore_item(key, name, None)
+                    changed += 1
+        return changed
+
+    @locked
+    def restore_item(self, key, name, value):
+        # מחליף פריט אחד באוסף בערך שלם, או מוחק אותו כש-value הוא None, דרך אותן פעולות של הפקודות
+        # הרגילות - כך שהביטול ב-batch והמטמונים (ניתוב, ACLs, טבלת MAC) מתעדכנים כרגיל
+        if key == "routing_table":
+            self.remove_route(name)
+            for route in value or []:
+                self.add_route(name, route["next_hop"], route.get("distance", 1))
+        elif value is None:
+            {"interfaces": self.remove_interface, "vlans": self.remove_vlan,
+             "access_lists": self.remove_access_list, "dhcp_pools": self.remove_dhcp_pool}[key](name)
+        elif key == "interfaces":
+            self.add_interface(name, value)
+        elif key == "dhcp_pools":
+            self.add_dhcp_pool(name, value)
+        else:
+            self._before_change((key, name))
+            self.state[key][name] = value
+            self._mark_dirty((key, name))
+            self._index_add(key, name)
+            if key == "access_lists":
+                self.compiled_acls.pop(name, None)
+
+    @locked
     def save_running_config(self):
-        running_config = self.get_device_state("running_config")
-        self.update_device_state("startup_config", running_config)
+        # copy run start: snapshot בארכיון במקום עותק של כל הטקסט; ה-startup-config מצביע עליו
+        self.update_device_state("startup_snapshot", self.archive_config("startup-config"))
+        self.flush()
+
+    @locked
+    def startup_config_lines(self):
+        snapshot_id = self.state.get("startup_snapshot")
+        if snapshot_id is None:
+            # מסד מגרסה קודמת שומר את הטקסט המלא
+            config = self.state.get("startup_config")
+            return config.split("\n") if config else []
+        return list(config_archive.render(self.config_archive().manifest(snapshot_id), self.config_renderer()))
 
     def __del__(self):
-        self.conn.close()
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,150 @@
+# device_registry.py
+
+import threading
+from cli_simulator import CLISimulator
+from command_catalog import CommandCatalog
+from data_manager import DataManager, open_database, DURABILITY_INTERVAL, DURABILITY_POLICIES
+from eigrp_engine import EigrpDomain
+from forwarding import ForwardingPlane
+from ospf_engine import OspfDomain
+from rip_engine import RipDomain
+import state_schema
+
+DEVICE_TYPES = ("router", "switch")
+
+
+class DeviceRegistry:
+    # מכשירים רבים בתהליך אחד: מסד וחיבור אחד, קטלוג פקודות אחד משותף ומצב נפרד לכל device_id.
+    # הסימולטור של מכשיר נבנה רק בגישה הראשונה אליו, והמצב שלו נטען מ-SQLite רק כשצריך אותו
+    def __init__(self, db_name='cisco_simulator.db', catalog=None, durability=DURABILITY_INTERVAL,
+                 flush_interval=1.0, journal_mode="wal", synchronous="normal", clock=None):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(f"Invalid durability policy: {durability}")
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.conn = open_database(db_name, journal_mode, synchronous)
+        self.catalog = catalog or CommandCatalog.shared()
+        # שעון אחד לכל המכשירים (למשל SimulatedClock בתרחיש מעבדה); None = הזמן האמיתי
+        self.clock = clock
+        # נעילה אחת לכל המכשירים: כולם כותבים דרך אותו חיבור
+        self.lock = threading.RLock()
+        self.device_types = dict(self.conn.execute("SELECT device_id, device_type FROM devices ORDER BY rowid"))
+        self.devices = {}
+        # מנהלי מצב שמחכים לכתיבה ברקע; טיימר אחד לכל המרשם במקום טיימר לכל מכשיר
+        self.pending = set()
+        self.flush_timer = None
+        # אזור OSPF אחד ו-EIGRP אחד לכל המכשירים; מכשיר מצטרף אליהם כשהוא נטען
+        self.ospf = OspfDomain()
+        self.eigrp = EigrpDomain()
+        self.rip = RipDomain()
+        # ה-data plane של ping ו-traceroute בין המכשירים
+        self.forwarding = ForwardingPlane()
+
+    def __len__(self):
+        return len(self.device_types)
+
+    def __contains__(self, device_id):
+        return device_id in self.device_types
+
+    def __iter__(self):
+        return iter(list(self.device_types))
+
+    def __getitem__(self, device_id):
+        return self.device(device_id)
+
+    def add_device(self, device_id, device_type):
+        if device_type not in DEVICE_TYPES:
+            raise ValueError("Invalid device type. Choose 'router' or 'switch'.")
+        with self.lock:
+            if device_id in self.device_types:
+                raise ValueError(f"Device {device_id} already exists")
+            with self.conn:
+                self.conn.execute("INSERT INTO devices (device_id, device_type) VALUES (?, ?)",
+                                  (device_id, device_type))
+            self.device_types[device_id] = device_type
+        return self.device(device_id)
+
+    def device(self, device_id):
+        with self.lock:
+            simulator = self.devices.get(device_id)
+            if simulator is None:
+                if device_id not in self.device_types:
+                    raise KeyError(device_id)
+                manager = DataManager(durability=self.durability, flush_interval=self.flush_interval,
+                                      device_id=device_id, conn=self.conn, lock=self.lock,
+                                      commands=self.catalog.commands, scheduler=self, clock=self.clock)
+                simulator = CLISimulator(manager, self.catalog)
+                simulator.set_device_type(self.device_types[device_id])
+                manager.ospf = self.ospf
+                manager.eigrp = self.eigrp
+                manager.rip = self.rip
+                manager.forwarding = self.forwarding
+                self.ospf.attach(device_id, manager)
+                self.eigrp.attach(device_id, manager)
+                self.rip.attach(device_id, manager)
+                self.forwarding.attach(device_id, manager)
+                self.devices[device_id] = simulator
+            return simulator
+
+    def remove_device(self, device_id):
+        with self.lock:
+            if device_id not in self.device_types:
+                raise KeyError(device_id)
+            simulator = self.devices.pop(device_id, None)
+            if simulator is not None:
+                self.pending.discard(simulator.data_manager)
+            self.ospf.remove(device_id)
+            self.eigrp.remove(device_id)
+            self.rip.remove(device_id)
+            self.forwarding.remove(device_id)
+            with self.conn:
+                state_schema.delete_device(self.conn, device_id)
+            del self.device_types[device_id]
+
+    def unload(self, device_id):
+        # שומר את המצב ומשחרר את הסימולטור מהזיכרון; הגישה הבאה טוענת אותו מחדש מ-SQLite
+        with self.lock:
+            simulator = self.devices.pop(device_id, None)
+            if simulator is not None:
+                self.pending.discard(simulator.data_manager)
+                simulator.data_manager.flush()
+                self.ospf.detach(device_id)
+                self.eigrp.detach(device_id)
+                self.rip.detach(device_id)
+                self.forwarding.detach(device_id)
+
+    def schedule(self, manager):
+        with self.lock:
+            self.pending.add(manager)
+            if self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    def _flush_from_timer(self):
+        with self.lock:
+            self.flush_timer = None
+            self._write(list(self.pending))
+
+    def flush(self):
+        with self.lock:
+            self._write([simulator.data_manager for simulator in self.devices.values()])
+
+    def _write(self, managers):
+        # כל המכשירים שהשתנו נכתבים בטרנזקציה אחת
+        managers = [manager for manager in managers if manager.dirty and not manager.batch_depth]
+        if managers:
+            with self.conn:
+                for manager in managers:
+                    manager.write_dirty()
+        self.pending.difference_update(managers)
+
+    def close(self):
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            self.flush()
+            self.devices.clear()
+            self.pending.clear()
+            self.conn.close()
@@ -0,0 +1,541 @@
+# eigrp_engine.py
+
+import time
+from collections import deque, namedtuple
+from interface_table import interface_metric, short_interface
+from routing_engine import FULL_MASK, MASKS, format_prefix, int_to_ip, ip_to_int, mask_to_length, parse_prefix
+
+MAX_VARIANCE = 128
+MAX_BANDWIDTH = 10000000
+MAX_DELAY = 16777215
+# כמה נתיבים לכל היותר מותקנים ל-prefix (maximum-paths של IOS)
+MAX_PATHS = 4
+
+# ההגדרה שהנתב מפעיל: links = {interface: (address, network, length, bandwidth, delay)} של הממשקים
+# שמשתתפים, ו-origins = {prefix: (bandwidth, delay, external)} - הרשתות שהוא מכריז בעצמו
+EigrpConfig = namedtuple("EigrpConfig", ["asn", "router_id", "links", "passive", "variance", "origins"])
+
+
+def composite_metric(bandwidth, delay):
+    # המטריקה המורכבת עם K1=K3=1: רוחב הפס הצר ביותר במסלול וסכום ה-delay (ביחידות של 10 מיקרו-שניות)
+    return 256 * (10000000 // bandwidth + delay // 10)
+
+
+def parse_network(statement):
+    # "10.0.0.0" (לפי המחלקה) או "10.0.0.0 0.0.0.255" -> (network, mask)
+    parts = statement.split()
+    try:
+        address = ip_to_int(parts[0])
+        if len(parts) >= 2:
+            mask = ~ip_to_int(parts[1]) & FULL_MASK
+        else:
+            first = address >> 24
+            mask = MASKS[8] if first < 128 else MASKS[16] if first < 192 else MASKS[24]
+    except (IndexError, ValueError):
+        return None
+    return address & mask, mask
+
+
+def parse_redistribute(statement):
+    # "static" / "connected metric 10000 100 255 1 1500" -> (source, (bandwidth, delay) או None)
+    parts = statement.split()
+    if len(parts) >= 4 and parts[1] == "metric":
+        return parts[0], (int(parts[2]), int(parts[3]) * 10)
+    return parts[0], None
+
+
+def router_config(state):
+    # תהליך ה-EIGRP הראשון של הנתב. None כשאין תהליך EIGRP או שאין לנתב router ID
+    processes = sorted(((int(name.split()[-1]), process)
+                        for name, process in (state.get("routing_protocols") or {}).items()
+                        if process.get("protocol") == "eigrp"), key=lambda item: item[0])
+    if not processes:
+        return None
+    asn, process = processes[0]
+    statements = [parsed for parsed in map(parse_network, process.get("networks", [])) if parsed]
+    passive = frozenset(process.get("passive", []))
+    links, origins, others = {}, {}, {}
+    addresses, loopbacks = [], []
+    for name, config in (state.get("interfaces") or {}).items():
+        if config.get("status") != "up" or not config.get("ip_address") or not config.get("subnet_mask"):
+            continue
+        try:
+            address = ip_to_int(config["ip_address"])
+            length = mask_to_length(config["subnet_mask"])
+        except ValueError:
+            continue
+        (loopbacks if name.startswith("Loopback") else addresses).append(address)
+        bandwidth, delay = interface_metric(name, config)
+        prefix = (address & MASKS[length], length)
+        if any(address & mask == network for network, mask in statements):
+            links[name] = (address, prefix[0], length, bandwidth, delay)
+            if prefix not in origins or composite_metric(bandwidth, delay) < composite_metric(*origins[prefix][:2]):
+                origins[prefix] = (bandwidth, delay, False)
+        else:
+            others[name] = (address, prefix, bandwidth, delay)
+    candidates = loopbacks or addresses
+    if not candidates:
+        return None
+    for statement in process.get("redistribute", []):
+        source, metric = parse_redistribute(statement)
+        if source == "connected":
+            for name, (address, prefix, bandwidth, delay) in others.items():
+                origins.setdefault(prefix, (*(metric or (bandwidth, delay)), True))
+        elif source == "static":
+            for route in state.get("routing_table") or []:
+                try:
+                    prefix = parse_prefix(route["destination"])
+                    next_hop = ip_to_int(route["next_hop"])
+                except ValueError:
+                    continue
+                if metric is None:
+                    # בלי metric מפורש - המטריקה של הממשק שדרכו עובר ה-next hop
+                    exits = [(bandwidth, delay) for address, network, length, bandwidth, delay in links.values()
+                             if next_hop & MASKS[length] == network]
+                    exits += [(bandwidth, delay) for address, (network, length), bandwidth, delay in others.values()
+                              if next_hop & MASKS[length] == network]
+                    if not exits:
+                        continue
+                    origins.setdefault(prefix, (*exits[0], True))
+                else:
+                    origins.setdefault(prefix, (*metric, True))
+    return EigrpConfig(asn, max(candidates), links, passive, process.get("variance", 1), origins)
+
+
+class Entry:
+    # שורה בטבלת הטופולוגיה: מה שכל שכן דיווח (vector = (bandwidth, delay, external)), הרשת אם הנתב
+    # מכריז אותה בעצמו, ה-FD, והמסלול הנבחר. active - מחכה לתשובות על query (waiting), ועונה אחר כך ל-reply_to
+    __slots__ = ("reported", "origin", "fd", "distance", "vector", "successor", "active", "waiting", "reply_to")
+
+    def __init__(self):
+        self.reported = {}
+        self.origin = None
+        self.fd = None
+        self.distance = None
+        self.vector = None
+        # השכן שדרכו המסלול הנבחר (None - הנתב מכריז בעצמו)
+        self.successor = None
+        self.active = False
+        self.waiting = set()
+        self.reply_to = set()
+
+
+class EigrpRouter:
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.config = None
+        # (device_id, address) של השכן -> (interface, address של השכן, bandwidth, delay, המפתח שלנו אצלו)
+        self.neighbors = {}
+        self.uptimes = {}
+        self.segments = set()
+        self.table = {}
+        # שכן -> ה-prefixes שהוא דיווח עליהם, כך שנפילה של שכן נוגעת רק בהם
+        self.learned = {}
+        # prefix -> (protocol, paths) שהותקנו בטבלת הניתוב
+        self.installed = {}
+
+
+class EigrpDomain:
+    # DUAL בין כל המכשירים ב-DeviceRegistry: נתבים עם תהליך באותו AS שחולקים subnet הם שכנים, וכל נתב
+    # מחזיק טבלת טופולוגיה משלו. שינוי בהגדרה רק מסמן את המכשיר; converge() מתרגם אותו לאירועים (שכן
+    # שעלה או נפל, מטריקה של קישור, רשת שנוספה), ומשם הכל הודעות update / query / reply בתור אחד עד
+    # שהרשת שקטה. נתב שיש לו feasible successor עובר אליו בלי לשאול אף אחד, ו-query מתפשט רק לנתבים
+    # שתלויים בנתב ששאל - כך שינוי נוגע רק ב-prefixes ובנתבים שהוא משפיע עליהם
+    def __init__(self):
+        self.managers = {}
+        self.routers = {}
+        self.stale = set()
+        # (asn, network, length) -> {device_id: (interface, address, bandwidth, delay)}
+        self.segments = {}
+        self.queue = deque()
+        # (יעד, שולח, prefix) -> ה-update האחרון שעוד בתור; update חדש על אותו קישור ו-prefix מחליף אותו
+        self.last_update = {}
+        self.touched = set()
+        self.sent = {"update": 0, "query": 0, "reply": 0}
+        self.converging = False
+
+    def attach(self, device_id, manager):
+        self.managers[device_id] = manager
+        self.stale.add(device_id)
+        router = self.routers.get(device_id)
+        if router is not None:
+            # מכשיר שנטען מחדש מקבל את הנתיבים שכבר חושבו לו
+            for protocol in ("eigrp", "eigrp_external"):
+                manager.set_dynamic_routes(protocol, {prefix: paths for prefix, (kind, paths)
+                                                      in router.installed.items() if kind == protocol}, replace=True)
+
+    def detach(self, device_id):
+        # המכשיר פורק מהזיכרון אבל ממשיך להשתתף עם ההגדרה האחרונה שלו
+        self.managers.pop(device_id, None)
+
+    def remove(self, device_id):
+        self.managers.pop(device_id, None)
+        self.stale.add(device_id)
+
+    def invalidate(self, device_id):
+        self.stale.add(device_id)
+
+    def converge(self):
+        if not self.stale or self.converging:
+            return
+        self.converging = True
+        try:
+            stale, self.stale = self.stale, set()
+            for device_id in sorted(stale):
+                self.reconfigure(device_id)
+            self.run()
+            self.install()
+        finally:
+            self.converging = False
+
+    def reconfigure(self, device_id):
+        manager = self.managers.get(device_id)
+        config = router_config(manager.state) if manager is not None else None
+        router = self.routers.get(device_id)
+        if router is None:
+            if config is None:
+                return
+            router = self.routers[device_id] = EigrpRouter(device_id)
+        old, router.config = router.config, config
+        if config == old:
+            return
+        # החברות ב-subnets: ממשק passive מכריז את הרשת שלו אבל לא יוצר שכנות
+        touched = set(router.segments)
+        for segment in router.segments:
+            self.segments[segment].pop(device_id, None)
+        router.segments = set()
+        if config is not None:
+            for interface, (address, network, length, bandwidth, delay) in config.links.items():
+                if interface in config.passive:
+                    continue
+                segment = (config.asn, network, length)
+                members = self.segments.setdefault(segment, {})
+                if device_id not in members or delay < members[device_id][3]:
+                    members[device_id] = (interface, address, bandwidth, delay)
+                router.segments.add(segment)
+                touched.add(segment)
+        affected = {device_id}
+        for segment in touched:
+            affected.update(self.segments.get(segment, ()))
+            if not self.segments.get(segment):
+                self.segments.pop(segment, None)
+        for member in sorted(affected):
+            self.set_neighbors(self.routers[member])
+        # הרשתות שהנתב מכריז בעצמו
+        old_origins = old.origins if old is not None else {}
+        new_origins = config.origins if config is not None else {}
+        for prefix in set(old_origins) | set(new_origins):
+            if old_origins.get(prefix) != new_origins.get(prefix):
+                entry = router.table.get(prefix)
+                if entry is None:
+                    entry = router.table[prefix] = Entry()
+                entry.origin = new_origins.get(prefix)
+                self.compute(router, prefix, entry)
+        if config is None:
+            self.withdraw(router)
+        elif old is None or old.variance != config.variance:
+            self.touched.update((device_id, prefix) for prefix in router.table)
+
+    def set_neighbors(self, router):
+        desired = {}
+        for segment in router.segments:
+            interface, address, bandwidth, delay = self.segments[segment][router.device_id]
+            for member, (peer_interface, peer_address, _, _) in self.segments[segment].items():
+                if member != router.device_id:
+                    desired[(member, peer_address)] = (interface, peer_address, bandwidth, delay,
+                                                       (router.device_id, address))
+        for key in [key for key in router.neighbors if key not in desired]:
+            self.neighbor_down(router, key)
+        for key, info in desired.items():
+            current = router.neighbors.get(key)
+            if current == info:
+                continue
+            router.neighbors[key] = info
+            if current is not None and current[0] == info[0] and current[4] == info[4]:
+                # רק המטריקה של הקישור השתנתה: מחשבים מחדש את מה שנלמד מהשכן הזה
+                for prefix in list(router.learned.get(key, ())):
+                    self.compute(router, prefix, router.table[prefix])
+                continue
+            if current is not None:
+                self.neighbor_down(router, key)
+                router.neighbors[key] = info
+            # שכן חדש מקבל את כל הטבלה (בלי מה שנלמד ממנו - split horizon)
+            router.uptimes[key] = time.monotonic()
+            for prefix, entry in router.table.items():
+                if not entry.active and entry.vector is not None and entry.successor != key:
+                    self.send("update", router, key, prefix, entry.vector)
+
+    def neighbor_down(self, router, key):
+        router.neighbors.pop(key, None)
+        router.uptimes.pop(key, None)
+        for prefix in router.learned.pop(key, ()):
+            entry = router.table[prefix]
+            entry.reported.pop(key, None)
+            if entry.active:
+                # שכן שנפל נחשב כאילו ענה
+                entry.waiting.discard(key)
+                entry.reply_to.discard(key)
+                if not entry.waiting:
+                    self.finish(router, prefix, entry)
+            else:
+                self.compute(router, prefix, entry)
+        for prefix, entry in list(router.table.items()):
+            if entry.active and key in entry.waiting:
+                entry.waiting.discard(key)
+                entry.reply_to.discard(key)
+                if not entry.waiting:
+                    self.finish(router, prefix, entry)
+
+    def withdraw(self, router):
+        # התהליך הוסר (או שהמכשיר נמחק): הנתיבים שלמד יוצאים מהטבלה והנתב יוצא מהאזור
+        router.table.clear()
+        self.install({(router.device_id, prefix) for prefix in router.installed})
+        del self.routers[router.device_id]
+
+    def send(self, kind, router, key, prefix, vector):
+        info = router.neighbors.get(key)
+        if info is None:
+            return
+        target = (key[0], info[4], prefix)
+        if kind == "update":
+            message = self.last_update.get(target)
+            if message is not None:
+                message[4] = vector
+                return
+        message = [kind, key[0], info[4], prefix, vector]
+        self.queue.append(message)
+        self.sent[kind] += 1
+        if kind == "update":
+            self.last_update[target] = message
+        else:
+            self.last_update.pop(target, None)
+
+    def run(self):
+        queue = self.queue
+        while queue:
+            message = queue.popleft()
+            kind, device_id, source, prefix, vector = message
+            target = (device_id, source, prefix)
+            if self.last_update.get(target) is message:
+                del self.last_update[target]
+            router = self.routers.get(device_id)
+            if router is None or source not in router.neighbors:
+                continue
+            self.receive(router, kind, source, prefix, vector)
+
+    def receive(self, router, kind, source, prefix, vector):
+        entry = router.table.get(prefix)
+        if entry is None:
+            if vector is None and kind == "update":
+                return
+            entry = router.table[prefix] = Entry()
+        previous = entry.reported.get(source)
+        if vector is None:
+            entry.reported.pop(source, None)
+            learned = router.learned.get(source)
+            if learned is not None:
+                learned.discard(prefix)
+        else:
+            entry.reported[source] = vector
+            router.learned.setdefault(source, set()).add(prefix)
+        if entry.active:
+            if kind == "reply":
+                entry.waiting.discard(source)
+                if not entry.waiting:
+                    self.finish(router, prefix, entry)
+            elif kind == "query":
+                self.send("reply", router, source, prefix, entry.vector)
+            return
+        if kind == "update" and source != entry.successor and entry.vector is not None:
+            # update משכן שאינו ה-successor ולא מציע מסלול טוב יותר לא משנה את הבחירה; רק הנתיבים
+            # המותקנים (ECMP / variance) עשויים להשתנות
+            info = router.neighbors[source]
+            before = self.distance(info, previous)
+            after = self.distance(info, vector)
+            if after is None or after > entry.distance:
+                if before is not None and (before == entry.distance or router.config.variance > 1):
+                    self.touched.add((router.device_id, prefix))
+                elif after is not None and router.config.variance > 1:
+                    self.touched.add((router.device_id, prefix))
+                return
+        self.compute(router, prefix, entry, source if kind == "query" else None)
+
+    @staticmethod
+    def distance(info, vector):
+        # המרחק דרך שכן (info מ-router.neighbors) לפי מה שהוא דיווח; None - לא מגיע
+        if vector is None:
+            return None
+        return composite_metric(min(vector[0], info[2]), vector[1] + info[3])
+
+    def candidates(self, router, entry):
+        # (distance, reported distance, vector, neighbor) לכל דרך ל-prefix, מהטובה לגרועה; neighbor None -
+        # הנתב מכריז בעצמו
+        found = []
+        if entry.origin is not None:
+            found.append((composite_metric(*entry.origin[:2]), 0, entry.origin, None))
+        for key, (bandwidth, delay, external) in entry.reported.items():
+            info = router.neighbors[key]
+            vector = (min(bandwidth, info[2]), delay + info[3], external)
+            found.append((composite_metric(*vector[:2]), composite_metric(bandwidth, delay), vector, key))
+        found.sort(key=lambda candidate: (candidate[0], candidate[3] != entry.successor, candidate[3] or ("", 0)))
+        return found
+
+    def best(self, router, entry):
+        # כמו candidates()[0] בלי למיין: בשוויון נשאר ה-successor הנוכחי
+        best = None
+        if entry.origin is not None:
+            best = (composite_metric(*entry.origin[:2]), 0, entry.origin, None)
+        neighbors, successor = router.neighbors, entry.successor
+        for key, reported in entry.reported.items():
+            info = neighbors[key]
+            bandwidth = min(reported[0], info[2])
+            delay = reported[1] + info[3]
+            distance = 256 * (10000000 // bandwidth + delay // 10)
+            if best is None or distance < best[0] or (distance == best[0] and best[3] is not None and (
+                    key == successor or (best[3] != successor and key < best[3]))):
+                best = (distance, None, (bandwidth, delay, reported[2]), key)
+        if best is not None and best[3] is not None:
+            reported = entry.reported[best[3]]
+            best = (best[0], composite_metric(reported[0], reported[1]), best[2], best[3])
+        return best
+
+    def compute(self, router, prefix, entry, query_from=None):
+        # חישוב מקומי (entry ב-passive): מסלול שעומד בתנאי ה-feasibility מתקבל מיד; אחרת הנתב עובר
+        # ל-active ושואל את השכנים
+        self.touched.add((router.device_id, prefix))
+        if entry.active:
+            # ההחלטה תתקבל כשכל התשובות יגיעו
+            return
+        best = self.best(router, entry)
+        if best is None:
+            if entry.vector is None or not router.neighbors:
+                self.settle(router, prefix, entry, None, None, None, query_from)
+                if not entry.reported and entry.origin is None:
+                    del router.table[prefix]
+                return
+        else:
+            distance, reported, vector, key = best
+            if key is None or entry.fd is None or reported < entry.fd:
+                entry.fd = distance if entry.fd is None else min(entry.fd, distance)
+                self.settle(router, prefix, entry, distance, vector, key, query_from)
+                return
+        entry.active = True
+        entry.waiting = set(router.neighbors)
+        if query_from is not None:
+            entry.reply_to.add(query_from)
+        for key in list(entry.waiting):
+            self.send("query", router, key, prefix, None)
+        entry.vector = None
+        if not entry.waiting:
+            self.finish(router, prefix, entry)
+
+    def settle(self, router, prefix, entry, distance, vector, successor, query_from=None):
+        # המסלול החדש מוכרז רק לשכנים שרואים שינוי; ל-successor מוכרז "לא מגיע" (poison reverse)
+        old_vector, old_successor = entry.vector, entry.successor
+        entry.distance, entry.vector, entry.successor = distance, vector, successor
+        for key in list(router.neighbors):
+            advertised = None if key == successor else vector
+            if key == query_from:
+                self.send("reply", router, key, prefix, advertised)
+            elif advertised != (None if key == old_successor else old_vector):
+                self.send("update", router, key, prefix, advertised)
+
+    def finish(self, router, prefix, entry):
+        # כל השכנים ענו: המסלול הטוב ביותר נבחר מחדש וה-FD מתאפס אליו. השכנים קיבלו query עם
+        # "לא מגיע", ולכן כל אחד מהם מקבל את המסלול החדש
+        entry.active = False
+        entry.waiting = set()
+        best = self.best(router, entry)
+        if best is not None:
+            entry.fd, entry.distance, entry.vector, entry.successor = best[0], best[0], best[2], best[3]
+        else:
+            entry.fd = entry.distance = entry.vector = entry.successor = None
+        reply_to, entry.reply_to = entry.reply_to, set()
+        for key in list(router.neighbors):
+            advertised = None if key == entry.successor else entry.vector
+            if key in reply_to:
+                self.send("reply", router, key, prefix, advertised)
+            elif advertised is not None:
+                self.send("update", router, key, prefix, advertised)
+        self.touched.add((router.device_id, prefix))
+        if best is None:
+            del router.table[prefix]
+
+    def paths(self, router, entry):
+        # successors ו-feasible successors שנכנסים לטבלת הניתוב: מרחק עד variance פעמים הטוב ביותר
+        if entry is None or entry.active or entry.vector is None or entry.origin is not None:
+            return None, []
+        limit = entry.distance * router.config.variance
+        paths = [(key[1], router.neighbors[key][0], distance)
+                 for distance, reported, vector, key in self.candidates(router, entry)
+                 if key is not None and distance <= limit and reported < entry.fd]
+        return ("eigrp_external" if entry.vector[2] else "eigrp"), sorted(paths[:MAX_PATHS])
+
+    def install(self, touched=None):
+        if touched is None:
+            touched, self.touched = self.touched, set()
+        updates = {}
+        for device_id, prefix in touched:
+            router = self.routers.get(device_id)
+            if router is None:
+                continue
+            protocol, paths = self.paths(router, router.table.get(prefix)) if router.config else (None, [])
+            current = router.installed.get(prefix)
+            if current == (protocol, paths) or (current is None and not paths):
+                continue
+            changes = updates.setdefault(device_id, {})
+            if current is not None and current[0] != protocol:
+                changes.setdefault(current[0], {})[prefix] = []
+            if paths:
+                changes.setdefault(protocol, {})[prefix] = paths
+                router.installed[prefix] = (protocol, paths)
+            else:
+                router.installed.pop(prefix, None)
+        for device_id, changes in updates.items():
+            manager = self.managers.get(device_id)
+            if manager is not None:
+                for protocol, routes in changes.items():
+                    manager.set_dynamic_routes(protocol, routes)
+
+    def neighbor_lines(self, device_id):
+        router = self.routers.get(device_id)
+        if router is None or router.config is None:
+            return
+        now = time.monotonic()
+        yield f"EIGRP-IPv4 Neighbors for AS({router.config.asn})"
+        yield "H   Address                 Interface              Hold Uptime   SRTT   RTO  Q  Seq"
+        yield "                                                   (sec)         (ms)       Cnt Num"
+        for handle, key in enumerate(sorted(router.neighbors, key=lambda key: router.uptimes[key])):
+            uptime = int(now - router.uptimes[key])
+            hours, rest = divmod(uptime, 3600)
+            yield (f"{handle:<4}{int_to_ip(key[1]):<24}{short_interface(router.neighbors[key][0]):<23}"
+                   f"{13:>4} {hours:02}:{rest // 60:02}:{rest % 60:02}{1:>5}{100:>6}  0  {handle + 1}")
+
+    def topology_lines(self, device_id):
+        router = self.routers.get(device_id)
+        if router is None or router.config is None:
+            return
+        yield f"EIGRP-IPv4 Topology Table for AS({router.config.asn})/ID({int_to_ip(router.config.router_id)})"
+        yield "Codes: P - Passive, A - Active, U - Update, Q - Query, R - Reply,"
+        yield "       r - reply Status, s - sia Status "
+        yield ""
+        for prefix in sorted(router.table):
+            entry = router.table[prefix]
+            if entry.active:
+                yield f"A {format_prefix(*prefix)}, 0 successors, FD is Inaccessible"
+                continue
+            if entry.vector is None:
+                continue
+            found = self.candidates(router, entry)
+            successors = sum(1 for distance, reported, vector, key in found
+                             if distance == entry.distance and (key is None or reported < entry.fd))
+            yield f"P {format_prefix(*prefix)}, {successors} successors, FD is {entry.fd}"
+            for distance, reported, vector, key in found:
+                if key is None:
+                    if vector[2]:
+                        yield f"        via Redistributed ({distance}/0)"
+                    else:
+                        interfaces = [name for name, link in router.config.links.items() if link[1:3] == prefix]
+                        yield f"        via Connected, {interfaces[0] if interfaces else ''}"
+                elif reported < entry.fd:
+                    yield f"        via {int_to_ip(key[1])} ({distance}/{reported}), {router.neighbors[key][0]}"
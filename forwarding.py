@@ -0,0 +1,428 @@
+# forwarding.py
+
+import os
+import re
+from collections import namedtuple
+from acl_engine import CompiledACL, is_standard, make_packet
+from mac_table import interface_mac
+from routing_engine import MASKS, RoutingEngine, int_to_ip, ip_to_int, mask_to_length
+
+# ה-TTL של ping ב-IOS: חבילה שעוברת יותר מכשירים נזרקת (למשל בלולאת ניתוב)
+MAX_HOPS = 255
+# מטריצת reachability מעל כמה זוגות מתחלקת בין תהליכים
+POOL_THRESHOLD = 50000
+# פורט המקור של חבילות tcp/udp במטריצה
+SOURCE_PORT = 1024
+
+FORWARDED = "forwarded"
+DELIVERED = "delivered"
+NO_ROUTE = "no route"
+DENIED = "denied"
+INTERFACE_DOWN = "interface down"
+NO_NEIGHBOR = "no neighbor"
+TTL_EXCEEDED = "ttl exceeded"
+
+# צעד אחד בדרך: המכשיר, ממשק הכניסה (None במכשיר שממנו החבילה יצאה), ממשק היציאה, הכתובת של ממשק
+# הכניסה (זו שעונה ב-traceroute), מה קרה לחבילה, והחבילה כמו שהגיעה למכשיר
+Hop = namedtuple("Hop", ["device_id", "ingress", "egress", "address", "status", "packet"])
+# הצעדים, הסטטוס של הצעד האחרון והחבילה אחרי הצעד האחרון (אחרי NAT)
+Trace = namedtuple("Trace", ["hops", "status", "packet"])
+# תא במטריצה: האם התשובה חזרה, ואם לא - מה נכשל, באיזה מכשיר והאם זה היה בדרך חזרה
+Reachability = namedtuple("Reachability", ["reachable", "status", "device_id", "reply"])
+# ממשק פעיל עם כתובת. vlan - ה-VLAN שמסגרות שנכנסות בממשק שייכות אליו (SVI או פורט access), או None
+Link = namedtuple("Link", ["address", "network", "length", "acl_in", "acl_out", "nat", "vlan"])
+
+
+def link_vlan(name, config):
+    svi = re.fullmatch(r"vlan(\d+)", name, re.IGNORECASE)
+    if svi:
+        return int(svi.group(1))
+    if config.get("switchport_mode") == "access":
+        return int(config.get("switchport_access_vlan") or 1)
+    return None
+
+
+def device_links(state):
+    links = {}
+    for name, config in (state.get("interfaces") or {}).items():
+        if config.get("status") != "up" or not config.get("ip_address") or not config.get("subnet_mask"):
+            continue
+        try:
+            address = ip_to_int(config["ip_address"])
+            length = mask_to_length(config["subnet_mask"])
+        except ValueError:
+            continue
+        links[name] = Link(address, address & MASKS[length], length, config.get("access_group_in"),
+                           config.get("access_group_out"), config.get("ip_nat"), link_vlan(name, config))
+    return links
+
+
+def parse_nat_rule(text):
+    # ההמשך של "ip nat inside source": "static <local> <global>" או "list <acl> interface <name> overload"
+    tokens = text.split()
+    if len(tokens) == 3 and tokens[0] == "static":
+        return "static", ip_to_int(tokens[1]), ip_to_int(tokens[2])
+    if len(tokens) == 5 and tokens[0] == "list" and tokens[2] == "interface" and tokens[4] == "overload":
+        return "list", tokens[1], tokens[3]
+    raise ValueError("expected 'static <local> <global>' or 'list <acl> interface <name> overload'")
+
+
+def reverse(packet):
+    # התשובה לחבילה: כתובות ופורטים בכיוון ההפוך
+    protocol, src, dst, src_port, dst_port = packet
+    return protocol, dst, src, dst_port, src_port
+
+
+class DeviceView:
+    # מה שה-data plane צריך ממכשיר אחד: ממשקים פעילים, ACLs על ממשקים, NAT וטבלת הניתוב.
+    # LiveDevice קורא מה-DataManager, ו-FrozenDevice הוא עותק שאפשר להעביר לתהליך אחר
+    def __init__(self, device_id, state):
+        self.device_id = device_id
+        self.links = device_links(state)
+        # inside local -> inside global, ו-(acl, interface) של PAT
+        self.static = {}
+        self.overload = []
+        for text in state.get("nat") or []:
+            try:
+                rule = parse_nat_rule(text)
+            except ValueError:
+                continue
+            if rule[0] == "static":
+                self.static[rule[1]] = rule[2]
+            else:
+                self.overload.append(rule[1:])
+        self.inside = {outside: inside for inside, outside in self.static.items()}
+        # הכתובות של המכשיר עצמו; גם loopback ‏/32, שבו ה-connected וה-local הם אותה רשת
+        self.addresses = {link.address for link in self.links.values()}
+
+    def is_local(self, address):
+        return address in self.addresses
+
+    def learn(self, interface, mac):
+        # רק מכשיר חי לומד כתובות MAC
+        pass
+
+    def policy(self, interface):
+        # האם יש בממשק משהו שתלוי בחבילה עצמה ולא רק ביעד (ACL או NAT)
+        link = self.links.get(interface)
+        return link is not None and bool(link.acl_in or link.acl_out or link.nat)
+
+    def translate_inbound(self, packet, translations):
+        # outside -> inside: static לפי ה-inside global, ו-PAT לפי התרגום שנרשם כשהחבילה יצאה
+        protocol, src, dst, src_port, dst_port = packet
+        local = self.inside.get(dst)
+        if local is None:
+            local = translations.get((self.device_id, dst, src, protocol))
+        return packet if local is None else (protocol, src, local, src_port, dst_port)
+
+    def translate_outbound(self, packet, translations):
+        # inside -> outside: static, ואחרת PAT לכתובת של הממשק לחבילות שה-ACL מתיר
+        protocol, src, dst, src_port, dst_port = packet
+        outside = self.static.get(src)
+        if outside is None:
+            for acl_id, interface in self.overload:
+                link = self.links.get(interface)
+                compiled = self.access_list(acl_id)
+                if link is not None and compiled is not None and compiled.permitted(packet, count=False):
+                    outside = link.address
+                    translations[(self.device_id, outside, dst, protocol)] = src
+                    break
+        return packet if outside is None else (protocol, outside, dst, src_port, dst_port)
+
+
+class LiveDevice(DeviceView):
+    def __init__(self, manager, count=True):
+        super().__init__(manager.device_id, manager.state)
+        self.manager = manager
+        self.count = count
+        self.engine = manager.routing_engine()
+
+    def resolve(self, address):
+        return self.engine.resolve(address)
+
+    def learn(self, interface, mac):
+        # המסגרת שנכנסה בממשק שייך ל-VLAN מלמדת את טבלת ה-MAC, כמו המונים - רק בחבילות אמיתיות
+        link = self.links.get(interface)
+        if self.count and link is not None and link.vlan is not None:
+            self.manager.learn_mac(link.vlan, mac, interface)
+
+    def permitted(self, interface, direction, packet):
+        return self.manager.filter_packets(interface, direction, [packet], self.count)[0]
+
+    def access_list(self, acl_id):
+        return self.manager.compiled_access_list(acl_id)
+
+    def freeze(self):
+        state = self.manager.state
+        routes = [(route.network, route.length, route.protocol, route.next_hop, route.interface, route.distance,
+                   route.metric) for node in self.engine.rib for route in self.engine.rib.best(node)]
+        used = {acl_id for link in self.links.values() for acl_id in (link.acl_in, link.acl_out) if acl_id}
+        used.update(acl_id for acl_id, _ in self.overload)
+        access_lists = state.get("access_lists") or {}
+        acls = {str(acl_id): list(access_lists[str(acl_id)]) for acl_id in used if str(acl_id) in access_lists}
+        return FrozenDevice(self.device_id, {"interfaces": state.get("interfaces"), "nat": state.get("nat")},
+                            routes, acls)
+
+
+class FrozenDevice(DeviceView):
+    def __init__(self, device_id, state, routes, acls):
+        super().__init__(device_id, state)
+        self.args = (device_id, state, routes, acls)
+        self.engine = RoutingEngine()
+        for route in routes:
+            self.engine.add_route(*route)
+        self.acls = {}
+        for acl_id, rules in acls.items():
+            try:
+                standard = is_standard(acl_id)
+            except ValueError:
+                standard = None
+            self.acls[acl_id] = CompiledACL(rules, standard)
+
+    def __reduce__(self):
+        # עובר לתהליך אחר כנתונים, והטבלאות נבנות שם מחדש
+        return FrozenDevice, self.args
+
+    def resolve(self, address):
+        return self.engine.resolve(address)
+
+    def permitted(self, interface, direction, packet):
+        link = self.links.get(interface)
+        acl_id = getattr(link, f"acl_{direction}") if link is not None else None
+        compiled = self.acls.get(str(acl_id)) if acl_id is not None else None
+        return compiled is None or compiled.permitted(packet, count=False)
+
+    def access_list(self, acl_id):
+        return self.acls.get(str(acl_id))
+
+
+class Walker:
+    # מעביר חבילה ממכשיר למכשיר. devices(device_id) מחזיר DeviceView, ו-owners: כתובת ->
+    # [(device_id, interface, network, length)] של הממשקים הפעילים שלה
+    def __init__(self, devices, owners, memo=None):
+        self.devices = devices
+        self.owners = owners
+        self.memo = memo if memo is not None else {}
+
+    def step(self, view, ingress, packet, translations):
+        # מה מכשיר אחד עושה בחבילה, בסדר של IOS: ACL נכנס, NAT outside->inside, ניתוב, NAT inside->outside
+        # ו-ACL יוצא. מחזיר (status, egress, packet, (device_id, ingress) של הצעד הבא או None)
+        link = view.links.get(ingress) if ingress is not None else None
+        if link is not None:
+            if not view.permitted(ingress, "in", packet):
+                return DENIED, None, packet, None
+            if link.nat == "outside":
+                packet = view.translate_inbound(packet, translations)
+        if view.is_local(packet[2]):
+            return DELIVERED, None, packet, None
+        resolved = view.resolve(packet[2])
+        if resolved is None:
+            return NO_ROUTE, None, packet, None
+        egress, next_hop = resolved
+        out = view.links.get(egress)
+        if out is None:
+            return INTERFACE_DOWN, egress, packet, None
+        if link is not None and link.nat == "inside" and out.nat == "outside":
+            packet = view.translate_outbound(packet, translations)
+        # ACL יוצא לא חל על חבילות שהמכשיר עצמו שולח, כמו ב-IOS
+        if link is not None and not view.permitted(egress, "out", packet):
+            return DENIED, egress, packet, None
+        target = next_hop if next_hop is not None else packet[2]
+        for device_id, interface, network, length in self.owners.get(target, ()):
+            if device_id != view.device_id and network == out.network and length == out.length:
+                return FORWARDED, egress, packet, (device_id, interface)
+        return NO_NEIGHBOR, egress, packet, None
+
+    def walk(self, device_id, packet, translations, ingress=None):
+        hops = []
+        source = None
+        while True:
+            view = self.devices(device_id)
+            if source is not None:
+                # כתובת המקור של המסגרת היא הכתובת של ממשק היציאה במכשיר הקודם
+                view.learn(ingress, source)
+            received = packet
+            status, egress, packet, following = self.step(view, ingress, packet, translations)
+            address = view.links[ingress].address if ingress is not None else None
+            hops.append(Hop(device_id, ingress, egress, address, status, received))
+            if following is None:
+                return Trace(hops, status, packet)
+            if len(hops) >= MAX_HOPS:
+                hops[-1] = hops[-1]._replace(status=TTL_EXCEEDED)
+                return Trace(hops, TTL_EXCEEDED, packet)
+            source = interface_mac(device_id, egress)
+            device_id, ingress = following
+
+    def outcome(self, device_id, packet, translations, ingress=None):
+        # כמו walk, בלי רשימת הצעדים: (status, device_id, packet). מה שקורה מצעד שאין אחריו ACL או NAT תלוי
+        # רק במכשיר, בממשק הכניסה וביעד, ולכן נשמר ב-memo ומשמש את כל הזוגות שעוברים שם
+        pending = []
+        count = 0
+        while True:
+            key = (device_id, ingress, packet[2])
+            cached = self.memo.get(key)
+            if cached is not None:
+                status, where, length = cached
+                total = count + length
+                break
+            view = self.devices(device_id)
+            status, egress, packet, following = self.step(view, ingress, packet, translations)
+            if view.policy(ingress) or view.policy(egress):
+                pending = []
+            else:
+                pending.append((key, count))
+            count += 1
+            if following is None:
+                where, total = device_id, count
+                break
+            if count >= MAX_HOPS:
+                return TTL_EXCEEDED, device_id, packet
+            device_id, ingress = following
+        if total > MAX_HOPS:
+            return TTL_EXCEEDED, where, packet
+        for key, index in pending:
+            self.memo[key] = (status, where, total - index)
+        return status, where, packet
+
+
+def matrix_rows(walker, sources, destinations, protocol, port):
+    # {(source, destination): Reachability} לכל זוג, עם ה-memo של walker משותף לכולם
+    results = {}
+    for source in sources:
+        origin = walker.owners[ip_to_int(source)][0][0]
+        for destination in destinations:
+            packet = make_packet(protocol, source, destination, SOURCE_PORT if port else 0, port)
+            translations = {}
+            status, where, packet = walker.outcome(origin, packet, translations)
+            if status == DELIVERED:
+                status, where, _ = walker.outcome(where, reverse(packet), translations)
+                results[(source, destination)] = Reachability(status == DELIVERED, status, where, True)
+            else:
+                results[(source, destination)] = Reachability(False, status, where, False)
+    return results
+
+
+# ה-walker של תהליך ה-worker, עם עותק של כל המכשירים; נבנה פעם אחת ב-init_worker
+worker_walker = None
+
+
+def init_worker(devices, owners):
+    global worker_walker
+    worker_walker = Walker(devices.__getitem__, owners)
+
+
+def run_rows(sources, destinations, protocol, port):
+    return matrix_rows(worker_walker, sources, destinations, protocol, port)
+
+
+class ForwardingPlane:
+    # ה-data plane של כל המכשירים שב-DeviceRegistry: חבילה עוברת ממכשיר למכשיר דרך subnet משותף, כמו
+    # השכנויות של OSPF/EIGRP/RIP. open_edges (מכשיר בודד, בלי מרשם) - next hop שאף מכשיר לא מחזיק נחשב
+    # לעולם שמחוץ למעבדה, שעונה
+    def __init__(self, open_edges=False):
+        self.managers = {}
+        self.open_edges = open_edges
+        self.owners = None
+        # (device_id, inside global, peer, protocol) -> inside local, מה-PAT של ping ו-traceroute
+        self.translations = {}
+
+    def attach(self, device_id, manager):
+        self.managers[device_id] = manager
+        self.owners = None
+
+    def detach(self, device_id):
+        self.managers.pop(device_id, None)
+        self.owners = None
+
+    def remove(self, device_id):
+        self.detach(device_id)
+        self.translations = {key: value for key, value in self.translations.items() if key[0] != device_id}
+
+    def invalidate(self, device_id=None):
+        self.owners = None
+
+    def owner_index(self):
+        if self.owners is None:
+            owners = {}
+            for device_id, manager in self.managers.items():
+                view = DeviceView(device_id, manager.state)
+                for interface, link in view.links.items():
+                    owners.setdefault(link.address, []).append((device_id, interface, link.network, link.length))
+                    # כתובת inside global של static NAT שייכת לממשק ה-outside שברשת שלה, כמו ה-ARP של IOS
+                    if link.nat == "outside":
+                        for address in view.inside:
+                            if address & MASKS[link.length] == link.network and address != link.address:
+                                owners.setdefault(address, []).append(
+                                    (device_id, interface, link.network, link.length))
+            self.owners = owners
+        return self.owners
+
+    def walker(self, count=True):
+        views = {}
+
+        def device(device_id):
+            view = views.get(device_id)
+            if view is None:
+                view = views[device_id] = LiveDevice(self.managers[device_id], count)
+            return view
+        return Walker(device, self.owner_index())
+
+    def trace(self, device_id, destination, protocol="icmp", port=0):
+        # חבילה מ-device_id ליעד, ואם הגיעה - התשובה בחזרה. המקור הוא הכתובת של ממשק היציאה, כמו ב-IOS.
+        # מחזיר (walker, forward, reply) כאשר reply הוא None אם החבילה לא הגיעה
+        walker = self.walker()
+        view = walker.devices(device_id)
+        address = ip_to_int(destination)
+        source = address if view.is_local(address) else 0
+        resolved = None if source else view.resolve(address)
+        if resolved is not None and resolved[0] in view.links:
+            source = view.links[resolved[0]].address
+        packet = make_packet(protocol, int_to_ip(source), destination, SOURCE_PORT if port else 0, port)
+        translations = {}
+        forward = walker.walk(device_id, packet, translations)
+        reply = None
+        if forward.status == DELIVERED:
+            reply = walker.walk(forward.hops[-1].device_id, reverse(forward.packet), translations)
+        self.translations.update(translations)
+        return walker, forward, reply
+
+    def count(self, trace, packets, octets):
+        # מוני הממשקים לאורך הדרך: כניסה בכל מכשיר שהחבילה הגיעה אליו, יציאה בכל מכשיר שהעביר אותה הלאה
+        for hop in trace.hops:
+            manager = self.managers.get(hop.device_id)
+            if manager is None:
+                continue
+            if hop.ingress is not None:
+                manager.count_traffic(hop.ingress, "in", packets, octets)
+            if hop.status in (FORWARDED, NO_NEIGHBOR):
+                manager.count_traffic(hop.egress, "out", packets, octets)
+
+    def answered(self, walker, hop):
+        # האם הודעת ICMP מהמכשיר של hop (time exceeded או unreachable) מגיעה בחזרה למקור
+        if hop.address is None:
+            return True
+        status = walker.walk(hop.device_id, (1, hop.address, hop.packet[1], 0, 0), dict(self.translations)).status
+        return status == DELIVERED
+
+    def reachability(self, sources, destinations=None, protocol="icmp", port=0, workers=None):
+        # כל זוג (מקור, יעד): האם החבילה מגיעה והתשובה חוזרת. המקורות והיעדים הם כתובות של ממשקים במעבדה.
+        # מטריצה גדולה מתחלקת בין תהליכים, כל אחד עם עותק של המכשירים
+        destinations = list(sources if destinations is None else destinations)
+        sources = list(sources)
+        owners = self.owner_index()
+        for source in sources:
+            if ip_to_int(source) not in owners:
+                raise ValueError(f"Source {source} is not an address of an active interface")
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(sources) * len(destinations) < POOL_THRESHOLD:
+            return matrix_rows(self.walker(count=False), sources, destinations, protocol, port)
+        from concurrent.futures import ProcessPoolExecutor
+        devices = {device_id: LiveDevice(manager, False).freeze() for device_id, manager in self.managers.items()}
+        size = max(1, len(sources) // (workers * 4))
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(devices, owners)) as executor:
+            futures = [executor.submit(run_rows, sources[start:start + size], destinations, protocol, port)
+                       for start in range(0, len(sources), size)]
+            for future in futures:
+                results.update(future.result())
+        return results
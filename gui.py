@@ -1,11 +1,114 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QMainWindow, QTextEdit, QLineEdit, QVBoxLayout, QWidget
-from cli_simulator import CLISimulator
+from collections import deque
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import (QApplication, QHBoxLayout, QLabel, QLineEdit, QMainWindow, QPlainTextEdit,
+                             QVBoxLayout, QWidget)
+from cli_simulator import CLISimulator, STATUS_OK, STATUS_UNKNOWN
+from output_pipeline import Pager, as_lines
+
+# כמה שורות נשמרות בחלון; הישנות נזרקות (Qt מחזיק את הבלוקים כ-ring buffer)
+SCROLLBACK_LINES = 200000
+# הוספות לחלון מתקבצות ונכתבות פעם אחת בכל פריים
+FRAME_MS = 16
+
+
+class CommandWorker(QObject):
+    # מריץ פקודות ב-thread משלו, כך שפלט ארוך או הדבקת קונפיגורציה לא מקפיאים את החלון.
+    # הפלט נשלח בחלקים דרך signals; אחרי ההגדרה רק ה-thread הזה נוגע בסימולטור
+    output = pyqtSignal(str)
+    finished = pyqtSignal(str)
+
+    def __init__(self, simulator):
+        super().__init__()
+        self.simulator = simulator
+
+    @pyqtSlot(list)
+    def run_lines(self, lines):
+        simulator = self.simulator
+        # כמה שורות (הדבקה) נכתבות ל-SQLite ב-commit אחד, כמו CLISimulator.run_block
+        with simulator.data_manager.batch():
+            for line in lines:
+                self.output.emit(f"{simulator.prompt}{line}")
+                self.run_line(line.strip())
+        # ה-prompt אחרי הפקודה האחרונה
+        self.finished.emit(simulator.prompt)
+
+    def run_line(self, line):
+        simulator = self.simulator
+        if not line:
+            return
+        simulator.history.append(line)
+        if line == "?":
+            output = simulator.help_lines()
+        else:
+            result = simulator.execute(line, lazy=True)
+            if result.status == STATUS_UNKNOWN:
+                output = simulator.unknown_command_lines(line)
+            elif result.status != STATUS_OK:
+                output = f"שגיאה בביצוע הפקודה: {result.output}"
+            else:
+                output = result.output
+            simulator.hostname = simulator.data_manager.get_device_state("hostname") or simulator.hostname
+            simulator.update_prompt()
+        # בלי --More--: הפלט נשלח בחלקים של Pager.CHUNK שורות תוך כדי הפקתו
+        try:
+            pager = Pager(as_lines(output))
+            chunk = pager.next_chunk()
+            while chunk:
+                self.output.emit("\n".join(chunk))
+                chunk = pager.next_chunk()
+        except Exception as e:
+            self.output.emit(f"שגיאה בביצוע הפקודה: {str(e)}")
+
+
+class OutputView(QPlainTextEdit):
+    # חלון הפלט: טקסט פשוט (מהיר גם עם מיליוני שורות), scrollback מוגבל, וכל ההוספות שהגיעו
+    # במהלך פריים נכתבות יחד. גם התור עצמו מוגבל, כך שהצפה בין שני פריימים לא גדלה בלי סוף
+    def __init__(self, parent=None, scrollback=SCROLLBACK_LINES):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(scrollback)
+        self.pending = deque(maxlen=scrollback)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(FRAME_MS)
+        self.timer.timeout.connect(self.flush)
+
+    @pyqtSlot(str)
+    def append_text(self, text):
+        self.pending.extend(text.split("\n"))
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        if self.pending:
+            self.appendPlainText("\n".join(self.pending))
+            self.pending.clear()
+
+
+class CommandLine(QLineEdit):
+    # הדבקה של כמה שורות נשלחת כבלוק אחד במקום להידחס לשורת הקלט
+    pasted = pyqtSignal(list)
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Paste):
+            text = QApplication.clipboard().text()
+            if "\n" in text.strip():
+                self.pasted.emit(text.splitlines())
+                return
+        super().keyPressEvent(event)
+
 
 class CLISimulatorGUI(QMainWindow):
+    submit = pyqtSignal(list)
+
     def __init__(self):
         super().__init__()
         self.cli_simulator = CLISimulator()
+        self.worker_thread = None
+        self.worker = None
         self.init_ui()
 
     def init_ui(self):
@@ -13,27 +116,42 @@ class CLISimulatorGUI(QMainWindow):
         self.setGeometry(100, 100, 800, 600)
 
         # יצירת ווידג'טים
-        self.output_area = QTextEdit(self)
-        self.output_area.setReadOnly(True)
+        self.output_area = OutputView(self)
 
-        self.input_line = QLineEdit(self)
+        self.prompt_label = QLabel(self)
+        self.input_line = CommandLine(self)
         self.input_line.returnPressed.connect(self.process_command)
+        self.input_line.pasted.connect(self.process_lines)
 
         # סידור הווידג'טים
+        input_row = QHBoxLayout()
+        input_row.addWidget(self.prompt_label)
+        input_row.addWidget(self.input_line)
+
         layout = QVBoxLayout()
         layout.addWidget(self.output_area)
-        layout.addWidget(self.input_line)
+        layout.addLayout(input_row)
 
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
         # אתחול הסימולטור
-        self.output_area.append("ברוכים הבאים לסימולטור CLI של סיסקו!")
-        self.output_area.append("אנא בחר סוג מכשיר (router/switch):")
+        self.output_area.append_text("ברוכים הבאים לסימולטור CLI של סיסקו!")
+        self.output_area.append_text("אנא בחר סוג מכשיר (router/switch):")
 
         self.state = "choose_device"
 
+    def start_worker(self):
+        # מכאן והלאה הסימולטור רץ רק ב-thread של ה-worker; הפקודות עוברות אליו בתור לפי הסדר
+        self.worker_thread = QThread(self)
+        self.worker = CommandWorker(self.cli_simulator)
+        self.worker.moveToThread(self.worker_thread)
+        self.submit.connect(self.worker.run_lines)
+        self.worker.output.connect(self.output_area.append_text)
+        self.worker.finished.connect(self.prompt_label.setText)
+        self.worker_thread.start()
+
     def process_command(self):
         command = self.input_line.text()
         self.input_line.clear()
@@ -41,24 +159,34 @@ class CLISimulatorGUI(QMainWindow):
         if self.state == "choose_device":
             if command.lower() in ["router", "switch"]:
                 self.cli_simulator.set_device_type(command.lower())
-                self.output_area.append(f"נבחר מכשיר: {command}")
-                self.output_area.append("אנא בחר שפת ממשק (he/en):")
+                self.output_area.append_text(f"נבחר מכשיר: {command}")
+                self.output_area.append_text("אנא בחר שפת ממשק (he/en):")
                 self.state = "choose_language"
             else:
-                self.output_area.append("בחירה לא חוקית. אנא בחר router או switch.")
+                self.output_area.append_text("בחירה לא חוקית. אנא בחר router או switch.")
         elif self.state == "choose_language":
             if command.lower() in ["he", "en"]:
                 self.cli_simulator.set_language(command.lower())
-                self.output_area.append(f"נבחרה שפה: {command}")
-                self.output_area.append(self.cli_simulator.prompt)
+                self.output_area.append_text(f"נבחרה שפה: {command}")
+                self.prompt_label.setText(self.cli_simulator.prompt)
+                self.start_worker()
                 self.state = "simulator"
             else:
-                self.output_area.append("בחירה לא חוקית. אנא בחר he או en.")
+                self.output_area.append_text("בחירה לא חוקית. אנא בחר he או en.")
         elif self.state == "simulator":
-            result = self.cli_simulator.default(command)
-            self.output_area.append(f"{self.cli_simulator.prompt}{command}")
-            self.output_area.append(result)
-            self.output_area.append(self.cli_simulator.prompt)
+            self.submit.emit([command])
+
+    def process_lines(self, lines):
+        if self.state == "simulator":
+            self.submit.emit(lines)
+
+    def closeEvent(self, event):
+        if self.worker_thread is not None:
+            # הפקודה שרצה מסתיימת לפני הסגירה; מה שעוד בתור לא ירוץ
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+        self.cli_simulator.data_manager.flush()
+        super().closeEvent(event)
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,322 @@
+# interface_table.py
+
+import bisect
+import re
+import sys
+from array import array
+from config_renderer import natural_key
+
+# מוני התנועה של כל ממשק; עמודה (array) לכל מונה, ובה שורה לכל ממשק
+COUNTERS = ("in_packets", "in_octets", "out_packets", "out_octets")
+MAX_VLAN = 4094
+# העמודה Status של show interfaces status לפי הסטטוס של הממשק
+STATUS_NAMES = {"up": "connected", "administratively down": "disabled", "down": "notconnect"}
+# פרוטוקול ה-EtherChannel לפי ה-mode של channel-group
+CHANNEL_PROTOCOLS = {"active": "LACP", "passive": "LACP", "desirable": "PAgP", "auto": "PAgP", "on": "-"}
+# רוחב פס (kbps) ו-delay (מיקרו-שניות) ברירת מחדל לפי סוג הממשק, כמו ב-IOS; הבדיקה לפי הסדר
+DEFAULT_METRICS = (("GigabitEthernet", 1000000, 10), ("FastEthernet", 100000, 100), ("Ethernet", 10000, 1000),
+                   ("Serial", 1544, 20000), ("Loopback", 8000000, 5000))
+SHORT_NAMES = (("GigabitEthernet", "Gi"), ("FastEthernet", "Fa"), ("Ethernet", "Et"), ("Serial", "Se"),
+               ("Loopback", "Lo"))
+# סוג הממשק (אותיות) והמספר שלו, עם רווח אופציונלי ביניהם: "gi0/1", "Gig 0/1", "GigabitEthernet0/1"
+INTERFACE_NAME = re.compile(r"([A-Za-z]+)\s*(\d[\d/.:]*)$")
+
+
+def interface_metric(name, config):
+    # (bandwidth, delay במיקרו-שניות); הפקודה delay בממשק היא ביחידות של 10 מיקרו-שניות
+    bandwidth, delay = 100000, 100
+    for prefix, default_bandwidth, default_delay in DEFAULT_METRICS:
+        if name.startswith(prefix):
+            bandwidth, delay = default_bandwidth, default_delay
+            break
+    if config.get("bandwidth"):
+        bandwidth = config["bandwidth"]
+    if config.get("delay"):
+        delay = config["delay"] * 10
+    return bandwidth, delay
+
+
+def short_interface(name):
+    for prefix, short in SHORT_NAMES:
+        if name.startswith(prefix):
+            return short + name[len(prefix):]
+    return name
+
+
+def canonical_interface(name):
+    # השם המלא של ממשק שנכתב מקוצר, כמו שה-CLI של IOS משלים אותו; כל תחילית של סוג מוכר מספיקה.
+    # סוג לא מוכר (Vlan, Port-channel) נשאר כמו שהוא
+    match = INTERFACE_NAME.match(name)
+    if match is None:
+        return name
+    kind, number = match.groups()
+    kind = kind.lower()
+    for prefix, short in SHORT_NAMES:
+        if prefix.lower().startswith(kind):
+            return prefix + number
+    return name
+
+
+def parse_vlan_list(text):
+    # "1,10,20-30" -> קבוצת מספרי VLAN; "all" ו-"none" כמו ב-switchport trunk allowed vlan
+    if text == "all":
+        return set(range(1, MAX_VLAN + 1))
+    if text == "none":
+        return set()
+    vlans = set()
+    for part in text.split(","):
+        low, _, high = part.partition("-")
+        if not low.isdigit() or (high and not high.isdigit()):
+            raise ValueError(f"Invalid VLAN list: {text}")
+        low, high = int(low), int(high or low)
+        if not 1 <= low <= high <= MAX_VLAN:
+            raise ValueError(f"Invalid VLAN list: {text}")
+        vlans.update(range(low, high + 1))
+    return vlans
+
+
+def format_vlan_list(vlans):
+    if not vlans:
+        return "none"
+    ranges = []
+    for vlan in sorted(vlans):
+        if ranges and ranges[-1][1] == vlan - 1:
+            ranges[-1][1] = vlan
+        else:
+            ranges.append([vlan, vlan])
+    return ",".join(str(low) if low == high else f"{low}-{high}" for low, high in ranges)
+
+
+class InterfaceRecord:
+    # ממשק אחד כפי שפקודות ה-show צריכות אותו. המחרוזות עוברות intern, כך שאלפי פורטים עם אותו
+    # סטטוס, mode ו-VLAN מחזיקים עותק אחד של כל ערך
+    __slots__ = ("name", "short", "key", "row", "status", "mode", "vlan", "native_vlan", "allowed", "channel_group",
+                 "channel_mode", "address", "mask", "description", "bandwidth", "delay")
+
+    def __init__(self, name, row):
+        self.name = sys.intern(name)
+        self.short = sys.intern(short_interface(name))
+        self.key = natural_key(name)
+        self.row = row
+
+    def load(self, config):
+        intern = sys.intern
+        self.status = intern(config.get("status") or "administratively down")
+        self.address = config.get("ip_address") or None
+        self.mask = config.get("subnet_mask") or None
+        self.mode = config.get("switchport_mode") or None
+        self.mode = intern(self.mode) if self.mode else None
+        # פורט access (או פורט שלא הוגדר, כמו ב-IOS) שייך ל-VLAN שלו; ממשק עם כתובת IP הוא routed
+        if self.mode == "trunk" or (self.address and not self.mode):
+            self.vlan = None
+        else:
+            self.vlan = intern(str(config.get("switchport_access_vlan") or "1"))
+        self.native_vlan = intern(str(config.get("switchport_trunk_native_vlan") or "1"))
+        self.allowed = config.get("switchport_trunk_allowed_vlan") or "1-4094"
+        group, _, mode = (config.get("channel_group") or "").partition(" mode ")
+        self.channel_group = int(group) if group.isdigit() else None
+        self.channel_mode = intern(mode) if mode else None
+        self.description = config.get("description") or ""
+        self.bandwidth, self.delay = interface_metric(self.name, config)
+
+    @property
+    def up(self):
+        return self.status == "up"
+
+
+class InterfaceTable:
+    # הממשקים של מכשיר כרשומות עם __slots__, ממוינים בסדר של IOS, עם אינדקסים משניים לפי VLAN, לפי
+    # switchport mode, לפי סטטוס ולפי channel-group - כך ש-show מסונן עובר רק על הממשקים הרלוונטיים.
+    # המונים נשמרים בעמודות array; clear counters לכל הממשקים רק מקדם epoch, ושורה שה-epoch שלה ישן
+    # מתאפסת כשניגשים אליה
+    def __init__(self, interfaces=None):
+        self.records = {}
+        self.keys = []
+        self.order = []
+        self.by_vlan = {}
+        self.by_mode = {}
+        self.by_status = {}
+        self.by_channel = {}
+        self.counters = {name: array("Q") for name in COUNTERS}
+        self.epochs = array("Q")
+        self.epoch = 0
+        self.free_rows = []
+        self.sync(interfaces or {})
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def get(self, name):
+        return self.records.get(name)
+
+    def _index(self, record):
+        if record.vlan is not None:
+            self.by_vlan.setdefault(record.vlan, {})[record.name] = record
+        if record.mode is not None:
+            self.by_mode.setdefault(record.mode, {})[record.name] = record
+        self.by_status.setdefault(record.status, {})[record.name] = record
+        if record.channel_group is not None:
+            self.by_channel.setdefault(record.channel_group, {})[record.name] = record
+
+    def _unindex(self, record):
+        for index, value in ((self.by_vlan, record.vlan), (self.by_mode, record.mode),
+                             (self.by_status, record.status), (self.by_channel, record.channel_group)):
+            members = index.get(value)
+            if members is not None:
+                members.pop(record.name, None)
+                if not members:
+                    del index[value]
+
+    def set(self, name, config):
+        record = self.records.get(name)
+        if record is None:
+            if self.free_rows:
+                row = self.free_rows.pop()
+            else:
+                row = len(self.epochs)
+                self.epochs.append(self.epoch)
+                for column in self.counters.values():
+                    column.append(0)
+            record = InterfaceRecord(name, row)
+            self._reset_row(row)
+            self.records[record.name] = record
+            position = self._position(record.key)
+            self.keys.insert(position, record.key)
+            self.order.insert(position, record)
+        else:
+            self._unindex(record)
+        record.load(config)
+        self._index(record)
+        return record
+
+    def remove(self, name):
+        record = self.records.pop(name, None)
+        if record is None:
+            return
+        self._unindex(record)
+        position = self._position(record.key)
+        del self.keys[position]
+        del self.order[position]
+        self.free_rows.append(record.row)
+
+    def sync(self, interfaces):
+        # אחרי החלפה של כל הממשקים (configure replace, ביטול batch): המונים של ממשקים שנשארו נשמרים
+        for name in [name for name in self.records if name not in interfaces]:
+            self.remove(name)
+        for name, config in interfaces.items():
+            self.set(name, config)
+
+    def _position(self, key):
+        return bisect.bisect_left(self.keys, key)
+
+    @staticmethod
+    def select(index, value):
+        # הרשומות באינדקס משני (by_vlan, by_mode...), בסדר של IOS
+        return sorted(index.get(value, {}).values(), key=lambda record: record.key)
+
+    def _reset_row(self, row):
+        for column in self.counters.values():
+            column[row] = 0
+        self.epochs[row] = self.epoch
+
+    def _row(self, record):
+        row = record.row
+        if self.epochs[row] != self.epoch:
+            self._reset_row(row)
+        return row
+
+    def count(self, name, direction, packets, octets):
+        record = self.records.get(name)
+        if record is None:
+            return
+        row = self._row(record)
+        self.counters[f"{direction}_packets"][row] += packets
+        self.counters[f"{direction}_octets"][row] += octets
+
+    def read(self, record):
+        row = self._row(record)
+        return {name: column[row] for name, column in self.counters.items()}
+
+    def clear(self, name=None):
+        if name is None:
+            self.epoch += 1
+        else:
+            self._reset_row(self.records[name].row)
+
+    # פלט בסגנון IOS, שורה אחר שורה (generator)
+
+    def show_ip_brief(self):
+        yield f"{'Interface':<23}{'IP-Address':<16}OK? Method {'Status':<22}Protocol"
+        for record in self.order:
+            address, method = (record.address, "manual") if record.address else ("unassigned", "unset")
+            protocol = "up" if record.up else "down"
+            yield f"{record.name:<23}{address:<16}YES {method:<7}{record.status:<22}{protocol}"
+
+    def show_status(self, records=None):
+        yield f"{'Port':<10}{'Name':<19}{'Status':<13}{'Vlan':<11}{'Duplex':<7} {'Speed':<6} Type"
+        for record in self.order if records is None else records:
+            status = STATUS_NAMES.get(record.status, "notconnect")
+            vlan = "trunk" if record.mode == "trunk" else record.vlan or "routed"
+            speed = "a-1000" if record.bandwidth >= 1000000 else f"a-{record.bandwidth // 1000}"
+            yield f"{record.short:<10}{record.description[:18]:<19}{status:<13}{vlan:<11}{'a-full':<7} {speed:<6} " \
+                  "10/100/1000BaseTX"
+
+    def show_trunk(self, vlans):
+        # vlans - ה-VLANs שמוגדרים במכשיר, לעמודה "allowed and active"
+        trunks = self.select(self.by_mode, "trunk")
+        yield f"{'Port':<12}{'Mode':<17}{'Encapsulation':<15}{'Status':<14}Native vlan"
+        for record in trunks:
+            status = "trunking" if record.up else "not-trunking"
+            yield f"{record.short:<12}{'on':<17}{'802.1q':<15}{status:<14}{record.native_vlan}"
+        yield ""
+        yield f"{'Port':<12}Vlans allowed on trunk"
+        for record in trunks:
+            yield f"{record.short:<12}{record.allowed}"
+        yield ""
+        yield f"{'Port':<12}Vlans allowed and active in management domain"
+        for record in trunks:
+            yield f"{record.short:<12}{format_vlan_list(parse_vlan_list(record.allowed) & vlans)}"
+
+    def show_counters(self):
+        rows = [(record, self.read(record)) for record in self.order]
+        yield f"{'Port':<16}{'InOctets':>14}{'InUcastPkts':>15}"
+        for record, counters in rows:
+            yield f"{record.short:<16}{counters['in_octets']:>14}{counters['in_packets']:>15}"
+        yield ""
+        yield f"{'Port':<16}{'OutOctets':>14}{'OutUcastPkts':>15}"
+        for record, counters in rows:
+            yield f"{record.short:<16}{counters['out_octets']:>14}{counters['out_packets']:>15}"
+
+    def show_interfaces(self, records=None):
+        for record in self.order if records is None else records:
+            protocol = "up" if record.up else "down"
+            yield f"{record.name} is {record.status}, line protocol is {protocol}"
+            if record.description:
+                yield f"  Description: {record.description}"
+            if record.address and record.mask:
+                length = sum(bin(int(octet)).count("1") for octet in record.mask.split("."))
+                yield f"  Internet address is {record.address}/{length}"
+            yield f"  MTU 1500 bytes, BW {record.bandwidth} Kbit/sec, DLY {record.delay} usec,"
+            yield "  Encapsulation ARPA, loopback not set"
+            counters = self.read(record)
+            yield f"     {counters['in_packets']} packets input, {counters['in_octets']} bytes"
+            yield f"     {counters['out_packets']} packets output, {counters['out_octets']} bytes"
+
+    def show_etherchannel(self):
+        yield "Flags:  D - down        P - bundled in port-channel"
+        yield "        S - Layer2      R - Layer3      U - in use"
+        yield ""
+        yield f"Number of channel-groups in use: {len(self.by_channel)}"
+        yield ""
+        yield "Group  Port-channel  Protocol    Ports"
+        yield "------+-------------+-----------+-----------------------------------------------"
+        for group in sorted(self.by_channel):
+            members = self.select(self.by_channel, group)
+            layer = "R" if all(record.address for record in members) else "S"
+            state = "U" if any(record.up for record in members) else "D"
+            ports = "  ".join(f"{record.short}({'P' if record.up else 'D'})" for record in members)
+            protocol = CHANNEL_PROTOCOLS.get(members[0].channel_mode, "-")
+            yield f"{group:<7}{f'Po{group}({layer}{state})':<14}{protocol:<12}{ports}"
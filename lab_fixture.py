@@ -0,0 +1,60 @@
+# lab_fixture.py
+
+from cli_simulator import STATUS_OK
+from data_manager import DURABILITY_CHECKPOINT
+from device_registry import DeviceRegistry
+
+# יהלום: R1-R2 ב-10.0.12.0/24, R1-R3 ב-10.0.13.0/24, R2-R4 ב-10.0.24.0/24, R3-R4 ב-10.0.34.0/24
+DIAMOND_LINKS = {"R1": [("GigabitEthernet0/0", "10.0.12.1"), ("GigabitEthernet0/1", "10.0.13.1")],
+                 "R2": [("GigabitEthernet0/0", "10.0.12.2"), ("GigabitEthernet0/1", "10.0.24.2")],
+                 "R3": [("GigabitEthernet0/0", "10.0.13.3"), ("GigabitEthernet0/1", "10.0.34.3")],
+                 "R4": [("GigabitEthernet0/0", "10.0.24.4"), ("GigabitEthernet0/1", "10.0.34.4")]}
+
+
+def interface_lines(interface, address, mask="255.255.255.0", extra=()):
+    return [f"interface {interface}", f"ip address {address} {mask}", "no shutdown", *extra, "exit"]
+
+
+def ring_links(count=12, chords=((0, 6), (3, 9), (2, 7))):
+    # טבעת של count נתבים עם קיצורים, subnet ‏10.1.<n>.0/24 לכל קישור: {name: [(interface, address)]}
+    links = [(i, (i + 1) % count) for i in range(count)] + list(chords)
+    addresses = {i: [] for i in range(count)}
+    for number, (a, b) in enumerate(links):
+        addresses[a].append(f"10.1.{number}.1")
+        addresses[b].append(f"10.1.{number}.2")
+    return {f"R{i}": [(f"GigabitEthernet0/{port}", address) for port, address in enumerate(addresses[i])]
+            for i in range(count)}
+
+
+class LabMixin:
+    # נתבים ב-DeviceRegistry אחד. LINKS: {name: [(interface, address[, mask[, lines]])]}, CONFIG - שורות שכל
+    # נתב מקבל אחרי הממשקים, EXTRA - שורות לנתב מסוים, ו-LOOPBACKS נותן לנתב ה-n את Loopback0 בכתובת 10.255.0.n
+    LINKS = {}
+    CONFIG = []
+    EXTRA = {}
+    LOOPBACKS = False
+
+    def setUp(self):
+        self.registry, self.routers = self.build_lab(self.LINKS, self.CONFIG, self.LOOPBACKS, self.EXTRA)
+
+    def build_lab(self, links, config=(), loopbacks=False, extra=None):
+        registry = DeviceRegistry(':memory:', durability=DURABILITY_CHECKPOINT)
+        self.addCleanup(registry.close)
+        routers = {}
+        for number, (name, interfaces) in enumerate(links.items(), 1):
+            lines = ["enable", "configure terminal"]
+            for link in interfaces:
+                lines += interface_lines(*link)
+            if loopbacks:
+                lines += interface_lines("Loopback0", f"10.255.0.{number}", "255.255.255.255")
+            lines += list(config) + (extra or {}).get(name, []) + ["end"]
+            routers[name] = registry.add_device(name, "router")
+            self.run_lines(routers[name], lines)
+        return registry, routers
+
+    def run_lines(self, simulator, lines):
+        outputs = []
+        for result in simulator.run_script(lines):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+            outputs.append(result.output)
+        return outputs
@@ -0,0 +1,108 @@
+# lab_runner.py
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from cli_simulator import STATUS_OK
+from command_catalog import CommandCatalog
+from logger import Logger, set_level
+from script_runner import create_simulator
+
+# משימה אחת: סקריפט קונפיגורציה שרץ על מכשיר נקי. lines - רשימת שורות, או path - קובץ שה-worker קורא בעצמו
+LabJob = namedtuple("LabJob", ["job_id", "device_type", "lines", "path"], defaults=(None, None))
+LabResult = namedtuple("LabResult", ["job_id", "results", "state", "elapsed"])
+
+# הקטלוג של תהליך ה-worker; נבנה פעם אחת ב-init_worker ומשמש את כל המשימות שלו
+worker_catalog = None
+
+
+def init_worker(catalog_path='commands.json', log_level=logging.WARNING):
+    global worker_catalog
+    worker_catalog = CommandCatalog.shared(catalog_path)
+    # אינדקס ההצעות נבנה מראש, כדי שהמשימה הראשונה בכל worker לא תשלם עליו
+    worker_catalog.suggestions
+    Logger()
+    set_level(log_level)
+
+
+def run_job(job, include_state=False, stop_on_error=False):
+    # כל משימה מקבלת מסד משלה בזיכרון, כך שמשימות מקבילות לא נוגעות זו במצב של זו
+    start = time.perf_counter()
+    simulator = create_simulator(job.device_type, worker_catalog)
+    try:
+        if job.path is not None:
+            with open(job.path, 'r', encoding='utf-8') as f:
+                results = list(simulator.run_script(f, stop_on_error))
+        else:
+            results = list(simulator.run_script(job.lines, stop_on_error))
+        state = simulator.data_manager.state if include_state else None
+    finally:
+        simulator.data_manager.close()
+    return LabResult(job.job_id, results, state, time.perf_counter() - start)
+
+
+def run_jobs(jobs, workers=None, catalog_path='commands.json', include_state=False, stop_on_error=False,
+             window=None):
+    # מפזר את המשימות על פני הליבות ומחזיר את התוצאות כ-generator, לפי סדר המשימות.
+    # לכל היותר window משימות בדרך בכל רגע, כדי שכיתה של אלפי הגשות לא תישמר כולה בזיכרון
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(catalog_path,)) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(run_job, job, include_state, stop_on_error))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def summarize(result):
+    statuses = {}
+    errors = []
+    for command in result.results:
+        statuses[command.status] = statuses.get(command.status, 0) + 1
+        if command.status != STATUS_OK:
+            errors.append({"line": command.line, "status": command.status, "output": command.output})
+    summary = {"job": result.job_id, "lines": len(result.results), "statuses": statuses, "errors": errors,
+               "elapsed": round(result.elapsed, 6)}
+    if result.state is not None:
+        summary["state"] = result.state
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="הרצה מקבילית של קבצי קונפיגורציה על פני כל הליבות")
+    parser.add_argument("files", nargs="+", help="קבצי קונפיגורציה, מכשיר נקי לכל קובץ")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--device-type", choices=["router", "switch"], default="router")
+    parser.add_argument("--include-state", action="store_true", help="הוספת מצב המכשיר הסופי לכל תוצאה")
+    parser.add_argument("--stop-on-error", action="store_true")
+    parser.add_argument("--summary", action="store_true", help="סיכום ומהירות ל-stderr")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    jobs = (LabJob(path, args.device_type, path=path) for path in args.files)
+    lines = 0
+    failed = 0
+    for result in run_jobs(jobs, args.workers, include_state=args.include_state, stop_on_error=args.stop_on_error):
+        summary = summarize(result)
+        lines += summary["lines"]
+        failed += bool(summary["errors"])
+        sys.stdout.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    elapsed = time.perf_counter() - start
+
+    if args.summary:
+        sys.stderr.write(json.dumps({"jobs": len(args.files), "failed_jobs": failed, "lines": lines,
+                                     "seconds": round(elapsed, 3),
+                                     "lines_per_second": round(lines / elapsed) if elapsed else 0}) + "\n")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
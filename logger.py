@@ -1,47 +1,195 @@
 # logger.py
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 
-class Logger:
-    def __init__(self, log_file='cisco_simulator.log'):
-        self.logger = logging.getLogger('CiscoSimulator')
-        self.logger.setLevel(logging.DEBUG)
+ROOT_LOGGER = 'CiscoSimulator'
+
+# הגדרות מהסביבה, כדי לשנות תיעוד בלי לגעת בקוד:
+# CISCO_SIM_LOG_LEVELS="WARNING,parser=DEBUG"  - רמה כללית ורמה לכל תת-מערכת
+# CISCO_SIM_LOG_FORMAT=json                    - שורת JSON לכל רשומה במקום טקסט
+# CISCO_SIM_LOG_SAMPLE="parser=100"            - רק אחת מכל 100 רשומות DEBUG מכל שורת קוד
+ENV_LEVELS = 'CISCO_SIM_LOG_LEVELS'
+ENV_FORMAT = 'CISCO_SIM_LOG_FORMAT'
+ENV_SAMPLE = 'CISCO_SIM_LOG_SAMPLE'
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_setup_lock = threading.Lock()
+_settings = None
+_listener = None
+_pid = None
+
+
+class JsonFormatter(logging.Formatter):
+    # שורת JSON אחת לכל רשומה, לעיבוד הלוגים בכלים חיצוניים
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    # מכניס את הרשומה לתור של ה-thread הכותב. ההודעה מורכבת כבר כאן, כי הארגומנטים עלולים להשתנות
+    # אחרי הקריאה, אבל בלי העתקת הרשומה ובלי Formatter - את השורה המלאה מעצב הכותב
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    # מעביר רק אחת מכל every רשומות DEBUG מאותה שורת קוד; רשומות ברמה גבוהה יותר עוברות תמיד
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+        self.counts = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.every <= 1:
+            return True
+        key = (record.pathname, record.lineno)
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        return count % self.every == 0
+
 
-        # יצירת תיקיית לוגים אם היא לא קיימת
-        log_dir = 'logs'
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+def parse_settings(value):
+    # "WARNING,parser=DEBUG" -> {None: "WARNING", "parser": "DEBUG"}
+    result = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, setting = part.rpartition("=")
+        result[name.strip() or None] = setting.strip()
+    return result
 
-        # הוספת תאריך לשם הקובץ
-        date_str = datetime.now().strftime("%Y-%m-%d")
-        log_file = f'{log_dir}/{date_str}_{log_file}'
 
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
+def configure(log_file='cisco_simulator.log', level=logging.DEBUG, console_level=logging.INFO, json_format=None,
+              levels=None, sample=None, log_dir='logs', console=True):
+    # מתקין פעם אחת QueueHandler יחיד על הלוגר הראשי. הכתיבה לקובץ ולמסך נעשית ב-thread של
+    # QueueListener, כך שהפקודה עצמה רק מכניסה רשומה לתור. קריאה נוספת מחליפה את ההגדרות
+    global _settings, _listener, _pid
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
 
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
+        _settings = dict(log_file=log_file, level=level, console_level=console_level, json_format=json_format,
+                         levels=levels, sample=sample, log_dir=log_dir, console=console)
+        if json_format is None:
+            json_format = os.environ.get(ENV_FORMAT, "").lower() == "json"
+        levels = {**parse_settings(os.environ.get(ENV_LEVELS)), **(levels or {})}
+        sample = {**{name: int(every) for name, every in parse_settings(os.environ.get(ENV_SAMPLE)).items()},
+                  **(sample or {})}
 
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
+        formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+        handlers = []
+        if log_file:
+            # יצירת תיקיית לוגים אם היא לא קיימת, ותאריך בשם הקובץ
+            os.makedirs(log_dir, exist_ok=True)
+            date_str = datetime.now().strftime("%Y-%m-%d")
+            file_handler = logging.FileHandler(f'{log_dir}/{date_str}_{log_file}', encoding='utf-8')
+            file_handler.setLevel(logging.DEBUG)
+            handlers.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(console_level)
+            handlers.append(console_handler)
+        for handler in handlers:
+            handler.setFormatter(formatter)
 
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        queue_handler = BackgroundHandler(queue.SimpleQueue())
+        root.addHandler(queue_handler)
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _pid = os.getpid()
 
-    def debug(self, message):
-        self.logger.debug(message)
+        # הגדרות קודמות של תת-מערכות (רמות, דגימה) מתאפסות לפני שההגדרות החדשות נקבעות
+        for target in [root] + subsystem_loggers():
+            target.setLevel(logging.NOTSET)
+            for old in [f for f in target.filters if isinstance(f, SamplingFilter)]:
+                target.removeFilter(old)
+        root.setLevel(level)
+        for name, subsystem_level in levels.items():
+            set_level(subsystem_level, name)
+        for name, every in sample.items():
+            logging.getLogger(ROOT_LOGGER if name is None else f"{ROOT_LOGGER}.{name}").addFilter(
+                SamplingFilter(every))
 
-    def info(self, message):
-        self.logger.info(message)
 
-    def warning(self, message):
-        self.logger.warning(message)
+def subsystem_loggers():
+    return [logging.getLogger(name) for name in list(logging.root.manager.loggerDict)
+            if name.startswith(ROOT_LOGGER + ".")]
 
-    def error(self, message):
-        self.logger.error(message)
 
-    def critical(self, message):
-        self.logger.critical(message)
+def set_level(level, subsystem=None):
+    # רמת התיעוד של תת-מערכת (parser, cli, server...) או של כל הסימולטור
+    logging.getLogger(ROOT_LOGGER if subsystem is None else f"{ROOT_LOGGER}.{subsystem}").setLevel(level)
+
+
+def flush():
+    # מחכה שכל מה שבתור ייכתב (לבדיקות ולפני יציאה)
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+
+def shutdown():
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _after_fork():
+    # ה-thread של הכותב לא עובר ל-fork; תהליך בן (lab_runner) מתקין את אותן הגדרות מחדש
+    global _listener
+    if _settings is not None and _pid != os.getpid():
+        _listener = None
+        targets = [logging.getLogger(ROOT_LOGGER)] + subsystem_loggers()
+        levels = [target.level for target in targets]
+        configure(**_settings)
+        for target, level in zip(targets, levels):
+            target.setLevel(level)
+
+
+atexit.register(shutdown)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class Logger:
+    # מופע קל: הלוגר של תת-המערכת עם המתודות שלו. ההודעה מעוצבת רק אם הרמה פעילה:
+    # logger.debug("Parsing command: %s", line)
+    def __init__(self, log_file='cisco_simulator.log', subsystem=None):
+        if _settings is None:
+            configure(log_file)
+        self.logger = logging.getLogger(ROOT_LOGGER if subsystem is None else f"{ROOT_LOGGER}.{subsystem}")
+        # המתודות של logging.Logger עצמו: בלי קריאה נוספת בדרך, והמיקום ברשומה הוא של הקורא
+        self.debug = self.logger.debug
+        self.info = self.logger.info
+        self.warning = self.logger.warning
+        self.error = self.logger.error
+        self.critical = self.logger.critical
+        self.isEnabledFor = self.logger.isEnabledFor
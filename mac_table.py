@@ -0,0 +1,300 @@
+# mac_table.py
+
+import math
+import zlib
+from sim_clock import MonotonicClock
+
+DEFAULT_AGING_TIME = 300
+# 0 מבטל aging; אחרת 10 עד 1,000,000 שניות, כמו ב-IOS
+MIN_AGING_TIME = 10
+MAX_AGING_TIME = 1000000
+
+TYPE_DYNAMIC = "DYNAMIC"
+TYPE_STATIC = "STATIC"
+# ה-OUI של Cisco, לכתובות ה-burned-in של הממשקים
+CISCO_OUI = 0x00000C
+
+
+def parse_mac(text):
+    # "0011.2233.4455", "00:11:22:33:44:55" או "00-11-22-33-44-55" -> מספר של 48 ביט
+    digits = text.replace(".", "").replace(":", "").replace("-", "")
+    if len(digits) != 12:
+        raise ValueError(f"Invalid MAC address: {text}")
+    try:
+        return int(digits, 16)
+    except ValueError:
+        raise ValueError(f"Invalid MAC address: {text}")
+
+
+def format_mac(value):
+    digits = f"{value:012x}"
+    return f"{digits[0:4]}.{digits[4:8]}.{digits[8:12]}"
+
+
+def interface_mac(device_id, interface):
+    # הכתובת של ממשק: OUI של Cisco ו-24 ביט שנגזרים מהמכשיר ומהממשק, כך שהיא יציבה בין הרצות
+    return CISCO_OUI << 24 | zlib.crc32(f"{device_id}/{interface}".encode()) & 0xFFFFFF
+
+
+def parse_static_entry(text):
+    # ההמשך של "mac address-table static": "<mac> vlan <id> interface <name>" -> (vlan, mac, interface)
+    tokens = text.split()
+    if len(tokens) < 5 or tokens[1] != "vlan" or not tokens[2].isdigit() or tokens[3] != "interface":
+        raise ValueError("expected '<mac> vlan <id> interface <name>'")
+    return int(tokens[2]), parse_mac(tokens[0]), "".join(tokens[4:])
+
+
+def format_static_entry(vlan, mac, interface):
+    return f"{format_mac(mac)} vlan {vlan} interface {interface}"
+
+
+def validate_aging_time(seconds):
+    if seconds != 0 and not MIN_AGING_TIME <= seconds <= MAX_AGING_TIME:
+        raise ValueError(f"Aging time must be 0 or between {MIN_AGING_TIME} and {MAX_AGING_TIME}")
+    return seconds
+
+
+class TimerWheel:
+    # גלגל טיימרים היררכי בשניות שלמות (ticks): ברמה 0 יש 64 תאים של tick אחד, ברמה 1 64 תאים של
+    # 64 ticks וכן הלאה. טיימר נכנס לרמה הנמוכה ביותר שמכסה אותו, ויורד רמה כשהזמן מגיע לתא שלו.
+    # התקדמות עולה לפי הטיימרים שפגו (וירידות הרמה), לא לפי מספר הטיימרים בגלגל או אורך פרק הזמן
+    BITS = 6
+    SIZE = 1 << BITS
+    MASK = SIZE - 1
+
+    def __init__(self, start=0, levels=4):
+        self.levels = levels
+        self.wheels = [[[] for _ in range(self.SIZE)] for _ in range(levels)]
+        # כמה טיימרים יש בכל רמה, כדי לדלג על פרקי זמן שאין בהם מה לעשות
+        self.level_counts = [0] * levels
+        # ה-tick האחרון שעובד; טיימר עם deadline <= current כבר פג
+        self.current = start
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, deadline, item):
+        # מחזיר את ה-deadline בפועל: טיימר שכבר עבר זמנו יפוג ב-tick הבא
+        deadline = max(deadline, self.current + 1)
+        self._place(deadline, item)
+        self.count += 1
+        return deadline
+
+    def _place(self, deadline, item):
+        delta = deadline - self.current
+        level = 0
+        while level < self.levels - 1 and delta >> (self.BITS * (level + 1)):
+            level += 1
+        # מעבר לרמה העליונה הטיימר נשאר בה ופשוט יוכנס אליה שוב כשהתא שלו יגיע
+        self.wheels[level][(deadline >> (self.BITS * level)) & self.MASK].append((deadline, item))
+        self.level_counts[level] += 1
+
+    def advance(self, tick):
+        # מקדם עד tick ומחזיר [(deadline, item)] של כל מה שפג בדרך
+        expired = []
+        wheels = self.wheels
+        counts = self.level_counts
+        while self.current < tick:
+            if not self.count:
+                self.current = tick
+                break
+            # עד הגבול הבא של הרמה הנמוכה שיש בה טיימרים לא קורה כלום - קופצים אליו
+            lowest = next(level for level in range(self.levels) if counts[level])
+            if lowest:
+                span = 1 << (self.BITS * lowest)
+                self.current = min(tick, (self.current // span + 1) * span - 1)
+                if self.current == tick:
+                    break
+            self.current += 1
+            now = self.current
+            for level in range(1, self.levels):
+                if now & ((1 << (self.BITS * level)) - 1):
+                    break
+                index = (now >> (self.BITS * level)) & self.MASK
+                bucket = wheels[level][index]
+                if bucket:
+                    wheels[level][index] = []
+                    counts[level] -= len(bucket)
+                    for deadline, item in bucket:
+                        self._place(max(deadline, now), item)
+            index = now & self.MASK
+            bucket = wheels[0][index]
+            if bucket:
+                wheels[0][index] = []
+                counts[0] -= len(bucket)
+                self.count -= len(bucket)
+                expired.extend(bucket)
+        return expired
+
+    def clear(self):
+        self.wheels = [[[] for _ in range(self.SIZE)] for _ in range(self.levels)]
+        self.level_counts = [0] * self.levels
+        self.count = 0
+
+
+class MacEntry:
+    __slots__ = ("vlan", "mac", "port", "type", "last_seen", "deadline")
+
+    def __init__(self, vlan, mac, port, entry_type, last_seen):
+        self.vlan = vlan
+        self.mac = mac
+        self.port = port
+        self.type = entry_type
+        self.last_seen = last_seen
+        self.deadline = None
+
+
+class MacTable:
+    # טבלת ה-MAC של מתג: (vlan, mac) -> כניסה, עם אינדקסים הפוכים לפי פורט ולפי VLAN
+    # (לתצוגה מסוננת ולניקוי פורט שירד בלי לסרוק את כל הטבלה), ו-aging בגלגל טיימרים.
+    # למידה מחדש רק מעדכנת last_seen; כשהטיימר הישן פג הכניסה נבדקת ומתוזמנת מחדש אם נראתה בינתיים
+    def __init__(self, clock=None, aging_time=DEFAULT_AGING_TIME):
+        self.clock = clock or MonotonicClock()
+        self.aging_time = validate_aging_time(aging_time)
+        self.entries = {}
+        self.by_port = {}
+        self.by_vlan = {}
+        self.wheel = TimerWheel(int(self.clock.now()))
+
+    def __len__(self):
+        self.expire()
+        return len(self.entries)
+
+    def _index(self, entry):
+        key = (entry.vlan, entry.mac)
+        self.by_port.setdefault(entry.port, {})[key] = entry
+        self.by_vlan.setdefault(entry.vlan, {})[key] = entry
+
+    def _unindex(self, entry):
+        key = (entry.vlan, entry.mac)
+        for index, name in ((self.by_port, entry.port), (self.by_vlan, entry.vlan)):
+            bucket = index.get(name)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del index[name]
+
+    def _arm(self, entry):
+        if self.aging_time:
+            entry.deadline = self.wheel.schedule(math.ceil(entry.last_seen + self.aging_time), (entry.vlan, entry.mac))
+        else:
+            entry.deadline = None
+
+    def learn(self, vlan, mac, port):
+        # מסגרת עם כתובת מקור mac נכנסה בפורט port. מחזיר את הכניסה
+        key = (vlan, mac)
+        now = self.clock.now()
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = MacEntry(vlan, mac, port, TYPE_DYNAMIC, now)
+            self.entries[key] = entry
+            self._index(entry)
+            self._arm(entry)
+        elif entry.type == TYPE_DYNAMIC:
+            if entry.port != port:
+                # התחנה עברה פורט
+                self._unindex(entry)
+                entry.port = port
+                self._index(entry)
+            entry.last_seen = now
+        return entry
+
+    def add_static(self, vlan, mac, port):
+        self.remove(vlan, mac)
+        entry = MacEntry(vlan, mac, port, TYPE_STATIC, self.clock.now())
+        self.entries[(vlan, mac)] = entry
+        self._index(entry)
+        return entry
+
+    def remove(self, vlan, mac):
+        entry = self.entries.pop((vlan, mac), None)
+        if entry is not None:
+            # הטיימר נשאר בגלגל ויתעלמו ממנו כשיפוג (הכניסה כבר לא קיימת)
+            self._unindex(entry)
+        return entry
+
+    def lookup(self, vlan, mac):
+        # הפורט שאליו יש להעביר מסגרת ל-mac, או None (flooding)
+        self.expire()
+        entry = self.entries.get((vlan, mac))
+        return None if entry is None else entry.port
+
+    def expire(self):
+        # מוציא את הכניסות שלא נראו aging_time שניות; מחזיר אותן
+        if not self.aging_time:
+            return []
+        now = self.clock.now()
+        removed = []
+        for deadline, key in self.wheel.advance(int(now)):
+            entry = self.entries.get(key)
+            if entry is None or entry.deadline != deadline:
+                continue
+            if entry.last_seen + self.aging_time <= now:
+                del self.entries[key]
+                self._unindex(entry)
+                removed.append(entry)
+            else:
+                self._arm(entry)
+        return removed
+
+    def set_aging_time(self, seconds):
+        seconds = validate_aging_time(seconds)
+        previous, self.aging_time = self.aging_time, seconds
+        if seconds and (not previous or seconds < previous):
+            # הטיימרים הקיימים מאוחרים מדי - מתזמנים את כולם מחדש (שינוי הגדרה נדיר)
+            now = self.clock.now()
+            self.wheel.clear()
+            self.wheel.current = int(now)
+            for entry in list(self.entries.values()):
+                if entry.type != TYPE_DYNAMIC:
+                    continue
+                if entry.last_seen + seconds <= now:
+                    self.remove(entry.vlan, entry.mac)
+                else:
+                    self._arm(entry)
+        elif not seconds:
+            self.wheel.clear()
+        # כשזמן ה-aging גדל, טיימר שפג מוקדם מדי פשוט מתוזמן שוב ב-expire
+
+    def clear(self, vlan=None, port=None):
+        # clear mac address-table dynamic [vlan N] [interface X]
+        for entry in list(self.select(vlan, port)):
+            if entry.type == TYPE_DYNAMIC:
+                self.remove(entry.vlan, entry.mac)
+
+    def select(self, vlan=None, port=None, entry_type=None, mac=None):
+        # הכניסות לפי סינון, דרך האינדקס הקטן מבין השניים. כתובת מסוימת נמצאת בחיפוש ישיר בכל VLAN
+        self.expire()
+        if mac is not None:
+            vlans = self.by_vlan if vlan is None else (vlan,)
+            entries = [self.entries[(candidate, mac)] for candidate in vlans if (candidate, mac) in self.entries]
+            if port is not None:
+                entries = [entry for entry in entries if entry.port == port]
+        elif vlan is None and port is None:
+            entries = self.entries.values()
+        elif port is None:
+            entries = self.by_vlan.get(vlan, {}).values()
+        elif vlan is None:
+            entries = self.by_port.get(port, {}).values()
+        else:
+            by_port = self.by_port.get(port, {})
+            by_vlan = self.by_vlan.get(vlan, {})
+            entries = [entry for key, entry in min(by_port, by_vlan, key=len).items()
+                       if key in by_port and key in by_vlan]
+        if entry_type is not None:
+            entries = [entry for entry in entries if entry.type == entry_type]
+        return entries
+
+    def show(self, vlan=None, port=None, entry_type=None, mac=None):
+        # העמודה Ports בשם המקוצר (Gi0/1), כמו ב-IOS; interface_table מייבא (דרך config_renderer) את המודול הזה
+        from interface_table import short_interface
+        entries = sorted(self.select(vlan, port, entry_type, mac), key=lambda entry: (entry.vlan, entry.mac))
+        yield "          Mac Address Table"
+        yield "-------------------------------------------"
+        yield ""
+        yield "Vlan    Mac Address       Type        Ports"
+        yield "----    -----------       --------    -----"
+        for entry in entries:
+            yield f"{entry.vlan:>4}    {format_mac(entry.mac)}    {entry.type:<8}    {short_interface(entry.port)}"
+        yield f"Total Mac Addresses for this criterion: {len(entries)}"
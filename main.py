@@ -1,8 +1,8 @@
 # main.py
 
 import cmd
+import sys
 import cli_simulator
-from gui import main as gui_main
 
 def text_interface():
     # יצירת לולאה ראשית שמקבלת קלט מהמשתמש ומעבירה אותו למעבד הפקודות
@@ -38,9 +38,14 @@ def text_interface():
     # התחלת הסימולטור
     simulator.start()
 
-if __name__ == "__main__":
-    # הפעלת הממשק הגרפי
+def gui_interface():
+    # PyQt5 נטען רק כשפותחים את הממשק הגרפי, כך שהממשק הטקסטואלי עולה בלעדיו
+    from gui import main as gui_main
     gui_main()
-    
-    # אם תרצה להפעיל את הממשק הטקסטואלי במקום, השתמש בשורה הבאה:
-    # text_interface()
+
+if __name__ == "__main__":
+    # הפעלת הממשק הגרפי; עם --text מופעל הממשק הטקסטואלי במקומו
+    if "--text" in sys.argv[1:]:
+        text_interface()
+    else:
+        gui_interface()
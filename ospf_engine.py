@@ -0,0 +1,521 @@
+# ospf_engine.py
+
+import heapq
+import time
+import zlib
+from collections import namedtuple
+from routing_engine import FULL_MASK, MASKS, int_to_ip, ip_to_int, mask_to_length
+
+# עלות ברירת מחדל לפי סוג הממשק (reference bandwidth של 100Mbps, כמו ב-IOS); הבדיקה לפי הסדר
+DEFAULT_COSTS = (("GigabitEthernet", 1), ("FastEthernet", 1), ("Ethernet", 10), ("Serial", 64), ("Loopback", 1))
+MAX_COST = 65535
+
+INITIAL_SEQUENCE = 0x80000001
+
+# ה-LSA של נתב: router ID וממשקים שמשתתפים ב-OSPF -
+# links = {interface: (address, network, length, cost, area)}
+RouterLSA = namedtuple("RouterLSA", ["router_id", "links"])
+
+
+def interface_cost(name, config):
+    cost = config.get("ospf_cost")
+    if cost:
+        return cost
+    if config.get("bandwidth"):
+        # כמו ב-IOS: reference bandwidth של 100Mbps חלקי רוחב הפס של הממשק
+        return max(1, 100000 // config["bandwidth"])
+    for prefix, default in DEFAULT_COSTS:
+        if name.startswith(prefix):
+            return default
+    return 1
+
+
+def parse_network(statement):
+    # "10.0.0.0 0.0.0.255 area 0" -> (network, mask, area); mask הוא ההפך של ה-wildcard
+    parts = statement.split()
+    try:
+        network, wildcard = ip_to_int(parts[0]), ip_to_int(parts[1])
+    except (IndexError, ValueError):
+        return None
+    area = parts[3] if len(parts) >= 4 and parts[2].lower() == "area" else "0"
+    mask = ~wildcard & FULL_MASK
+    return network & mask, mask, area
+
+
+def router_lsa(state):
+    # ה-LSA שהנתב מפיץ לפי ההגדרה שלו: ממשקים פעילים עם כתובת שמתאימה לפקודת network.
+    # None כשאין תהליך OSPF או שאין לנתב router ID (אין אף ממשק פעיל עם כתובת)
+    statements = []
+    running = False
+    for process in (state.get("routing_protocols") or {}).values():
+        if process.get("protocol") != "ospf":
+            continue
+        running = True
+        statements.extend(parsed for parsed in map(parse_network, process.get("networks", [])) if parsed)
+    if not running:
+        return None
+    links = {}
+    addresses, loopbacks = [], []
+    for name, config in (state.get("interfaces") or {}).items():
+        if config.get("status") != "up" or not config.get("ip_address") or not config.get("subnet_mask"):
+            continue
+        try:
+            address = ip_to_int(config["ip_address"])
+            length = mask_to_length(config["subnet_mask"])
+        except ValueError:
+            continue
+        (loopbacks if name.startswith("Loopback") else addresses).append(address)
+        for network, mask, area in statements:
+            if address & mask == network:
+                # ממשק loopback מוכרז כ-host route, כמו ב-IOS
+                if name.startswith("Loopback"):
+                    links[name] = (address, address, 32, interface_cost(name, config), area)
+                else:
+                    links[name] = (address, address & MASKS[length], length, interface_cost(name, config), area)
+                break
+    # router ID: הכתובת הגבוהה ביותר של loopback, ואם אין - של ממשק פעיל
+    candidates = loopbacks or addresses
+    if not candidates:
+        return None
+    return RouterLSA(max(candidates), links)
+
+
+def is_network(node):
+    # צמתים בגרף: נתב הוא device_id, רשת transit היא (network, length)
+    return type(node) is tuple
+
+
+class SpfTree:
+    # עץ ה-SPF של נתב אחד: מרחק ו-first hops מהשורש לכל צומת, והנתיבים שנגזרים מהם.
+    # first hop הוא (interface, next_hop), ו-next_hop None מסמן רשת שמחוברת ישירות לשורש
+    def __init__(self, root):
+        self.root = root
+        self.dist = {}
+        self.hops = {}
+        self.routes = {}
+        # קבוצות first hops זהות משותפות בין הצמתים (יש מעטות מהן - לפי מספר השכנים)
+        self.hop_sets = {}
+        self.full_runs = 0
+        self.incremental_runs = 0
+
+    def full(self, domain):
+        # Dijkstra עם heap בינארי. המפתח (מרחק, סוג) מוציא רשת לפני נתב באותו מרחק, כך שההורים של
+        # צומת (גם דרך קשת רשת->נתב במשקל 0) תמיד סגורים לפניו וה-first hops שלו נגזרים מיד
+        self.full_runs += 1
+        previous = set(self.dist)
+        self.dist = {self.root: 0}
+        self.hops = {self.root: frozenset()}
+        heap = [(0, 1, self.root)]
+        done = set()
+        out_edges = domain.out_edges
+        while heap:
+            d, kind, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            done.add(node)
+            if node != self.root:
+                self.hops[node] = self.derive(domain, node)
+            for neighbor, cost in out_edges.get(node, {}).items():
+                candidate = d + cost
+                current = self.dist.get(neighbor)
+                if current is None or candidate < current:
+                    self.dist[neighbor] = candidate
+                    heapq.heappush(heap, (candidate, 0 if is_network(neighbor) else 1, neighbor))
+        return previous | done
+
+    def update(self, domain, changes):
+        # SPF אינקרמנטלי אחרי שינוי בקשתות: changes = [(u, v, old, new)] כשהגרף כבר מעודכן (None = אין קשת).
+        # רק הצמתים שמתחת לקשת שהתייקרה או נמחקה נפתחים מחדש, וקשת שהוזלה מפיצה שיפור רק כל עוד הוא
+        # משפר. נתב שהשינוי לא נוגע בעץ שלו משלם רק על הבדיקה. מחזיר את הצמתים שהמרחק או ה-first hops שלהם השתנו
+        dist, out_edges, in_edges = self.dist, domain.out_edges, domain.in_edges
+        roots = [v for u, v, old, new in changes
+                 if old is not None and (new is None or new > old)
+                 and u in dist and v in dist and dist[u] + old == dist[v]]
+        improved = [(u, v, new) for u, v, old, new in changes
+                    if new is not None and (old is None or new < old) and u in dist]
+        if not roots and not improved:
+            return set()
+        self.incremental_runs += 1
+        # העץ הישן נבנה לפי העלויות שלפני השינוי: קשת שהוזלה או נוספה באותו batch לא הייתה קשת בעץ,
+        # וקשת שנמחקה כבר לא ב-out_edges - הילד שלה נפתח ממילא כ-root
+        before = {(u, v): old for u, v, old, new in changes}
+        invalid = set()
+        stack = roots
+        while stack:
+            node = stack.pop()
+            if node in invalid:
+                continue
+            invalid.add(node)
+            for child, cost in out_edges.get(node, {}).items():
+                cost = before.get((node, child), cost)
+                if cost is not None and child not in invalid and child in dist and dist[node] + cost == dist[child]:
+                    stack.append(child)
+        previous = {node: dist.pop(node) for node in invalid}
+        heap = []
+        for node in invalid:
+            for parent, cost in in_edges.get(node, {}).items():
+                if parent in dist:
+                    heap.append((dist[parent] + cost, 0 if is_network(node) else 1, node))
+        for u, v, cost in improved:
+            if u in dist:
+                candidate = dist[u] + cost
+                if v not in dist or candidate <= dist[v]:
+                    heap.append((candidate, 0 if is_network(v) else 1, v))
+        heapq.heapify(heap)
+        region = set(invalid)
+        while heap:
+            d, kind, node = heapq.heappop(heap)
+            current = dist.get(node)
+            if current is not None and current <= d:
+                if current == d:
+                    # מסלול נוסף באותו מרחק: ההורים (וה-first hops) עשויים להשתנות
+                    region.add(node)
+                continue
+            if node not in previous:
+                previous[node] = current
+            dist[node] = d
+            region.add(node)
+            for neighbor, cost in out_edges.get(node, {}).items():
+                candidate = d + cost
+                current = dist.get(neighbor)
+                if current is None or candidate <= current:
+                    heapq.heappush(heap, (candidate, 0 if is_network(neighbor) else 1, neighbor))
+        # first hops מחדש לפי סדר המרחק; צומת שה-hops שלו השתנו מעביר את השינוי לילדים שלו
+        changed = set()
+        order = []
+        for node in region:
+            if node in dist:
+                order.append((dist[node], 0 if is_network(node) else 1, node))
+            elif self.hops.pop(node, None) is not None:
+                changed.add(node)
+        heapq.heapify(order)
+        queued = set(region)
+        while order:
+            d, kind, node = heapq.heappop(order)
+            hops = self.derive(domain, node)
+            if node in previous and previous[node] != d:
+                changed.add(node)
+            if hops != self.hops.get(node):
+                changed.add(node)
+                self.hops[node] = hops
+                for child, cost in out_edges.get(node, {}).items():
+                    if child not in queued and dist.get(child) == d + cost:
+                        queued.add(child)
+                        heapq.heappush(order, (dist[child], 0 if is_network(child) else 1, child))
+        return changed
+
+    def derive(self, domain, node):
+        # ה-first hops של צומת: האיחוד על כל ההורים שלו במסלולים הקצרים ביותר (ECMP)
+        dist = self.dist
+        target = dist[node]
+        hops = set()
+        for parent, cost in domain.in_edges.get(node, {}).items():
+            d = dist.get(parent)
+            if d is None or d + cost != target:
+                continue
+            if parent == self.root:
+                hops.add((domain.segments[node][self.root][0], None))
+            elif is_network(parent):
+                address = domain.segments[parent][node][1]
+                hops.update((interface, address if next_hop is None else next_hop)
+                            for interface, next_hop in self.hops.get(parent, ()))
+            else:
+                hops.update(self.hops.get(parent, ()))
+        hops = frozenset(hops)
+        return self.hop_sets.setdefault(hops, hops)
+
+    def route(self, domain, prefix):
+        # הנתיבים ל-prefix: המפרסם הקרוב ביותר (ECMP בין שווים). רשת שמחוברת לשורש היא connected ולא OSPF
+        if self.root in domain.segments.get(prefix, ()):
+            return []
+        best, hops = None, set()
+        for node, cost in domain.advertisers.get(prefix, {}).items():
+            d = self.dist.get(node)
+            if d is None:
+                continue
+            total = d + cost
+            if best is None or total < best:
+                best, hops = total, set(self.hops[node])
+            elif total == best:
+                hops.update(self.hops[node])
+        return sorted((next_hop, interface, best) for interface, next_hop in hops if next_hop is not None)
+
+
+class OspfDomain:
+    # אזור OSPF אחד של מכשירים רבים (DeviceRegistry): ה-LSDB נבנה מה-LSAs של הנתבים, נתבים שחולקים
+    # subnet הם שכנים דרך צומת רשת transit (כמו network LSA של DR), וכל נתב מחזיק עץ SPF משלו.
+    # שינוי בהגדרה רק מסמן את המכשיר; converge() מעדכן את הקשתות שהשתנו, מריץ SPF אינקרמנטלי בעצים
+    # שהשינוי נוגע בהם ו-partial SPF (חישוב prefixes בלי Dijkstra) כשהשתנו רק רשתות קצה,
+    # ומתקין במכשירים רק את ה-prefixes שהנתיבים אליהם השתנו. עץ של נתב מחושב רק כשמבקשים אותו
+    def __init__(self):
+        self.managers = {}
+        self.lsas = {}
+        self.sequences = {}
+        self.originated = {}
+        self.stale = set()
+        # (network, length) -> {device_id: (interface, address, cost)}
+        self.segments = {}
+        self.device_segments = {}
+        self.out_edges = {}
+        self.in_edges = {}
+        # צומת -> {prefix: cost} שהוא מפרסם, ו-prefix -> {צומת: cost}
+        self.advertised = {}
+        self.advertisers = {}
+        self.trees = {}
+        # device_id -> ({(u, v): (old, new)}, prefixes): שינויים שעוד לא הגיעו לעץ של הנתב
+        self.pending = {}
+        self.converging = False
+
+    def attach(self, device_id, manager):
+        self.managers[device_id] = manager
+        self.stale.add(device_id)
+        tree = self.trees.get(device_id)
+        if tree is not None:
+            # מכשיר שנטען מחדש מקבל את כל הנתיבים שכבר חושבו לו
+            manager.set_dynamic_routes("ospf", tree.routes, replace=True)
+
+    def detach(self, device_id):
+        # המכשיר פורק מהזיכרון אבל ממשיך להשתתף באזור עם ה-LSA האחרון שלו
+        self.managers.pop(device_id, None)
+
+    def remove(self, device_id):
+        self.managers.pop(device_id, None)
+        self.stale.add(device_id)
+
+    def invalidate(self, device_id):
+        self.stale.add(device_id)
+
+    def converge(self, device_id=None):
+        # מפיץ את ה-LSAs שהשתנו ומעדכן את העצים. עם device_id רק העץ של הנתב הזה מחושב עכשיו, ושאר העצים
+        # צוברים את השינויים עד שמישהו מסתכל עליהם (show ip route, ping) - כמו נתבים אמיתיים שכל אחד מהם
+        # מריץ SPF משלו, שינוי באזור גדול עולה רק על הנתב שנבדק. בלי device_id כל הנתבים מתכנסים
+        if self.converging:
+            return
+        self.converging = True
+        try:
+            if self.stale:
+                stale, self.stale = self.stale, set()
+                changes, prefixes = self.flood(stale)
+                for tree_id in list(self.trees):
+                    if tree_id not in self.lsas:
+                        # OSPF הוסר מהנתב (או שהנתב נמחק): גם הנתיבים שלמד יוצאים מהטבלה
+                        del self.trees[tree_id]
+                        self.pending.pop(tree_id, None)
+                        manager = self.managers.get(tree_id)
+                        if manager is not None:
+                            manager.set_dynamic_routes("ospf", {}, replace=True)
+                    elif changes or prefixes:
+                        edges, affected = self.pending.setdefault(tree_id, ({}, set()))
+                        for u, v, old, new in changes:
+                            # כמה שינויים באותה קשת מתמזגים: הערך שהעץ חושב לפיו והערך הנוכחי
+                            edges[(u, v)] = (edges[(u, v)][0] if (u, v) in edges else old, new)
+                        affected.update(prefixes)
+            for tree_id in ([device_id] if device_id is not None else list(self.lsas)):
+                self.sync(tree_id)
+        finally:
+            self.converging = False
+
+    def sync(self, device_id):
+        # מביא את העץ של נתב אחד למצב ה-LSDB הנוכחי ומתקין את ה-prefixes שהשתנו
+        if device_id not in self.lsas:
+            return
+        tree = self.trees.get(device_id)
+        if tree is None:
+            tree = self.trees[device_id] = SpfTree(device_id)
+            tree.full(self)
+            self.install(tree, set(self.advertisers) | set(tree.routes))
+            return
+        edges, affected = self.pending.pop(device_id, ({}, set()))
+        changes = [(u, v, old, new) for (u, v), (old, new) in edges.items() if old != new]
+        if len(changes) > len(tree.dist):
+            # שינויים רבים שהצטברו: Dijkstra מלא זול יותר מעדכון אינקרמנטלי
+            tree.full(self)
+            self.install(tree, set(self.advertisers) | set(tree.routes))
+            return
+        for node in (tree.update(self, changes) if changes else ()):
+            affected.update(self.advertised.get(node, ()))
+        if affected:
+            self.install(tree, affected)
+
+    def install(self, tree, prefixes):
+        routes = tree.routes
+        updates = {}
+        for prefix in prefixes:
+            paths = tree.route(self, prefix)
+            if paths != routes.get(prefix, []):
+                updates[prefix] = paths
+                if paths:
+                    routes[prefix] = paths
+                else:
+                    routes.pop(prefix, None)
+        manager = self.managers.get(tree.root)
+        if updates and manager is not None:
+            manager.set_dynamic_routes("ospf", updates)
+
+    def flood(self, stale):
+        # מעדכן את ה-LSDB מה-LSAs החדשים ומחזיר (שינויים בקשתות, prefixes שהמפרסמים או העלויות שלהם השתנו)
+        touched_nodes = set()
+        touched_segments = set()
+        for device_id in stale:
+            manager = self.managers.get(device_id)
+            lsa = router_lsa(manager.state) if manager is not None else None
+            if lsa == self.lsas.get(device_id):
+                continue
+            for segment in self.device_segments.pop(device_id, ()):
+                self.segments[segment].pop(device_id, None)
+                touched_segments.add(segment)
+            if lsa is None:
+                self.lsas.pop(device_id, None)
+            else:
+                self.lsas[device_id] = lsa
+                self.sequences[device_id] = self.sequences.get(device_id, INITIAL_SEQUENCE - 1) + 1
+                self.originated[device_id] = time.monotonic()
+                segments = self.device_segments[device_id] = set()
+                for interface, (address, network, length, cost, area) in lsa.links.items():
+                    members = self.segments.setdefault((network, length), {})
+                    # שני ממשקים באותה רשת: נשאר הזול
+                    if device_id not in members or cost < members[device_id][2]:
+                        members[device_id] = (interface, address, cost)
+                    segments.add((network, length))
+                    touched_segments.add((network, length))
+            touched_nodes.add(device_id)
+        for segment in touched_segments:
+            touched_nodes.add(segment)
+            touched_nodes.update(self.segments.get(segment, ()))
+        changes, prefixes = [], set()
+        for node in touched_nodes:
+            edges, advertised = self.originate(node)
+            self.set_edges(node, edges, changes)
+            self.set_advertised(node, advertised, prefixes)
+        for segment in touched_segments:
+            if not self.segments.get(segment):
+                self.segments.pop(segment, None)
+        # נתב שהצטרף לרשת או עזב אותה הופך אותה ל-connected (או מחזיר אותה ל-OSPF) גם כשהמפרסמים לא השתנו
+        prefixes.update(touched_segments)
+        return changes, prefixes
+
+    def originate(self, node):
+        # הקשתות היוצאות מצומת והפרפיקסים שהוא מפרסם. רשת עם נתב אחד היא רשת קצה (stub) של הנתב
+        if is_network(node):
+            members = self.segments.get(node, {})
+            if len(members) < 2:
+                return {}, {}
+            return {device_id: 0 for device_id in members}, {node: 0}
+        edges, advertised = {}, {}
+        for segment in self.device_segments.get(node, ()):
+            members = self.segments[segment]
+            cost = members[node][2]
+            if len(members) >= 2:
+                edges[segment] = cost
+            else:
+                advertised[segment] = cost
+        return edges, advertised
+
+    def set_edges(self, node, edges, changes):
+        current = self.out_edges.get(node, {})
+        for neighbor in set(current) | set(edges):
+            old, new = current.get(neighbor), edges.get(neighbor)
+            if old != new:
+                changes.append((node, neighbor, old, new))
+                if new is None:
+                    self.in_edges[neighbor].pop(node, None)
+                else:
+                    self.in_edges.setdefault(neighbor, {})[node] = new
+        if edges:
+            self.out_edges[node] = edges
+        else:
+            self.out_edges.pop(node, None)
+
+    def set_advertised(self, node, advertised, prefixes):
+        current = self.advertised.get(node, {})
+        for prefix in set(current) | set(advertised):
+            old, new = current.get(prefix), advertised.get(prefix)
+            if old != new:
+                prefixes.add(prefix)
+                if new is None:
+                    self.advertisers[prefix].pop(node, None)
+                    if not self.advertisers[prefix]:
+                        del self.advertisers[prefix]
+                else:
+                    self.advertisers.setdefault(prefix, {})[node] = new
+        if advertised:
+            self.advertised[node] = advertised
+        else:
+            self.advertised.pop(node, None)
+
+    def designated_router(self, segment):
+        # ה-DR של רשת transit: הנתב עם ה-router ID הגבוה ביותר (בלי priority)
+        members = self.segments.get(segment, {})
+        return max(members, key=lambda device_id: self.lsas[device_id].router_id) if members else None
+
+    def process_lines(self, device_id, processes):
+        lsa = self.lsas.get(device_id)
+        tree = self.trees.get(device_id)
+        for name in processes:
+            if lsa is None:
+                yield f" %OSPF: Router process {name.split()[-1]} is not running, please configure a router-id"
+                continue
+            yield f' Routing Process "{name}" with ID {int_to_ip(lsa.router_id)}'
+            yield " Supports only single TOS(TOS0) routes"
+            areas = {}
+            for address, network, length, cost, area in lsa.links.values():
+                areas[area] = areas.get(area, 0) + 1
+            yield f" Number of areas in this router is {len(areas)}. {len(areas)} normal 0 stub 0 nssa"
+            for area, count in sorted(areas.items()):
+                yield f"    Area {'BACKBONE(0)' if area == '0' else area}"
+                yield f"        Number of interfaces in this area is {count}"
+                if tree is not None:
+                    yield (f"        SPF algorithm executed {tree.full_runs + tree.incremental_runs} times "
+                           f"({tree.full_runs} full, {tree.incremental_runs} incremental)")
+                    yield f"        Number of LSA {sum(1 for node in tree.dist if node in self.lsas or is_network(node))}."
+
+    def neighbor_lines(self, device_id):
+        yield f"{'Neighbor ID':<16}{'Pri':<6}{'State':<16}{'Dead Time':<12}{'Address':<16}Interface"
+        lsa = self.lsas.get(device_id)
+        if lsa is None:
+            return
+        for interface, (address, network, length, cost, area) in lsa.links.items():
+            segment = (network, length)
+            members = self.segments.get(segment, {})
+            if len(members) < 2 or members.get(device_id, (None,))[0] != interface:
+                continue
+            ranked = sorted(members, key=lambda member: self.lsas[member].router_id, reverse=True)
+            for neighbor in ranked:
+                if neighbor == device_id:
+                    continue
+                role = "DR" if neighbor == ranked[0] else "BDR" if neighbor == ranked[1] else "DROTHER"
+                yield (f"{int_to_ip(self.lsas[neighbor].router_id):<16}{'1':<6}{'FULL/' + role:<16}{'00:00:35':<12}"
+                       f"{int_to_ip(members[neighbor][1]):<16}{interface}")
+
+    def database_lines(self, device_id, process):
+        # ה-LSDB כפי שהנתב רואה אותו: ה-LSAs של כל הצמתים שמגיעים אליו באזור
+        lsa = self.lsas.get(device_id)
+        tree = self.trees.get(device_id)
+        if lsa is None or tree is None:
+            return
+        now = time.monotonic()
+        yield f"            OSPF Router with ID ({int_to_ip(lsa.router_id)}) (Process ID {process})"
+        yield ""
+        yield "                Router Link States (Area 0)"
+        yield ""
+        yield f"{'Link ID':<16}{'ADV Router':<16}{'Age':<12}{'Seq#':<11}{'Checksum':<9}Link count"
+        routers = sorted((self.lsas[node].router_id, node) for node in tree.dist if node in self.lsas)
+        for router_id, node in routers:
+            links = self.lsas[node].links
+            age = int(now - self.originated[node])
+            checksum = zlib.crc32(repr(sorted(links.items())).encode()) & 0xFFFF
+            yield (f"{int_to_ip(router_id):<16}{int_to_ip(router_id):<16}{age:<12}"
+                   f"0x{self.sequences[node]:08X} 0x{checksum:04X}   {len(links)}")
+        networks = sorted(node for node in tree.dist if is_network(node))
+        if not networks:
+            return
+        yield ""
+        yield "                Net Link States (Area 0)"
+        yield ""
+        yield f"{'Link ID':<16}{'ADV Router':<16}{'Age':<12}{'Seq#':<11}Checksum"
+        for segment in networks:
+            dr = self.designated_router(segment)
+            members = self.segments[segment]
+            checksum = zlib.crc32(repr(sorted(members)).encode()) & 0xFFFF
+            yield (f"{int_to_ip(members[dr][1]):<16}{int_to_ip(self.lsas[dr].router_id):<16}"
+                   f"{int(now - self.originated[dr]):<12}0x{self.sequences[dr]:08X} 0x{checksum:04X}")
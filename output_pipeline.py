@@ -0,0 +1,133 @@
+# output_pipeline.py
+
+import re
+
+# מסנני הפלט של IOS אחרי "|"; כל אחד הוא שלב ב-generator מעל זרם השורות של הפקודה
+FILTERS = ("include", "exclude", "begin", "section")
+
+# ה-"|" שמפריד בין הפקודה למסנן בא אחרי רווח, כך ש-"| include a|b" נשאר ביטוי אחד
+PIPE = re.compile(r"\s+\|\s*")
+
+MORE_PROMPT = " --More-- "
+
+DEFAULT_TERMINAL_LENGTH = 24
+MAX_TERMINAL_LENGTH = 512
+
+END = object()
+
+
+def split_filters(line):
+    # "show run | include ^interface | exclude Vlan" -> ("show run", [("include", <regex>), ("exclude", <regex>)])
+    parts = PIPE.split(line)
+    filters = []
+    for part in parts[1:]:
+        words = part.split(None, 1)
+        if not words:
+            raise ValueError("missing output modifier after '|'")
+        matches = [name for name in FILTERS if name.startswith(words[0].lower())]
+        if len(matches) != 1:
+            raise ValueError(f"unknown output modifier '{words[0]}'")
+        if len(words) < 2:
+            raise ValueError(f"'{matches[0]}' requires a regular expression")
+        # הביטוי הוא כל מה שאחרי המילה, כולל רווחים ("exclude ^ " מסנן שורות מוזחות)
+        try:
+            filters.append((matches[0], re.compile(words[1])))
+        except re.error as e:
+            raise ValueError(f"invalid regular expression '{words[1]}': {e}")
+    return parts[0], filters
+
+
+def as_lines(output):
+    # פלט של handler הוא מחרוזת אחת או זרם שורות; מכאן והלאה תמיד זרם
+    if isinstance(output, str):
+        return iter(output.split("\n")) if output else iter(())
+    return iter(output)
+
+
+def include(lines, regex):
+    return (line for line in lines if regex.search(line))
+
+
+def exclude(lines, regex):
+    return (line for line in lines if not regex.search(line))
+
+
+def begin(lines, regex):
+    for line in lines:
+        if regex.search(line):
+            yield line
+            break
+    # מההתאמה הראשונה הכול עובר בלי בדיקה
+    yield from lines
+
+
+def section(lines, regex):
+    # פסקה היא שורה בלי הזחה והשורות המוזחות שאחריה; היא מוצגת כולה אם אחת השורות בה מתאימה.
+    # רק הפסקה הנוכחית נשמרת בזיכרון
+    block = []
+    matched = False
+    for line in lines:
+        if not line.startswith((" ", "\t")):
+            if matched:
+                yield from block
+            block = []
+            matched = False
+        block.append(line)
+        if not matched and regex.search(line):
+            matched = True
+    if matched:
+        yield from block
+
+
+STAGES = {"include": include, "exclude": exclude, "begin": begin, "section": section}
+
+
+def apply_filters(output, filters):
+    lines = as_lines(output)
+    for name, regex in filters:
+        lines = STAGES[name](lines, regex)
+    return lines
+
+
+class Pager:
+    # מחלק זרם שורות לעמודים לפי terminal length: length - 1 שורות ואז --More--, כמו ב-IOS.
+    # length 0 מבטל את העצירות; השורות עדיין נשלפות מהזרם בחלקים, לא כולן בבת אחת
+    CHUNK = 256
+
+    def __init__(self, lines, length=0):
+        self.lines = iter(lines)
+        self.page_size = max(length - 1, 1) if length else 0
+        self.step = self.page_size or self.CHUNK
+        # שורה אחת קדימה, כדי לא להציג --More-- כשהפלט בדיוק נגמר
+        self.pending = next(self.lines, END)
+
+    def next_chunk(self):
+        # השורות עד העצירה הבאה; רשימה ריקה כשהזרם נגמר
+        chunk = []
+        while self.pending is not END and len(chunk) < self.step:
+            chunk.append(self.pending)
+            self.pending = next(self.lines, END)
+        return chunk
+
+    @property
+    def more(self):
+        return bool(self.page_size) and self.pending is not END
+
+    def answer(self, key):
+        # התשובה ל---More--: רווח - עמוד נוסף, Enter - שורה אחת, כל דבר אחר - עצירה.
+        # עצירה סוגרת את הזרם, כך שהשורות שאחריה לא מופקות בכלל
+        key = key.rstrip("\r\n")
+        if key == "":
+            self.step = 1
+            return True
+        if not key.strip():
+            self.step = self.page_size
+            return True
+        self.close()
+        return False
+
+    def close(self):
+        self.pending = END
+        close = getattr(self.lines, "close", None)
+        if close is not None:
+            close()
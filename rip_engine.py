@@ -0,0 +1,519 @@
+# rip_engine.py
+
+import time
+from collections import namedtuple
+from eigrp_engine import parse_network
+from routing_engine import MASKS, format_prefix, int_to_ip, ip_to_int, load_numpy, mask_to_length
+
+# NumPy, אחרי ש-RipDomain הראשון צריך את המסלול הווקטורי (numpy_available)
+np = None
+
+# מטריקה 16 היא "לא מגיע"
+INFINITY = 16
+MAX_PATHS = 4
+UPDATE_INTERVAL = 30
+# כמה prefixes (עמודות במטריצות) מחושבים יחד, כדי שהמערכים הזמניים של סבב יישארו קטנים
+CHUNK = 1024
+# גבול לסבבים בהתכנסות אחת; מה שלא הספיק ממשיך ב-converge הבא
+MAX_ROUNDS = 1000
+
+# links = {interface: (address, network, length)} של הממשקים שבתוך פקודות network, ו-origins - הרשתות שלהם
+RipConfig = namedtuple("RipConfig", ["links", "passive", "origins"])
+
+
+def router_config(state):
+    # תהליך ה-RIP של הנתב, או None כשאין
+    process = (state.get("routing_protocols") or {}).get("rip")
+    if not process or process.get("protocol") != "rip":
+        return None
+    # ב-RIP פקודת network היא לפי המחלקה של הכתובת
+    statements = [parsed for parsed in (parse_network(statement.split()[0])
+                                        for statement in process.get("networks", []) if statement.split()) if parsed]
+    links = {}
+    for name, config in (state.get("interfaces") or {}).items():
+        if config.get("status") != "up" or not config.get("ip_address") or not config.get("subnet_mask"):
+            continue
+        try:
+            address = ip_to_int(config["ip_address"])
+            length = mask_to_length(config["subnet_mask"])
+        except ValueError:
+            continue
+        if any(address & mask == network for network, mask in statements):
+            links[name] = (address, address & MASKS[length], length)
+    origins = frozenset(link[1:] for link in links.values())
+    return RipConfig(links, frozenset(process.get("passive", [])), origins)
+
+
+def numpy_available():
+    # בלי NumPy הסבבים רצים בלולאות רגילות עם אותה תוצאה, רק לאט יותר במעבדות גדולות
+    global np
+    np = load_numpy()
+    return np is not None
+
+
+def unique(values):
+    # ערכים ממוינים בלי כפילויות; np.unique איטי יותר על המערכים האלה
+    values = np.sort(values)
+    if len(values):
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+def runs(pairs):
+    # [(new, old)] -> [(new_start, old_start, length)] של רצפים ששני האינדקסים בהם עולים יחד
+    found = []
+    for new, old in pairs:
+        if found and new == found[-1][0] + found[-1][2] and old == found[-1][1] + found[-1][2]:
+            found[-1][2] += 1
+        else:
+            found.append([new, old, 1])
+    return found
+
+
+class RipDomain:
+    # RIP בין כל הנתבים של DeviceRegistry כ-Bellman-Ford מסונכרן: בכל סבב כל נתב מפרסם את הטבלה שלו בכל
+    # ממשק (split horizon - בלי נתיבים שנלמדו דרך אותו ממשק), וכל נתב לוקח לכל prefix את המטריקה הקטנה
+    # ביותר שקיבל + 1, עד 16. המצב הוא מטריצות שטוחות לפי prefix: metrics (prefix x נתב) ו-received
+    # (prefix x ממשק, מה שהגיע לממשק). סבב מחשב מחדש רק תאים שאחד השולחים אליהם השתנה בסבב הקודם
+    # (frontier), כאוסף של gathers ו-minimum על מערכי NumPy, כך שהעבודה תלויה במספר השינויים ולא בגודל
+    # המטריצות. שינוי בהגדרה ממשיך מהמצב הקיים (triggered update). הנתיבים מותקנים בנתב רק כשמסתכלים
+    # עליו. ב-stepping (debug ip rip) הסבבים רצים רק דרך step_lines(), סבב אחרי סבב
+    def __init__(self, vectorized=None):
+        # vectorized=None: מחליטים (וטוענים NumPy) רק כשנתב ראשון מפעיל RIP; עד אז המטריצות ריקות
+        self.vectorized = vectorized if vectorized is None else bool(vectorized and numpy_available())
+        self.managers = {}
+        self.configs = {}
+        self.stale = set()
+        self.devices = []
+        self.rows = {}
+        self.prefixes = []
+        self.columns = {}
+        # ממשק -> (device_id, interface, address), רק ממשקים ב-subnet שיש בו עוד נתב RIP
+        self.ports = []
+        self.port_row = []
+        self.row_ports = []
+        # ממשק -> הממשקים שהוא מקבל מהם עדכונים (לא passive), ונתב -> הממשקים שמקבלים ממנו
+        self.port_edges = []
+        self.out_ports = []
+        # לכל מטריצה עמודת דמה אחרונה (נתב / ממשק שלא קיים) שתמיד 16, למילוי טבלאות ברוחב קבוע
+        self.metrics = self.received = self.base = self.dirty = self.vector(0, 0)
+        self.tables = None
+        self.frontier = self.empty()
+        # device_id -> {prefix: paths} שהותקנו במכשיר
+        self.installed = {}
+        self.stepping = False
+        self.rounds = 0
+        self.changes = 0
+        self.updated = time.monotonic()
+        self.converging = False
+
+    def vector(self, size, fill):
+        if self.vectorized:
+            return np.full(size, fill, np.int8)
+        return bytearray([fill]) * size
+
+    def empty(self):
+        return np.zeros(0, dtype=np.int64) if self.vectorized else set()
+
+    def attach(self, device_id, manager):
+        self.managers[device_id] = manager
+        self.stale.add(device_id)
+        if self.installed.get(device_id):
+            manager.set_dynamic_routes("rip", self.installed[device_id], replace=True)
+
+    def detach(self, device_id):
+        # המכשיר פורק מהזיכרון אבל ממשיך להשתתף עם ההגדרה האחרונה שלו
+        self.managers.pop(device_id, None)
+
+    def remove(self, device_id):
+        self.managers.pop(device_id, None)
+        self.stale.add(device_id)
+
+    def invalidate(self, device_id):
+        self.stale.add(device_id)
+
+    def converge(self, device_id=None):
+        # מחיל את שינויי ההגדרה, מריץ סבבים עד שאין שינוי (חוץ מב-stepping), ומתקין את הנתיבים של
+        # device_id - או של כל הנתבים כשלא צוין נתב
+        if self.converging:
+            return
+        self.converging = True
+        try:
+            if self.stale:
+                self.rebuild()
+            rounds = 0
+            while len(self.frontier) and not self.stepping and rounds < MAX_ROUNDS:
+                self.step()
+                rounds += 1
+            for target in ([device_id] if device_id is not None else list(self.rows)):
+                self.sync(target)
+        finally:
+            self.converging = False
+
+    def rebuild(self):
+        stale, self.stale = self.stale, set()
+        changed = set()
+        for device_id in stale:
+            manager = self.managers.get(device_id)
+            config = router_config(manager.state) if manager is not None else None
+            if config == self.configs.get(device_id):
+                continue
+            changed.add(device_id)
+            if config is None:
+                del self.configs[device_id]
+            else:
+                self.configs[device_id] = config
+        if not changed:
+            return
+        if self.vectorized is None:
+            self.vectorized = numpy_available()
+        old_rows, old_columns = self.rows, self.columns
+        old_ports = {port[:2]: index for index, port in enumerate(self.ports)}
+        old_neighbors = self.neighbor_keys()
+        old_frontier = self.frontier_cells()
+        self.devices = sorted(self.configs)
+        self.prefixes = sorted(set().union(*(config.origins for config in self.configs.values())))
+        self.rows = {device_id: row for row, device_id in enumerate(self.devices)}
+        self.columns = {prefix: column for column, prefix in enumerate(self.prefixes)}
+        segments = {}
+        for device_id in self.devices:
+            for interface, (address, network, length) in sorted(self.configs[device_id].links.items()):
+                segments.setdefault((network, length), []).append((device_id, interface, address))
+        self.ports = [port for device_id in self.devices for port in self.device_ports(device_id, segments)]
+        index = {port[:2]: number for number, port in enumerate(self.ports)}
+        self.port_row = [self.rows[port[0]] for port in self.ports]
+        self.row_ports = [[] for _ in self.devices]
+        for number, row in enumerate(self.port_row):
+            self.row_ports[row].append(number)
+        self.port_edges = []
+        for device_id, interface, address in self.ports:
+            network, length = self.configs[device_id].links[interface][1:]
+            self.port_edges.append([index[member[:2]] for member in segments[(network, length)]
+                                    if member[0] != device_id and member[:2] in index
+                                    and member[1] not in self.configs[member[0]].passive])
+        self.out_ports = [set() for _ in self.devices]
+        for receiver, senders in enumerate(self.port_edges):
+            for sender in senders:
+                self.out_ports[self.port_row[sender]].add(receiver)
+        self.out_ports = [sorted(receivers) for receivers in self.out_ports]
+        neighbors = self.neighbor_keys()
+        self.metrics = self.remap(self.metrics, old_columns, old_rows, self.devices, INFINITY)
+        self.received = self.remap(self.received, old_columns, old_ports, [port[:2] for port in self.ports], INFINITY)
+        self.dirty = self.remap(self.dirty, old_columns, old_rows, self.devices, 1)
+        width = len(self.devices) + 1
+        self.base = self.vector(len(self.prefixes) * width, INFINITY)
+        for device_id, config in self.configs.items():
+            for prefix in config.origins:
+                self.base[self.columns[prefix] * width + self.rows[device_id]] = 0
+        if self.vectorized:
+            self.build_tables()
+        # נתבים שההגדרה שלהם או השכנים של הממשקים שלהם השתנו מחשבים מחדש את כל הטבלה שלהם מיד, והמשך
+        # ההתכנסות יוצא מהתאים שהשתנו
+        touched = changed | {key[0] for key in set(neighbors) ^ set(old_neighbors)}
+        touched |= {key[0] for key in neighbors if key in old_neighbors and neighbors[key] != old_neighbors[key]}
+        touched = sorted(self.rows[device_id] for device_id in touched if device_id in self.rows)
+        self.frontier = self.empty()
+        self.merge(old_frontier)
+        self.reset(touched)
+        # נתבים שיצאו מ-RIP ו-prefixes שאף נתב כבר לא מכריז יוצאים מהטבלאות
+        gone = set(old_columns) - set(self.columns)
+        for device_id in list(self.installed):
+            routes = self.installed[device_id]
+            removed = {prefix: [] for prefix in (routes if device_id not in self.rows else gone & routes.keys())}
+            for prefix in removed:
+                del routes[prefix]
+            manager = self.managers.get(device_id)
+            if removed and manager is not None:
+                manager.set_dynamic_routes("rip", removed)
+            if device_id not in self.rows:
+                del self.installed[device_id]
+
+    def device_ports(self, device_id, segments):
+        # הממשקים של נתב שיש מולם עוד נתב RIP באותו subnet
+        config = self.configs[device_id]
+        for interface in sorted(config.links):
+            address, network, length = config.links[interface]
+            if any(member[0] != device_id for member in segments[(network, length)]):
+                yield device_id, interface, address
+
+    def neighbor_keys(self):
+        # (device_id, interface) -> השכנים שהממשק מקבל מהם עדכונים
+        return {port[:2]: tuple(self.ports[sender][:2] for sender in self.port_edges[index])
+                for index, port in enumerate(self.ports)}
+
+    def remap(self, old, old_columns, old_keys, new_keys, fill):
+        # מטריצה שטוחה (prefix x נתב או ממשק, ועמודת דמה) לפי האינדקסים החדשים, עם הערכים שנשארו. האינדקסים
+        # זזים ברצפים (נתב שנוסף מזיז את כל מי שאחריו באחד), אז ההעתקה היא לפי רצפים
+        old_width, width = len(old_keys) + 1, len(new_keys) + 1
+        result = self.vector(len(self.prefixes) * width, fill)
+        keys = runs((number, old_keys[key]) for number, key in enumerate(new_keys) if key in old_keys)
+        columns = runs((number, old_columns[prefix]) for number, prefix in enumerate(self.prefixes)
+                       if prefix in old_columns)
+        for new_column, old_column, height in columns:
+            for new_key, old_key, length in keys:
+                if self.vectorized:
+                    result.reshape(-1, width)[new_column:new_column + height, new_key:new_key + length] = \
+                        old.reshape(-1, old_width)[old_column:old_column + height, old_key:old_key + length]
+                    continue
+                for offset in range(height):
+                    start, source = (new_column + offset) * width + new_key, (old_column + offset) * old_width + old_key
+                    result[start:start + length] = old[source:source + length]
+        return result
+
+    def build_tables(self):
+        # הטופולוגיה כמערכים: השולחים לכל ממשק והממשקים של כל נתב בטבלאות ברוחב קבוע (מקום ריק מצביע
+        # על עמודת הדמה), ו-out_ports בפורמט CSR
+        spare = len(self.ports)
+        senders = np.full((spare + 1, max([len(edges) for edges in self.port_edges] + [1])), spare, np.int64)
+        for port, edges in enumerate(self.port_edges):
+            senders[port, :len(edges)] = edges
+        ports = np.full((len(self.devices) + 1, max([len(members) for members in self.row_ports] + [1])), spare,
+                        np.int64)
+        for row, members in enumerate(self.row_ports):
+            ports[row, :len(members)] = members
+        counts = np.array([len(receivers) for receivers in self.out_ports] + [0], dtype=np.int64)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        receivers = np.array([port for members in self.out_ports for port in members], dtype=np.int64)
+        self.tables = (np.array(self.port_row + [len(self.devices)], dtype=np.int64), senders, ports,
+                       counts, starts, receivers)
+
+    def frontier_cells(self):
+        # ה-frontier כזוגות (prefix, device_id), כדי לשמור אותו כשהאינדקסים משתנים
+        width = len(self.devices) + 1
+        return [(self.prefixes[column], self.devices[row])
+                for column, row in (divmod(int(index), width) for index in self.frontier)]
+
+    def merge(self, cells):
+        width = len(self.devices) + 1
+        indexes = [self.columns[prefix] * width + self.rows[device_id] for prefix, device_id in cells
+                   if prefix in self.columns and device_id in self.rows]
+        if self.vectorized:
+            self.frontier = unique(np.concatenate([self.frontier, np.array(indexes, dtype=np.int64)]))
+        else:
+            self.frontier.update(indexes)
+
+    def reset(self, rows):
+        # חישוב מחדש מיידי של כל ה-prefixes בנתבים rows: מה שהממשקים שלהם מקבלים עכשיו והמטריקות שלהם
+        if not rows or not self.prefixes:
+            return
+        width, port_width = len(self.devices) + 1, len(self.ports) + 1
+        ports = [port for row in rows for port in self.row_ports[row]]
+        for row in rows:
+            self.set_dirty(row, 1)
+        if not self.vectorized:
+            cells = {column * port_width + port for column in range(len(self.prefixes)) for port in ports}
+            routers = {column * width + row for column in range(len(self.prefixes)) for row in rows}
+            self.frontier |= self.relax_python(cells, routers)[0]
+            return
+        port_row, senders, router_ports = self.tables[:3]
+        metrics = self.metrics.reshape(-1, width)
+        received = self.received.reshape(-1, port_width)
+        base = self.base.reshape(-1, width)
+        ports, rows = np.array(ports, dtype=np.int64), np.array(rows, dtype=np.int64)
+        found = [self.frontier]
+        for start in range(0, len(self.prefixes), CHUNK):
+            stop = min(start + CHUNK, len(self.prefixes))
+            columns = np.arange(start, stop, dtype=np.int64)
+            # ממשק צריך חישוב רק ב-prefixes שהוא כבר מחזיק או שאחד השולחים אליו מגיע אליהם
+            reachable = received[start:stop][:, ports] < INFINITY
+            for column in range(senders.shape[1]):
+                reachable |= metrics[start:stop][:, port_row[senders[ports, column]]] < INFINITY
+            cell_columns, cell_ports = np.nonzero(reachable)
+            found.append(self.relax_vectorized(columns[cell_columns] * port_width + ports[cell_ports],
+                                               self.empty())[0])
+            # המטריקות של הנתבים עצמם מחושבות על כל ה-prefixes של החלק
+            values = np.minimum(base[start:stop][:, rows], received[start:stop][:, router_ports[rows]].min(axis=2))
+            cell_columns, cell_rows = np.nonzero(values != metrics[start:stop][:, rows])
+            metrics[start:stop, rows] = values
+            found.append(columns[cell_columns] * width + rows[cell_rows])
+        self.frontier = unique(np.concatenate(found))
+
+    def set_dirty(self, row, value):
+        width = len(self.devices) + 1
+        if self.vectorized:
+            self.dirty.reshape(-1, width)[:, row] = value
+        else:
+            for column in range(len(self.prefixes)):
+                self.dirty[column * width + row] = value
+
+    def row_metrics(self, row):
+        # המטריקות של נתב אחד לכל ה-prefixes, כ-bytes
+        width = len(self.devices) + 1
+        if self.vectorized:
+            return self.metrics.reshape(-1, width)[:, row].tobytes()
+        return bytes(self.metrics[row::width])
+
+    def step(self):
+        # סבב עדכונים אחד: הנתבים שהשתנו בסבב הקודם מפרסמים, והממשקים שמקבלים מהם מחושבים מחדש.
+        # מחזיר כמה מטריקות השתנו
+        if not len(self.frontier):
+            return 0
+        if self.vectorized:
+            self.frontier, changed = self.relax_vectorized(self.expand(self.frontier), self.empty())
+        else:
+            port_width = len(self.ports) + 1
+            width = len(self.devices) + 1
+            cells = {column * port_width + port for column, row in (divmod(index, width) for index in self.frontier)
+                     for port in self.out_ports[row]}
+            self.frontier, changed = self.relax_python(cells, set())
+        self.rounds += 1
+        self.changes += changed
+        self.updated = time.monotonic()
+        return changed
+
+    def expand(self, frontier):
+        # (prefix, נתב) -> (prefix, ממשק) לכל ממשק שמקבל עדכונים מהנתב
+        port_row, senders, ports, counts, starts, receivers = self.tables
+        columns, rows = np.divmod(frontier, len(self.devices) + 1)
+        repeat = counts[rows]
+        total = int(repeat.sum())
+        if not total:
+            return self.empty()
+        offsets = np.repeat(starts[rows] - np.cumsum(repeat) + repeat, repeat) + np.arange(total)
+        return unique(np.repeat(columns * (len(self.ports) + 1), repeat) + receivers[offsets])
+
+    def relax_vectorized(self, cells, routers):
+        # cells: תאי received לחישוב, routers: תאי metrics נוספים. קודם כל הממשקים מחושבים מהמצב הקודם,
+        # ואז המטריקות של הנתבים שלהם. מחזיר (frontier חדש, כמה מטריקות השתנו)
+        port_row, senders, ports = self.tables[:3]
+        width, port_width = len(self.devices) + 1, len(self.ports) + 1
+        columns, cell_ports = np.divmod(cells, port_width)
+        sender = senders[cell_ports]
+        values = self.metrics[(columns * width)[:, None] + port_row[sender]]
+        reported = self.received[(columns * port_width)[:, None] + sender]
+        # split horizon: שולח שהמסלול הטוב ביותר שלו הגיע דרך אותו ממשק מפרסם 16
+        advertised = np.where((values < INFINITY) & (reported != values), values + 1, INFINITY).min(axis=1)
+        moved = advertised != self.received[cells]
+        self.received[cells] = advertised
+        owners = columns * width + port_row[cell_ports]
+        targets = unique(np.concatenate([owners, routers]))
+        target_columns, target_rows = np.divmod(targets, width)
+        best = self.received[(target_columns * port_width)[:, None] + ports[target_rows]].min(axis=1)
+        values = np.minimum(self.base[targets], best)
+        changed = values != self.metrics[targets]
+        self.metrics[targets] = values
+        frontier = unique(np.concatenate([targets[changed], owners[moved]]))
+        self.dirty[frontier] = 1
+        return frontier, int(np.count_nonzero(changed))
+
+    def relax_python(self, cells, routers):
+        metrics, received = self.metrics, self.received
+        width, port_width = len(self.devices) + 1, len(self.ports) + 1
+        updates = []
+        for cell in cells:
+            column, port = divmod(cell, port_width)
+            best = INFINITY
+            for sender in self.port_edges[port]:
+                value = metrics[column * width + self.port_row[sender]]
+                if value < INFINITY and received[column * port_width + sender] != value:
+                    best = min(best, value + 1)
+            updates.append((cell, column * width + self.port_row[port], best))
+        frontier = set()
+        for cell, owner, value in updates:
+            routers.add(owner)
+            if received[cell] != value:
+                received[cell] = value
+                frontier.add(owner)
+        changed = 0
+        for target in routers:
+            column, row = divmod(target, width)
+            value = min([self.base[target]] + [received[column * port_width + port] for port in self.row_ports[row]])
+            if value != metrics[target]:
+                metrics[target] = value
+                frontier.add(target)
+                changed += 1
+        for target in frontier:
+            self.dirty[target] = 1
+        return frontier, changed
+
+    def sync(self, device_id):
+        # מתקין במכשיר את הנתיבים שהשתנו מאז הפעם הקודמת
+        row = self.rows.get(device_id)
+        manager = self.managers.get(device_id)
+        if row is None or manager is None:
+            return
+        width = len(self.devices) + 1
+        if self.vectorized:
+            columns = np.flatnonzero(self.dirty.reshape(-1, width)[:, row]).tolist()
+        else:
+            columns = [column for column in range(len(self.prefixes)) if self.dirty[column * width + row]]
+        self.set_dirty(row, 0)
+        installed = self.installed.setdefault(device_id, {})
+        changes = {}
+        for column in columns:
+            prefix = self.prefixes[column]
+            paths = self.paths(row, column)
+            if paths != installed.get(prefix, []):
+                changes[prefix] = paths
+                if paths:
+                    installed[prefix] = paths
+                else:
+                    del installed[prefix]
+        if changes:
+            manager.set_dynamic_routes("rip", changes)
+
+    def paths(self, row, column):
+        # [(next_hop, interface, metric)]: שכנים שהמטריקה שלהם + 1 היא המטריקה של הנתב, ושלא למדו את
+        # ה-prefix דרך אותו subnet
+        width, port_width = len(self.devices) + 1, len(self.ports) + 1
+        metric = int(self.metrics[column * width + row])
+        if not 0 < metric < INFINITY:
+            return []
+        found = []
+        for port in self.row_ports[row]:
+            if self.received[column * port_width + port] != metric:
+                continue
+            interface = self.ports[port][1]
+            for sender in self.port_edges[port]:
+                value = int(self.metrics[column * width + self.port_row[sender]])
+                if value + 1 == metric and self.received[column * port_width + sender] != value:
+                    found.append((self.ports[sender][2], interface, metric))
+        return sorted(found)[:MAX_PATHS]
+
+    def step_lines(self, device_id, rounds=1):
+        # מצב הוראה: מריץ סבבים ומראה מה השתנה בטבלה של device_id, בסגנון debug ip rip
+        self.converge(device_id)
+        for _ in range(rounds):
+            if not len(self.frontier):
+                yield f"RIP: converged ({self.rounds} rounds, {self.changes} metric changes in total)"
+                return
+            row = self.rows.get(device_id)
+            before = self.row_metrics(row) if row is not None else b""
+            installed = dict(self.installed.get(device_id, {}))
+            changed = self.step()
+            self.sync(device_id)
+            yield f"RIP: round {self.rounds}, {changed} metric{'s' if changed != 1 else ''} changed in the domain"
+            if row is None:
+                continue
+            after = self.row_metrics(row)
+            current = self.installed.get(device_id, {})
+            columns = {column for column in range(len(after)) if after[column] != before[column]}
+            columns.update(self.columns[prefix] for prefix in set(installed) | set(current)
+                           if installed.get(prefix) != current.get(prefix))
+            for column in sorted(columns):
+                prefix = format_prefix(*self.prefixes[column])
+                if after[column] >= INFINITY:
+                    yield f"RIP: {prefix} is possibly down, metric {INFINITY}"
+                elif after[column] == 0:
+                    yield f"RIP: {prefix} directly connected"
+                else:
+                    hops = ", ".join(int_to_ip(next_hop) for next_hop, _, _ in self.paths(row, column))
+                    yield f"RIP: {prefix} via {hops}, metric {after[column]}"
+
+    def database_lines(self, device_id):
+        row = self.rows.get(device_id)
+        if row is None:
+            return
+        config = self.configs[device_id]
+        age = int(time.monotonic() - self.updated) % UPDATE_INTERVAL
+        metrics = self.row_metrics(row)
+        for column, prefix in enumerate(self.prefixes):
+            if metrics[column] >= INFINITY:
+                continue
+            if metrics[column] == 0:
+                interfaces = sorted(name for name, link in config.links.items() if link[1:] == prefix)
+                yield f"{format_prefix(*prefix)}    directly connected, {interfaces[0]}"
+                continue
+            yield format_prefix(*prefix)
+            for next_hop, interface, metric in self.paths(row, column):
+                yield f"    [{metric}] via {int_to_ip(next_hop)}, 00:00:{age:02}, {interface}"
@@ -0,0 +1,474 @@
+# routing_engine.py
+
+import functools
+import socket
+
+# מרחק מנהלי ברירת מחדל לכל מקור, וקוד המקור בפלט show ip route
+ADMIN_DISTANCES = {
+    "connected": 0,
+    "local": 0,
+    "static": 1,
+    "eigrp": 90,
+    "ospf": 110,
+    "rip": 120,
+    "eigrp_external": 170,
+}
+
+ROUTE_CODES = {
+    "connected": "C",
+    "local": "L",
+    "static": "S",
+    "eigrp": "D",
+    "ospf": "O",
+    "rip": "R",
+    "eigrp_external": "D EX",
+}
+
+ROUTE_CODES_LEGEND = "Codes: L - local, C - connected, S - static, R - RIP, O - OSPF, D - EIGRP, EX - EIGRP external"
+
+FULL_MASK = 0xFFFFFFFF
+MASKS = [(FULL_MASK << (32 - length)) & FULL_MASK for length in range(33)]
+LENGTHS = {mask: length for length, mask in enumerate(MASKS)}
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    # NumPy נטען רק בפעם הראשונה שמסלול וקטורי צריך אותו, כדי שהעלייה של הסימולטור לא תשלם עליו.
+    # None כשהוא לא מותקן - אז הכול רץ בלולאות רגילות
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def ip_to_int(address):
+    # "10.1.2.3" -> 167838211; inet_aton לבד מקבל גם צורות כמו "10.1", ולכן בודקים ארבעה חלקים
+    if address.count(".") != 3:
+        raise ValueError(f"Invalid IPv4 address: {address}")
+    try:
+        return int.from_bytes(socket.inet_aton(address), "big")
+    except OSError:
+        raise ValueError(f"Invalid IPv4 address: {address}")
+
+
+def int_to_ip(value):
+    return socket.inet_ntoa(value.to_bytes(4, "big"))
+
+
+def mask_to_length(mask):
+    length = LENGTHS.get(ip_to_int(mask) if isinstance(mask, str) else mask)
+    if length is None:
+        raise ValueError(f"Invalid subnet mask: {mask}")
+    return length
+
+
+def parse_prefix(text, mask=None):
+    # "10.0.0.0/24", "10.0.0.0/255.255.255.0" או ("10.0.0.0", "255.255.255.0") -> (network, length).
+    # ביטים של המארח מתאפסים, כמו ש-IOS שומר את הרשת
+    if mask is None:
+        address, _, mask = text.partition("/")
+        if not mask:
+            mask = "32"
+    else:
+        address = text
+    if isinstance(mask, str) and mask.isdigit():
+        length = int(mask)
+        if length > 32:
+            raise ValueError(f"Invalid prefix length: {mask}")
+    else:
+        length = mask_to_length(mask)
+    return ip_to_int(address) & MASKS[length], length
+
+
+def format_prefix(network, length):
+    return f"{int_to_ip(network)}/{length}"
+
+
+class Route:
+    # נתיב אחד ב-RIB. next_hop ו-interface יכולים להיות None (למשל נתיב סטטי לממשק, או connected)
+    __slots__ = ("network", "length", "protocol", "distance", "metric", "next_hop", "interface")
+
+    def __init__(self, network, length, protocol, next_hop=None, interface=None, distance=None, metric=0):
+        self.network = network
+        self.length = length
+        self.protocol = protocol
+        self.distance = ADMIN_DISTANCES[protocol] if distance is None else distance
+        self.metric = metric
+        self.next_hop = next_hop
+        self.interface = interface
+
+    def key(self):
+        return (self.protocol, self.next_hop, self.interface)
+
+    def __repr__(self):
+        return (f"Route({format_prefix(self.network, self.length)}, {self.protocol}, "
+                f"next_hop={None if self.next_hop is None else int_to_ip(self.next_hop)}, "
+                f"interface={self.interface}, [{self.distance}/{self.metric}])")
+
+
+class RadixNode:
+    # צומת ב-Patricia trie: prefix, שני ילדים לפי הביט הבא, והנתיבים לאותו prefix בדיוק (ריק בצומת מעבר)
+    __slots__ = ("network", "length", "children", "routes")
+
+    def __init__(self, network, length):
+        self.network = network
+        self.length = length
+        self.children = [None, None]
+        self.routes = None
+
+
+def common_length(a, b, limit):
+    # אורך ה-prefix המשותף של שתי כתובות, לכל היותר limit
+    if a == b:
+        return limit
+    return min(limit, 32 - (a ^ b).bit_length())
+
+
+class RIB:
+    # טבלת הניתוב המלאה: כל הנתיבים מכל המקורות, ב-Patricia trie לפי prefix.
+    # לכל prefix נבחרים הנתיבים עם המרחק המנהלי הנמוך ביותר (ואחריו ה-metric), עם ECMP
+    def __init__(self):
+        self.root = RadixNode(0, 0)
+        self.nodes = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _insert_node(self, network, length):
+        # מחזיר את הצומת של network/length, ויוצר אותו (ואם צריך - צומת פיצול מעליו) אם הוא חסר
+        parent = self.root
+        if length == 0:
+            return parent
+        while True:
+            bit = (network >> (31 - parent.length)) & 1
+            child = parent.children[bit]
+            if child is None:
+                node = parent.children[bit] = RadixNode(network, length)
+                return node
+            common = common_length(child.network, network, min(child.length, length))
+            if common == child.length:
+                if child.length == length:
+                    return child
+                # child הוא prefix של הצומת החדש - ממשיכים לרדת
+                parent = child
+                continue
+            node = RadixNode(network, length)
+            if common == length:
+                # הצומת החדש הוא prefix של child - נכנס מעליו
+                node.children[(child.network >> (31 - length)) & 1] = child
+                parent.children[bit] = node
+            else:
+                # מתפצלים: צומת מעבר באורך המשותף ושני הענפים מתחתיו
+                glue = RadixNode(network & MASKS[common], common)
+                glue.children[(child.network >> (31 - common)) & 1] = child
+                glue.children[(network >> (31 - common)) & 1] = node
+                parent.children[bit] = glue
+            return node
+
+    def _remove_node(self, node):
+        # צומת בלי נתיבים נשאר רק כצומת פיצול עם שני ילדים; אחרת הילד היחיד עולה במקומו,
+        # וצומת פיצול שנשאר עם ילד אחד מתמזג גם הוא - כך העץ נשאר דחוס
+        del self.nodes[(node.network, node.length)]
+        if node is self.root:
+            return
+        parent, grandparent = None, None
+        current = self.root
+        while current is not node:
+            grandparent, parent = parent, current
+            current = current.children[(node.network >> (31 - current.length)) & 1]
+        left, right = node.children
+        if left is not None and right is not None:
+            return
+        parent.children[(node.network >> (31 - parent.length)) & 1] = left or right
+        if parent is not self.root and not parent.routes and None in parent.children:
+            remaining = parent.children[0] or parent.children[1]
+            grandparent.children[(parent.network >> (31 - grandparent.length)) & 1] = remaining
+
+    def add(self, route):
+        # מחזיר True אם הנתיבים הנבחרים ל-prefix השתנו (ויש לעדכן את ה-FIB)
+        node = self.nodes.get((route.network, route.length))
+        if node is None:
+            node = self.nodes[(route.network, route.length)] = self._insert_node(route.network, route.length)
+        before = self.best(node)
+        if node.routes is None:
+            node.routes = []
+        key = route.key()
+        node.routes = [existing for existing in node.routes if existing.key() != key] + [route]
+        return self.best(node) != before
+
+    def remove(self, network, length, protocol, next_hop=None, interface=None, any_next_hop=False):
+        node = self.nodes.get((network, length))
+        if node is None or not node.routes:
+            return False
+        before = self.best(node)
+        node.routes = [route for route in node.routes
+                       if not (route.protocol == protocol
+                               and (any_next_hop or (route.next_hop == next_hop and route.interface == interface)))]
+        if not node.routes:
+            node.routes = None
+            self._remove_node(node)
+        return self.best(node) != before
+
+    @staticmethod
+    def best(node):
+        # הנתיבים עם (מרחק מנהלי, metric) הטובים ביותר, ואיתם שאר הנתיבים של אותו פרוטוקול: פרוטוקול
+        # דינמי מתקין רק נתיבים שהוא עצמו בחר, גם כשה-metric שלהם שונה (variance של EIGRP)
+        if not node.routes:
+            return ()
+        top = min(node.routes, key=lambda route: (route.distance, route.metric))
+        return tuple(route for route in node.routes if route.distance == top.distance
+                     and (route.metric == top.metric or route.protocol == top.protocol))
+
+    def routes_for(self, network, length):
+        node = self.nodes.get((network, length))
+        return list(node.routes) if node is not None and node.routes else []
+
+    def lookup(self, address):
+        # ההתאמה הארוכה ביותר בעץ עצמו (ה-FIB מהיר יותר; זה לשאילתות show ולבדיקות)
+        node = self.root
+        found = None
+        while node is not None:
+            if node.length and (address ^ node.network) >> (32 - node.length):
+                break
+            if node.routes:
+                found = node
+            if node.length == 32:
+                break
+            node = node.children[(address >> (31 - node.length)) & 1]
+        return found
+
+    def __iter__(self):
+        # כל הצמתים עם נתיבים, לפי סדר הכתובות (וה-prefix הקצר לפני הארוך), בלי רקורסיה
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.routes:
+                yield node
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
+
+    def subtree(self, network, length):
+        # כל ה-prefixes בתוך network/length (show ip route ... longer-prefixes)
+        node = self.root
+        while node is not None and node.length < length:
+            node = node.children[(network >> (31 - node.length)) & 1]
+        if node is None or (network ^ node.network) & MASKS[length]:
+            return
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.routes:
+                yield current
+            for child in reversed(current.children):
+                if child is not None:
+                    stack.append(child)
+
+
+class FIB:
+    # טבלת ההעברה: רק הנתיבים הנבחרים, במילון נפרד לכל אורך prefix.
+    # חיפוש = מעבר על האורכים הקיימים מהארוך לקצר, עם גישה אחת למילון בכל אורך
+    def __init__(self):
+        self.tables = {}
+        self.order = []
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def set(self, network, length, entry):
+        table = self.tables.get(length)
+        if table is None:
+            table = self.tables[length] = {}
+            self._reorder()
+        table[network] = entry
+
+    def delete(self, network, length):
+        table = self.tables.get(length)
+        if table is not None and table.pop(network, None) is not None and not table:
+            del self.tables[length]
+            self._reorder()
+
+    def _reorder(self):
+        self.order = [(MASKS[length], self.tables[length], length) for length in sorted(self.tables, reverse=True)]
+
+    def lookup(self, address):
+        for mask, table, _ in self.order:
+            entry = table.get(address & mask)
+            if entry is not None:
+                return entry
+        return None
+
+    def lookup_prefix(self, address):
+        # כמו lookup, אבל מחזיר גם את ה-prefix שהתאים: (network, length, entry)
+        for mask, table, length in self.order:
+            network = address & mask
+            entry = table.get(network)
+            if entry is not None:
+                return network, length, entry
+        return None
+
+    def lookup_many(self, addresses):
+        order = self.order
+        results = []
+        append = results.append
+        for address in addresses:
+            for mask, table, _ in order:
+                entry = table.get(address & mask)
+                if entry is not None:
+                    break
+            else:
+                entry = None
+            append(entry)
+        return results
+
+
+class RoutingEngine:
+    # RIB + FIB של מכשיר אחד. כל שינוי ב-RIB מעדכן ב-FIB רק את ה-prefix שהשתנה
+    def __init__(self):
+        self.rib = RIB()
+        self.fib = FIB()
+        # ממשק -> (כתובת, אורך) של הנתיבים connected/local שהוא התקין
+        self.connected = {}
+
+    def add_route(self, network, length, protocol, next_hop=None, interface=None, distance=None, metric=0):
+        route = Route(network, length, protocol, next_hop, interface, distance, metric)
+        if self.rib.add(route):
+            self._update_fib(network, length)
+        return route
+
+    def remove_route(self, network, length, protocol, next_hop=None, interface=None, any_next_hop=False):
+        if self.rib.remove(network, length, protocol, next_hop, interface, any_next_hop):
+            self._update_fib(network, length)
+
+    def replace_protocol_routes(self, protocol, routes):
+        # מנועי הניתוב הדינמי (OSPF, EIGRP, RIP) מתקינים את כל התוצאה שלהם בבת אחת:
+        # routes = [(network, length, next_hop, interface, metric)]; prefixes שלא השתנו לא נוגעים ב-FIB
+        wanted = {}
+        for network, length, next_hop, interface, metric in routes:
+            wanted.setdefault((network, length), []).append((next_hop, interface, metric))
+        for node in [node for node in self.rib if any(route.protocol == protocol for route in node.routes)]:
+            if (node.network, node.length) not in wanted:
+                self.remove_route(node.network, node.length, protocol, any_next_hop=True)
+        for (network, length), paths in wanted.items():
+            self.set_protocol_routes(protocol, network, length, paths)
+
+    def set_protocol_routes(self, protocol, network, length, paths):
+        # הנתיבים של פרוטוקול ל-prefix אחד: paths = [(next_hop, interface, metric)], רשימה ריקה מוחקת
+        current = {(route.next_hop, route.interface, route.metric)
+                   for route in self.rib.routes_for(network, length) if route.protocol == protocol}
+        if current == set(paths):
+            return
+        self.remove_route(network, length, protocol, any_next_hop=True)
+        for next_hop, interface, metric in paths:
+            self.add_route(network, length, protocol, next_hop, interface, metric=metric)
+
+    def _update_fib(self, network, length):
+        node = self.rib.nodes.get((network, length))
+        best = self.rib.best(node) if node is not None else ()
+        if best:
+            self.fib.set(network, length, best)
+        else:
+            self.fib.delete(network, length)
+
+    def set_interface(self, name, config):
+        # נתיבי connected ו-local של ממשק: קיימים רק כשיש לו כתובת והוא פעיל
+        self.remove_interface(name)
+        address, mask = config.get("ip_address"), config.get("subnet_mask")
+        if not address or not mask or config.get("status") != "up":
+            return
+        try:
+            host = ip_to_int(address)
+            length = mask_to_length(mask)
+        except ValueError:
+            return
+        self.add_route(host & MASKS[length], length, "connected", interface=name)
+        self.add_route(host, 32, "local", interface=name)
+        self.connected[name] = (host, length)
+
+    def remove_interface(self, name):
+        installed = self.connected.pop(name, None)
+        if installed is not None:
+            host, length = installed
+            self.remove_route(host & MASKS[length], length, "connected", interface=name)
+            self.remove_route(host, 32, "local", interface=name)
+
+    def lookup(self, address):
+        return self.fib.lookup(address)
+
+    def resolve(self, address, depth=8):
+        # ממשק היציאה ו-next hop לכתובת, כולל פתרון רקורסיבי של next hop בנתיב סטטי.
+        # מחזיר (interface, next_hop) או None אם אין נתיב
+        next_hop = None
+        for _ in range(depth):
+            entry = self.fib.lookup(address)
+            if entry is None:
+                return None
+            route = entry[0]
+            if route.interface is not None:
+                return route.interface, route.next_hop if route.next_hop is not None else next_hop
+            next_hop = route.next_hop
+            address = route.next_hop
+        return None
+
+    def is_local(self, address):
+        entry = self.fib.lookup(address)
+        return entry is not None and entry[0].protocol == "local" and entry[0].length == 32
+
+    def show_ip_route(self, network=None, length=None):
+        # פלט בסגנון IOS, שורה אחר שורה (generator)
+        yield ROUTE_CODES_LEGEND
+        yield ""
+        default = self.fib.tables.get(0, {}).get(0)
+        if default is None:
+            yield "Gateway of last resort is not set"
+        elif default[0].next_hop is not None:
+            yield f"Gateway of last resort is {int_to_ip(default[0].next_hop)} to network 0.0.0.0"
+        else:
+            yield "Gateway of last resort is 0.0.0.0 to network 0.0.0.0"
+        yield ""
+        nodes = self.rib if network is None else self.rib.subtree(network, length)
+        for node in nodes:
+            for route in self.rib.best(node):
+                yield format_route(route)
+
+    def show_route_entry(self, address):
+        node = self.rib.lookup(address)
+        if node is None:
+            yield "% Network not in table"
+            return
+        best = self.rib.best(node)
+        yield f"Routing entry for {format_prefix(node.network, node.length)}"
+        yield f'  Known via "{best[0].protocol}", distance {best[0].distance}, metric {best[0].metric}'
+        yield "  Routing Descriptor Blocks:"
+        for route in best:
+            if route.next_hop is not None:
+                yield f"  * {int_to_ip(route.next_hop)}" + (f", via {route.interface}" if route.interface else "")
+            else:
+                yield f"  * directly connected, via {route.interface}"
+
+    def show_ip_cef(self):
+        yield f"{'Prefix':<21}{'Next Hop':<21}Interface"
+        for node in self.rib:
+            best = self.rib.best(node)
+            if not best:
+                continue
+            for route in best:
+                prefix = format_prefix(node.network, node.length)
+                if route.protocol == "local":
+                    yield f"{prefix:<21}{'receive':<21}{route.interface}"
+                elif route.next_hop is None:
+                    yield f"{prefix:<21}{'attached':<21}{route.interface}"
+                else:
+                    resolved = self.resolve(route.next_hop)
+                    interface = resolved[0] if resolved else ""
+                    yield f"{prefix:<21}{int_to_ip(route.next_hop):<21}{interface}"
+
+
+def format_route(route):
+    code = ROUTE_CODES.get(route.protocol, "?")
+    prefix = format_prefix(route.network, route.length)
+    if route.next_hop is None:
+        return f"{code:<9}{prefix} is directly connected, {route.interface}"
+    via = f"{code:<9}{prefix} [{route.distance}/{route.metric}] via {int_to_ip(route.next_hop)}"
+    return via + (f", {route.interface}" if route.interface else "")
@@ -0,0 +1,70 @@
+# script_runner.py
+
+import argparse
+import json
+import sys
+import time
+from cli_simulator import CLISimulator, STATUS_OK
+from command_catalog import CommandCatalog
+from data_manager import DataManager, DURABILITY_CHECKPOINT
+import state_schema
+
+
+def create_simulator(device_type, catalog, db_name=':memory:', device_id=state_schema.DEFAULT_DEVICE):
+    # מכשיר נקי לכל קובץ; ברירת המחדל היא מסד בזיכרון כדי שהרצה לא תיגע ב-cisco_simulator.db.
+    # במסד קובץ המצב הקודם של device_id נמחק, כך שהרצה חוזרת לא ממשיכה מאיפה שהקודמת עצרה
+    manager = DataManager(db_name, durability=DURABILITY_CHECKPOINT, device_id=device_id, commands=catalog.commands)
+    with manager.conn:
+        state_schema.delete_device(manager.conn, device_id)
+    simulator = CLISimulator(manager, catalog)
+    simulator.set_device_type(device_type)
+    return simulator
+
+
+def run_file(simulator, f, out, output_format, stop_on_error):
+    counts = {}
+    for result in simulator.run_script(f, stop_on_error):
+        counts[result.status] = counts.get(result.status, 0) + 1
+        if output_format == "json":
+            out.write(json.dumps(result._asdict(), ensure_ascii=False) + "\n")
+        elif output_format == "text" and (result.output or result.status != STATUS_OK):
+            out.write(f"{result.line}: {result.output}\n" if result.status != STATUS_OK else result.output + "\n")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="הרצת קבצי קונפיגורציה דרך הסימולטור, ללא ממשק")
+    parser.add_argument("files", nargs="*", default=["-"], help="קבצי קונפיגורציה ('-' לקלט הסטנדרטי)")
+    parser.add_argument("--device-type", choices=["router", "switch"], default="router")
+    parser.add_argument("--format", choices=["json", "text", "none"], default="json")
+    parser.add_argument("--db", default=":memory:",
+                        help="מסד SQLite לשמירת התוצאות; כל קובץ רץ כמכשיר נפרד בשם הקובץ ('stdin' לקלט הסטנדרטי)")
+    parser.add_argument("--stop-on-error", action="store_true")
+    parser.add_argument("--summary", action="store_true", help="סיכום ומהירות ל-stderr")
+    args = parser.parse_args(argv)
+
+    catalog = CommandCatalog.shared()
+    totals = {}
+    start = time.perf_counter()
+    for path in args.files:
+        simulator = create_simulator(args.device_type, catalog, args.db, "stdin" if path == "-" else path)
+        if path == "-":
+            counts = run_file(simulator, sys.stdin, sys.stdout, args.format, args.stop_on_error)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                counts = run_file(simulator, f, sys.stdout, args.format, args.stop_on_error)
+        simulator.data_manager.close()
+        for status, count in counts.items():
+            totals[status] = totals.get(status, 0) + count
+    elapsed = time.perf_counter() - start
+
+    if args.summary:
+        lines = sum(totals.values())
+        rate = lines / elapsed if elapsed else 0.0
+        sys.stderr.write(json.dumps({"files": len(args.files), "lines": lines, "statuses": totals,
+                                     "seconds": round(elapsed, 3), "lines_per_second": round(rate)}) + "\n")
+    return 0 if set(totals) <= {STATUS_OK} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
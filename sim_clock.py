@@ -0,0 +1,28 @@
+# sim_clock.py
+
+import threading
+import time
+
+
+class MonotonicClock:
+    # הזמן האמיתי, בשניות; ברירת המחדל לסשן אינטראקטיבי
+    def now(self):
+        return time.monotonic()
+
+
+class SimulatedClock:
+    # זמן מדומה שמתקדם רק כשמבקשים: בדיקות ותרחישי מעבדה מריצים שעה של aging בלי לחכות.
+    # שעון אחד יכול להיות משותף לכל המכשירים במרשם, כך שכולם "מזדקנים" יחד
+    def __init__(self, start=0.0):
+        self.time = float(start)
+        self.lock = threading.Lock()
+
+    def now(self):
+        return self.time
+
+    def advance(self, seconds):
+        if seconds < 0:
+            raise ValueError("Simulated time cannot go backwards")
+        with self.lock:
+            self.time += seconds
+            return self.time
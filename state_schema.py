@@ -0,0 +1,318 @@
+# state_schema.py
+
+import json
+
+# גרסת הסכמה נשמרת ב-PRAGMA user_version:
+# 0 = הפורמט הישן (ערך JSON אחד לכל מפתח ב-device_state), 1 = טבלאות מנורמלות למכשיר יחיד,
+# 2 = כל שורה שייכת למכשיר לפי device_id, כך שמסד אחד מחזיק מכשירים רבים,
+# 3 = ארכיון ה-snapshots של הקונפיגורציה (config_archive)
+SCHEMA_VERSION = 3
+
+# המכשיר היחיד של סימולטור רגיל, ושל נתונים שהומרו מגרסאות קודמות
+DEFAULT_DEVICE = "default"
+
+# אוספים שנשמרים בטבלאות משלהם; שאר המפתחות (hostname, users וכו') נשארים ב-device_state
+COLLECTIONS = ("interfaces", "vlans", "routing_table", "access_lists", "dhcp_pools")
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS devices (
+        device_id TEXT PRIMARY KEY,
+        device_type TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS device_state (
+        device_id TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT,
+        PRIMARY KEY (device_id, key)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS interfaces (
+        device_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        PRIMARY KEY (device_id, name)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS interface_attributes (
+        device_id TEXT NOT NULL,
+        interface TEXT NOT NULL,
+        attribute TEXT NOT NULL,
+        value TEXT,
+        PRIMARY KEY (device_id, interface, attribute)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS vlans (
+        device_id TEXT NOT NULL,
+        vlan_id TEXT NOT NULL,
+        name TEXT,
+        extra TEXT,
+        PRIMARY KEY (device_id, vlan_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS vlan_members (
+        device_id TEXT NOT NULL,
+        vlan_id TEXT NOT NULL,
+        interface TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (device_id, vlan_id, interface)
+    ) WITHOUT ROWID''',
+    '''CREATE INDEX IF NOT EXISTS vlan_members_by_interface ON vlan_members (device_id, interface)''',
+    '''CREATE TABLE IF NOT EXISTS routes (
+        id INTEGER PRIMARY KEY,
+        device_id TEXT NOT NULL,
+        destination TEXT NOT NULL,
+        next_hop TEXT,
+        distance INTEGER,
+        time TEXT,
+        extra TEXT
+    )''',
+    '''CREATE INDEX IF NOT EXISTS routes_by_destination ON routes (device_id, destination)''',
+    '''CREATE INDEX IF NOT EXISTS routes_by_next_hop ON routes (device_id, next_hop)''',
+    '''CREATE TABLE IF NOT EXISTS acl_entries (
+        device_id TEXT NOT NULL,
+        acl_id TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        rule TEXT,
+        PRIMARY KEY (device_id, acl_id, seq)
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS dhcp_pools (
+        device_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        config TEXT,
+        PRIMARY KEY (device_id, name)
+    )''',
+    # הארכיון לפי כתובת תוכן: blob לכל פריט, עץ (רשימת [name, hash]) לכל חלק, ו-snapshot שמצביע על העצים.
+    # blobs ועצים משותפים לכל המכשירים ולא משתנים אחרי שנכתבו
+    '''CREATE TABLE IF NOT EXISTS config_blobs (
+        hash TEXT PRIMARY KEY,
+        content TEXT
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS config_trees (
+        hash TEXT PRIMARY KEY,
+        items TEXT
+    ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS config_snapshots (
+        snapshot_id INTEGER PRIMARY KEY,
+        device_id TEXT NOT NULL,
+        number INTEGER NOT NULL,
+        created TEXT,
+        label TEXT,
+        sections TEXT,
+        UNIQUE (device_id, number)
+    )''',
+]
+
+# טבלה -> העמודות שלה בגרסה 1, להעתקה בהמרה לגרסה 2
+V1_COLUMNS = {
+    "device_state": ("key", "value"),
+    "interfaces": ("name",),
+    "interface_attributes": ("interface", "attribute", "value"),
+    "vlans": ("vlan_id", "name", "extra"),
+    "vlan_members": ("vlan_id", "interface", "position"),
+    "routes": ("id", "destination", "next_hop", "distance", "time", "extra"),
+    "acl_entries": ("acl_id", "seq", "rule"),
+    "dhcp_pools": ("name", "config"),
+}
+
+ROUTE_COLUMNS = ("destination", "next_hop", "distance", "time")
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+
+def migrate(conn):
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than supported version {SCHEMA_VERSION}")
+    if version == SCHEMA_VERSION:
+        return
+    with conn:
+        if version < 1 and table_exists(conn, "device_state"):
+            migrate_json_blobs(conn)
+        elif version == 1:
+            migrate_device_ids(conn)
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def migrate_json_blobs(conn):
+    # המרה מהפורמט הישן: כל מפתח, כולל האוספים, היה ערך JSON אחד בטבלת device_state
+    conn.execute("ALTER TABLE device_state RENAME TO device_state_v0")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    for key, value in conn.execute("SELECT key, value FROM device_state_v0").fetchall():
+        if key in COLLECTIONS:
+            replace_collection(conn, DEFAULT_DEVICE, key, json.loads(value) if value else None)
+        else:
+            conn.execute("INSERT INTO device_state (device_id, key, value) VALUES (?, ?, ?)",
+                         (DEFAULT_DEVICE, key, value))
+    conn.execute("DROP TABLE device_state_v0")
+
+
+def migrate_device_ids(conn):
+    # גרסה 1 -> 2: בנייה מחדש של כל טבלה עם device_id; השורות הקיימות שייכות למכשיר ברירת המחדל
+    for index in ("vlan_members_by_interface", "routes_by_destination", "routes_by_next_hop"):
+        conn.execute(f"DROP INDEX IF EXISTS {index}")
+    for table in V1_COLUMNS:
+        if table_exists(conn, table):
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_v1")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    for table, columns in V1_COLUMNS.items():
+        if not table_exists(conn, f"{table}_v1"):
+            continue
+        column_list = ", ".join(columns)
+        order = "" if table in ("interface_attributes", "vlan_members", "acl_entries", "device_state") else " ORDER BY rowid"
+        conn.execute(f"INSERT INTO {table} (device_id, {column_list}) "
+                     f"SELECT ?, {column_list} FROM {table}_v1{order}", (DEFAULT_DEVICE,))
+        conn.execute(f"DROP TABLE {table}_v1")
+
+
+def delete_device(conn, device_id):
+    for table in V1_COLUMNS:
+        conn.execute(f"DELETE FROM {table} WHERE device_id = ?", (device_id,))
+    # blobs ועצים עשויים להיות משותפים למכשירים אחרים ונשארים
+    conn.execute("DELETE FROM config_snapshots WHERE device_id = ?", (device_id,))
+    conn.execute("DELETE FROM devices WHERE device_id = ?", (device_id,))
+
+
+def read_state(conn, device_id=DEFAULT_DEVICE):
+    state = {key: json.loads(value) for key, value in conn.execute(
+        "SELECT key, value FROM device_state WHERE device_id = ?", (device_id,))}
+
+    interfaces = {name: {} for (name,) in conn.execute(
+        "SELECT name FROM interfaces WHERE device_id = ? ORDER BY rowid", (device_id,))}
+    for interface, attribute, value in conn.execute(
+            "SELECT interface, attribute, value FROM interface_attributes WHERE device_id = ?", (device_id,)):
+        interfaces.setdefault(interface, {})[attribute] = json.loads(value)
+    state["interfaces"] = interfaces
+
+    vlans = {}
+    for vlan_id, name, extra in conn.execute(
+            "SELECT vlan_id, name, extra FROM vlans WHERE device_id = ? ORDER BY rowid", (device_id,)):
+        vlan = json.loads(extra) if extra else {}
+        vlan["name"] = name
+        vlan["interfaces"] = []
+        vlans[vlan_id] = vlan
+    for vlan_id, interface in conn.execute(
+            "SELECT vlan_id, interface FROM vlan_members WHERE device_id = ? ORDER BY vlan_id, position", (device_id,)):
+        if vlan_id in vlans:
+            vlans[vlan_id]["interfaces"].append(interface)
+    state["vlans"] = vlans
+
+    state["routing_table"] = [route_from_row(row) for row in conn.execute(
+        "SELECT destination, next_hop, distance, time, extra FROM routes WHERE device_id = ? ORDER BY id", (device_id,))]
+
+    access_lists = {}
+    for acl_id, rule in conn.execute(
+            "SELECT acl_id, rule FROM acl_entries WHERE device_id = ? ORDER BY acl_id, seq", (device_id,)):
+        access_lists.setdefault(acl_id, []).append(json.loads(rule))
+    state["access_lists"] = access_lists
+
+    state["dhcp_pools"] = {name: json.loads(config) for name, config in conn.execute(
+        "SELECT name, config FROM dhcp_pools WHERE device_id = ? ORDER BY rowid", (device_id,))}
+    return state
+
+
+def route_from_row(row):
+    destination, next_hop, distance, time, extra = row
+    route = json.loads(extra) if extra else {}
+    route.update({"destination": destination, "next_hop": next_hop, "distance": distance, "time": time})
+    return route
+
+
+def route_to_row(device_id, route):
+    extra = {key: value for key, value in route.items() if key not in ROUTE_COLUMNS}
+    return (device_id, route.get("destination"), route.get("next_hop"), route.get("distance"), route.get("time"),
+            json.dumps(extra) if extra else None)
+
+
+def write_scalar(conn, device_id, key, value):
+    conn.execute("INSERT OR REPLACE INTO device_state (device_id, key, value) VALUES (?, ?, ?)",
+                 (device_id, key, json.dumps(value)))
+
+
+def write_interface(conn, device_id, name, config):
+    conn.execute("DELETE FROM interface_attributes WHERE device_id = ? AND interface = ?", (device_id, name))
+    if config is None:
+        conn.execute("DELETE FROM interfaces WHERE device_id = ? AND name = ?", (device_id, name))
+        return
+    conn.execute("INSERT OR IGNORE INTO interfaces (device_id, name) VALUES (?, ?)", (device_id, name))
+    conn.executemany("INSERT INTO interface_attributes (device_id, interface, attribute, value) VALUES (?, ?, ?, ?)",
+                     [(device_id, name, attribute, json.dumps(value)) for attribute, value in config.items()])
+
+
+def write_interface_attribute(conn, device_id, name, attribute, config):
+    if config is None:
+        return
+    conn.execute("INSERT OR IGNORE INTO interfaces (device_id, name) VALUES (?, ?)", (device_id, name))
+    if attribute in config:
+        conn.execute("INSERT OR REPLACE INTO interface_attributes (device_id, interface, attribute, value) "
+                     "VALUES (?, ?, ?, ?)", (device_id, name, attribute, json.dumps(config[attribute])))
+    else:
+        conn.execute("DELETE FROM interface_attributes WHERE device_id = ? AND interface = ? AND attribute = ?",
+                     (device_id, name, attribute))
+
+
+def write_vlan(conn, device_id, vlan_id, vlan):
+    conn.execute("DELETE FROM vlan_members WHERE device_id = ? AND vlan_id = ?", (device_id, vlan_id))
+    if vlan is None:
+        conn.execute("DELETE FROM vlans WHERE device_id = ? AND vlan_id = ?", (device_id, vlan_id))
+        return
+    extra = {key: value for key, value in vlan.items() if key not in ("name", "interfaces")}
+    conn.execute("INSERT INTO vlans (device_id, vlan_id, name, extra) VALUES (?, ?, ?, ?) "
+                 "ON CONFLICT (device_id, vlan_id) DO UPDATE SET name = excluded.name, extra = excluded.extra",
+                 (device_id, vlan_id, vlan.get("name"), json.dumps(extra) if extra else None))
+    conn.executemany("INSERT OR IGNORE INTO vlan_members (device_id, vlan_id, interface, position) VALUES (?, ?, ?, ?)",
+                     [(device_id, vlan_id, interface, position)
+                      for position, interface in enumerate(vlan.get("interfaces", []))])
+
+
+def write_routes(conn, device_id, destination, routes):
+    conn.execute("DELETE FROM routes WHERE device_id = ? AND destination = ?", (device_id, destination))
+    conn.executemany("INSERT INTO routes (device_id, destination, next_hop, distance, time, extra) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", [route_to_row(device_id, route) for route in routes])
+
+
+def write_access_list(conn, device_id, acl_id, rules):
+    conn.execute("DELETE FROM acl_entries WHERE device_id = ? AND acl_id = ?", (device_id, acl_id))
+    if rules:
+        conn.executemany("INSERT INTO acl_entries (device_id, acl_id, seq, rule) VALUES (?, ?, ?, ?)",
+                         [(device_id, acl_id, seq, json.dumps(rule)) for seq, rule in enumerate(rules, 1)])
+
+
+def write_dhcp_pool(conn, device_id, name, config):
+    if config is None:
+        conn.execute("DELETE FROM dhcp_pools WHERE device_id = ? AND name = ?", (device_id, name))
+    else:
+        conn.execute("INSERT INTO dhcp_pools (device_id, name, config) VALUES (?, ?, ?) "
+                     "ON CONFLICT (device_id, name) DO UPDATE SET config = excluded.config",
+                     (device_id, name, json.dumps(config)))
+
+
+def replace_collection(conn, device_id, key, value):
+    if key == "interfaces":
+        conn.execute("DELETE FROM interface_attributes WHERE device_id = ?", (device_id,))
+        conn.execute("DELETE FROM interfaces WHERE device_id = ?", (device_id,))
+        for name, config in (value or {}).items():
+            write_interface(conn, device_id, name, config)
+    elif key == "vlans":
+        conn.execute("DELETE FROM vlan_members WHERE device_id = ?", (device_id,))
+        conn.execute("DELETE FROM vlans WHERE device_id = ?", (device_id,))
+        for vlan_id, vlan in (value or {}).items():
+            write_vlan(conn, device_id, str(vlan_id), vlan)
+    elif key == "routing_table":
+        conn.execute("DELETE FROM routes WHERE device_id = ?", (device_id,))
+        conn.executemany("INSERT INTO routes (device_id, destination, next_hop, distance, time, extra) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", [route_to_row(device_id, route) for route in value or []])
+    elif key == "access_lists":
+        conn.execute("DELETE FROM acl_entries WHERE device_id = ?", (device_id,))
+        for acl_id, rules in (value or {}).items():
+            write_access_list(conn, device_id, str(acl_id), rules)
+    elif key == "dhcp_pools":
+        conn.execute("DELETE FROM dhcp_pools WHERE device_id = ?", (device_id,))
+        for name, config in (value or {}).items():
+            write_dhcp_pool(conn, device_id, name, config)
+    else:
+        raise KeyError(key)
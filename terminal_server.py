@@ -0,0 +1,245 @@
+# terminal_server.py
+
+import argparse
+import asyncio
+import time
+from cli_simulator import CLISimulator, STATUS_OK, STATUS_UNKNOWN
+from command_parser import CommandError
+from device_registry import DeviceRegistry
+from logger import Logger
+from output_pipeline import MORE_PROMPT, Pager, as_lines
+
+# בתים של פרוטוקול telnet שמגיעים מלקוח telnet אמיתי ולא שייכים לפקודה
+IAC = 255
+SB = 250
+SE = 240
+WILL, WONT, DO, DONT = 251, 252, 253, 254
+
+LOGOUT_COMMANDS = ("exit", "quit", "logout")
+
+
+def strip_telnet(data):
+    # מסיר רצפי משא ומתן של telnet (IAC ...) ומחזיר רק את התווים של המשתמש
+    if IAC not in data:
+        return data
+    result = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != IAC:
+            result.append(byte)
+            i += 1
+        elif i + 1 < len(data) and data[i + 1] == IAC:
+            result.append(IAC)
+            i += 2
+        elif i + 1 < len(data) and data[i + 1] == SB:
+            end = data.find(bytes([IAC, SE]), i + 2)
+            i = len(data) if end == -1 else end + 2
+        elif i + 1 < len(data) and data[i + 1] in (WILL, WONT, DO, DONT):
+            i += 3
+        else:
+            i += 2
+    return bytes(result)
+
+
+class Session:
+    # חיבור אחד: מצב, prompt והיסטוריה משלו מעל המצב המשותף של המכשיר ב-DeviceRegistry
+    def __init__(self, server, reader, writer):
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.device_id = None
+        self.simulator = None
+        self.task = None
+        self.last_activity = time.monotonic()
+
+    async def send(self, text):
+        writer = self.writer
+        writer.write(text.replace("\n", "\r\n").encode("utf-8"))
+        # backpressure: כשהחוצץ מעל output_limit מחכים שהלקוח יקרא; לקוח תקוע מנותק אחרי write_timeout.
+        # wait_for יוצר task, ולכן רק כשבאמת צריך לחכות
+        if writer.transport.get_write_buffer_size() >= self.server.output_limit:
+            await asyncio.wait_for(writer.drain(), self.server.write_timeout)
+
+    async def readline(self, strip=True):
+        data = await self.reader.readline()
+        if not data:
+            raise ConnectionResetError("client closed the connection")
+        self.last_activity = time.monotonic()
+        text = strip_telnet(data).decode("utf-8", errors="replace")
+        return text.strip() if strip else text.rstrip("\r\n")
+
+    async def page(self, output):
+        # שולח את הפלט בחלקים תוך כדי הפקתו; ב---More-- מחכה לתשובה (רווח, Enter או q) בלי לחסום סשנים אחרים
+        # שגיאה של handler באמצע הפלט מודפסת כמו שגיאה של פקודה, בלי לנתק את הסשן
+        try:
+            pager = Pager(as_lines(output), self.simulator.command_parser.terminal_length)
+            while True:
+                chunk = pager.next_chunk()
+                if not chunk:
+                    return
+                await self.send("\n".join(chunk) + "\n")
+                if pager.more:
+                    await self.send(MORE_PROMPT)
+                    if not pager.answer(await self.readline(strip=False)):
+                        await self.send("\n")
+                        return
+        except CommandError as e:
+            await self.send(f"% {e}\n")
+
+    async def login(self):
+        server = self.server
+        while True:
+            await self.send("Device: ")
+            device_id = await self.readline()
+            if not device_id:
+                continue
+            if device_id not in server.registry:
+                if not server.auto_create:
+                    await self.send(f"% Unknown device {device_id}\n")
+                    continue
+                server.registry.add_device(device_id, server.device_type)
+            device = server.registry.device(device_id)
+            self.device_id = device_id
+            self.simulator = CLISimulator(device.data_manager, server.registry.catalog)
+            self.simulator.set_device_type(device.device_type)
+            self.simulator.set_language(server.language)
+            self.simulator.command_parser.trace = False
+            return
+
+    async def run(self):
+        await self.login()
+        simulator = self.simulator
+        while True:
+            simulator.hostname = simulator.data_manager.get_device_state("hostname") or simulator.hostname
+            simulator.update_prompt()
+            await self.send(simulator.prompt)
+            line = await self.readline()
+            if not line:
+                continue
+            simulator.history.append(line)
+            if line == "?":
+                await self.send("\n".join(simulator.help_lines()) + "\n")
+                continue
+            if simulator.mode == "user" and line.lower() in LOGOUT_COMMANDS:
+                await self.send("Bye!\n")
+                return
+            result = simulator.execute(line, lazy=True)
+            if result.status == STATUS_UNKNOWN:
+                await self.send(f"% Invalid input detected: {line}\n")
+            elif result.status != STATUS_OK:
+                await self.send(f"% {result.output}\n")
+            else:
+                await self.page(result.output)
+
+
+class TerminalServer:
+    # שרת telnet יחיד (asyncio) לכל הכיתה: כל חיבור הוא Session, וכל Session ממופה למכשיר במרשם
+    def __init__(self, registry, host="127.0.0.1", port=2323, max_sessions=500, idle_timeout=900.0,
+                 write_timeout=30.0, output_limit=64 * 1024, device_type="router", language="en",
+                 auto_create=True):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.write_timeout = write_timeout
+        self.output_limit = output_limit
+        self.device_type = device_type
+        self.language = language
+        self.auto_create = auto_create
+        self.sessions = set()
+        self.server = None
+        self.reaper = None
+        self.logger = Logger(subsystem="server")
+
+    async def start(self):
+        # תור ה-accept בגודל מספר הסשנים: כיתה שלמה שמתחברת יחד לא נתקעת בחיבורים חצי-פתוחים
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port,
+                                                 backlog=max(100, self.max_sessions))
+        # port=0 בוחר פורט פנוי; שומרים את הפורט בפועל
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.reaper = asyncio.get_running_loop().create_task(self.reap_idle_sessions())
+        self.logger.info("Terminal server listening on %s:%s", self.host, self.port)
+        return self
+
+    async def reap_idle_sessions(self):
+        # task אחד לכל השרת במקום טיימר לכל קריאה: סוגר סשנים שלא הוקלד בהם דבר idle_timeout שניות
+        while True:
+            await asyncio.sleep(min(self.idle_timeout / 4, 5.0))
+            deadline = time.monotonic() - self.idle_timeout
+            for session in list(self.sessions):
+                if session.last_activity < deadline and not session.writer.is_closing():
+                    session.writer.write(b"\r\n% Session timed out\r\n")
+                    session.writer.close()
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.reaper is not None:
+            self.reaper.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        sessions = list(self.sessions)
+        for session in sessions:
+            session.writer.close()
+        await asyncio.gather(*[session.task for session in sessions], return_exceptions=True)
+        self.registry.flush()
+
+    async def handle_client(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=self.output_limit)
+        if len(self.sessions) >= self.max_sessions:
+            writer.write(b"% Too many sessions, try again later\r\n")
+            await self.close_writer(writer)
+            return
+        session = Session(self, reader, writer)
+        session.task = asyncio.current_task()
+        self.sessions.add(session)
+        try:
+            await session.run()
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            # הלקוח התנתק, לא קרא את הפלט בזמן, או שהסשן נסגר כי היה במנוחה
+            pass
+        except Exception as e:
+            self.logger.error("Session error on device %s: %s", session.device_id, e)
+        finally:
+            await self.close_writer(writer)
+            self.sessions.discard(session)
+
+    @staticmethod
+    async def close_writer(writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="שרת telnet לסימולטור - הרבה משתמשים ומכשירים בתהליך אחד")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2323)
+    parser.add_argument("--db", default="cisco_simulator.db")
+    parser.add_argument("--max-sessions", type=int, default=500)
+    parser.add_argument("--idle-timeout", type=float, default=900.0)
+    parser.add_argument("--device-type", choices=["router", "switch"], default="router")
+    args = parser.parse_args(argv)
+
+    registry = DeviceRegistry(args.db)
+    server = TerminalServer(registry, args.host, args.port, max_sessions=args.max_sessions,
+                            idle_timeout=args.idle_timeout, device_type=args.device_type)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        registry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,50 @@
 # test_cli_simulator.py
 
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import sqlite3
+import tempfile
+import time
+import types
+import tracemalloc
 import unittest
-from unittest.mock import Mock, patch
-from cli_simulator import CLISimulator
-from data_manager import DataManager
-from command_parser import CommandParser, CommandError
+from unittest.mock import MagicMock, Mock, patch
+from cli_simulator import CLISimulator, STATUS_OK, STATUS_ERROR, STATUS_UNKNOWN
+from data_manager import DataManager, DURABILITY_IMMEDIATE, DURABILITY_INTERVAL, DURABILITY_CHECKPOINT
+from command_parser import CommandParser, CommandError, UnknownCommandError
+from command_index import CommandIndex, AmbiguousCommandError, PrefixIndex
+import state_schema
+import logger
+from logger import Logger
+from command_suggestions import SuggestionIndex, BKTree, levenshtein, transposition_distance
+from device_registry import DeviceRegistry
+import command_catalog
+from command_catalog import CommandCatalog
+import script_runner
+from script_runner import create_simulator
+from terminal_server import TerminalServer, IAC, DO
+import lab_runner
+from lab_runner import LabJob, run_jobs
+from benchmarks import generators
+from benchmarks.harness import compare, measure
+from routing_engine import RoutingEngine, format_prefix, ip_to_int, load_numpy, parse_prefix
+import acl_engine
+from acl_engine import CompiledACL, make_packet, parse_rule
+from mac_table import MacTable, TimerWheel, format_mac, parse_mac
+import ospf_engine
+from eigrp_engine import router_config
+import interface_table
+from sim_clock import SimulatedClock
+from config_renderer import ConfigRenderer
+import config_archive
+from output_pipeline import Pager, apply_filters, split_filters
 
 class TestCLISimulator(unittest.TestCase):
 
@@ -36,15 +76,17 @@ class TestCLISimulator(unittest.TestCase):
         self.simulator.update_prompt()
         self.assertEqual(self.simulator.prompt, "TestRouter# ")
 
-    def test_exit_current_mode_from_user(self):
+    @patch('builtins.print')
+    def test_exit_current_mode_from_user(self, mock_print):
         self.simulator.mode = "user"
-        self.simulator.exit_current_mode()
-        self.assertFalse(self.simulator.running)
+        self.assertTrue(self.simulator.onecmd(self.simulator.precmd("quit")))
 
     def test_exit_current_mode_from_privileged(self):
-        self.simulator.mode = "privileged"
-        self.simulator.exit_current_mode()
-        self.assertEqual(self.simulator.mode, "user")
+        manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT)
+        simulator = CLISimulator(manager, CommandCatalog.shared())
+        simulator.set_device_type("router")
+        self.assertEqual([result.mode for result in simulator.run_script(["enable", "exit"])], ["privileged", "user"])
+        manager.close()
 
     @patch('builtins.print')
     def test_print_help(self, mock_print):
@@ -78,27 +120,45 @@ class TestCLISimulator(unittest.TestCase):
         self.simulator.command_parser.parse_command.assert_called_with("show interfaces", self.simulator.device_type, self.simulator.mode)
 
     def test_default_unknown_command(self):
-        self.simulator.command_parser.parse_command.side_effect = CommandError("Unknown command")
+        self.simulator.command_parser.parse_command.side_effect = UnknownCommandError("Unknown command")
+        with patch.object(self.simulator, "report_unknown_command") as report:
+            self.simulator.default("unknown_command")
+            report.assert_called_once_with("unknown_command")
         with patch('builtins.print') as mock_print:
             self.simulator.default("unknown_command")
-            mock_print.assert_called_with("פקודה לא מוכרת: unknown_command")
+            mock_print.assert_any_call("פקודה לא מוכרת: unknown_command")
+
+    def test_default_unknown_command_suggests_corrections(self):
+        self.simulator.command_parser.parse_command.side_effect = UnknownCommandError("Unknown command")
+        self.simulator.mode = "privileged"
+        with patch('builtins.print') as mock_print:
+            self.simulator.default("shwo ip route")
+            mock_print.assert_any_call("פקודה לא מוכרת: shwo ip route")
+            mock_print.assert_any_call("- show ip route")
 
 class TestCommandParser(unittest.TestCase):
 
     def setUp(self):
         self.data_manager = Mock(spec=DataManager)
+        self.data_manager.batch.return_value = MagicMock()
+        self.data_manager.load_catalog.return_value = CommandCatalog.shared()
         self.parser = CommandParser(self.data_manager)
 
     def test_parse_command_valid(self):
-        self.parser.commands = [
+        self.parser.command_index = CommandIndex([
             {"full_command": "show interfaces", "action": "show_interfaces", "modes": ["privileged"]}
-        ]
-        result = self.parser.parse_command("show interfaces", "router", "privileged")
-        self.assertIsNotNone(result)
+        ])
+        with patch.object(self.parser, "show_interfaces", return_value="ok") as handler:
+            result = self.parser.parse_command("sh int Gi0/0", "router", "privileged")
+        self.assertEqual(result, "ok")
+        handler.assert_called_once_with("router", ["Gi0/0"])
+        self.assertEqual(self.parser.last_mode, "privileged")
 
     def test_parse_command_invalid(self):
-        with self.assertRaises(CommandError):
+        with self.assertRaises(UnknownCommandError):
             self.parser.parse_command("invalid command", "router", "user")
+        with self.assertRaises(CommandError):
+            self.parser.parse_command("", "router", "user")
 
     def test_set_ip_address_valid(self):
         args = ["GigabitEthernet0/0", "192.168.1.1", "255.255.255.0"]
@@ -120,41 +180,1659 @@ class TestCommandParser(unittest.TestCase):
         with self.assertRaises(CommandError):
             self.parser.configure_static_route("router", args)
 
-class TestDataManager(unittest.TestCase):
+class TestCommandIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CommandIndex([
+            {"full_command": "show interfaces", "shortcuts": ["sh int"], "modes": ["privileged"]},
+            {"full_command": "show interfaces status", "shortcuts": ["sh int status"], "modes": ["privileged"]},
+            {"full_command": "show interface counters", "shortcuts": ["sh int count"], "modes": ["privileged"]},
+            {"full_command": "show ip route", "shortcuts": ["sh ip ro"], "modes": ["privileged"]},
+            {"full_command": "show ip ospf", "shortcuts": ["sh ip ospf"], "modes": ["privileged"]},
+            {"full_command": "show ip ospf database", "shortcuts": ["sh ip ospf db"], "modes": ["privileged"]},
+            {"full_command": "show mac address-table", "shortcuts": ["sh mac"], "modes": ["privileged"]},
+            {"full_command": "configure terminal", "shortcuts": ["conf t"], "modes": ["privileged"]},
+            {"full_command": "copy running-config startup-config", "shortcuts": ["copy run start"], "modes": ["privileged"]},
+            {"full_command": "clock set", "shortcuts": ["clock set"], "modes": ["privileged"]},
+            {"full_command": "shutdown", "shortcuts": ["sh"], "modes": ["interface"]},
+            {"full_command": "interface", "shortcuts": ["int"], "modes": ["config"]},
+            {"full_command": "router ospf", "shortcuts": ["ro ospf"], "modes": ["config"]},
+        ])
+
+    def resolve(self, line, mode):
+        command, args = self.index.resolve(line.split(), mode)
+        return (command['full_command'] if command else None), args
+
+    def test_full_multi_word_command(self):
+        self.assertEqual(self.resolve("show ip route", "privileged"), ("show ip route", []))
+
+    def test_shortcuts(self):
+        self.assertEqual(self.resolve("sh ip ro", "privileged"), ("show ip route", []))
+        self.assertEqual(self.resolve("conf t", "privileged"), ("configure terminal", []))
+        self.assertEqual(self.resolve("sh ip ospf db", "privileged"), ("show ip ospf database", []))
+        self.assertEqual(self.resolve("sh mac", "privileged"), ("show mac address-table", []))
+
+    def test_abbreviations(self):
+        self.assertEqual(self.resolve("sho ip rou", "privileged"), ("show ip route", []))
+        self.assertEqual(self.resolve("cop run sta", "privileged"), ("copy running-config startup-config", []))
 
-    @patch('sqlite3.connect')
-    def setUp(self, mock_connect):
+    def test_longest_keyword_match_wins(self):
+        self.assertEqual(self.resolve("sh int", "privileged"), ("show interfaces", []))
+        self.assertEqual(self.resolve("sh int status", "privileged"), ("show interfaces status", []))
+        self.assertEqual(self.resolve("sh int count", "privileged"), ("show interface counters", []))
+
+    def test_remaining_tokens_are_arguments(self):
+        self.assertEqual(self.resolve("int GigabitEthernet0/0", "config"), ("interface", ["GigabitEthernet0/0"]))
+        self.assertEqual(self.resolve("ro ospf 1", "config"), ("router ospf", ["1"]))
+        self.assertEqual(self.resolve("sh ip ospf 1", "privileged"), ("show ip ospf", ["1"]))
+
+    def test_mode_views(self):
+        self.assertEqual(self.resolve("sh", "interface"), ("shutdown", []))
+        self.assertEqual(self.resolve("show ip route", "config"), (None, ["show", "ip", "route"]))
+        self.assertEqual(self.resolve("show ip route", "unknown"), (None, ["show", "ip", "route"]))
+
+    def test_ambiguous_command(self):
+        with self.assertRaises(AmbiguousCommandError) as ctx:
+            self.index.resolve(["c"], "privileged")
+        self.assertEqual({cmd['full_command'] for cmd in ctx.exception.candidates},
+                         {"copy running-config startup-config", "clock set", "configure terminal"})
+
+    def test_unknown_command(self):
+        self.assertEqual(self.resolve("foo bar", "privileged"), (None, ["foo", "bar"]))
+
+class TestCommandCompletion(unittest.TestCase):
+
+    def setUp(self):
         self.data_manager = DataManager(':memory:')
-        self.data_manager.cursor = Mock()
-        self.data_manager.conn = Mock()
+        self.parser = CommandParser(self.data_manager)
+
+    def test_next_keyword_candidates(self):
+        self.assertEqual(self.parser.complete_command("", "sh ip ospf", "privileged"), ["database", "neighbor"])
+        self.assertEqual(self.parser.complete_command("co", "", "privileged"), ["configure", "copy"])
+        self.assertEqual(self.parser.complete_command("st", "show interfaces", "privileged"), ["status"])
+
+    def test_completion_respects_mode(self):
+        self.assertEqual(self.parser.complete_command("", "", "user"), ["enable"])
+        self.assertEqual(self.parser.complete_command("sh", "", "interface"), ["shutdown"])
+
+    def test_interface_name_completion(self):
+        for port in range(48):
+            self.data_manager.add_interface(f"GigabitEthernet1/0/{port}", {})
+        completions = self.parser.complete_command("gigabitethernet1/0/4", "int", "config")
+        self.assertEqual(completions, ["GigabitEthernet1/0/4"] + [f"GigabitEthernet1/0/{port}" for port in range(40, 48)])
+
+    def test_state_completion_tracks_mutations(self):
+        self.data_manager.add_vlan("10", "Sales")
+        self.data_manager.add_vlan("20", "HR")
+        self.assertEqual(self.parser.complete_command("", "vlan", "config"), ["10", "20"])
+        self.data_manager.remove_vlan("10")
+        self.assertEqual(self.parser.complete_command("", "vlan", "config"), ["20"])
+        self.data_manager.add_access_list("101", "permit ip any any")
+        self.assertEqual(self.parser.complete_command("1", "access-list", "config"), ["101"])
+        self.data_manager.add_dhcp_pool("LAN", {})
+        self.assertEqual(self.parser.complete_command("l", "ip dhcp pool", "config"), ["LAN"])
+
+    def test_prefix_index(self):
+        index = PrefixIndex(["Gi0/1", "Gi0/0", "Fa0/1"])
+        index.add("Gi0/2")
+        index.discard("Gi0/0")
+        self.assertEqual(index.complete("gi"), ["Gi0/1", "Gi0/2"])
+        self.assertEqual(len(index), 3)
+
+class TestSuggestionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SuggestionIndex([
+            {"full_command": "show interfaces", "shortcuts": ["sh int"], "modes": ["privileged"]},
+            {"full_command": "show interface counters", "shortcuts": ["sh int count"], "modes": ["privileged"]},
+            {"full_command": "show ip route", "shortcuts": ["sh ip ro"], "modes": ["privileged"]},
+            {"full_command": "show running-config", "shortcuts": ["sh run"], "modes": ["privileged"]},
+            {"full_command": "configure terminal", "shortcuts": ["conf t"], "modes": ["privileged"]},
+            {"full_command": "switchport mode access", "shortcuts": ["sw mo ac"], "modes": ["interface"]},
+        ])
+
+    def test_edit_distances(self):
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("rnu", "run"), 2)
+        self.assertEqual(transposition_distance("rnu", "run"), 1)
+        self.assertEqual(transposition_distance("configure", "confgure"), 1)
+
+    def test_bk_tree_search(self):
+        tree = BKTree(["show", "shaw", "slow", "enable"])
+        self.assertEqual(sorted(tree.search("shoq", 1)), [(1, "show")])
+        self.assertEqual(sorted(word for _, word in tree.search("show", 1)), ["shaw", "show", "slow"])
+
+    def test_typo_ranked_by_distance(self):
+        self.assertEqual(self.index.suggest("shwo ip route", "privileged")[0], "show ip route")
+        self.assertEqual(self.index.suggest("confgure terminal", "privileged"), ["configure terminal"])
+
+    def test_abbreviations(self):
+        self.assertEqual(self.index.suggest("sh ip rotue", "privileged")[0], "show ip route")
+        self.assertEqual(self.index.suggest("sw mo acess", "interface"), ["switchport mode access"])
+        self.assertEqual(self.index.suggest("show int", "privileged"), ["show interfaces", "show interface counters"])
+
+    def test_words_run_together(self):
+        self.assertEqual(self.index.suggest("showrunning-config", "privileged"), ["show running-config"])
+
+    def test_mode_and_limit(self):
+        self.assertEqual(self.index.suggest("shwo ip route", "interface"), [])
+        self.assertEqual(len(self.index.suggest("sh", "privileged", limit=2)), 2)
+        self.assertEqual(self.index.suggest("xyzzy", "privileged"), [])
+
+class TestDataManagerStateCache(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.db_path)
+
+    def query(self, sql, params=()):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def stored_value(self, key):
+        rows = self.query("SELECT value FROM device_state WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def test_checkpoint_policy_defers_writes(self):
+        manager = DataManager(self.db_path, durability=DURABILITY_CHECKPOINT)
+        manager.add_interface("GigabitEthernet0/0", {})
+        manager.update_interface("GigabitEthernet0/0", "ip_address", "10.0.0.1")
+        self.assertEqual(manager.get_device_state("interfaces")["GigabitEthernet0/0"]["ip_address"], "10.0.0.1")
+        self.assertEqual(self.query("SELECT * FROM interfaces"), [])
+        self.assertIn(("interfaces", "GigabitEthernet0/0"), manager.dirty)
+
+        manager.save_running_config()
+        self.assertEqual(self.query("SELECT interface, attribute, value FROM interface_attributes"),
+                         [("GigabitEthernet0/0", "ip_address", '"10.0.0.1"')])
+        self.assertEqual(manager.dirty, set())
+        manager.close()
+
+    def test_immediate_policy_writes_through(self):
+        manager = DataManager(self.db_path, durability=DURABILITY_IMMEDIATE)
+        manager.add_vlan("10", "Sales")
+        self.assertEqual(self.query("SELECT vlan_id, name FROM vlans"), [("10", "Sales")])
+        self.assertEqual(manager.dirty, set())
+        manager.close()
+
+    def test_interval_policy_flushes_in_background(self):
+        manager = DataManager(self.db_path, durability=DURABILITY_INTERVAL, flush_interval=0.01)
+        manager.update_hostname("R1")
+        deadline = time.time() + 2
+        while manager.dirty and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.stored_value("hostname"), '"R1"')
+        manager.close()
+
+    def test_state_survives_reopen(self):
+        manager = DataManager(self.db_path, durability=DURABILITY_CHECKPOINT)
+        manager.add_route("10.0.0.0/8", "192.168.1.1")
+        manager.save_device_state()
+        manager.close()
+        reopened = DataManager(self.db_path, durability=DURABILITY_CHECKPOINT)
+        self.assertEqual(reopened.get_device_state("routing_table")[0]["next_hop"], "192.168.1.1")
+        reopened.close()
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            DataManager(self.db_path, durability="never")
+
+class TestDataManager(unittest.TestCase):
+
+    def setUp(self):
+        self.data_manager = DataManager(':memory:', durability=DURABILITY_IMMEDIATE)
+        self.conn = self.data_manager.conn
 
     def test_update_hostname(self):
         self.data_manager.update_hostname("NewHostname")
-        self.data_manager.cursor.execute.assert_called_with(
-            "INSERT OR REPLACE INTO device_state (key, value) VALUES (?, ?)",
-            ("hostname", '"NewHostname"')
-        )
+        self.assertEqual(self.conn.execute("SELECT value FROM device_state WHERE key = 'hostname'").fetchone(),
+                         ('"NewHostname"',))
 
     def test_add_interface(self):
-        self.data_manager.get_device_state = Mock(return_value={})
         self.data_manager.add_interface("GigabitEthernet0/0", {"ip": "192.168.1.1"})
-        self.data_manager.cursor.execute.assert_called_with(
-            "INSERT OR REPLACE INTO device_state (key, value) VALUES (?, ?)",
-            ("interfaces", '{"GigabitEthernet0/0": {"ip": "192.168.1.1"}}')
-        )
+        self.assertEqual(self.conn.execute("SELECT interface, attribute, value FROM interface_attributes").fetchall(),
+                         [("GigabitEthernet0/0", "ip", '"192.168.1.1"')])
 
     def test_add_route(self):
-        self.data_manager.get_device_state = Mock(return_value=[])
         self.data_manager.add_route("192.168.2.0/24", "10.0.0.1")
-        self.data_manager.cursor.execute.assert_called()  # We can't check the exact arguments due to the timestamp
+        self.assertEqual(self.conn.execute("SELECT destination, next_hop, distance FROM routes").fetchall(),
+                         [("192.168.2.0/24", "10.0.0.1", 1)])
 
     def test_add_vlan(self):
-        self.data_manager.get_device_state = Mock(return_value={})
         self.data_manager.add_vlan("10", "Sales")
-        self.data_manager.cursor.execute.assert_called_with(
-            "INSERT OR REPLACE INTO device_state (key, value) VALUES (?, ?)",
-            ("vlans", '{"10": {"name": "Sales", "interfaces": []}}')
-        )
+        self.assertEqual(self.conn.execute("SELECT vlan_id, name FROM vlans").fetchall(), [("10", "Sales")])
+
+    def test_update_interface_writes_one_row(self):
+        for port in range(48):
+            self.data_manager.add_interface(f"GigabitEthernet1/0/{port}", {"status": "up"})
+        self.conn.execute("CREATE TEMP TABLE writes (n INTEGER)")
+        self.conn.execute("INSERT INTO writes VALUES (0)")
+        self.conn.execute("CREATE TEMP TRIGGER count_writes AFTER INSERT ON interface_attributes "
+                          "BEGIN UPDATE writes SET n = n + 1; END")
+        self.data_manager.update_interface("GigabitEthernet1/0/37", "status", "down")
+        self.assertEqual(self.conn.execute("SELECT n FROM writes").fetchone(), (1,))
+
+    def test_routes_via_next_hop(self):
+        self.data_manager.add_route("10.1.0.0/16", "10.0.0.1")
+        self.data_manager.add_route("10.2.0.0/16", "10.0.0.2")
+        self.data_manager.add_route("10.3.0.0/16", "10.0.0.1")
+        self.assertEqual([route["destination"] for route in self.data_manager.find_routes_via("10.0.0.1")],
+                         ["10.1.0.0/16", "10.3.0.0/16"])
+        plan = " ".join(row[-1] for row in self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM routes WHERE device_id = 'default' AND next_hop = '10.0.0.1'"))
+        self.assertIn("routes_by_next_hop", plan)
+
+    def test_remove_route(self):
+        self.data_manager.add_route("10.1.0.0/16", "10.0.0.1")
+        self.data_manager.remove_route("10.1.0.0/16")
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM routes").fetchone(), (0,))
+
+
+class TestStateSchemaMigration(unittest.TestCase):
+
+    def test_migrates_json_blobs(self):
+        handle, db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        try:
+            conn = sqlite3.connect(db_path)
+            conn.execute("CREATE TABLE device_state (key TEXT PRIMARY KEY, value TEXT)")
+            legacy = {
+                "hostname": "R1",
+                "interfaces": {"Gi0/0": {"ip_address": "10.0.0.1"}, "Gi0/1": {}},
+                "vlans": {"10": {"name": "Sales", "interfaces": ["Gi0/1"]}},
+                "routing_table": [{"destination": "10.0.0.0/8", "next_hop": "1.1.1.1", "distance": 1, "time": "t"}],
+                "access_lists": {"10": ["permit any"]},
+                "dhcp_pools": {"LAN": {"network": "192.168.1.0"}},
+            }
+            conn.executemany("INSERT INTO device_state VALUES (?, ?)", [(k, json.dumps(v)) for k, v in legacy.items()])
+            conn.commit()
+            conn.close()
+
+            manager = DataManager(db_path, durability=DURABILITY_CHECKPOINT)
+            for key, value in legacy.items():
+                self.assertEqual(manager.get_device_state(key), value)
+            manager.close()
+
+            conn = sqlite3.connect(db_path)
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone(), (state_schema.SCHEMA_VERSION,))
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM device_state WHERE key = 'interfaces'").fetchone(), (0,))
+            conn.close()
+        finally:
+            os.remove(db_path)
+
+    def test_migrates_single_device_tables(self):
+        conn = sqlite3.connect(':memory:')
+        conn.executescript('''
+            CREATE TABLE device_state (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE interfaces (name TEXT PRIMARY KEY);
+            CREATE TABLE interface_attributes (interface TEXT NOT NULL, attribute TEXT NOT NULL, value TEXT,
+                PRIMARY KEY (interface, attribute)) WITHOUT ROWID;
+            CREATE TABLE routes (id INTEGER PRIMARY KEY, destination TEXT NOT NULL, next_hop TEXT,
+                distance INTEGER, time TEXT, extra TEXT);
+            CREATE INDEX routes_by_next_hop ON routes (next_hop);
+            INSERT INTO device_state VALUES ('hostname', '"R1"');
+            INSERT INTO interfaces VALUES ('Gi0/1');
+            INSERT INTO interfaces VALUES ('Gi0/0');
+            INSERT INTO interface_attributes VALUES ('Gi0/0', 'ip_address', '"10.0.0.1"');
+            INSERT INTO routes VALUES (1, '10.0.0.0/8', '1.1.1.1', 1, 't', NULL);
+            PRAGMA user_version = 1;
+        ''')
+        state_schema.migrate(conn)
+        self.assertEqual(state_schema.schema_version(conn), state_schema.SCHEMA_VERSION)
+        state = state_schema.read_state(conn, state_schema.DEFAULT_DEVICE)
+        self.assertEqual(state["hostname"], "R1")
+        self.assertEqual(list(state["interfaces"]), ["Gi0/1", "Gi0/0"])
+        self.assertEqual(state["interfaces"]["Gi0/0"], {"ip_address": "10.0.0.1"})
+        self.assertEqual(state["routing_table"][0]["next_hop"], "1.1.1.1")
+        self.assertEqual(state_schema.read_state(conn, "other")["interfaces"], {})
+        conn.close()
+
+class TestDataManagerBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = DataManager(':memory:', durability=DURABILITY_IMMEDIATE)
+        self.manager.add_interface("Gi0/0", {"status": "down"})
+
+    def tearDown(self):
+        self.manager.close()
+
+    def query(self, sql):
+        return self.manager.conn.execute(sql).fetchall()
+
+    def test_batch_defers_writes_to_one_commit(self):
+        with self.manager.batch():
+            self.manager.update_interface("Gi0/0", "ip_address", "10.0.0.1")
+            self.manager.add_vlan("10", "Sales")
+            self.assertEqual(self.query("SELECT * FROM vlans"), [])
+        self.assertEqual(self.query("SELECT vlan_id, name FROM vlans"), [("10", "Sales")])
+        self.assertIn(("Gi0/0", "ip_address", '"10.0.0.1"'),
+                      self.query("SELECT interface, attribute, value FROM interface_attributes"))
+        self.assertEqual(self.manager.dirty, set())
+
+    def test_exception_rolls_back_memory_state(self):
+        with self.assertRaises(RuntimeError):
+            with self.manager.batch():
+                self.manager.update_interface("Gi0/0", "ip_address", "10.0.0.1")
+                self.manager.add_route("10.1.0.0/16", "10.0.0.2")
+                self.manager.add_user("admin", "secret", 15)
+                raise RuntimeError("boom")
+        self.assertEqual(self.manager.get_device_state("interfaces"), {"Gi0/0": {"status": "down"}})
+        self.assertEqual(self.manager.get_device_state("routing_table"), [])
+        self.assertEqual(self.manager.get_device_state("users"), [])
+        self.manager.flush()
+        self.assertEqual(self.query("SELECT * FROM routes"), [])
+        self.assertEqual(self.manager.complete_keys("interfaces", "G"), ["Gi0/0"])
+
+    def test_nested_batch_rolls_back_only_inner_changes(self):
+        with self.manager.batch():
+            self.manager.add_vlan("10", "Sales")
+            try:
+                with self.manager.batch():
+                    self.manager.add_vlan("20", "Eng")
+                    self.manager.remove_vlan("10")
+                    raise ValueError("bad line")
+            except ValueError:
+                pass
+            self.manager.add_vlan("30", "Ops")
+        self.assertEqual(sorted(self.manager.get_device_state("vlans")), ["10", "30"])
+        self.assertEqual(self.query("SELECT vlan_id FROM vlans ORDER BY vlan_id"), [("10",), ("30",)])
+
+    def test_parse_command_is_atomic(self):
+        parser = CommandParser(self.manager)
+        parser.command_index = CommandIndex([{"full_command": "ip address", "modes": ["config"], "action": "set_ip_address"}])
+        update_interface = self.manager.update_interface
+        calls = []
+
+        def failing_update(name, key, value):
+            calls.append(key)
+            update_interface(name, key, value)
+            if len(calls) == 2:
+                raise sqlite3.OperationalError("disk I/O error")
+
+        with patch.object(self.manager, "update_interface", side_effect=failing_update):
+            with self.assertRaises(sqlite3.OperationalError):
+                parser.parse_command("ip address Gi0/0 10.0.0.1 255.255.255.0", "router", "config")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.manager.get_device_state("interfaces")["Gi0/0"], {"status": "down"})
+
+    def test_pragmas_applied(self):
+        handle, db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        try:
+            manager = DataManager(db_path, durability=DURABILITY_CHECKPOINT)
+            self.assertEqual(manager.conn.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+            self.assertEqual(manager.conn.execute("PRAGMA synchronous").fetchone(), (1,))
+            manager.close()
+            with self.assertRaises(ValueError):
+                DataManager(db_path, journal_mode="fast")
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+
+class TestScriptExecution(unittest.TestCase):
+
+    CONFIG = [
+        "enable",
+        "configure terminal",
+        "hostname R1",
+        "!",
+        "interface GigabitEthernet0/0",
+        " ip address 192.168.1.1 255.255.255.0",
+        " no shutdown",
+        "exit",
+        "vlan 10",
+        " name Sales",
+        "exit",
+        "router ospf 1",
+        " network 10.0.0.0 0.0.0.255 area 0",
+        "end",
+    ]
+
+    def setUp(self):
+        self.catalog = CommandCatalog.load()
+        self.simulator = create_simulator("router", self.catalog)
+
+    def tearDown(self):
+        self.simulator.data_manager.close()
+
+    def test_run_script_returns_structured_results(self):
+        results = list(self.simulator.run_script(self.CONFIG))
+        self.assertEqual(len(results), len(self.CONFIG) - 1)
+        self.assertTrue(all(result.status == STATUS_OK for result in results))
+        self.assertEqual([result.mode for result in results[:4]], ["privileged", "config", "config", "interface"])
+        self.assertEqual(results[-1].mode, "privileged")
+        self.assertTrue(all(result.elapsed >= 0 for result in results))
+        self.assertEqual(self.simulator.mode, "privileged")
+        self.assertEqual(self.simulator.hostname, "R1")
+
+        state = self.simulator.data_manager
+        self.assertEqual(state.get_device_state("interfaces")["GigabitEthernet0/0"],
+                         {"status": "up", "ip_address": "192.168.1.1", "subnet_mask": "255.255.255.0"})
+        self.assertEqual(state.get_device_state("vlans")["10"]["name"], "Sales")
+        self.assertEqual(state.get_device_state("routing_protocols")["ospf 1"]["networks"], ["10.0.0.0 0.0.0.255 area 0"])
+
+    def test_errors_do_not_change_mode(self):
+        with patch('builtins.print') as mock_print:
+            results = list(self.simulator.run_script(["enable", "configure terminal", "vlan 5000", "bogus"]))
+            mock_print.assert_not_called()
+        self.assertEqual([result.status for result in results], [STATUS_OK, STATUS_OK, STATUS_ERROR, STATUS_UNKNOWN])
+        self.assertEqual(results[-1].mode, "config")
+        self.assertTrue(self.simulator.command_parser.trace)
+
+    def test_stop_on_error(self):
+        results = list(self.simulator.run_script(["enable", "bogus", "configure terminal"], stop_on_error=True))
+        self.assertEqual([result.line for result in results], ["enable", "bogus"])
+
+    def test_exit_walks_up_modes(self):
+        lines = ["enable", "conf t", "int Gi0/1", "exit", "exit", "disable"]
+        self.assertEqual([result.mode for result in self.simulator.run_script(lines)],
+                         ["privileged", "config", "interface", "config", "privileged", "user"])
+
+    def test_script_runner_main(self):
+        handle, path = tempfile.mkstemp(suffix=".cfg")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.CONFIG))
+        try:
+            self.assertEqual(script_runner.main([path, "--format", "none"]), 0)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\nbogus\n")
+            self.assertEqual(script_runner.main([path, "--format", "none"]), 1)
+        finally:
+            os.remove(path)
+
+    def test_script_runner_gives_each_file_its_own_device(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db = os.path.join(directory, "results.db")
+            first, second = os.path.join(directory, "first.cfg"), os.path.join(directory, "second.cfg")
+            with open(first, "w", encoding="utf-8") as f:
+                f.write("\n".join(self.CONFIG))
+            for vlan in (20, 30):
+                with open(second, "w", encoding="utf-8") as f:
+                    f.write(f"enable\nconfigure terminal\nvlan {vlan}\nend\n")
+                self.assertEqual(script_runner.main([first, second, "--db", db, "--format", "none"]), 0)
+            managers = {path: DataManager(db, durability=DURABILITY_CHECKPOINT, device_id=path) for path in (first, second)}
+            try:
+                self.assertEqual(managers[first].get_device_state("hostname"), "R1")
+                self.assertEqual(sorted(managers[first].get_device_state("vlans")), ["10"])
+                # הקובץ השני לא ממשיך מהמצב של הראשון, והרצה חוזרת מתחילה ממכשיר נקי
+                self.assertNotEqual(managers[second].get_device_state("hostname"), "R1")
+                self.assertEqual(sorted(managers[second].get_device_state("vlans")), ["30"])
+            finally:
+                for manager in managers.values():
+                    manager.close()
+
+class TestDeviceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = DeviceRegistry(':memory:', durability=DURABILITY_CHECKPOINT)
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_devices_share_catalog_and_isolate_state(self):
+        r1 = self.registry.add_device("R1", "router")
+        s1 = self.registry.add_device("S1", "switch")
+        self.assertIs(r1.catalog, s1.catalog)
+        self.assertIs(r1.command_parser.command_index, s1.command_parser.command_index)
+        r1.data_manager.add_vlan("10", "Sales")
+        r1.data_manager.update_hostname("R1")
+        self.assertEqual(s1.data_manager.get_device_state("vlans"), {})
+        self.assertEqual(s1.data_manager.get_device_state("hostname"), "Router")
+        self.assertEqual(s1.device_type, "switch")
+
+    def test_flush_writes_every_device_and_reloads(self):
+        self.registry.add_device("R1", "router").data_manager.add_route("10.0.0.0/8", "1.1.1.1")
+        self.registry.add_device("R2", "router").data_manager.add_route("10.0.0.0/8", "2.2.2.2")
+        self.registry.flush()
+        self.assertEqual(self.registry.conn.execute(
+            "SELECT device_id, next_hop FROM routes ORDER BY device_id").fetchall(),
+            [("R1", "1.1.1.1"), ("R2", "2.2.2.2")])
+        self.registry.unload("R1")
+        self.assertNotIn("R1", self.registry.devices)
+        self.assertEqual(self.registry["R1"].data_manager.find_routes_via("1.1.1.1")[0]["destination"], "10.0.0.0/8")
+
+    def test_state_is_loaded_on_first_access(self):
+        manager = DataManager(conn=self.registry.conn, device_id="lazy", commands=[])
+        self.assertNotIn("state", manager.__dict__)
+        self.assertEqual(manager.get_device_state("hostname"), "Router")
+        self.assertIn("state", manager.__dict__)
+
+    def test_remove_device(self):
+        self.registry.add_device("R1", "router").data_manager.add_interface("Gi0/0", {"status": "up"})
+        self.registry.flush()
+        self.registry.remove_device("R1")
+        self.assertNotIn("R1", self.registry)
+        self.assertEqual(self.registry.conn.execute("SELECT COUNT(*) FROM interface_attributes").fetchone(), (0,))
+        with self.assertRaises(KeyError):
+            self.registry["R1"]
+
+    def test_duplicate_and_invalid_devices(self):
+        self.registry.add_device("R1", "router")
+        with self.assertRaises(ValueError):
+            self.registry.add_device("R1", "router")
+        with self.assertRaises(ValueError):
+            self.registry.add_device("F1", "firewall")
+
+    def test_idle_device_memory(self):
+        self.registry.add_device("warmup", "router")
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            for i in range(200):
+                self.registry.add_device(f"R{i}", "router")
+            per_device = (tracemalloc.get_traced_memory()[0] - before) / 200
+        finally:
+            tracemalloc.stop()
+        self.assertLess(per_device, 16 * 1024)
+        self.assertEqual(len(self.registry), 201)
+
+class TestTerminalServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.registry = DeviceRegistry(':memory:', durability=DURABILITY_CHECKPOINT)
+        self.server = await TerminalServer(self.registry, port=0, max_sessions=2, idle_timeout=5).start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        self.registry.close()
+
+    async def connect(self, device_id):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        self.assertEqual(await reader.readuntil(b": "), b"Device: ")
+        writer.write(device_id.encode() + b"\r\n")
+        await self.prompt(reader)
+        return reader, writer
+
+    async def prompt(self, reader):
+        return (await asyncio.wait_for(reader.readuntil(b" "), 5)).decode()
+
+    async def command(self, reader, writer, line):
+        writer.write(line.encode() + b"\r\n")
+        output = await asyncio.wait_for(reader.readuntil(b"# "), 5)
+        return output.decode()
+
+    async def test_sessions_have_own_mode_and_share_device_state(self):
+        reader1, writer1 = await self.connect("R1")
+        reader2, writer2 = await self.connect("R1")
+        writer1.write(b"enable\r\n")
+        self.assertEqual(await self.prompt(reader1), "Router# ")
+        self.assertIn("Router(config)#", await self.command(reader1, writer1, "conf t"))
+        self.assertIn("R9(config)#", await self.command(reader1, writer1, "hostname R9"))
+        writer2.write(b"enable\r\n")
+        self.assertEqual(await self.prompt(reader2), "R9# ")
+        self.assertEqual(len(self.server.sessions), 2)
+        self.assertEqual(self.registry["R1"].data_manager.get_device_state("hostname"), "R9")
+        for writer in (writer1, writer2):
+            writer.close()
+
+    async def test_session_limit(self):
+        connections = [await self.connect("R1"), await self.connect("R2")]
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        self.assertIn(b"Too many sessions", await reader.read())
+        writer.close()
+        for _, connection_writer in connections:
+            connection_writer.close()
+
+    async def test_idle_timeout_and_telnet_negotiation(self):
+        self.server.idle_timeout = 0.2
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        await reader.readuntil(b": ")
+        writer.write(bytes([IAC, DO, 1]) + b"S1\r\n")
+        await self.prompt(reader)
+        self.assertIn("S1", self.registry)
+        self.assertIn(b"Session timed out", await asyncio.wait_for(reader.read(), 5))
+        writer.close()
+
+    async def test_more_prompt_pages_long_output(self):
+        reader, writer = await self.connect("R1")
+        writer.write(b"enable\r\n")
+        await self.prompt(reader)
+        data_manager = self.registry["R1"].data_manager
+        for i in range(40):
+            data_manager.add_interface(f"Gi0/{i}", {"status": "up"})
+        await self.command(reader, writer, "terminal length 10")
+        writer.write(b"show running-config | include interface\r\n")
+        page = (await asyncio.wait_for(reader.readuntil(b"--More-- "), 5)).decode()
+        self.assertEqual(page.count("interface Gi0/"), 9)
+        writer.write(b"\r\n")
+        self.assertEqual((await asyncio.wait_for(reader.readuntil(b"--More-- "), 5)).decode().count("interface"), 1)
+        writer.write(b" \r\n")
+        self.assertEqual((await asyncio.wait_for(reader.readuntil(b"--More-- "), 5)).decode().count("interface"), 9)
+        self.assertNotIn("interface", await self.command(reader, writer, "q"))
+        await self.command(reader, writer, "terminal length 0")
+        output = await self.command(reader, writer, "show running-config | include ^interface")
+        self.assertEqual(output.count("interface Gi0/"), 40)
+        writer.close()
+
+    async def test_command_error_keeps_session(self):
+        reader, writer = await self.connect("R1")
+        writer.write(b"enable\r\n")
+        await self.prompt(reader)
+        self.assertIn("Destination address required", await self.command(reader, writer, "traceroute"))
+        self.assertIn("Invalid IP address", await self.command(reader, writer, "traceroute 10.0.0"))
+        self.assertIn("Router#", await self.command(reader, writer, "show clock"))
+
+        def show_access_lists(device_type, args):
+            yield "Standard IP access list 1"
+            raise CommandError("Error: Access list changed.")
+
+        # שגיאה בזמן הפקת הפלט (אחרי שהפקודה כבר החזירה אותו) לא מנתקת את הסשן
+        session = next(iter(self.server.sessions))
+        with patch.object(session.simulator.command_parser, "show_access_lists", show_access_lists):
+            self.assertIn("% Error: Access list changed.", await self.command(reader, writer, "show access-lists"))
+        self.assertIn("Router#", await self.command(reader, writer, "show clock"))
+        writer.close()
+
+class TestLabRunner(unittest.TestCase):
+
+    def job(self, i):
+        return LabJob(f"S{i}", "router", ["enable", "configure terminal", f"hostname S{i}",
+                                          f"interface GigabitEthernet0/{i}", " no shutdown", "end"])
+
+    def test_parallel_results_match_sequential_and_keep_order(self):
+        jobs = [self.job(i) for i in range(12)]
+        parallel = list(run_jobs(jobs, workers=2, include_state=True, window=3))
+        self.assertEqual([result.job_id for result in parallel], [job.job_id for job in jobs])
+        lab_runner.init_worker()
+        for job, result in zip(jobs, parallel):
+            expected = lab_runner.run_job(job, include_state=True)
+            self.assertEqual([r[:4] for r in result.results], [r[:4] for r in expected.results])
+            self.assertEqual(result.state, expected.state)
+
+    def test_jobs_are_isolated(self):
+        results = list(run_jobs([self.job(1), self.job(2)], workers=1, include_state=True))
+        self.assertTrue(all(r.status == STATUS_OK for result in results for r in result.results))
+        states = [result.state for result in results]
+        self.assertEqual(states[0]["hostname"], "S1")
+        self.assertEqual(list(states[1]["interfaces"]), ["GigabitEthernet0/2"])
+
+    def test_job_from_file_and_summary(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".cfg", delete=False) as f:
+            f.write("enable\nbogus command\n")
+        try:
+            result = next(run_jobs([LabJob(f.name, "switch", path=f.name)], workers=1))
+        finally:
+            os.remove(f.name)
+        summary = lab_runner.summarize(result)
+        self.assertEqual(summary["job"], f.name)
+        self.assertEqual(summary["statuses"], {STATUS_OK: 1, STATUS_UNKNOWN: 1})
+        self.assertEqual(summary["errors"][0]["line"], "bogus command")
+
+class TestBenchmarkHarness(unittest.TestCase):
+
+    def test_generators_are_deterministic(self):
+        self.assertEqual(generators.route_table(500, seed=3), generators.route_table(500, seed=3))
+        self.assertNotEqual(generators.route_table(500, seed=3), generators.route_table(500, seed=4))
+        routes = generators.route_table(2000, seed=1)
+        self.assertEqual(len({(destination, mask) for destination, mask, _ in routes}), 2000)
+        stack = generators.switch_stack_config(switches=2, ports=48, vlans=10, seed=5)
+        self.assertEqual(stack, generators.switch_stack_config(switches=2, ports=48, vlans=10, seed=5))
+        self.assertEqual(sum(line.startswith("interface ") for line in stack), 96)
+
+    def test_generated_configs_run_cleanly(self):
+        simulator = create_simulator("switch", CommandCatalog.load())
+        lines = generators.switch_stack_config(switches=2, ports=4, vlans=5) + ["configure terminal"]
+        lines += generators.route_table_config(50)[2:]
+        results = list(simulator.run_script(lines))
+        self.assertEqual([result for result in results if result.status != STATUS_OK], [])
+        self.assertEqual(len(simulator.data_manager.get_device_state("interfaces")), 8)
+        self.assertEqual(len(simulator.data_manager.get_device_state("routing_table")), 50)
+        simulator.data_manager.close()
+
+    def test_measure_and_compare(self):
+        calls = []
+        result = measure(calls.append, range(10), repeat=3, warmup=1)
+        self.assertEqual(len(calls), 40)
+        self.assertEqual(result["calls"], 10)
+        old = {"results": {"parser": {"resolve": {"us_per_op": 2.0}, "dispatch": {"us_per_op": 5.0}}}}
+        new = {"results": {"parser": {"resolve": {"us_per_op": 3.0}, "dispatch": {"us_per_op": 5.1}}}}
+        self.assertEqual(compare(old, new, threshold=0.1), [("parser.resolve", 2.0, 3.0, 1.5)])
+
+class TestCompiledCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "commands.json")
+        shutil.copy("commands.json", self.path)
+
+    def tearDown(self):
+        command_catalog._shared.pop(os.path.abspath(self.path), None)
+        shutil.rmtree(self.directory)
+
+    def test_shared_catalog_is_built_once_and_cached_on_disk(self):
+        catalog = CommandCatalog.shared(self.path)
+        self.assertIs(CommandCatalog.shared(self.path), catalog)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, ".cache", "commands.catalog")))
+        self.assertEqual(sorted(os.listdir(self.directory)), [".cache", "commands.json"])
+        command_catalog._shared.clear()
+        with patch.object(CommandCatalog, "__init__", side_effect=AssertionError("rebuilt")):
+            compiled = CommandCatalog.shared(self.path)
+        self.assertEqual(compiled.digest, catalog.digest)
+        self.assertEqual(compiled.index.resolve(["sh", "ip", "ro"], "privileged")[0]["action"], "show_ip_route")
+        self.assertEqual(compiled.suggestions.suggest("shw ip rout", "privileged")[0], "show ip route")
+
+    def test_changed_or_corrupt_file_invalidates_catalog(self):
+        catalog = CommandCatalog.shared(self.path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data["commands"].append({"full_command": "show bench", "shortcuts": [], "modes": ["privileged"],
+                                 "action": "show_bench", "description_en": "", "description_he": ""})
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        updated = CommandCatalog.shared(self.path)
+        self.assertIsNot(updated, catalog)
+        self.assertEqual(updated.index.resolve(["show", "bench"], "privileged")[0]["action"], "show_bench")
+        with open(os.path.join(self.directory, ".cache", "commands.catalog"), "wb") as f:
+            f.write(b"not a pickle")
+        command_catalog._shared.clear()
+        self.assertEqual(len(CommandCatalog.shared(self.path).commands), len(data["commands"]))
+
+    def test_simulators_share_one_catalog(self):
+        first = CLISimulator(DataManager(':memory:', durability=DURABILITY_CHECKPOINT))
+        second = CLISimulator(DataManager(':memory:', durability=DURABILITY_CHECKPOINT))
+        self.assertIs(first.catalog, second.catalog)
+        self.assertIs(first.data_manager.commands, first.catalog.commands)
+        self.assertIs(first.command_parser.catalog, first.catalog)
+        first.data_manager.close()
+        second.data_manager.close()
+
+    def test_text_interface_does_not_import_gui(self):
+        code = "import sys, main; sys.exit('gui' in sys.modules or 'PyQt5' in sys.modules)"
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+class TestLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        logger.configure()
+        shutil.rmtree(self.directory)
+
+    def configure(self, **kwargs):
+        logger.configure(log_file="test.log", log_dir=self.directory, console=False, **kwargs)
+
+    def read_log(self):
+        logger.flush()
+        [name] = os.listdir(self.directory)
+        with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_one_handler_set_and_lazy_formatting(self):
+        self.configure()
+        for _ in range(5):
+            Logger()
+            Logger(subsystem="parser")
+        self.assertEqual(len(logging.getLogger(logger.ROOT_LOGGER).handlers), 1)
+        formatted = []
+
+        class Expensive:
+            def __str__(self):
+                formatted.append(1)
+                return "expensive"
+
+        parser_log = Logger(subsystem="parser")
+        logger.set_level(logging.INFO, "parser")
+        parser_log.debug("Parsing command: %s", Expensive())
+        self.assertEqual(formatted, [])
+        parser_log.info("Executing command: %s", Expensive())
+        self.assertEqual(formatted, [1])
+        lines = self.read_log()
+        self.assertEqual(len(lines), 1)
+        self.assertIn("CiscoSimulator.parser - INFO - Executing command: expensive", lines[0])
+
+    def test_subsystem_levels_json_and_sampling(self):
+        self.configure(json_format=True, levels={"server": "WARNING"}, sample={"parser": 10})
+        Logger(subsystem="server").info("hidden")
+        Logger(subsystem="server").warning("shown %d", 1)
+        parser_log = Logger(subsystem="parser")
+        for i in range(25):
+            parser_log.debug("event %d", i)
+        parser_log.error("always")
+        entries = [json.loads(line) for line in self.read_log()]
+        self.assertEqual([entry["message"] for entry in entries],
+                         ["shown 1", "event 0", "event 10", "event 20", "always"])
+        self.assertEqual(entries[0]["logger"], "CiscoSimulator.server")
+        self.assertEqual(entries[-1]["level"], "ERROR")
+
+class TestRoutingEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = RoutingEngine()
+
+    def add(self, prefix, protocol="static", next_hop=None, **kwargs):
+        network, length = parse_prefix(prefix)
+        return self.engine.add_route(network, length, protocol,
+                                     next_hop=None if next_hop is None else ip_to_int(next_hop), **kwargs)
+
+    def best_prefix(self, address):
+        match = self.engine.fib.lookup_prefix(ip_to_int(address))
+        return None if match is None else format_prefix(match[0], match[1])
+
+    def test_parse_prefix(self):
+        self.assertEqual(parse_prefix("10.1.2.3/255.255.0.0"), (ip_to_int("10.1.0.0"), 16))
+        self.assertEqual(parse_prefix("10.1.2.0", "24"), (ip_to_int("10.1.2.0"), 24))
+        for bad in ("10.1/8", "10.0.0.0/33", "10.0.0.0/255.0.255.0", "300.0.0.0/8"):
+            with self.assertRaises(ValueError):
+                parse_prefix(bad)
+
+    def test_longest_prefix_match(self):
+        for prefix in ("0.0.0.0/0", "10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24", "10.1.2.128/25", "10.1.2.200/32"):
+            self.add(prefix, next_hop="192.0.2.1")
+        self.assertEqual(self.best_prefix("10.1.2.200"), "10.1.2.200/32")
+        self.assertEqual(self.best_prefix("10.1.2.201"), "10.1.2.128/25")
+        self.assertEqual(self.best_prefix("10.1.2.1"), "10.1.2.0/24")
+        self.assertEqual(self.best_prefix("10.1.3.1"), "10.1.0.0/16")
+        self.assertEqual(self.best_prefix("10.9.0.1"), "10.0.0.0/8")
+        self.assertEqual(self.best_prefix("11.0.0.1"), "0.0.0.0/0")
+        self.assertEqual(self.engine.rib.lookup(ip_to_int("10.1.2.201")).length, 25)
+        self.engine.remove_route(*parse_prefix("10.1.2.128/25"), "static", next_hop=ip_to_int("192.0.2.1"))
+        self.assertEqual(self.best_prefix("10.1.2.201"), "10.1.2.0/24")
+        self.assertEqual([(node.network, node.length) for node in self.engine.rib],
+                         sorted(self.engine.rib.nodes))
+
+    def test_random_table_matches_linear_scan(self):
+        prefixes = generators.int_prefixes(2000, seed=3)
+        for network, length in prefixes:
+            self.engine.add_route(network, length, "static", next_hop=1)
+        for network, length in prefixes[::2]:
+            self.engine.remove_route(network, length, "static", next_hop=1)
+        remaining = prefixes[1::2]
+        for address in random.Random(3).sample(range(1 << 24, 224 << 24), 300):
+            expected = max((length for network, length in remaining
+                            if address >> (32 - length) << (32 - length) == network), default=None)
+            match = self.engine.fib.lookup_prefix(address)
+            self.assertEqual(None if match is None else match[1], expected)
+        self.assertEqual(len(self.engine.rib), len(remaining))
+
+    def test_administrative_distance_and_ecmp(self):
+        self.add("172.16.0.0/16", "ospf", "192.0.2.1", metric=20)
+        self.add("172.16.0.0/16", "rip", "192.0.2.2", metric=1)
+        self.assertEqual(self.engine.lookup(ip_to_int("172.16.1.1"))[0].protocol, "ospf")
+        self.add("172.16.0.0/16", "ospf", "192.0.2.3", metric=20)
+        self.assertEqual(len(self.engine.lookup(ip_to_int("172.16.1.1"))), 2)
+        self.add("172.16.0.0/16", "static", "192.0.2.9")
+        entry = self.engine.lookup(ip_to_int("172.16.1.1"))
+        self.assertEqual([route.protocol for route in entry], ["static"])
+        self.engine.remove_route(*parse_prefix("172.16.0.0/16"), "static", next_hop=ip_to_int("192.0.2.9"))
+        self.assertEqual(len(self.engine.lookup(ip_to_int("172.16.1.1"))), 2)
+
+    def test_replace_protocol_routes_updates_only_changes(self):
+        network, length = parse_prefix("10.0.0.0/8")
+        self.engine.replace_protocol_routes("ospf", [(network, length, 1, "Gi0/0", 10)])
+        entry = self.engine.lookup(network)
+        self.engine.replace_protocol_routes("ospf", [(network, length, 1, "Gi0/0", 10)])
+        self.assertIs(self.engine.lookup(network), entry)
+        self.engine.replace_protocol_routes("ospf", [])
+        self.assertIsNone(self.engine.lookup(network))
+
+    def test_connected_routes_follow_interface(self):
+        config = {"ip_address": "192.168.1.1", "subnet_mask": "255.255.255.0", "status": "administratively down"}
+        self.engine.set_interface("Gi0/0", config)
+        self.assertIsNone(self.engine.lookup(ip_to_int("192.168.1.5")))
+        self.engine.set_interface("Gi0/0", dict(config, status="up"))
+        self.assertTrue(self.engine.is_local(ip_to_int("192.168.1.1")))
+        self.add("10.0.0.0/8", next_hop="192.168.1.254")
+        self.assertEqual(self.engine.resolve(ip_to_int("10.1.1.1")), ("Gi0/0", ip_to_int("192.168.1.254")))
+        self.engine.remove_interface("Gi0/0")
+        self.assertIsNone(self.engine.resolve(ip_to_int("10.1.1.1")))
+
+
+class TestRoutingCommands(unittest.TestCase):
+
+    CONFIG = [
+        "enable",
+        "configure terminal",
+        "interface GigabitEthernet0/0",
+        " ip address 10.0.0.1 255.255.255.0",
+        " no shutdown",
+        "exit",
+        "ip route 192.168.0.0 255.255.0.0 10.0.0.2",
+        "ip route 192.168.1.0 255.255.255.0 10.0.0.3",
+        "end",
+    ]
+
+    def setUp(self):
+        self.simulator = create_simulator("router", CommandCatalog.shared())
+        for result in self.simulator.run_script(self.CONFIG):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+
+    def tearDown(self):
+        self.simulator.data_manager.close()
+
+    def test_show_ip_route_and_cef(self):
+        output = self.simulator.execute("show ip route").output
+        self.assertIn("C        10.0.0.0/24 is directly connected, GigabitEthernet0/0", output)
+        self.assertIn("L        10.0.0.1/32 is directly connected, GigabitEthernet0/0", output)
+        self.assertIn("S        192.168.1.0/24 [1/0] via 10.0.0.3", output)
+        self.assertIn("Gateway of last resort is not set", output)
+        entry = self.simulator.execute("show ip route 192.168.1.77").output
+        self.assertIn("Routing entry for 192.168.1.0/24", entry)
+        subtree = self.simulator.execute("show ip route 192.168.0.0 255.255.0.0").output
+        self.assertNotIn("10.0.0.0/24", subtree)
+        self.assertIn("192.168.1.0/24", subtree)
+        cef = self.simulator.execute("show ip cef").output
+        self.assertIn("192.168.0.0/16       10.0.0.2             GigabitEthernet0/0", cef)
+        self.assertIn("10.0.0.1/32          receive", cef)
+
+    def test_ping(self):
+        self.assertIn("!!!!!", self.simulator.execute("ping 192.168.5.5").output)
+        self.assertIn("Success rate is 0 percent (0/5)", self.simulator.execute("ping 172.16.0.1").output)
+        self.assertIn("(3/3)", self.simulator.execute("ping 10.0.0.1 repeat 3").output)
+        self.assertEqual(self.simulator.execute("ping 10.0.0").status, STATUS_ERROR)
+
+    def test_engine_tracks_configuration_changes(self):
+        self.assertIn("!!!!!", self.simulator.execute("ping 192.168.5.5").output)
+        for line in ["configure terminal", "interface GigabitEthernet0/0", "shutdown", "end"]:
+            self.simulator.execute(line)
+        self.assertIn(".....", self.simulator.execute("ping 192.168.5.5").output)
+        manager = self.simulator.data_manager
+        manager.remove_route("192.168.1.0/255.255.255.0")
+        self.assertNotIn("192.168.1.0/24", self.simulator.execute("show ip route").output)
+        self.assertEqual([route["destination"] for route in manager.get_device_state("routing_table")],
+                         ["192.168.0.0/255.255.0.0"])
+
+    def test_failed_command_rolls_back_routes(self):
+        manager = self.simulator.data_manager
+        manager.routing_engine()
+        with self.assertRaises(RuntimeError):
+            with manager.batch():
+                manager.add_route("172.16.0.0/255.255.0.0", "10.0.0.9")
+                manager.remove_route("192.168.0.0/255.255.0.0")
+                raise RuntimeError("handler failed")
+        self.assertEqual(sorted(route["destination"] for route in manager.get_device_state("routing_table")),
+                         ["192.168.0.0/255.255.0.0", "192.168.1.0/255.255.255.0"])
+        output = self.simulator.execute("show ip route").output
+        self.assertIn("192.168.0.0/16", output)
+        self.assertNotIn("172.16.0.0/16", output)
+        manager.flush()
+        rows = manager.conn.execute("SELECT destination FROM routes WHERE device_id = ? ORDER BY destination",
+                                    (manager.device_id,)).fetchall()
+        self.assertEqual([row[0] for row in rows], ["192.168.0.0/255.255.0.0", "192.168.1.0/255.255.255.0"])
+
+class TestAclEngine(unittest.TestCase):
+
+    RULES = [
+        "remark web servers",
+        "permit tcp any host 192.168.1.5 eq www",
+        "deny tcp 10.0.0.0 0.0.0.255 any range 20 21",
+        "permit udp any any neq 53",
+        "deny ip 10.0.0.0 0.255.0.255 any",
+        "permit icmp any any",
+        "permit tcp any any gt 1023",
+    ]
+
+    def test_parse_rule(self):
+        rule = parse_rule("permit tcp 10.0.0.0 0.0.0.255 any eq ssh log")
+        self.assertEqual((rule.protocol, rule.dst_ports), (6, [(22, 22)]))
+        self.assertEqual(parse_rule("deny host 10.0.0.1", standard=True).src, (ip_to_int("10.0.0.1"), 0xFFFFFFFF))
+        self.assertTrue(acl_engine.is_standard("10"))
+        self.assertFalse(acl_engine.is_standard("2100"))
+        for bad in ("allow ip any any", "permit tcp any any eq 70000", "permit foo any any", "permit ip any"):
+            with self.assertRaises(ValueError):
+                parse_rule(bad, standard=False)
+        with self.assertRaises(ValueError):
+            acl_engine.is_standard("300")
+
+    def test_first_match_semantics(self):
+        acl = CompiledACL(self.RULES, standard=False)
+        self.assertEqual(acl.match(make_packet("tcp", "10.0.0.9", "192.168.1.5", 4000, 80)), 1)
+        self.assertEqual(acl.match(make_packet("tcp", "10.0.0.9", "192.168.1.6", 4000, 21)), 2)
+        self.assertEqual(acl.match(make_packet("udp", "10.0.0.9", "8.8.8.8", 4000, 53)), 4)
+        self.assertEqual(acl.match(make_packet("udp", "10.1.1.9", "8.8.8.8", 4000, 53)), None)
+        self.assertEqual(acl.match(make_packet("icmp", "10.7.0.9", "8.8.8.8")), 4)
+        self.assertEqual(acl.match(make_packet("icmp", "10.7.1.9", "8.8.8.8")), 5)
+        self.assertEqual(acl.match(make_packet("tcp", "172.16.0.1", "8.8.8.8", 80, 1024)), 6)
+        self.assertFalse(acl.permitted(make_packet("tcp", "172.16.0.1", "8.8.8.8", 80, 1023)))
+
+    def test_matches_linear_scan_on_random_acl(self):
+        rules = generators.access_list_rules(400, seed=5) + ["permit ip 10.0.0.0 0.3.0.255 10.1.0.0 0.0.255.0"]
+        acl = CompiledACL(rules, standard=False)
+        packets = generators.flows(3000, seed=5)
+        expected = [next((i for i, rule in enumerate(acl.rules) if rule.matches(packet)), -1) for packet in packets]
+        self.assertEqual([-1 if i is None else i for i in map(acl.match, packets)], expected)
+        self.assertEqual(acl.evaluate_many(packets, vectorized=False), expected)
+        self.assertEqual(sum(acl.hits), sum(1 for index in expected if index >= 0))
+
+    @unittest.skipIf(load_numpy() is None, "NumPy is not installed")
+    def test_vectorized_evaluation_matches_loop(self):
+        rules = generators.access_list_rules(300, seed=2) + ["deny ip 10.0.0.0 0.3.0.255 any"]
+        acl = CompiledACL(rules, standard=False)
+        packets = generators.flows(5000, seed=2)
+        self.assertEqual(acl.evaluate_many(packets, count=False, vectorized=True),
+                         acl.evaluate_many(packets, count=False, vectorized=False))
+
+    def test_hit_counters_survive_new_entries(self):
+        manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT)
+        manager.add_access_list("10", "permit 10.0.0.0 0.0.0.255")
+        manager.add_interface("Gi0/0", {"status": "up", "access_group_in": "10"})
+        packets = [make_packet("icmp", "10.0.0.1", "1.1.1.1"), make_packet("icmp", "10.0.1.1", "1.1.1.1")]
+        self.assertEqual(manager.filter_packets("Gi0/0", "in", packets), [True, False])
+        self.assertEqual(manager.filter_packets("Gi0/0", "out", packets), [True, True])
+        manager.add_access_list("10", "permit any")
+        self.assertEqual(manager.filter_packets("Gi0/0", "in", packets), [True, True])
+        self.assertEqual(manager.compiled_access_list("10").hits, [2, 1])
+        manager.close()
+
+
+class TestAccessListCommands(unittest.TestCase):
+
+    CONFIG = [
+        "enable",
+        "configure terminal",
+        "interface Gi0/0",
+        " ip address 10.0.0.1 255.255.255.0",
+        " no shutdown",
+        " ip access-group 101 in",
+        "exit",
+        "interface Gi0/1",
+        " ip address 192.168.1.1 255.255.255.0",
+        " no shutdown",
+        " ip access-group 10 out",
+        "exit",
+        "access-list 101 permit tcp any host 192.168.1.5 eq www",
+        "access-list 101 permit icmp any any",
+        "access-list 10 deny host 10.0.0.66",
+        "access-list 10 permit 10.0.0.0 0.0.0.255",
+        "end",
+    ]
+
+    def setUp(self):
+        self.simulator = create_simulator("router", CommandCatalog.shared())
+        for result in self.simulator.run_script(self.CONFIG):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+
+    def tearDown(self):
+        self.simulator.data_manager.close()
+
+    def test_invalid_entries_are_rejected(self):
+        self.simulator.execute("configure terminal")
+        self.assertEqual(self.simulator.execute("access-list 10 permit bogus").status, STATUS_ERROR)
+        self.assertEqual(self.simulator.execute("access-list 300 permit any").status, STATUS_ERROR)
+        self.assertEqual(self.simulator.data_manager.get_device_state("access_lists")["10"],
+                         ["deny host 10.0.0.66", "permit 10.0.0.0 0.0.0.255"])
+
+    def test_packet_tracer_and_counters(self):
+        output = self.simulator.execute("packet-tracer input Gi0/0 tcp 10.0.0.5 3333 192.168.1.5 80").output
+        self.assertIn("Config: access-list 101 permit tcp any host 192.168.1.5 eq www", output)
+        self.assertIn("output-interface: GigabitEthernet0/1", output)
+        self.assertTrue(output.endswith("Action: allow"))
+        output = self.simulator.execute("packet-tracer input Gi0/0 icmp 10.0.0.66 192.168.1.5").output
+        self.assertIn("Config: access-list 10 deny host 10.0.0.66", output)
+        self.assertTrue(output.endswith("Action: drop"))
+        output = self.simulator.execute("packet-tracer input Gi0/0 udp 10.0.0.5 53 192.168.1.5 53").output
+        self.assertIn("access-list 101 implicit deny", output)
+        self.assertEqual(self.simulator.execute("packet-tracer input Gi9/9 icmp 10.0.0.5 192.168.1.5").status,
+                         STATUS_ERROR)
+
+        shown = self.simulator.execute("show access-lists").output.splitlines()
+        self.assertEqual(shown[0], "Extended IP access list 101")
+        self.assertIn("    10 permit tcp any host 192.168.1.5 eq www (1 match)", shown)
+        self.assertIn("    10 deny host 10.0.0.66 (1 match)", shown)
+        self.simulator.execute("clear access-list counters")
+        self.assertNotIn("match", self.simulator.execute("show access-lists 101").output)
+
+class TestMacTable(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = SimulatedClock(1000)
+        self.table = MacTable(self.clock, aging_time=300)
+
+    def test_timer_wheel_fires_each_timer_once_at_its_deadline(self):
+        wheel = TimerWheel(start=5)
+        deadlines = [6, 7, 70, 300, 4100, 5000, 300000, 20000000]
+        for deadline in deadlines:
+            wheel.schedule(deadline, deadline)
+        fired = []
+        for tick in (6, 69, 70, 4099, 4100, 400000, 30000000):
+            fired += [(tick, item) for deadline, item in wheel.advance(tick)]
+        self.assertEqual([item for _, item in fired], deadlines)
+        self.assertTrue(all(item <= tick for tick, item in fired))
+        self.assertEqual(len(wheel), 0)
+
+    def test_learn_move_and_age(self):
+        mac = parse_mac("0050.7966.6800")
+        self.assertEqual(format_mac(mac), "0050.7966.6800")
+        self.assertEqual(parse_mac("00:50:79:66:68:00"), mac)
+        self.table.learn(10, mac, "Gi0/1")
+        self.table.learn(10, mac + 1, "Gi0/2")
+        self.table.learn(10, mac, "Gi0/3")
+        self.assertEqual(self.table.lookup(10, mac), "Gi0/3")
+        self.assertEqual(list(self.table.by_port), ["Gi0/2", "Gi0/3"])
+        self.clock.advance(200)
+        self.table.learn(10, mac, "Gi0/3")
+        self.clock.advance(150)
+        self.assertEqual([format_mac(entry.mac) for entry in self.table.expire()], ["0050.7966.6801"])
+        self.assertEqual(self.table.lookup(10, mac), "Gi0/3")
+        self.clock.advance(200)
+        self.assertIsNone(self.table.lookup(10, mac))
+        self.assertEqual((len(self.table), self.table.by_port, self.table.by_vlan), (0, {}, {}))
+
+    def test_static_entries_and_aging_time_changes(self):
+        self.table.add_static(1, 1, "Gi0/1")
+        for mac in range(2, 12):
+            self.table.learn(1, mac, "Gi0/2")
+        self.clock.advance(60)
+        self.table.set_aging_time(30)
+        self.assertEqual([entry.mac for entry in self.table.select()], [1])
+        self.table.learn(1, 5, "Gi0/2")
+        self.table.set_aging_time(0)
+        self.clock.advance(100000)
+        self.assertEqual(len(self.table), 2)
+        with self.assertRaises(ValueError):
+            self.table.set_aging_time(5)
+
+    def test_filtered_show_uses_indexes(self):
+        for vlan, mac, port in generators.mac_addresses(2000, vlans=5, ports=8, seed=1):
+            self.table.learn(vlan, mac, port)
+        vlan, mac, port = generators.mac_addresses(2000, vlans=5, ports=8, seed=1)[0]
+        entries = self.table.select()
+        self.assertEqual(len(self.table.select(vlan=vlan)), sum(1 for entry in entries if entry.vlan == vlan))
+        both = self.table.select(vlan=vlan, port=port)
+        self.assertEqual(sorted(entry.mac for entry in both),
+                         sorted(entry.mac for entry in entries if entry.vlan == vlan and entry.port == port))
+        lines = list(self.table.show(mac=mac))
+        self.assertIn(f"{vlan:>4}    {format_mac(mac)}    DYNAMIC     {interface_table.short_interface(port)}", lines)
+        self.assertEqual(lines[-1], "Total Mac Addresses for this criterion: 1")
+
+
+class TestMacTableCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = SimulatedClock()
+        self.manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT, clock=self.clock)
+        self.simulator = CLISimulator(self.manager, CommandCatalog.shared())
+        self.simulator.set_device_type("switch")
+        for result in self.simulator.run_script(["enable", "configure terminal", "interface Gi0/1", "exit",
+                                                 "interface Gi0/2", "end"]):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+        table = self.manager.mac_address_table()
+        table.learn(10, parse_mac("0000.0000.0001"), "GigabitEthernet0/1")
+        table.learn(20, parse_mac("0000.0000.0002"), "GigabitEthernet0/2")
+
+    def tearDown(self):
+        self.manager.close()
+
+    def test_show_and_filters(self):
+        output = self.simulator.execute("show mac address-table").output
+        self.assertIn("  10    0000.0000.0001    DYNAMIC     Gi0/1", output)
+        self.assertTrue(output.endswith("Total Mac Addresses for this criterion: 2"))
+        self.assertNotIn("Gi0/1", self.simulator.execute("show mac address-table vlan 20").output)
+        self.assertNotIn("Gi0/2", self.simulator.execute("show mac address-table interface Gi0/1").output)
+        self.assertIn("criterion: 0", self.simulator.execute("show mac address-table static").output)
+        self.assertIn("criterion: 1", self.simulator.execute("show mac address-table address 0000.0000.0002").output)
+        self.assertEqual(self.simulator.execute("show mac address-table vlan x").status, STATUS_ERROR)
+
+    def test_aging_time_and_port_shutdown(self):
+        self.assertEqual(self.simulator.execute("configure terminal").status, STATUS_OK)
+        self.assertEqual(self.simulator.execute("mac address-table aging-time 5").status, STATUS_ERROR)
+        self.assertEqual(self.simulator.execute("mac address-table aging-time 60").status, STATUS_OK)
+        self.assertEqual(self.manager.get_device_state("mac_aging_time"), 60)
+        self.simulator.execute("interface Gi0/2")
+        self.simulator.execute("shutdown")
+        self.simulator.execute("end")
+        self.assertIn("Global Aging Time:     60", self.simulator.execute("show mac address-table aging-time").output)
+        self.assertIn("criterion: 1", self.simulator.execute("show mac address-table").output)
+        self.clock.advance(61)
+        self.assertIn("criterion: 0", self.simulator.execute("show mac address-table").output)
+
+    def test_registry_devices_share_clock(self):
+        clock = SimulatedClock()
+        with tempfile.TemporaryDirectory() as directory:
+            registry = DeviceRegistry(os.path.join(directory, "lab.db"), durability=DURABILITY_CHECKPOINT, clock=clock)
+            tables = [registry.add_device(name, "switch").data_manager.mac_address_table() for name in ("S1", "S2")]
+            for table in tables:
+                table.learn(1, 1, "Gi0/1")
+            clock.advance(301)
+            self.assertEqual([len(table) for table in tables], [0, 0])
+            registry.close()
+
+class TestConfigRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT)
+        self.simulator = CLISimulator(self.manager, CommandCatalog.shared())
+        self.simulator.set_device_type("router")
+        self.run_lines(["enable", "configure terminal", "hostname R1",
+                        "interface GigabitEthernet0/10", "exit",
+                        "interface GigabitEthernet0/2", "ip address 10.0.0.1 255.255.255.0", "no shutdown",
+                        "ip access-group 101 in", "exit",
+                        "access-list 101 permit tcp any any eq 80",
+                        "ip route 192.168.0.0 255.255.0.0 10.0.0.2",
+                        "ip route 10.1.0.0 255.255.255.0 10.0.0.3",
+                        "router ospf 1", "network 10.0.0.0 0.0.0.255 area 0", "end"])
+
+    def tearDown(self):
+        self.manager.close()
+
+    def run_lines(self, lines):
+        for result in self.simulator.run_script(lines):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+
+    def fresh(self):
+        # הפקה מאפס, בלי מטמון, להשוואה מול המטמון המצטבר
+        routes = {}
+        for route in self.manager.get_device_state("routing_table"):
+            routes.setdefault(route["destination"], []).append(route)
+        return list(ConfigRenderer().lines(self.manager.state, {"routing_table": routes}))
+
+    def test_ios_order(self):
+        lines = list(self.manager.running_config())
+        self.assertEqual(lines[:4], ["!", "version 15.2", "!", "hostname R1"])
+        self.assertEqual(lines[-1], "end")
+        positions = [lines.index(line) for line in (
+            "interface GigabitEthernet0/2", "interface GigabitEthernet0/10", "router ospf 1",
+            "ip route 10.1.0.0 255.255.255.0 10.0.0.3", "ip route 192.168.0.0 255.255.0.0 10.0.0.2",
+            "access-list 101 permit tcp any any eq 80")]
+        self.assertEqual(positions, sorted(positions))
+        interface = lines[lines.index("interface GigabitEthernet0/2"):lines.index("interface GigabitEthernet0/10")]
+        self.assertEqual(interface, ["interface GigabitEthernet0/2", " ip address 10.0.0.1 255.255.255.0",
+                                     " ip access-group 101 in", "!"])
+        self.assertIn(" shutdown", lines[lines.index("interface GigabitEthernet0/10"):])
+
+    def test_only_changed_items_are_rendered_again(self):
+        list(self.manager.running_config())
+        section = self.manager.renderer.by_key["interfaces"]
+        untouched = section.cached["GigabitEthernet0/10"]
+        self.run_lines(["configure terminal", "interface GigabitEthernet0/2", "shutdown", "end"])
+        self.assertEqual(section.pending, {"GigabitEthernet0/2"})
+        lines = list(self.manager.running_config())
+        self.assertIs(section.cached["GigabitEthernet0/10"], untouched)
+        self.assertEqual(lines, self.fresh())
+
+    def test_incremental_output_matches_full_render(self):
+        rng = random.Random(5)
+        commands = [
+            lambda: f"interface GigabitEthernet0/{rng.randrange(20)}",
+            lambda: f"ip route 10.{rng.randrange(50)}.0.0 255.255.0.0 10.0.0.{rng.randrange(2, 9)}",
+            lambda: f"access-list {rng.choice((1, 101, 150))} permit {'ip any any' if rng.random() < 0.5 else 'any'}",
+            lambda: f"vlan {rng.randrange(2, 30)}",
+            lambda: f"hostname R{rng.randrange(5)}",
+            lambda: f"mac address-table aging-time {rng.choice((60, 300, 600))}",
+        ]
+        for step in range(300):
+            self.simulator.mode = "config"
+            self.simulator.execute(rng.choice(commands)())
+            if rng.random() < 0.3:
+                self.simulator.execute(rng.choice(("shutdown", "no shutdown", "name LAB")))
+            if rng.random() < 0.1:
+                self.manager.remove_route(f"10.{rng.randrange(50)}.0.0/255.255.0.0")
+            if rng.random() < 0.05:
+                with self.assertRaises(RuntimeError):
+                    with self.manager.batch():
+                        self.manager.remove_interface(f"GigabitEthernet0/{rng.randrange(20)}")
+                        self.manager.add_route("172.16.0.0/255.255.0.0", "10.0.0.9")
+                        list(self.manager.running_config())
+                        raise RuntimeError
+            if rng.random() < 0.1:
+                # צרכן שעוצר באמצע הזרם לא משאיר מטמון חלקי
+                stream = self.manager.running_config()
+                for _ in range(rng.randrange(1, 30)):
+                    next(stream, None)
+                stream.close()
+            if step % 10 == 0:
+                self.assertEqual(list(self.manager.running_config()), self.fresh(), step)
+
+    def test_show_and_copy_commands(self):
+        self.assertEqual(self.simulator.execute("show startup-config").output, "startup-config is not present")
+        output = self.simulator.execute("show running-config").output
+        config = "\n".join(self.manager.running_config())
+        self.assertEqual(output, f"Building configuration...\n\nCurrent configuration : {len(config)} bytes\n{config}")
+        self.assertEqual(self.simulator.execute("copy running-config startup-config").status, STATUS_OK)
+        self.assertTrue(self.simulator.execute("show startup-config").output.endswith(config))
+        # ה-startup-config הוא snapshot בארכיון ולא עותק של הטקסט
+        self.assertIsNotNone(self.manager.get_device_state("startup_snapshot"))
+        self.assertEqual("\n".join(self.manager.startup_config_lines()), config)
+
+
+class TestOutputPipeline(unittest.TestCase):
+
+    def test_split_filters(self):
+        command, filters = split_filters("show run | include a|b | ex Vlan")
+        self.assertEqual(command, "show run")
+        self.assertEqual([(name, regex.pattern) for name, regex in filters], [("include", "a|b"), ("exclude", "Vlan")])
+        self.assertEqual(split_filters("show ip route"), ("show ip route", []))
+        for line in ("show run | bogus x", "show run | include", "show run | include (", "show run |"):
+            with self.assertRaises(ValueError):
+                split_filters(line)
+
+    def test_stages(self):
+        config = ["hostname R1", "interface Gi0/1", " ip address 10.0.0.1 255.0.0.0", " shutdown",
+                  "interface Gi0/2", " no ip address", "router ospf 1", " network 10.0.0.0 0.0.0.255 area 0"]
+
+        def run(line):
+            return list(apply_filters(config, split_filters(line)[1]))
+
+        self.assertEqual(run("x | include ^interface"), ["interface Gi0/1", "interface Gi0/2"])
+        self.assertEqual(run("x | exclude ^ "), ["hostname R1", "interface Gi0/1", "interface Gi0/2", "router ospf 1"])
+        self.assertEqual(run("x | begin Gi0/2"), config[4:])
+        self.assertEqual(run("x | section shutdown"), config[1:4])
+        self.assertEqual(run("x | section ^router"), config[6:])
+        self.assertEqual(run("x | section interface | include address"),
+                         [" ip address 10.0.0.1 255.0.0.0", " no ip address"])
+
+    def test_filters_are_lazy(self):
+        # זרם אינסופי: המסננים מחזירים שורות בלי לקרוא את כל הקלט
+        lines = apply_filters((f"line {i}" for i in itertools.count()), split_filters("x | begin 500 | include 0$")[1])
+        self.assertEqual(next(lines), "line 500")
+        self.assertEqual(next(lines), "line 510")
+
+    def test_pager(self):
+        produced = []
+
+        def lines():
+            for i in range(100):
+                produced.append(i)
+                yield str(i)
+
+        pager = Pager(lines(), 10)
+        self.assertEqual(pager.next_chunk(), [str(i) for i in range(9)])
+        self.assertTrue(pager.more)
+        self.assertTrue(pager.answer("\n"))
+        self.assertEqual(pager.next_chunk(), ["9"])
+        self.assertTrue(pager.answer(" \n"))
+        self.assertEqual(len(pager.next_chunk()), 9)
+        self.assertFalse(pager.answer("q\n"))
+        self.assertEqual(pager.next_chunk(), [])
+        # אחרי q הזרם נסגר - לא הופקו יותר שורות מאלה שהוצגו ועוד אחת קדימה
+        self.assertEqual(len(produced), 20)
+        pager = Pager(["a", "b"], 3)
+        self.assertEqual(pager.next_chunk(), ["a", "b"])
+        self.assertFalse(pager.more)
+        self.assertEqual(Pager(iter(range(1000)), 0).next_chunk(), list(range(Pager.CHUNK)))
+
+    def test_show_commands_with_filters(self):
+        manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT)
+        simulator = CLISimulator(manager, CommandCatalog.shared())
+        simulator.set_device_type("router")
+        for result in simulator.run_script(["enable", "configure terminal", "hostname R1", "interface Gi0/1",
+                                            "ip address 10.0.0.1 255.255.255.0", "exit", "ip route 10.9.0.0 255.255.0.0 10.0.0.2",
+                                            "end"]):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+        self.assertEqual(simulator.execute("show running-config | include hostname").output, "hostname R1")
+        self.assertEqual(simulator.execute("sh run | sec Ethernet0/1").output,
+                         "interface GigabitEthernet0/1\n ip address 10.0.0.1 255.255.255.0\n shutdown")
+        self.assertEqual(simulator.execute("show ip route | include ^S").output,
+                         "S        10.9.0.0/16 [1/0] via 10.0.0.2")
+        self.assertIsInstance(simulator.command_parser.parse_command("show ip route", "router", "privileged"),
+                              types.GeneratorType)
+        self.assertEqual(simulator.execute("show run | include (").status, STATUS_ERROR)
+        self.assertEqual(simulator.execute("terminal length 600").status, STATUS_ERROR)
+        self.assertEqual(simulator.execute("terminal length 0").status, STATUS_OK)
+        self.assertEqual(simulator.command_parser.terminal_length, 0)
+        simulator.execute("configure terminal")
+        self.assertEqual(simulator.execute("hostname R2 | include x").status, STATUS_ERROR)
+        manager.close()
+
+    def test_lazy_output_is_produced_inside_a_batch(self):
+        manager = DataManager(':memory:', durability=DURABILITY_CHECKPOINT)
+        self.addCleanup(manager.close)
+        simulator = CLISimulator(manager, CommandCatalog.shared())
+        simulator.set_device_type("router")
+        simulator.execute("enable")
+        depths = []
+
+        def show_access_lists(device_type, args):
+            for i in range(600):
+                depths.append(manager.batch_depth)
+                yield str(i)
+
+        with patch.object(simulator.command_parser, "show_access_lists", show_access_lists):
+            result = simulator.execute("show access-lists | include 9$", lazy=True)
+            self.assertEqual(depths, [])
+            self.assertEqual(len(list(result.output)), 60)
+        self.assertEqual(set(depths), {1})
+
+
+class TestConfigArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = DeviceRegistry(':memory:', durability=DURABILITY_CHECKPOINT)
+        self.simulator = self.registry.add_device("R1", "router")
+        self.manager = self.simulator.data_manager
+        self.run_lines(self.simulator, ["enable", "configure terminal", "hostname R1",
+                                        "interface GigabitEthernet0/1", "ip address 10.0.0.1 255.255.255.0",
+                                        "no shutdown", "ip access-group 10 in", "exit", "access-list 10 permit any",
+                                        "ip route 10.1.0.0 255.255.0.0 10.0.0.2", "end"])
+
+    def tearDown(self):
+        self.registry.close()
+
+    def run_lines(self, simulator, lines):
+        for result in simulator.run_script(lines):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+
+    def count(self, table):
+        return self.manager.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_snapshots_share_unchanged_sections(self):
+        first = self.manager.archive_config()
+        blobs, trees = self.count("config_blobs"), self.count("config_trees")
+        second = self.manager.archive_config()
+        self.assertEqual((self.count("config_blobs"), self.count("config_trees")), (blobs, trees))
+        self.manager.add_route("10.2.0.0/255.255.0.0", "10.0.0.3")
+        self.manager.archive_config()
+        # נתיב אחד חדש: blob אחד ועץ אחד (החלק של הנתיבים), בלי לגעת בשאר
+        self.assertEqual((self.count("config_blobs"), self.count("config_trees")), (blobs + 1, trees + 1))
+        self.assertEqual(self.manager.config_diff(first, second), [])
+        self.assertEqual([row[1] for row in self.manager.config_snapshots()], [1, 2, 3])
+        text = list(config_archive.render(self.manager.config_manifest(first), self.manager.config_renderer()))
+        self.manager.remove_route("10.2.0.0/255.255.0.0")
+        self.assertEqual(text, list(self.manager.running_config()))
+
+    def test_diff_and_replace(self):
+        self.simulator.execute("archive config")
+        self.manager.remove_access_list("10")
+        self.run_lines(self.simulator, ["configure terminal", "hostname R9", "interface GigabitEthernet0/1",
+                                        "ip address 10.0.9.1 255.255.255.0", "exit", "access-list 10 deny any",
+                                        "ip route 10.2.0.0 255.255.0.0 10.0.0.3", "vlan 20", "end"])
+        before = list(self.manager.running_config())
+        output = self.simulator.execute("show archive config differences").output
+        self.assertEqual(output.split("\n"), [
+            "!Contextual Config Diffs:",
+            "-hostname R1",
+            "+hostname R9",
+            "+vlan 20",
+            "interface GigabitEthernet0/1",
+            " -ip address 10.0.0.1 255.255.255.0",
+            " +ip address 10.0.9.1 255.255.255.0",
+            "+ip route 10.2.0.0 255.255.0.0 10.0.0.3",
+            "-access-list 10 permit any",
+            "+access-list 10 deny any",
+        ])
+        packet = make_packet("icmp", "1.1.1.1", "10.0.0.1")
+        self.assertEqual(self.manager.filter_packets("GigabitEthernet0/1", "in", [packet]), [False])
+        self.simulator.execute("archive config")
+        self.assertEqual(self.simulator.execute("configure replace 1").status, STATUS_OK)
+        self.assertEqual(self.simulator.execute("show archive config differences 1").output,
+                         "!Contextual Config Diffs:\n!No changes were found")
+        self.assertEqual(self.manager.get_device_state("hostname"), "R1")
+        self.assertEqual(self.manager.routing_engine().resolve(ip_to_int("10.2.0.1")), None)
+        self.assertEqual(self.manager.filter_packets("GigabitEthernet0/1", "in", [packet]), [True])
+        self.simulator.execute("archive config")
+        self.assertIn("-hostname R9", self.simulator.execute("show archive config differences 2 3").output)
+        self.assertIn("<- Most Recent", self.simulator.execute("show archive").output.split("\n")[-1])
+        self.assertEqual(self.simulator.execute("configure replace 9").status, STATUS_ERROR)
+        self.assertEqual(self.simulator.execute("configure replace 2").status, STATUS_OK)
+        self.assertEqual(list(self.manager.running_config()), before)
+
+    def test_replace_survives_reload_and_diffs_across_devices(self):
+        self.simulator.execute("copy running-config startup-config")
+        config = list(self.manager.running_config())
+        self.manager.update_hostname("R5")
+        self.manager.remove_interface("GigabitEthernet0/1")
+        self.simulator.execute("configure replace startup-config")
+        self.registry.unload("R1")
+        self.assertEqual(list(self.registry.device("R1").data_manager.running_config()), config)
+        # בודק מול מכשיר ייחוס: snapshot של מכשיר אחד מול ה-running-config של מכשיר אחר
+        reference = self.registry.add_device("REF", "router").data_manager
+        changes = self.registry.device("R1").data_manager.config_diff(reference.archive_config())
+        self.assertIn(("interfaces", "GigabitEthernet0/1"), [change[:2] for change in changes])
+        self.registry.remove_device("R1")
+        self.assertEqual(self.count("config_snapshots"), 1)
+
+
+class TestInterfaceTable(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = DeviceRegistry(':memory:', durability=DURABILITY_CHECKPOINT)
+        self.switch = self.registry.add_device("SW1", "switch")
+        lines = ["enable", "configure terminal"]
+        for port in range(1, 5):
+            lines += [f"interface GigabitEthernet1/0/{port}", "switchport mode access",
+                      f"switchport access vlan {10 if port < 3 else 20}", "exit"]
+        lines += ["interface GigabitEthernet1/0/10", "switchport mode trunk", "switchport trunk allowed vlan 10,20,30-40",
+                  "switchport trunk allowed vlan remove 35", "switchport trunk native vlan 99",
+                  "channel-group 1 mode active", "exit",
+                  "interface GigabitEthernet1/0/9", "switchport mode trunk", "channel-group 1 mode passive",
+                  "shutdown", "exit",
+                  "interface Vlan10", "ip address 10.0.10.1 255.255.255.0", "end"]
+        self.outputs = self.run_lines(lines)
+
+    def tearDown(self):
+        self.registry.close()
+
+    def run_lines(self, lines):
+        outputs = []
+        for result in self.switch.run_script(lines):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+            outputs.append(result.output)
+        return outputs
+
+    def output(self, line):
+        return self.run_lines([line])[0].split("\n")
+
+    def test_switchport_show_commands(self):
+        self.assertIn("% Access VLAN does not exist. Creating vlan 10", self.outputs)
+        self.assertIn("Creating a port-channel interface Port-channel 1", self.outputs)
+        status = self.output("show interfaces status")
+        self.assertEqual([line.split()[0] for line in status[1:]], [
+            "Gi1/0/1", "Gi1/0/2", "Gi1/0/3", "Gi1/0/4", "Gi1/0/9", "Gi1/0/10", "Vlan10"])
+        self.assertEqual(status[5], "Gi1/0/9                      disabled     trunk      a-full  a-1000 "
+                                    "10/100/1000BaseTX")
+        self.assertEqual([line.split()[0] for line in self.output("show interfaces status vlan 20")[1:]],
+                         ["Gi1/0/3", "Gi1/0/4"])
+        self.assertEqual([line.split()[0] for line in self.output("show interfaces status disabled")[1:]],
+                         ["Gi1/0/9"])
+        self.assertEqual(self.output("show interfaces trunk"), [
+            "Port        Mode             Encapsulation  Status        Native vlan",
+            "Gi1/0/9     on               802.1q         not-trunking  1",
+            "Gi1/0/10    on               802.1q         trunking      99",
+            "",
+            "Port        Vlans allowed on trunk",
+            "Gi1/0/9     1-4094",
+            "Gi1/0/10    10,20,30-34,36-40",
+            "",
+            "Port        Vlans allowed and active in management domain",
+            "Gi1/0/9     1,10,20",
+            "Gi1/0/10    10,20",
+        ])
+        self.assertEqual(self.output("show ip interface brief")[-1],
+                         "Vlan10                 10.0.10.1       YES manual up                    up")
+        self.assertEqual(self.output("show etherchannel summary")[-1],
+                         "1      Po1(SU)       LACP        Gi1/0/9(D)  Gi1/0/10(P)")
+        config = self.switch.execute("show running-config").output
+        self.assertIn("interface GigabitEthernet1/0/10\n switchport mode trunk\n"
+                      " switchport trunk allowed vlan 10,20,30-34,36-40\n switchport trunk native vlan 99\n"
+                      " channel-group 1 mode active\n!", config)
+        results = list(self.switch.run_script(["configure terminal", "interface GigabitEthernet1/0/11",
+                                               "channel-group 1 mode desirable", "switchport trunk allowed vlan 5000"]))
+        self.assertEqual([result.status for result in results[2:]], [STATUS_ERROR, STATUS_ERROR])
+        router = self.registry.add_device("R1", "router")
+        results = list(router.run_script(["enable", "configure terminal", "interface GigabitEthernet0/0",
+                                          "switchport mode access"]))
+        self.assertEqual(results[-1].status, STATUS_ERROR)
+
+    def test_counters_and_clear(self):
+        self.output("ping 10.0.10.5")
+        self.output("ping 10.0.10.5 repeat 3")
+        self.assertEqual(self.output("show interfaces counters")[-1], "Vlan10                     800              8")
+        self.assertEqual(self.output("show interface counters"), self.output("show interfaces counters"))
+        self.assertEqual(self.output("show interfaces Vlan10")[-1], "     8 packets output, 800 bytes")
+        table = self.switch.data_manager.interface_table()
+        table.count("GigabitEthernet1/0/1", "in", 4, 256)
+        # שינוי בהגדרה לא מאפס את המונים; clear counters לממשק אחד או לכולם
+        self.run_lines(["configure terminal", "interface GigabitEthernet1/0/1", "switchport access vlan 20", "end"])
+        self.assertEqual(self.output("show interfaces Gi1/0/1")[-2], "     4 packets input, 256 bytes")
+        self.output("clear counters Vlan10")
+        self.assertEqual(self.output("show interfaces Vlan10")[-1], "     0 packets output, 0 bytes")
+        self.assertEqual(self.output("show interfaces Gi1/0/1")[-2], "     4 packets input, 256 bytes")
+        self.output("clear counters")
+        self.assertEqual(table.read(table.get("GigabitEthernet1/0/1")),
+                         {"in_packets": 0, "in_octets": 0, "out_packets": 0, "out_octets": 0})
+        self.assertEqual(self.switch.execute("show interfaces Gi9/0/1").status, STATUS_ERROR)
+
+    def test_abbreviated_names_are_canonical(self):
+        self.assertEqual([interface_table.canonical_interface(name) for name in
+                          ("Gi1/0/1", "gig 1/0/1", "g1/0/1", "fa0/1", "e0", "Se0/0/0", "lo0", "Vlan10", "Port-channel1")],
+                         ["GigabitEthernet1/0/1"] * 3 + ["FastEthernet0/1", "Ethernet0", "Serial0/0/0", "Loopback0",
+                                                          "Vlan10", "Port-channel1"])
+        router = self.registry.add_device("R1", "router")
+        for result in router.run_script(["enable", "configure terminal", "interface Gi0/1", "no shutdown",
+                                         "ip address 10.0.0.1 255.255.255.0", "exit",
+                                         "interface GigabitEthernet0/1", "bandwidth 500000", "exit",
+                                         "interface se0/0/0", "no shutdown", "ip address 10.0.1.1 255.255.255.252",
+                                         "exit", "interface fa0/0", "exit",
+                                         "router ospf 1", "network 10.0.0.0 0.0.255.255 area 0", "exit",
+                                         "router eigrp 1", "network 10.0.0.0", "end"]):
+            self.assertEqual(result.status, STATUS_OK, result.output)
+        interfaces = router.data_manager.get_device_state("interfaces")
+        self.assertEqual(sorted(interfaces), ["FastEthernet0/0", "GigabitEthernet0/1", "Serial0/0/0"])
+        self.assertEqual(interfaces["GigabitEthernet0/1"]["bandwidth"], 500000)
+        # ברירות המחדל לפי סוג הממשק חלות גם כשהממשק נוצר בשם מקוצר
+        self.assertIn("  MTU 1500 bytes, BW 1544 Kbit/sec, DLY 20000 usec,", self.output_of(router, "show interfaces s0/0/0"))
+        self.assertEqual(ospf_engine.router_lsa(router.data_manager.state).links["Serial0/0/0"][3], 64)
+        self.assertEqual(router_config(router.data_manager.state).links["Serial0/0/0"][3:], (1544, 20000))
+
+    def output_of(self, simulator, line):
+        result = simulator.execute(line)
+        self.assertEqual(result.status, STATUS_OK, result.output)
+        return result.output.split("\n")
+
+    def test_indexes_match_rebuild(self):
+        # שינויים אקראיים, כולל ביטול batch והחלפת כל הממשקים; האינדקסים והסדר זהים לטבלה שנבנית מאפס
+        rng = random.Random(5)
+        manager = self.switch.data_manager
+        table = manager.interface_table()
+        names = [f"GigabitEthernet{unit}/0/{port}" for unit in (1, 2) for port in range(1, 13)]
+        for step in range(400):
+            name = rng.choice(names)
+            action = rng.random()
+            if action < 0.15:
+                manager.remove_interface(name)
+            elif name not in manager.state["interfaces"]:
+                manager.add_interface(name, {"status": "up"})
+            elif action < 0.4:
+                manager.update_interface(name, "status", rng.choice(("up", "administratively down")))
+            elif action < 0.6:
+                manager.update_interface(name, "switchport_access_vlan", str(rng.randint(1, 5)))
+            elif action < 0.75:
+                manager.update_interface(name, "switchport_mode", rng.choice(("access", "trunk")))
+            elif action < 0.9:
+                manager.update_interface(name, "channel_group", f"{rng.randint(1, 3)} mode active")
+            else:
+                with self.assertRaises(KeyError):
+                    with manager.batch():
+                        manager.update_interface(name, "status", "administratively down")
+                        manager.remove_interface(rng.choice(names))
+                        raise KeyError(name)
+            if step == 200:
+                interfaces = dict(manager.state["interfaces"])
+                interfaces.pop(name, None)
+                manager.update_device_state("interfaces", interfaces)
+        reference = interface_table.InterfaceTable(manager.state["interfaces"])
+        self.assertEqual([record.name for record in table], [record.name for record in reference])
+        for index in ("by_vlan", "by_mode", "by_status", "by_channel"):
+            self.assertEqual({value: set(members) for value, members in getattr(table, index).items()},
+                             {value: set(members) for value, members in getattr(reference, index).items()})
+
 
 if __name__ == '__main__':
     unittest.main()
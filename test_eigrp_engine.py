@@ -0,0 +1,132 @@
+# test_eigrp_engine.py
+
+import heapq
+import random
+import unittest
+from cli_simulator import STATUS_ERROR
+from eigrp_engine import router_config
+from lab_fixture import DIAMOND_LINKS, LabMixin, ring_links
+
+
+class TestEigrp(LabMixin, unittest.TestCase):
+
+    LINKS = DIAMOND_LINKS
+    CONFIG = ["router eigrp 100", "network 10.0.0.0"]
+    LOOPBACKS = True
+
+    def eigrp_routes(self, name, prefix="10.255.0.4/32"):
+        output = self.routers[name].execute("show ip route").output
+        return [line for line in output.split("\n") if line.startswith("D") and prefix in line]
+
+    def test_equal_cost_paths_and_show_commands(self):
+        self.assertEqual(self.eigrp_routes("R1"), [
+            "D        10.255.0.4/32 [90/131072] via 10.0.12.2, GigabitEthernet0/0",
+            "D        10.255.0.4/32 [90/131072] via 10.0.13.3, GigabitEthernet0/1",
+        ])
+        output = self.routers["R1"].execute("show ip eigrp neighbors").output.split("\n")
+        self.assertEqual(output[0], "EIGRP-IPv4 Neighbors for AS(100)")
+        self.assertTrue(output[3].startswith("0   10.0.12.2               Gi0/0"))
+        self.assertTrue(output[4].startswith("1   10.0.13.3               Gi0/1"))
+        topology = self.routers["R1"].execute("show ip eigrp topology").output
+        self.assertIn("Topology Table for AS(100)/ID(10.255.0.1)", topology)
+        self.assertIn("P 10.255.0.4/32, 2 successors, FD is 131072", topology)
+        self.assertIn("via 10.0.12.2 (131072/130816), GigabitEthernet0/0", topology)
+
+    def test_variance_and_feasible_successor_failover(self):
+        self.eigrp_routes("R1")
+        self.run_lines(self.routers["R1"], ["configure terminal", "interface GigabitEthernet0/1", "delay 3", "end"])
+        self.assertEqual(self.eigrp_routes("R1"), [
+            "D        10.255.0.4/32 [90/131072] via 10.0.12.2, GigabitEthernet0/0"])
+        self.run_lines(self.routers["R1"], ["configure terminal", "router eigrp 100", "variance 2", "end"])
+        self.assertEqual(self.eigrp_routes("R1"), [
+            "D        10.255.0.4/32 [90/131072] via 10.0.12.2, GigabitEthernet0/0",
+            "D        10.255.0.4/32 [90/131584] via 10.0.13.3, GigabitEthernet0/1",
+        ])
+        self.run_lines(self.routers["R2"], ["configure terminal", "interface GigabitEthernet0/1", "shutdown", "end"])
+        self.assertEqual(self.eigrp_routes("R1"), [
+            "D        10.255.0.4/32 [90/131584] via 10.0.13.3, GigabitEthernet0/1"])
+        self.assertIn("variance 2", self.routers["R1"].execute("show running-config").output)
+        # ה-feasible successor דרך R3 נכנס בלי לעבור ל-active, ולכן ה-FD לא התאפס
+        self.assertIn("P 10.255.0.4/32, 1 successors, FD is 131072",
+                      self.routers["R1"].execute("show ip eigrp topology").output)
+        results = list(self.routers["R1"].run_script(["configure terminal", "router eigrp 100", "variance 200"]))
+        self.assertEqual(results[2].status, STATUS_ERROR)
+
+    def test_redistribute_static_and_passive_interface(self):
+        self.run_lines(self.routers["R4"], ["configure terminal", "ip route 192.168.0.0 255.255.0.0 10.0.34.3",
+                                            "router eigrp 100", "redistribute static", "end"])
+        self.assertEqual(self.eigrp_routes("R1", "192.168.0.0/16"), [
+            "D EX     192.168.0.0/16 [170/3328] via 10.0.12.2, GigabitEthernet0/0",
+            "D EX     192.168.0.0/16 [170/3328] via 10.0.13.3, GigabitEthernet0/1",
+        ])
+        self.run_lines(self.routers["R1"], ["configure terminal", "router eigrp 100",
+                                            "passive-interface GigabitEthernet0/0", "end"])
+        self.assertEqual(self.eigrp_routes("R1", "192.168.0.0/16"), [
+            "D EX     192.168.0.0/16 [170/3328] via 10.0.13.3, GigabitEthernet0/1"])
+        self.assertEqual(self.eigrp_routes("R2", "10.255.0.1/32"), [
+            "D        10.255.0.1/32 [90/131328] via 10.0.24.4, GigabitEthernet0/1"])
+        config = self.routers["R1"].execute("show running-config").output
+        self.assertIn("router eigrp 100\n network 10.0.0.0\n passive-interface GigabitEthernet0/0", config)
+        self.assertIn("redistribute static", self.routers["R4"].execute("show running-config").output)
+
+    def test_removing_eigrp_withdraws_routes(self):
+        self.eigrp_routes("R1")
+        self.routers["R4"].data_manager.update_device_state("routing_protocols", {})
+        self.assertEqual(self.eigrp_routes("R1"), [])
+        self.assertEqual(self.eigrp_routes("R1", "10.0.24.0/24"), [
+            "D        10.0.24.0/24 [90/3072] via 10.0.12.2, GigabitEthernet0/0"])
+        self.registry.remove_device("R2")
+        self.assertEqual(self.eigrp_routes("R1", "10.255.0.2/32"), [])
+        self.assertEqual(self.eigrp_routes("R1", "10.0.24.0/24"), [])
+
+    def test_dual_matches_shortest_paths(self):
+        # טבעת של 12 נתבים עם קיצורים ו-delay אקראי; אחרי נפילות קישורים ושינויי delay כל נתב מגיע לכל
+        # רשת ב-delay המצטבר הקטן ביותר (כל הקישורים Gigabit, כך שה-bandwidth זהה בכל המסלולים)
+        rng = random.Random(5)
+        links = {name: [(interface, address, "255.255.255.0", [f"delay {rng.randint(1, 20)}"])
+                        for interface, address in interfaces] for name, interfaces in ring_links().items()}
+        registry, routers = self.build_lab(links, ["router eigrp 1", "network 10.0.0.0"])
+        managers = [simulator.data_manager for simulator in routers.values()]
+        domain = registry.eigrp
+        for step in range(40):
+            manager = rng.choice(managers)
+            interface = rng.choice(sorted(manager.get_device_state("interfaces")))
+            if step % 2:
+                status = manager.get_device_state("interfaces")[interface]["status"]
+                manager.update_interface(interface, "status", "up" if status != "up" else "administratively down")
+            else:
+                manager.update_interface(interface, "delay", rng.randint(1, 20))
+            domain.converge()
+            graph, origins = {}, {}
+            for manager in managers:
+                # נתב שכל הממשקים שלו למטה נשאר בלי router ID ובלי EIGRP
+                eigrp = router_config(manager.state)
+                if eigrp is None:
+                    continue
+                for address, network, length, bandwidth, delay in eigrp.links.values():
+                    graph.setdefault((network, length), []).append((manager.device_id, delay))
+                for prefix, (bandwidth, delay, external) in eigrp.origins.items():
+                    origins.setdefault(prefix, []).append((manager.device_id, delay))
+            for manager in managers:
+                distance, queue = {manager.device_id: 0}, [(0, manager.device_id)]
+                while queue:
+                    total, device_id = heapq.heappop(queue)
+                    if total > distance[device_id]:
+                        continue
+                    for members in graph.values():
+                        own = [delay for member, delay in members if member == device_id]
+                        for member, _ in members if own else ():
+                            if member != device_id and total + own[0] < distance.get(member, total + own[0] + 1):
+                                distance[member] = total + own[0]
+                                heapq.heappush(queue, (distance[member], member))
+                expected = {prefix: min(distance[member] + delay for member, delay in members if member in distance)
+                            for prefix, members in origins.items()
+                            if any(member in distance for member, _ in members)}
+                router = domain.routers.get(manager.device_id)
+                table = router.table if router is not None and router.config is not None else {}
+                self.assertEqual({prefix: entry.vector[1] for prefix, entry in table.items()}, expected)
+                self.assertFalse(any(entry.active for entry in table.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# test_forwarding.py
+
+import unittest
+from unittest.mock import patch
+from cli_simulator import STATUS_ERROR
+import forwarding
+from lab_fixture import LabMixin
+import mac_table
+from mac_table import format_mac
+
+
+class TestForwarding(LabMixin, unittest.TestCase):
+
+    # R1 (inside) - R2 (NAT) - R3 (בחוץ, בלי נתיב חזרה לרשת של R1)
+    LINKS = {
+        "R1": [("GigabitEthernet0/0", "10.0.12.1", "255.255.255.0", [])],
+        "R2": [("GigabitEthernet0/0", "10.0.12.2", "255.255.255.0", ["ip nat inside"]),
+               ("GigabitEthernet0/1", "203.0.113.2", "255.255.255.0", ["ip nat outside"])],
+        "R3": [("GigabitEthernet0/0", "203.0.113.3", "255.255.255.0", []),
+               ("Loopback0", "198.51.100.1", "255.255.255.255", [])],
+    }
+    EXTRA = {
+        "R1": ["ip route 0.0.0.0 0.0.0.0 10.0.12.2"],
+        "R2": ["ip route 198.51.100.0 255.255.255.0 203.0.113.3", "access-list 1 permit 10.0.12.0 0.0.0.255",
+               "ip nat inside source list 1 interface GigabitEthernet0/1 overload"],
+    }
+
+    def output(self, name, line):
+        return self.run_lines(self.routers[name], [line])[0].split("\n")
+
+    def test_ping_and_traceroute_through_pat(self):
+        self.assertEqual(self.output("R1", "ping 198.51.100.1")[2:], [
+            "!!!!!", "Success rate is 100 percent (5/5), round-trip min/avg/max = 4/4/4 ms"])
+        self.assertEqual(self.output("R1", "traceroute 198.51.100.1")[3:], [
+            "  1 10.0.12.2 1 msec 1 msec 1 msec",
+            "  2 198.51.100.1 2 msec 2 msec 2 msec",
+        ])
+        self.assertIn("icmp 203.0.113.2           10.0.12.1             198.51.100.1          198.51.100.1",
+                      self.output("R2", "show ip nat translations"))
+        self.assertIn("ip nat inside source list 1 interface GigabitEthernet0/1 overload\n!",
+                      self.routers["R2"].execute("show running-config").output)
+        # בלי NAT החבילה מגיעה ל-R3, אבל לתשובה אין נתיב חזרה
+        self.routers["R2"].data_manager.update_device_state("nat", [])
+        self.assertEqual(self.output("R1", "ping 198.51.100.1")[2], ".....")
+
+    def test_static_nat_from_outside(self):
+        self.assertEqual(self.output("R3", "ping 203.0.113.10")[2], ".....")
+        self.run_lines(self.routers["R2"], ["configure terminal", "ip nat inside source static 10.0.12.1 203.0.113.10",
+                                            "ip nat inside source static 10.0.12.1 203.0.113.11", "end"])
+        self.assertEqual(self.routers["R2"].data_manager.get_device_state("nat"), [
+            "list 1 interface GigabitEthernet0/1 overload", "static 10.0.12.1 203.0.113.11"])
+        self.assertEqual(self.output("R3", "ping 203.0.113.11")[2], "!!!!!")
+        self.assertEqual(self.output("R3", "ping 203.0.113.10")[2], ".....")
+        self.assertIn("---  203.0.113.11          10.0.12.1             ---                   ---",
+                      self.output("R2", "show ip nat translations"))
+        results = list(self.routers["R2"].run_script(["configure terminal", "ip nat inside source static 10.0.12.1"]))
+        self.assertEqual(results[1].status, STATUS_ERROR)
+
+    def test_unreachable_codes(self):
+        self.run_lines(self.routers["R3"], [
+            "configure terminal", "access-list 101 deny icmp any host 198.51.100.1",
+            "access-list 101 permit ip any any", "interface GigabitEthernet0/0", "ip access-group 101 in", "end"])
+        self.assertEqual(self.output("R1", "ping 198.51.100.1")[2:], ["U.U.U", "Success rate is 0 percent (0/5)"])
+        self.assertEqual(self.output("R1", "ping 203.0.113.3")[2], "!!!!!")
+        self.assertEqual(self.output("R1", "traceroute 172.16.0.1")[3:], ["  1 10.0.12.2 !H  !H  !H"])
+        # traceroute הוא udp, וה-ACL חוסם רק icmp
+        self.assertEqual(self.output("R1", "traceroute 198.51.100.1")[-1], "  2 198.51.100.1 2 msec 2 msec 2 msec")
+        self.run_lines(self.routers["R3"], ["configure terminal", "access-list 102 deny udp any any",
+                                            "interface GigabitEthernet0/0", "ip access-group 102 in", "end"])
+        self.assertEqual(self.output("R1", "traceroute 198.51.100.1")[-1], "  2 203.0.113.3 !A  !A  !A")
+        self.run_lines(self.routers["R2"], ["configure terminal", "interface GigabitEthernet0/0", "shutdown", "end"])
+        self.assertEqual(self.output("R1", "traceroute 198.51.100.1")[3:], ["  1  *  *  *"])
+
+    def test_reachability_matrix(self):
+        plane = self.registry.forwarding
+        addresses = ["10.0.12.1", "10.0.12.2", "203.0.113.2", "203.0.113.3", "198.51.100.1"]
+        matrix = plane.reachability(addresses)
+        self.assertEqual(len(matrix), 25)
+        self.assertTrue(matrix[("10.0.12.1", "198.51.100.1")].reachable)
+        self.assertEqual(matrix[("203.0.113.3", "10.0.12.1")],
+                         forwarding.Reachability(False, forwarding.NO_ROUTE, "R3", False))
+        self.assertEqual(matrix[("198.51.100.1", "203.0.113.2")],
+                         forwarding.Reachability(True, forwarding.DELIVERED, "R3", True))
+        with self.assertRaises(ValueError):
+            plane.reachability(["172.16.0.1"])
+        # אותה מטריצה מתהליכי worker, עם עותקים של המכשירים
+        with patch.object(forwarding, "POOL_THRESHOLD", 0):
+            self.assertEqual(plane.reachability(addresses, workers=2), matrix)
+        self.registry.remove_device("R3")
+        self.assertEqual(plane.reachability(["10.0.12.1"], ["203.0.113.3"])[("10.0.12.1", "203.0.113.3")].status,
+                         forwarding.NO_NEIGHBOR)
+
+    def test_mac_learning_and_static_entries(self):
+        # מתג עם SVI ב-subnet של R1 ו-R2: ping מ-R1 מלמד את המתג את הכתובת של הממשק של R1 ב-VLAN 12
+        switch = self.routers["SW1"] = self.registry.add_device("SW1", "switch")
+        self.run_lines(switch, ["enable", "configure terminal", "interface Vlan12",
+                                "ip address 10.0.12.3 255.255.255.0", "exit", "interface GigabitEthernet0/1", "exit",
+                                "mac address-table static 00:11:22:33:44:55 vlan 12 interface GigabitEthernet0/1",
+                                "mac address-table static 0011.2233.4455 vlan 12 interface Vlan12", "end"])
+        self.assertEqual(self.output("R1", "ping 10.0.12.3")[2], "!!!!!")
+        learned = format_mac(mac_table.interface_mac("R1", "GigabitEthernet0/0"))
+        self.assertEqual(self.output("SW1", "show mac address-table vlan 12")[5:], [
+            f"  12    {learned}    DYNAMIC     Vlan12",
+            "  12    0011.2233.4455    STATIC      Vlan12",
+            "Total Mac Addresses for this criterion: 2",
+        ])
+        self.assertIn("mac address-table static 0011.2233.4455 vlan 12 interface Vlan12\n!",
+                      switch.execute("show running-config").output)
+        # ה-routers לא לומדים: הממשקים שלהם לא שייכים ל-VLAN
+        self.assertIn("criterion: 0", self.output("R1", "show mac address-table")[-1])
+        results = list(switch.run_script(["configure terminal", "mac address-table static 0011.2233.4455 vlan 12",
+                                          "mac address-table static 0011.2233.4455 vlan 12 interface Gi0/9"]))
+        self.assertEqual([result.status for result in results[1:]], [STATUS_ERROR, STATUS_ERROR])
+
+
+if __name__ == '__main__':
+    unittest.main()
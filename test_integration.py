@@ -2,35 +2,49 @@
 
 import unittest
 from cli_simulator import CLISimulator
+from data_manager import DataManager
 
 class TestIntegration(unittest.TestCase):
 
     def setUp(self):
-        self.simulator = CLISimulator()
+        self.manager = DataManager(':memory:')
+        self.simulator = CLISimulator(self.manager)
         self.simulator.set_device_type("router")
         self.simulator.set_language("en")
 
+    def tearDown(self):
+        self.manager.close()
+
+    def run_command(self, line):
+        # כמו CLISimulator.default: הפקודה רצה במצב הנוכחי, והמצב שהמנתח החזיר הופך לנוכחי
+        parser = self.simulator.command_parser
+        output = parser.parse_command(line, self.simulator.device_type, self.simulator.mode)
+        self.simulator.mode = parser.last_mode
+        self.simulator.update_prompt()
+        return output if isinstance(output, str) else "\n".join(output)
+
     def test_full_command_flow(self):
         # Simulate entering privileged mode
-        result = self.simulator.command_parser.parse_command("enable", "router", self.simulator.commands, "user")
-        self.assertIn("Router#", result)
+        self.run_command("enable")
+        self.assertIn("Router#", self.simulator.prompt)
         self.assertEqual(self.simulator.mode, "privileged")
 
         # Simulate configuring an interface
-        result = self.simulator.command_parser.parse_command("configure terminal", "router", self.simulator.commands, "privileged")
-        self.assertIn("Router(config)#", result)
+        self.run_command("configure terminal")
+        self.assertIn("Router(config)#", self.simulator.prompt)
         self.assertEqual(self.simulator.mode, "config")
 
-        result = self.simulator.command_parser.parse_command("interface GigabitEthernet0/0", "router", self.simulator.commands, "config")
-        self.assertIn("config-if", self.simulator.mode)
+        self.run_command("interface GigabitEthernet0/0")
+        self.assertIn("config-if", self.simulator.prompt)
 
-        result = self.simulator.command_parser.parse_command("ip address 192.168.1.1 255.255.255.0", "router", self.simulator.commands, "config-if")
-        self.assertIn("IP address configured", result)
+        result = self.run_command("ip address 192.168.1.1 255.255.255.0")
+        self.assertIn("IP address 192.168.1.1/255.255.255.0 set", result)
 
         # Verify the configuration
-        result = self.simulator.command_parser.parse_command("show running-config", "router", self.simulator.commands, "privileged")
+        self.run_command("end")
+        result = self.run_command("show running-config")
         self.assertIn("interface GigabitEthernet0/0", result)
         self.assertIn("ip address 192.168.1.1 255.255.255.0", result)
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
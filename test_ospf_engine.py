@@ -0,0 +1,157 @@
+# test_ospf_engine.py
+
+import random
+import unittest
+from cli_simulator import STATUS_ERROR
+from lab_fixture import LabMixin, interface_lines, ring_links
+from ospf_engine import SpfTree
+from routing_engine import ip_to_int
+
+
+class TestOspf(LabMixin, unittest.TestCase):
+
+    # משולש: R1-R2 ב-10.0.12.0/24, R1-R3 ב-10.0.13.0/24, R2-R3 ב-10.0.23.0/24, ו-loopback לכל נתב
+    LINKS = {"R1": [("GigabitEthernet0/0", "10.0.12.1"), ("GigabitEthernet0/1", "10.0.13.1")],
+             "R2": [("GigabitEthernet0/0", "10.0.12.2"), ("GigabitEthernet0/1", "10.0.23.2")],
+             "R3": [("GigabitEthernet0/0", "10.0.13.3"), ("GigabitEthernet0/1", "10.0.23.3")]}
+    CONFIG = ["router ospf 1", "network 10.0.0.0 0.255.255.255 area 0"]
+    LOOPBACKS = True
+
+    def ospf_routes(self, name):
+        output = self.routers[name].execute("show ip route").output
+        return [line for line in output.split("\n") if line.startswith("O ")]
+
+    def test_triangle_routes_and_ecmp(self):
+        self.assertEqual(self.ospf_routes("R1"), [
+            "O        10.0.23.0/24 [110/2] via 10.0.12.2, GigabitEthernet0/0",
+            "O        10.0.23.0/24 [110/2] via 10.0.13.3, GigabitEthernet0/1",
+            "O        10.255.0.2/32 [110/2] via 10.0.12.2, GigabitEthernet0/0",
+            "O        10.255.0.3/32 [110/2] via 10.0.13.3, GigabitEthernet0/1",
+        ])
+        engine = self.routers["R2"].data_manager.routing_engine()
+        self.assertEqual(engine.resolve(ip_to_int("10.255.0.3"))[:2], ("GigabitEthernet0/1", ip_to_int("10.0.23.3")))
+        output = self.routers["R1"].execute("show ip ospf neighbor").output.split("\n")
+        self.assertEqual(len(output), 3)
+        self.assertTrue(output[1].startswith("10.255.0.2      1     FULL/DR"))
+        database = self.routers["R1"].execute("show ip ospf database").output
+        self.assertIn("Router Link States (Area 0)", database)
+        self.assertIn("10.255.0.3      10.255.0.3", database)
+
+    def test_cost_change_and_shutdown_converge_incrementally(self):
+        self.ospf_routes("R1")
+        self.run_lines(self.routers["R2"], ["configure terminal", "interface GigabitEthernet0/1",
+                                            "ip ospf cost 10", "end"])
+        self.assertEqual(self.ospf_routes("R1")[0], "O        10.0.23.0/24 [110/2] via 10.0.13.3, GigabitEthernet0/1")
+        self.run_lines(self.routers["R3"], ["configure terminal", "interface GigabitEthernet0/0", "shutdown", "end"])
+        self.assertEqual(self.ospf_routes("R1"), [
+            "O        10.0.23.0/24 [110/11] via 10.0.12.2, GigabitEthernet0/0",
+            "O        10.255.0.2/32 [110/2] via 10.0.12.2, GigabitEthernet0/0",
+            "O        10.255.0.3/32 [110/12] via 10.0.12.2, GigabitEthernet0/0",
+        ])
+        self.assertIn("SPF algorithm executed 3 times (1 full, 2 incremental)",
+                      self.routers["R1"].execute("show ip ospf").output)
+        self.assertEqual(self.routers["R1"].execute("show ip ospf database").output.count("0x80000002"), 4)
+        results = list(self.routers["R2"].run_script(["configure terminal", "interface GigabitEthernet0/1",
+                                                      "ip ospf cost 0", "end"]))
+        self.assertEqual(results[2].status, STATUS_ERROR)
+
+    def test_removing_ospf_withdraws_routes(self):
+        self.ospf_routes("R1")
+        self.routers["R3"].data_manager.update_device_state("routing_protocols", {})
+        self.assertEqual(self.ospf_routes("R1"), [
+            "O        10.0.23.0/24 [110/2] via 10.0.12.2, GigabitEthernet0/0",
+            "O        10.255.0.2/32 [110/2] via 10.0.12.2, GigabitEthernet0/0",
+        ])
+        self.assertEqual(self.ospf_routes("R3"), [])
+        self.registry.remove_device("R2")
+        self.assertEqual(self.ospf_routes("R1"), [])
+
+    def test_batched_changes_use_pre_change_costs(self):
+        # קו R1-R2-R3: התייקרות ב-R1 והוזלה ב-R2 באותו converge. העץ הישן נבנה לפי העלויות הישנות
+        line = {"R1": [("GigabitEthernet0/0", "10.0.12.1")],
+                "R2": [("GigabitEthernet0/0", "10.0.12.2"),
+                       ("GigabitEthernet0/1", "10.0.23.2", "255.255.255.0", ["ip ospf cost 3"])],
+                "R3": [("GigabitEthernet0/0", "10.0.23.3")]}
+        registry, routers = self.build_lab(line, self.CONFIG, loopbacks=True)
+        routers["R1"].execute("show ip route")
+        self.run_lines(routers["R1"], ["configure terminal", "interface GigabitEthernet0/0", "ip ospf cost 5", "end"])
+        self.run_lines(routers["R2"], ["configure terminal", "interface GigabitEthernet0/1", "ip ospf cost 1", "end"])
+        output = routers["R1"].execute("show ip route").output
+        self.assertEqual([line for line in output.split("\n") if line.startswith("O ")], [
+            "O        10.0.23.0/24 [110/6] via 10.0.12.2, GigabitEthernet0/0",
+            "O        10.255.0.2/32 [110/6] via 10.0.12.2, GigabitEthernet0/0",
+            "O        10.255.0.3/32 [110/7] via 10.0.12.2, GigabitEthernet0/0",
+        ])
+        self.assertIn("(1 full, 1 incremental)", routers["R1"].execute("show ip ospf").output)
+
+    def assert_matches_full(self, registry):
+        domain = registry.ospf
+        domain.converge()
+        for device_id, tree in domain.trees.items():
+            reference = SpfTree(device_id)
+            reference.full(domain)
+            self.assertEqual(tree.dist, reference.dist)
+            self.assertEqual(tree.hops, reference.hops)
+            routes = {prefix: reference.route(domain, prefix) for prefix in domain.advertisers}
+            self.assertEqual(tree.routes, {prefix: paths for prefix, paths in routes.items() if paths})
+            self.assertEqual(registry.device(device_id).data_manager.dynamic_routes.get("ospf", {}), tree.routes)
+
+    def test_leaving_network_restores_ospf_route(self):
+        # שלושה נתבים על 10.0.0.0/24 ו-10.0.1.0/24. R1 עוזב את 10.0.1.0/24 ואז R0 עוזב את 10.0.0.0/24:
+        # המפרסמים של 10.0.1.0/24 לא השתנו, אבל R1 צריך עכשיו נתיב OSPF אליה
+        shared = {f"R{i}": [("GigabitEthernet0/0", f"10.0.0.{i + 1}"), ("GigabitEthernet0/1", f"10.0.1.{i + 1}")]
+                  for i in range(3)}
+        registry, routers = self.build_lab(shared, self.CONFIG)
+        registry.ospf.converge()
+        self.run_lines(routers["R1"], ["configure terminal", "interface GigabitEthernet0/1", "shutdown", "end"])
+        registry.ospf.converge()
+        self.run_lines(routers["R0"], ["configure terminal", "interface GigabitEthernet0/0", "shutdown", "end"])
+        output = routers["R1"].execute("show ip route").output
+        self.assertIn("O        10.0.1.0/24 [110/2] via 10.0.0.3, GigabitEthernet0/0", output.split("\n"))
+        self.assert_matches_full(registry)
+
+    def test_joining_network_replaces_ospf_route(self):
+        # R1 מגיע ל-10.0.23.0/24 דרך R2 ו-R3; אחרי שהוא מצטרף אליה היא connected ונתיב ה-OSPF יוצא
+        registry = self.registry
+        self.assertIn("O        10.0.23.0/24 [110/2] via 10.0.12.2, GigabitEthernet0/0", self.ospf_routes("R1"))
+        self.run_lines(self.routers["R1"], ["configure terminal",
+                                            *interface_lines("GigabitEthernet0/2", "10.0.23.1", extra=["ip ospf cost 50"]),
+                                            "end"])
+        self.assertEqual([route for route in self.ospf_routes("R1") if "10.0.23.0/24" in route], [])
+        self.assert_matches_full(registry)
+
+    def check_random_changes(self, seed, batched):
+        # טבעת של 12 נתבים עם קיצורים; אחרי שינויי עלות ו-shutdown אקראיים כל העצים זהים לחישוב מלא מאפס
+        rng = random.Random(seed)
+        registry, routers = self.build_lab(ring_links(), self.CONFIG)
+        managers = [simulator.data_manager for simulator in routers.values()]
+        domain = registry.ospf
+        domain.converge()
+        for step in range(30):
+            for _ in range(1 + step % 3 + (2 if batched else 0)):
+                manager = rng.choice(managers)
+                interface = rng.choice(sorted(manager.get_device_state("interfaces")))
+                if batched and rng.random() < 0.2:
+                    status = manager.get_device_state("interfaces")[interface].get("status")
+                    manager.update_interface(interface, "status",
+                                             "administratively down" if status == "up" else "up")
+                else:
+                    manager.update_interface(interface, "ospf_cost", rng.randint(1, 20))
+                if not batched:
+                    # חלק מהעצים מתעדכנים אחרי כל שינוי, והשאר צוברים כמה שינויים עד ה-converge המלא
+                    managers[step % 12].routing_engine()
+            self.assert_matches_full(registry)
+        self.assertGreater(sum(tree.incremental_runs for tree in domain.trees.values()), 0)
+
+    def test_incremental_spf_matches_full(self):
+        self.check_random_changes(3, batched=False)
+
+    def test_batched_incremental_spf_matches_full(self):
+        # כמה שינויים (התייקרויות, הוזלות, קישורים שנופלים וחוזרים) באותו converge
+        for seed in (1, 7, 42, 258, 1009):
+            with self.subTest(seed=seed):
+                self.check_random_changes(seed, batched=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# test_rip_engine.py
+
+import random
+import unittest
+from cli_simulator import STATUS_ERROR
+from lab_fixture import DIAMOND_LINKS, LabMixin, ring_links
+import rip_engine
+
+
+class TestRip(LabMixin, unittest.TestCase):
+
+    # אותו יהלום כמו ב-TestEigrp, עם router rip
+    LINKS = DIAMOND_LINKS
+    CONFIG = ["router rip", "network 10.0.0.0"]
+    LOOPBACKS = True
+
+    def rip_routes(self, name, prefix="10.255.0.4/32"):
+        output = self.routers[name].execute("show ip route").output
+        return [line for line in output.split("\n") if line.startswith("R ") and prefix in line]
+
+    def test_equal_cost_paths_and_database(self):
+        self.assertEqual(self.rip_routes("R1"), [
+            "R        10.255.0.4/32 [120/2] via 10.0.12.2, GigabitEthernet0/0",
+            "R        10.255.0.4/32 [120/2] via 10.0.13.3, GigabitEthernet0/1",
+        ])
+        self.assertEqual(self.rip_routes("R1", "10.0.24.0/24"), [
+            "R        10.0.24.0/24 [120/1] via 10.0.12.2, GigabitEthernet0/0"])
+        database = self.routers["R1"].execute("show ip rip database").output.split("\n")
+        self.assertIn("10.0.12.0/24    directly connected, GigabitEthernet0/0", database)
+        index = database.index("10.255.0.4/32")
+        self.assertTrue(database[index + 1].startswith("    [2] via 10.0.12.2, 00:00:"))
+        self.assertTrue(database[index + 2].endswith(", GigabitEthernet0/1"))
+
+    def test_step_mode_shows_rounds(self):
+        results = list(self.routers["R1"].run_script(["enable", "rip step"]))
+        self.assertEqual(results[1].status, STATUS_ERROR)
+        self.rip_routes("R1")
+        self.assertEqual(self.run_lines(self.routers["R1"], ["debug ip rip"]), ["RIP protocol debugging is on"])
+        self.run_lines(self.routers["R2"], ["configure terminal", "interface GigabitEthernet0/1", "shutdown", "end"])
+        # עד הסבב הבא R1 עדיין מחזיק את המסלול דרך R2
+        self.assertEqual(len(self.rip_routes("R1")), 2)
+        first = self.run_lines(self.routers["R1"], ["rip step"])[0].split("\n")
+        self.assertTrue(first[0].startswith("RIP: round "))
+        self.assertIn("RIP: 10.255.0.4/32 via 10.0.13.3, metric 2", first)
+        self.assertEqual(self.rip_routes("R1"), [
+            "R        10.255.0.4/32 [120/2] via 10.0.13.3, GigabitEthernet0/1"])
+        last = self.run_lines(self.routers["R1"], ["rip step 16"])[0].split("\n")
+        self.assertTrue(last[-1].startswith("RIP: converged ("))
+        self.assertEqual(self.run_lines(self.routers["R1"], ["no debug ip rip"]), ["RIP protocol debugging is off"])
+        self.assertEqual(self.rip_routes("R1", "10.0.24.0/24"), [
+            "R        10.0.24.0/24 [120/2] via 10.0.13.3, GigabitEthernet0/1"])
+
+    def test_passive_interface_and_removal(self):
+        self.run_lines(self.routers["R1"], ["configure terminal", "router rip",
+                                            "passive-interface GigabitEthernet0/0", "end"])
+        # R1 עדיין לומד דרך Gi0/0 אבל לא מפרסם בו, אז R2 מגיע אליו דרך R4 ו-R3
+        self.assertEqual(self.rip_routes("R1"), [
+            "R        10.255.0.4/32 [120/2] via 10.0.12.2, GigabitEthernet0/0",
+            "R        10.255.0.4/32 [120/2] via 10.0.13.3, GigabitEthernet0/1",
+        ])
+        self.assertEqual(self.rip_routes("R2", "10.255.0.1/32"), [
+            "R        10.255.0.1/32 [120/3] via 10.0.24.4, GigabitEthernet0/1"])
+        config = self.routers["R1"].execute("show running-config").output
+        self.assertIn("router rip\n network 10.0.0.0\n passive-interface GigabitEthernet0/0", config)
+        self.routers["R4"].data_manager.update_device_state("routing_protocols", {})
+        self.assertEqual(self.rip_routes("R1"), [])
+        self.assertEqual(self.rip_routes("R1", "10.0.24.0/24"), [
+            "R        10.0.24.0/24 [120/1] via 10.0.12.2, GigabitEthernet0/0"])
+        self.registry.remove_device("R2")
+        self.assertEqual(self.rip_routes("R1", "10.255.0.2/32"), [])
+        self.assertEqual(self.rip_routes("R1", "10.0.24.0/24"), [])
+
+    def test_rounds_match_hop_counts(self):
+        # טבעת של 12 נתבים עם קיצורים; אחרי נפילות קישורים ו-passive-interface כל נתב מגיע לכל רשת
+        # במספר הקפיצות הקטן ביותר (עד 15), ו-RipDomain בלי NumPy מגיע לאותה טבלה
+        rng = random.Random(3)
+        registry, routers = self.build_lab(ring_links(), self.CONFIG)
+        managers = [simulator.data_manager for simulator in routers.values()]
+        domain, reference = registry.rip, rip_engine.RipDomain(vectorized=False)
+        for step in range(30):
+            manager = rng.choice(managers)
+            interface = rng.choice(sorted(manager.get_device_state("interfaces")))
+            if step % 3:
+                status = manager.get_device_state("interfaces")[interface]["status"]
+                manager.update_interface(interface, "status", "up" if status != "up" else "administratively down")
+            else:
+                process = dict(manager.get_device_state("routing_protocols")["rip"])
+                process["passive"] = sorted(set(process.get("passive", [])) ^ {interface})
+                manager.update_device_state("routing_protocols", {"rip": process})
+            domain.converge()
+            configs = {manager.device_id: rip_engine.router_config(manager.state) for manager in managers}
+            senders = {}
+            for device_id, rip in configs.items():
+                for interface, (address, network, length) in (rip.links.items() if rip else ()):
+                    senders.setdefault((network, length), []).append((device_id, interface in rip.passive))
+            for manager in managers:
+                if configs[manager.device_id] is None:
+                    continue
+                hops, queue = {manager.device_id: 0}, [manager.device_id]
+                for device_id in queue:
+                    for members in senders.values():
+                        if any(member == device_id for member, _ in members):
+                            for member, passive in members:
+                                if not passive and member not in hops:
+                                    hops[member] = hops[device_id] + 1
+                                    queue.append(member)
+                expected = {}
+                for device_id, distance in hops.items():
+                    for prefix in configs[device_id].origins:
+                        expected[prefix] = min(expected.get(prefix, distance), distance)
+                metrics = domain.row_metrics(domain.rows[manager.device_id])
+                self.assertEqual({prefix: metrics[column] for column, prefix in enumerate(domain.prefixes)
+                                  if metrics[column] < rip_engine.INFINITY},
+                                 {prefix: distance for prefix, distance in expected.items()
+                                  if distance < rip_engine.INFINITY})
+        for manager in managers:
+            reference.attach(manager.device_id, manager)
+        reference.converge()
+        domain.converge()
+        self.assertEqual(reference.installed, domain.installed)
+
+
+if __name__ == '__main__':
+    unittest.main()